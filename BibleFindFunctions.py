@@ -0,0 +1,2426 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# BibleFindFunctions.py
+#
+# Functions to support finding (and replacing) text in Bibles in Biblelator
+#
+# Copyright (C) 2018 Robert Hunt
+# Author: Robert Hunt <Freely.Given.org@gmail.com>
+# License: See gpl-3.0.txt
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Non-GUI helper functions for the Bible find (search) functions.
+
+The actual searching of the text is still done by the BOS findText functions,
+    but a (saved) index of the normalized words in each book
+    is used to decide which books and chapters need to be searched (and so loaded) at all.
+The index for a book gets rebuilt (from its saved file, by the find worker processes if possible)
+    whenever its source file changes.
+
+Regular expression finds and replaces are done by worker processes of their own (if possible)
+    so that a runaway expression (e.g., with catastrophic backtracking)
+    can be stopped after evaluating for REGEX_TIME_LIMIT seconds (or when it's cancelled)
+    rather than hanging the program (or stopping anybody else's searches).
+
+Caseless and diacritic-insensitive searches done here (e.g., Bible finds and collating) search a shadow copy
+    of each loaded book's text that's already been case-folded, etc. (made the first time it's needed)
+    with an offset map back to the original text.
+
+Searches that can't use the index (e.g., regular expressions, markers, footnotes)
+    are split up by book and searched by a pool of worker processes.
+
+Replaces are done directly on the USFM files (one write per book)
+    with the original files kept in an undo journal.
+
+Two Bibles are collated by walking through the verses of each book of both together
+    (with the books loaded and collated by the find worker processes if possible).
+
+    normalizeFindText( text )
+    getFindTokens( findText )
+    class BibleFindIndex
+        __init__( self, internalBible, indexFolderPath=None )
+        getBookSourceStat( self, BBB )
+        _getBookFileParameters( self, BBB )
+        _loadSavedBookIndex( self, BBB, sourceStat )
+        startBuildingBookIndexes( self, bookList )
+        getBookIndex( self, BBB )
+        _buildBookIndex( self, BBB )
+        findCandidateChapters( self, BBB, findText )
+    getBibleFindIndex( internalBible )
+    indexBookWords( BBB, internalBibleBook )
+    _makeFileBible( bibleClass, sourceFolder, bibleName, bibleAbbreviation, encoding )
+    buildBookIndexHelper( parameters )
+    _buildBookIndexFromFile( parameters )
+    getFindIndexThreadExecutor()
+    class ShadowCharacterDict( dict )
+        __init__( self, caselessFlag, ignoreDiacriticsFlag )
+        __missing__( self, char )
+    makeShadowText( text, caselessFlag=True, ignoreDiacriticsFlag=True )
+    getOriginalSpan( offsetMap, startIndex, endIndex )
+    class BookShadowText
+        __init__( self, internalBibleBook, caselessFlag=True, ignoreDiacriticsFlag=True )
+        iterateMatches( self, compiledRegex )
+        getEntryText( self, entryIndex )
+    getBookShadowText( internalBibleBook, caselessFlag=True, ignoreDiacriticsFlag=True )
+    invalidateBookShadowTexts( internalBible, BBB )
+    makeShadowRegex( optionsDict )
+    findInBookShadowText( internalBibleBook, compiledShadowRegex, caselessFlag, ignoreDiacriticsFlag )
+    canFindInShadowText( optionsDict )
+    findBookTextInShadowText( BBB, internalBibleBook, optionsDict )
+    canFindByBooks( internalBible )
+    canUseFindIndex( optionsDict )
+    isRegexFind( optionsDict )
+    canFindInWorkers( internalBible )
+    canFindInParallel( internalBible, numBooks )
+    getFindBookList( internalBible, optionsDict )
+    getFindWorkerPool()
+    _discardFindWorkerPool()
+    getRegexTaskManager()
+    _runRegexTask( parameters )
+    _startRegexEvaluation( taskKey )
+    class RegexWorkerPool
+        __init__( self, numProcesses )
+        submit( self, function, parameters )
+        _getStartedMessages( self )
+        isOverTime( self, taskKey, timeLimit )
+        getResult( self, taskKey, future, timeLimit )
+        close( self )
+    findBookTextHelper( parameters )
+    iterateFindTextInBooks( internalBible, optionsDict, bookChapterLists, waitFlag=True, timeLimit=REGEX_TIME_LIMIT )
+    getFindBookChapterLists( optionsDict )
+    iterateFindTextByBooks( optionsDict, resultSummaryDict, waitFlag=True, timeLimit=REGEX_TIME_LIMIT )
+    findTextByBooks( optionsDict )
+    compileFindRegex( pattern, flags=0 )
+    checkFindRegex( findText )
+    makeReplaceRegex( optionsDict )
+    findBookReplacements( BBB, bookText, compiledRegex, optionsDict )
+    findBookReplacementsHelper( parameters )
+    findBookReplacementsInWorker( BBB, bookText, compiledRegex, optionsDict, regexWorkerPool, timeLimit=REGEX_TIME_LIMIT )
+    applyBookReplacements( bookText, replacements )
+    writeFileAtomically( filepath, fileBytes )
+    class ReplaceUndoJournal
+        __init__( self, journalFolderPath )
+        _appendRecord( self, record )
+        getRecords( self )
+        canRollback( self )
+        recordBook( self, BBB, filepath, originalBytes, newBytes )
+        rollback( self, internalBible=None )
+    _pruneReplaceUndoJournals( journalsFolderPath )
+    makeReplaceUndoJournal( internalBible )
+    replaceTextInBooks( optionsDict, confirmFunction, undoJournal, timeLimit=REGEX_TIME_LIMIT )
+    iterateBookVerses( internalBibleBook )
+    findBookShadowVerses( internalBibleBook, shadowRegexTuple )
+    collateBookVerses( BBB, verses1, verses2, foundVerseSet1, foundVerseSet2, markersMatchFlag=False )
+    collateBookHelper( parameters )
+    iterateCollatedBooks( optionsDict1, optionsDict2, markersMatchFlag=False, waitFlag=True )
+    collateBooks( optionsDict1, optionsDict2, markersMatchFlag=False )
+    demoReplace()
+    demoCollate()
+    demoShadowText()
+    demoRegexTimeLimit()
+    demo()
+"""
+
+from gettext import gettext as _
+
+LastModifiedDate = '2018-03-14' # by RJH
+ShortProgName = "BibleFindFunctions"
+ProgName = "Biblelator Bible Find Functions"
+ProgVersion = '0.43'
+ProgNameVersion = '{} v{}'.format( ProgName, ProgVersion )
+ProgNameVersionDate = '{} {} {}'.format( ProgNameVersion, _("last modified"), LastModifiedDate )
+
+debuggingThisModule = False
+
+
+import os
+import logging
+import re
+import json
+import time
+import shutil
+import signal
+import pickle
+import hashlib
+import unicodedata
+import weakref
+import multiprocessing
+from collections import OrderedDict, defaultdict
+from bisect import bisect_right
+from array import array
+from itertools import accumulate
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, wait as waitForFutures
+from concurrent.futures.process import BrokenProcessPool
+
+# Biblelator imports
+from BiblelatorGlobals import DATA_FOLDER_NAME
+from BiblelatorHelpers import packBCV, unpackBCV, getInternalBibleLock
+
+# BibleOrgSys imports
+#if __name__ == '__main__': import sys; sys.path.append( '../BibleOrgSys/' )
+import BibleOrgSysGlobals
+from VerseReferences import SimpleVerseKey
+
+
+FIND_INDEXES_SUBFOLDER_NAME = 'FindIndexes/'
+FIND_INDEX_VERSION = 1 # Increment this if the saved index format (or the normalization) changes
+FIND_WORD_RE = re.compile( r'\w+' )
+LEADING_NUMBER_RE = re.compile( r'\d+' )
+USFM_CV_RE = re.compile( r'\\(c|v)\s+(\S+)' )
+NON_ASCII_RE = re.compile( r'[^\x00-\x7f]' )
+
+REPLACE_JOURNALS_SUBFOLDER_NAME = 'ReplaceJournals/'
+REPLACE_JOURNAL_FILENAME = 'Journal.txt'
+MAX_REPLACE_JOURNALS = 10 # Number of replace sessions that we keep the originals for
+liveReplaceUndoJournals = weakref.WeakSet() # The ReplaceUndoJournal objects still in use (e.g., kept by an edit window for undo)
+
+MAX_FIND_WORKER_BIBLES = 3 # Number of Bibles that each find worker process keeps loaded
+MAX_COMPILED_REGEXES = 100 # Number of compiled regular expressions that we keep
+REGEX_TIME_LIMIT = 10 # Seconds that a regular expression search (or replace) of one book can take before it's abandoned
+REGEX_CHECK_INTERVAL = 0.05 # Seconds between checks on how long a regular expression search has been going
+COLLATE_SKIPPED_MARKERS = ( 'c#', 'vp#', ) # Added by BOS (and with no verse text)
+UNPICKLABLE_FIND_OPTIONS = ( 'givenBible', 'parentWindow', 'parentBox', 'parentApp', ) # Not passed to the find worker processes
+
+bibleFindIndexes = weakref.WeakKeyDictionary() # Indexed by internal Bible -- contains BibleFindIndex objects
+bookShadowTexts = weakref.WeakKeyDictionary() # Indexed by internal Bible book -- contains dicts (indexed by (caselessFlag,ignoreDiacriticsFlag)) of BookShadowText objects
+compiledRegexCache = OrderedDict() # Indexed by (pattern, flags) -- contains compiled regular expressions (most recently used last)
+findWorkerPool = None # Shared by all the find windows (made when first needed)
+findIndexThreadExecutor = None # Builds find indexes if we can't use the find worker processes (made when first needed)
+workerBibles = OrderedDict() # Only used in the find worker processes -- indexed by (Bible class name, sourceFolder)
+regexTaskManager = None # Makes the queues and events for the RegexWorkerPools (made when first needed)
+regexStartedQueue = regexStopEvent = None # Only used in the regex worker processes (see RegexWorkerPool)
+
+
+
+def exp( messageString ):
+    """
+    Expands the message string in debug mode.
+    Prepends the module name to a error or warning message string
+        if we are in debug mode.
+    Returns the new string.
+    """
+    try: nameBit, errorBit = messageString.split( ': ', 1 )
+    except ValueError: nameBit, errorBit = '', messageString
+    if BibleOrgSysGlobals.debugFlag or debuggingThisModule:
+        nameBit = '{}{}{}'.format( ShortProgName, '.' if nameBit else '', nameBit )
+    return '{}{}'.format( nameBit+': ' if nameBit else '', errorBit )
+# end of exp
+
+
+
+def normalizeFindText( text ):
+    """
+    Returns the text case-folded and with any diacritics (combining marks) removed.
+
+    This is used for both the indexed words and the words searched for,
+        so that the index finds every verse that the find could possibly match
+        whatever the caseless and ignore diacritics settings are.
+    """
+    return ''.join( char for char in unicodedata.normalize( 'NFD', text ) if not unicodedata.combining( char ) ).casefold()
+# end of normalizeFindText
+
+
+def getFindTokens( findText ):
+    """
+    Splits the text to be searched for into normalized words.
+
+    Returns a list of 3-tuples: (normalizedWord, leftOpen, rightOpen)
+        where leftOpen means that the word in the text might have extra letters before it
+        (because it's at the start of the search text), and similarly for rightOpen.
+    """
+    normalizedFindText = normalizeFindText( findText )
+    matches = list( FIND_WORD_RE.finditer( normalizedFindText ) )
+    findTokens = []
+    for j,match in enumerate( matches ):
+        findTokens.append( (match.group(),
+                            j==0 and match.start()==0, # Nothing before the first word in the search text
+                            j==len(matches)-1 and match.end()==len(normalizedFindText) ) ) # Nothing after the last word
+    return findTokens
+# end of getFindTokens
+
+
+
+class BibleFindIndex:
+    """
+    An index of the normalized words in each book of a Bible,
+        giving the (packed) verse keys where they occur.
+
+    Each book's index is saved (pickled) in our data folder
+        along with the modification time and size of the book's source file
+        so that it only needs to be rebuilt when the book is changed.
+    """
+    def __init__( self, internalBible, indexFolderPath=None ):
+        """
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( exp("BibleFindIndex.__init__( {}, {} )").format( internalBible.getAName(), indexFolderPath ) )
+        self.internalBible = internalBible
+        if indexFolderPath is None:
+            sourceFolder = os.path.normcase( os.path.realpath( internalBible.sourceFolder ) )
+            indexFolderName = '{}_{}'.format( re.sub( r'[^\w.-]', '_', internalBible.getAName() ),
+                                                hashlib.md5( sourceFolder.encode( 'utf-8' ) ).hexdigest()[:8] )
+            indexFolderPath = os.path.join( BibleOrgSysGlobals.findHomeFolderPath(), DATA_FOLDER_NAME,
+                                                FIND_INDEXES_SUBFOLDER_NAME, indexFolderName )
+        self.indexFolderPath = indexFolderPath
+        self.bookIndexes = {} # Indexed by BBB -- contains (sourceStat, narrowableFlag, wordPostingsDict)
+        self.bookIndexFutures = {} # Indexed by BBB -- contains Futures for the indexes being built in the background
+    # end of BibleFindIndex.__init__
+
+
+    def getBookSourceStat( self, BBB ):
+        """
+        Returns a 2-tuple (modification time, size) for the source file of the book.
+
+        Raises KeyError if we don't know the filename, or OSError if we can't get to it.
+        """
+        sourceStat = os.stat( os.path.join( self.internalBible.sourceFolder, self.internalBible.possibleFilenameDict[BBB] ) )
+        return sourceStat.st_mtime, sourceStat.st_size
+    # end of BibleFindIndex.getBookSourceStat
+
+
+    def _getBookFileParameters( self, BBB ):
+        """
+        Returns the parameters for buildBookIndexHelper or _buildBookIndexFromFile
+            (so they can load the book from its saved file).
+        """
+        internalBible = self.internalBible
+        return (type(internalBible), internalBible.sourceFolder,
+                getattr( internalBible, 'givenName', None ), getattr( internalBible, 'abbreviation', None ),
+                getattr( internalBible, 'encoding', None ), BBB, internalBible.possibleFilenameDict[BBB])
+    # end of BibleFindIndex._getBookFileParameters
+
+
+    def _loadSavedBookIndex( self, BBB, sourceStat ):
+        """
+        Returns a 3-tuple (sourceStat, narrowableFlag, wordPostingsDict) for the book
+            if we have an index in memory or saved that was built from the current source file,
+            otherwise None.
+        """
+        try: bookIndex = self.bookIndexes[BBB]
+        except KeyError: bookIndex = None
+        if bookIndex is not None and bookIndex[0] == sourceStat: return bookIndex
+        try:
+            with open( os.path.join( self.indexFolderPath, BBB+'.pickle' ), 'rb' ) as indexFile:
+                indexVersion, savedSourceStat, narrowableFlag, wordPostingsDict = pickle.load( indexFile )
+        except (OSError, ValueError, EOFError, pickle.UnpicklingError): return None
+        if indexVersion != FIND_INDEX_VERSION or tuple(savedSourceStat) != sourceStat: return None
+        bookIndex = self.bookIndexes[BBB] = sourceStat, narrowableFlag, wordPostingsDict
+        return bookIndex
+    # end of BibleFindIndex._loadSavedBookIndex
+
+
+    def startBuildingBookIndexes( self, bookList ):
+        """
+        Starts building the indexes for any of the books that don't have an up-to-date index
+            (in the find worker processes if possible, else on a background thread)
+            so that the GUI thread doesn't have to wait while they're built.
+
+        Returns a list of the Futures for the indexes being built.
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( exp("BibleFindIndex.startBuildingBookIndexes( {} ) for {}").format( bookList, self.internalBible.getAName() ) )
+
+        for BBB in bookList:
+            if BBB in self.bookIndexFutures: continue # Already being built
+            try: sourceStat = self.getBookSourceStat( BBB )
+            except (KeyError, OSError): continue # getBookIndex will fail too
+            if self._loadSavedBookIndex( BBB, sourceStat ) is not None: continue
+            parameters = self._getBookFileParameters( BBB )
+            if canFindInWorkers( self.internalBible ):
+                try:
+                    self.bookIndexFutures[BBB] = getFindWorkerPool().submit( buildBookIndexHelper, parameters )
+                    continue
+                except (BrokenProcessPool, RuntimeError) as err:
+                    logging.error( exp("BibleFindIndex.startBuildingBookIndexes: Unable to use the find worker processes: {}").format( err ) )
+                    _discardFindWorkerPool()
+            self.bookIndexFutures[BBB] = getFindIndexThreadExecutor().submit( _buildBookIndexFromFile, parameters )
+        return list( self.bookIndexFutures.values() )
+    # end of BibleFindIndex.startBuildingBookIndexes
+
+
+    def getBookIndex( self, BBB ):
+        """
+        Returns a 2-tuple (narrowableFlag, wordPostingsDict) for the book
+            (using the saved index if the book's source file hasn't changed since it was built).
+
+        If the index isn't up to date, it's built from the saved file
+            (waiting for it if startBuildingBookIndexes has already started building it).
+
+        narrowableFlag is False if the chapter numbers couldn't all be understood
+            (in which case the index can only be used to decide whether to search the whole book).
+        wordPostingsDict is indexed by normalized word
+            and contains the sorted list of the packed verse keys where the word occurs.
+        """
+        sourceStat = self.getBookSourceStat( BBB )
+        bookIndexFuture = self.bookIndexFutures.pop( BBB, None )
+        bookIndex = self._loadSavedBookIndex( BBB, sourceStat )
+        if bookIndex is None:
+            if bookIndexFuture is not None:
+                try: bookIndex = bookIndexFuture.result()
+                except Exception as err: # Could be anything from the Bible class -- build it here instead
+                    logging.error( exp("BibleFindIndex.getBookIndex: {} index build failed in the background: {}").format( BBB, err ) )
+                    if isinstance( err, BrokenProcessPool ): _discardFindWorkerPool()
+                if bookIndex is not None and bookIndex[0] != sourceStat: bookIndex = None # Saved again since it was started
+            if bookIndex is None: bookIndex = self._buildBookIndex( BBB )
+            # The sourceStat in bookIndex was taken before the file was loaded for indexing
+            #   so if the file was changed after that, it'll get indexed again next time
+            try:
+                indexFilepath = os.path.join( self.indexFolderPath, BBB+'.pickle' )
+                os.makedirs( self.indexFolderPath, exist_ok=True )
+                with open( indexFilepath+'.tmp', 'wb' ) as indexFile:
+                    pickle.dump( (FIND_INDEX_VERSION,)+tuple(bookIndex), indexFile, pickle.HIGHEST_PROTOCOL )
+                os.replace( indexFilepath+'.tmp', indexFilepath )
+            except OSError as err:
+                logging.error( exp("BibleFindIndex.getBookIndex: Unable to save {} find index: {}").format( BBB, err ) )
+            self.bookIndexes[BBB] = bookIndex
+        return bookIndex[1:]
+    # end of BibleFindIndex.getBookIndex
+
+
+    def _buildBookIndex( self, BBB ):
+        """
+        Loads the book from its saved file and indexes all the words in it
+            (in this thread -- only used if it couldn't be done in the background).
+
+        Returns a 3-tuple (sourceStat, narrowableFlag, wordPostingsDict) -- see getBookIndex above.
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( exp("BibleFindIndex._buildBookIndex( {} ) for {}").format( BBB, self.internalBible.getAName() ) )
+
+        return _buildBookIndexFromFile( self._getBookFileParameters( BBB ) )
+    # end of BibleFindIndex._buildBookIndex
+
+
+    def findCandidateChapters( self, BBB, findText ):
+        """
+        Uses the index to find which chapters of the book might contain the text.
+
+        Returns an empty list if the text can't be in the book,
+            a sorted list of chapter number strings,
+            or None if the whole book needs to be searched.
+        """
+        findTokens = getFindTokens( findText )
+        if not findTokens: return None # Can't tell anything from the index
+        narrowableFlag, wordPostingsDict = self.getBookIndex( BBB )
+        candidateVerseKeys = None
+        for word,leftOpen,rightOpen in findTokens:
+            if leftOpen and rightOpen: matchingWords = [indexWord for indexWord in wordPostingsDict if word in indexWord]
+            elif leftOpen: matchingWords = [indexWord for indexWord in wordPostingsDict if indexWord.endswith( word )]
+            elif rightOpen: matchingWords = [indexWord for indexWord in wordPostingsDict if indexWord.startswith( word )]
+            else: matchingWords = [word] if word in wordPostingsDict else []
+            verseKeys = set()
+            for matchingWord in matchingWords: verseKeys.update( wordPostingsDict[matchingWord] )
+            candidateVerseKeys = verseKeys if candidateVerseKeys is None else candidateVerseKeys & verseKeys
+            if not candidateVerseKeys: return [] # Not in this book
+        if not narrowableFlag: return None
+        candidateChapters = sorted( { int( unpackBCV( packedVerseKey )[1] ) for packedVerseKey in candidateVerseKeys } )
+        if candidateChapters[0] < 1: return None # Found in the introduction (which the chapter list might not include)
+        return [str(intC) for intC in candidateChapters]
+    # end of BibleFindIndex.findCandidateChapters
+# end of BibleFindIndex class
+
+
+
+def getBibleFindIndex( internalBible ):
+    """
+    Returns the (shared) find index for the internal Bible.
+    """
+    try: return bibleFindIndexes[internalBible]
+    except KeyError:
+        findIndex = bibleFindIndexes[internalBible] = BibleFindIndex( internalBible )
+        return findIndex
+# end of getBibleFindIndex
+
+
+def indexBookWords( BBB, internalBibleBook ):
+    """
+    Indexes all the (normalized) words in the loaded book.
+
+    Returns a 2-tuple (narrowableFlag, wordPostingsDict) -- see BibleFindIndex.getBookIndex.
+    """
+    narrowableFlag = True
+    wordVerseSets = defaultdict( set )
+    intC, intV = -1, 0 # For the book introduction
+    for verseDataEntry in internalBibleBook._processedLines:
+        marker, cleanText = verseDataEntry.getMarker(), verseDataEntry.getCleanText()
+        if marker == 'c' or marker == 'v':
+            match = LEADING_NUMBER_RE.match( cleanText )
+            if match is None or int( match.group() ) >= 999: narrowableFlag = False # Leave intC,intV unchanged
+            elif marker == 'c': intC, intV = int( match.group() ), 0
+            else: intV = int( match.group() )
+            continue
+        if marker.startswith( '¬' ): continue # End markers don't have any text
+        packedVerseKey = packBCV( BBB, intC, intV )
+        for word in FIND_WORD_RE.findall( normalizeFindText( cleanText ) ):
+            wordVerseSets[word].add( packedVerseKey )
+    return narrowableFlag, { word:sorted( verseSet ) for word,verseSet in wordVerseSets.items() }
+# end of indexBookWords
+
+
+def _makeFileBible( bibleClass, sourceFolder, bibleName, bibleAbbreviation, encoding ):
+    """
+    Returns a new (preloaded) Bible object of the given class for the Bible files in sourceFolder
+        (so that books can be loaded from their saved files).
+    """
+    try: fileBible = bibleClass( sourceFolder, givenName=bibleName, givenAbbreviation=bibleAbbreviation, encoding=encoding )
+    except TypeError: fileBible = bibleClass( sourceFolder ) # Not all Bible classes take the same parameters
+    try: fileBible.preload()
+    except AttributeError: pass # Not all Bible classes need preloading
+    return fileBible
+# end of _makeFileBible
+
+
+def buildBookIndexHelper( parameters ):
+    """
+    Runs in a find worker process to index the words in one Bible book (loaded from its saved file).
+
+    Parameter parameters is a 7-tuple containing the Bible class, sourceFolder, name, abbreviation, encoding,
+        BBB, and filename.
+
+    Returns a 3-tuple (sourceStat, narrowableFlag, wordPostingsDict)
+        where sourceStat was taken before the book was loaded.
+    """
+    bibleClass, sourceFolder, bibleName, bibleAbbreviation, encoding, BBB, filename = parameters
+    _initFindWorker()
+    if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+        print( exp("buildBookIndexHelper( {} {} {} )").format( bibleClass.__name__, sourceFolder, BBB ) )
+
+    workerBible = _getWorkerBibleBook( bibleClass, sourceFolder, bibleName, bibleAbbreviation, encoding, BBB, filename )
+    sourceStat = workerBibles[bibleClass.__name__, sourceFolder][1][BBB]
+    return (sourceStat,) + indexBookWords( BBB, workerBible[BBB] )
+# end of buildBookIndexHelper
+
+
+def _buildBookIndexFromFile( parameters ):
+    """
+    Indexes the words in one Bible book loaded (into a new Bible object) from its saved file,
+        rather than using the loaded book (which might have been changed since it was saved).
+
+    Used when the find worker processes can't be used.
+
+    Parameter parameters is the same as for buildBookIndexHelper (as is the result).
+    """
+    bibleClass, sourceFolder, bibleName, bibleAbbreviation, encoding, BBB, filename = parameters
+    if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+        print( exp("_buildBookIndexFromFile( {} {} {} )").format( bibleClass.__name__, sourceFolder, BBB ) )
+
+    sourceStat = os.stat( os.path.join( sourceFolder, filename ) ) # Before we load it
+    fileBible = _makeFileBible( bibleClass, sourceFolder, bibleName, bibleAbbreviation, encoding )
+    fileBible.loadBook( BBB )
+    return ((sourceStat.st_mtime, sourceStat.st_size),) + indexBookWords( BBB, fileBible[BBB] )
+# end of _buildBookIndexFromFile
+
+
+def getFindIndexThreadExecutor():
+    """
+    Returns the worker thread used to build find indexes if we can't use the find worker processes
+        (making it the first time).
+    """
+    global findIndexThreadExecutor
+    if findIndexThreadExecutor is None: findIndexThreadExecutor = ThreadPoolExecutor( max_workers=1 )
+    return findIndexThreadExecutor
+# end of getFindIndexThreadExecutor
+
+
+
+class ShadowCharacterDict( dict ):
+    """
+    A dictionary (indexed by character) of the shadow text for each character
+        which works out (and remembers) the ones that it hasn't seen before.
+    """
+    def __init__( self, caselessFlag, ignoreDiacriticsFlag ):
+        """
+        """
+        dict.__init__( self )
+        self.caselessFlag, self.ignoreDiacriticsFlag = caselessFlag, ignoreDiacriticsFlag
+    # end of ShadowCharacterDict.__init__
+
+    def __missing__( self, char ):
+        """
+        Returns the shadow text for a character that we haven't seen before
+            (which might be empty for a combining mark, or more than one character, e.g., ß gives ss).
+        """
+        shadowChars = char
+        if self.ignoreDiacriticsFlag:
+            shadowChars = ''.join( decomposedChar for decomposedChar in unicodedata.normalize( 'NFD', shadowChars )
+                                                    if not unicodedata.combining( decomposedChar ) )
+        if self.caselessFlag: shadowChars = shadowChars.casefold()
+        self[char] = shadowChars
+        return shadowChars
+    # end of ShadowCharacterDict.__missing__
+# end of ShadowCharacterDict class
+
+shadowCharacterDicts = { (caselessFlag,ignoreDiacriticsFlag):ShadowCharacterDict( caselessFlag, ignoreDiacriticsFlag )
+                            for caselessFlag in (False,True) for ignoreDiacriticsFlag in (False,True) }
+
+
+def makeShadowText( text, caselessFlag=True, ignoreDiacriticsFlag=True ):
+    """
+    Makes a shadow copy of the text to search for caseless and/or diacritic-insensitive finds
+        (with both flags set, it's the same as normalizeFindText( text )).
+
+    Returns a 2-tuple (shadowText, offsetMap)
+        where offsetMap is an array giving the index in the original text of each character in the shadow text
+            (with one extra entry at the end for the length of the original text),
+        or None if every character is still at the same index.
+    """
+    if not caselessFlag and not ignoreDiacriticsFlag: return text, None
+    if NON_ASCII_RE.search( text ) is None: return (text.lower() if caselessFlag else text), None # Always the same length
+    shadowPieces = list( map( shadowCharacterDicts[caselessFlag,ignoreDiacriticsFlag].__getitem__, text ) )
+    shadowText = ''.join( shadowPieces )
+    if len(shadowText) == len(text) and '' not in shadowPieces: return shadowText, None # Every piece is one character
+    offsetMap = array( 'L', [index for index,shadowPiece in enumerate( shadowPieces ) for shadowChar in shadowPiece] )
+    offsetMap.append( len(text) )
+    return shadowText, offsetMap
+# end of makeShadowText
+
+
+def getOriginalSpan( offsetMap, startIndex, endIndex ):
+    """
+    Given the start and end indexes of something found in a shadow text (from makeShadowText),
+        returns a 2-tuple with the start and end indexes of the same thing in the original text.
+
+    The original span includes any combining marks that were dropped from the end
+        and the whole of any original character that was only partly matched (e.g., ß for s).
+    """
+    if offsetMap is None: return startIndex, endIndex
+    originalStartIndex = offsetMap[startIndex]
+    if endIndex <= startIndex: return originalStartIndex, originalStartIndex
+    originalEndIndex = offsetMap[endIndex]
+    if originalEndIndex == offsetMap[endIndex-1]: originalEndIndex += 1 # We stopped part way through an original character
+    return originalStartIndex, originalEndIndex
+# end of getOriginalSpan
+
+
+
+class BookShadowText:
+    """
+    A shadow copy of the searchable text of a loaded Bible book
+        which is already case-folded and/or has the diacritics removed
+        so that repeated caseless or diacritic-insensitive searches don't have to do that to every verse again.
+
+    The clean text of the entries (processed lines) is joined into one string (with newlines in between)
+        and the offset map gives the original position of anything found in the shadow text.
+    """
+    def __init__( self, internalBibleBook, caselessFlag=True, ignoreDiacriticsFlag=True ):
+        """
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( exp("BookShadowText.__init__( {}, {}, {} )").format( internalBibleBook, caselessFlag, ignoreDiacriticsFlag ) )
+        self.caselessFlag, self.ignoreDiacriticsFlag = caselessFlag, ignoreDiacriticsFlag
+        self.entryList, textList = [], [] # entryList contains a 3-tuple (C, V, marker) for each entry with text
+        self.findTextRefs = [] # Contains a 3-tuple (C, V, originalMarker) for each entry numbered the way that findText does it (or None if it skips it)
+        self.chapterVerseLines = [] # Contains a 5-tuple (numEntriesBefore, C, V, originalMarker, cleanText) for each \\c and \\v line (which findText also searches)
+        C, V = '-1', '0' # For the book introduction
+        findC, findV = '-1', '-1' # findText counts each line of the book introduction as a new verse
+        for verseDataEntry in internalBibleBook._processedLines:
+            marker, cleanText = verseDataEntry.getMarker(), verseDataEntry.getCleanText()
+            findTextFlag = not marker.startswith( '¬' ) and marker not in ( 'intro', 'chapters', ) # Lines added by BOS
+            if findTextFlag:
+                if marker == 'c': findC, findV = cleanText, '0'
+                elif marker == 'v': findV = cleanText
+                elif findC == '-1': findV = str( int(findV) + 1 )
+            if marker == 'c' or marker == 'v':
+                if marker == 'c': C, V = cleanText.strip(), '0'
+                else: V = cleanText.strip()
+                if cleanText: self.chapterVerseLines.append( (len(self.entryList), findC, findV, verseDataEntry.getOriginalMarker(), cleanText) )
+            elif cleanText and not marker.startswith( '¬' ): # End markers don't have any text
+                self.entryList.append( (C, V, marker) )
+                self.findTextRefs.append( (findC, findV, verseDataEntry.getOriginalMarker()) if findTextFlag else None )
+                textList.append( cleanText )
+        self.originalText = '\n'.join( textList )
+        self.entryStartIndexes = list( accumulate( [0] + [len(cleanText)+1 for cleanText in textList[:-1]] ) )
+        self.shadowText, self.offsetMap = makeShadowText( self.originalText, caselessFlag, ignoreDiacriticsFlag )
+    # end of BookShadowText.__init__
+
+
+    def iterateMatches( self, compiledRegex ):
+        """
+        A generator which searches the shadow text with the compiled regular expression
+            (which must already be case-folded, etc. in the same way as the shadow text)
+            and yields a 3-tuple (entryIndex, startIndex, endIndex) for each match
+            where the indexes are into the original clean text of that entry.
+        """
+        for match in compiledRegex.finditer( self.shadowText ):
+            originalStartIndex, originalEndIndex = getOriginalSpan( self.offsetMap, match.start(), match.end() )
+            entryIndex = bisect_right( self.entryStartIndexes, originalStartIndex ) - 1
+            entryStartIndex = self.entryStartIndexes[entryIndex]
+            yield entryIndex, originalStartIndex-entryStartIndex, originalEndIndex-entryStartIndex
+    # end of BookShadowText.iterateMatches
+
+
+    def getEntryText( self, entryIndex ):
+        """
+        Returns the original clean text of the entry.
+        """
+        entryStartIndex = self.entryStartIndexes[entryIndex]
+        entryEndIndex = self.entryStartIndexes[entryIndex+1]-1 if entryIndex+1 < len(self.entryStartIndexes) else len(self.originalText)
+        return self.originalText[entryStartIndex:entryEndIndex]
+    # end of BookShadowText.getEntryText
+# end of BookShadowText class
+
+
+def getBookShadowText( internalBibleBook, caselessFlag=True, ignoreDiacriticsFlag=True ):
+    """
+    Returns the (shared) shadow text of the loaded Bible book, making it first if necessary.
+
+    The shadow texts are kept for as long as the book object is,
+        so a book that's reloaded (e.g., after it's been saved) gets new ones.
+    """
+    try: bookShadowTextDict = bookShadowTexts[internalBibleBook]
+    except KeyError:
+        bookShadowTextDict = {}
+        try: bookShadowTexts[internalBibleBook] = bookShadowTextDict
+        except TypeError: pass # Can't be weakly referenced so we can't keep it
+    try: return bookShadowTextDict[caselessFlag,ignoreDiacriticsFlag]
+    except KeyError:
+        bookShadowText = bookShadowTextDict[caselessFlag,ignoreDiacriticsFlag] \
+                        = BookShadowText( internalBibleBook, caselessFlag, ignoreDiacriticsFlag )
+        return bookShadowText
+# end of getBookShadowText
+
+
+def invalidateBookShadowTexts( internalBible, BBB ):
+    """
+    Discards any shadow texts of the book, e.g., because it has just been saved.
+    """
+    try: del bookShadowTexts[internalBible.books[BBB]]
+    except (AttributeError, KeyError, TypeError): pass # Don't have any
+# end of invalidateBookShadowTexts
+
+
+def makeShadowRegex( optionsDict ):
+    """
+    Returns a 3-tuple (compiledRegex, caselessFlag, ignoreDiacriticsFlag)
+        with a compiled regular expression for the findText and wordMode in the options
+        and the flags for the shadow text that it should search (see getBookShadowText).
+
+    A regular expression can't safely be case-folded (e.g., \\W would become \\w)
+        so it searches the shadow text with just the diacritics removed (and re.IGNORECASE instead).
+
+    Raises re.error if the regular expression is bad.
+    """
+    findText = optionsDict['findText']
+    caselessFlag, ignoreDiacriticsFlag = bool( optionsDict.get( 'caselessFlag' ) ), bool( optionsDict.get( 'ignoreDiacriticsFlag' ) )
+    if findText.lower().startswith( 'regex:' ):
+        shadowOptionsDict = dict( optionsDict, findText=makeShadowText( findText, False, ignoreDiacriticsFlag )[0] )
+        return makeReplaceRegex( shadowOptionsDict ), False, ignoreDiacriticsFlag
+    shadowOptionsDict = dict( optionsDict, findText=makeShadowText( findText, caselessFlag, ignoreDiacriticsFlag )[0], caselessFlag=False )
+    return makeReplaceRegex( shadowOptionsDict ), caselessFlag, ignoreDiacriticsFlag
+# end of makeShadowRegex
+
+
+def findInBookShadowText( internalBibleBook, compiledShadowRegex, caselessFlag, ignoreDiacriticsFlag ):
+    """
+    Searches the shadow text of the loaded book (from makeShadowRegex).
+
+    Returns a list of 5-tuples (C, V, marker, cleanText, foundText) for each match
+        where foundText is exactly what was found in the original clean text.
+    """
+    bookShadowText = getBookShadowText( internalBibleBook, caselessFlag, ignoreDiacriticsFlag )
+    resultList = []
+    for entryIndex,startIndex,endIndex in bookShadowText.iterateMatches( compiledShadowRegex ):
+        entryText = bookShadowText.getEntryText( entryIndex )
+        resultList.append( bookShadowText.entryList[entryIndex] + (entryText, entryText[startIndex:endIndex]) )
+    return resultList
+# end of findInBookShadowText
+
+
+def canFindInShadowText( optionsDict ):
+    """
+    Returns True if the search described by the options is a caseless and/or diacritic-insensitive search
+        of just the clean text that findBookTextInShadowText can do (rather than findText).
+
+    Regular expression searches are left to findText
+        (which case-folds the text but not the expression itself).
+    """
+    caselessFlag, ignoreDiacriticsFlag = bool( optionsDict.get( 'caselessFlag', True ) ), bool( optionsDict.get( 'ignoreDiacriticsFlag' ) )
+    return ( caselessFlag or ignoreDiacriticsFlag ) \
+        and not isRegexFind( optionsDict ) \
+        and not optionsDict.get( 'markerList' ) \
+        and optionsDict.get( 'includeMainTextFlag', True ) \
+        and not optionsDict.get( 'includeMarkerTextFlag' ) \
+        and not optionsDict.get( 'includeExtrasFlag' ) \
+        and bool( makeShadowText( optionsDict['findText'], caselessFlag, ignoreDiacriticsFlag )[0] )
+# end of canFindInShadowText
+
+
+def _iterateShadowFindMatches( compiledShadowRegex, shadowText, wordMode ):
+    """
+    A generator which searches the shadow text with the (lookahead) regular expression from findBookTextInShadowText
+        and yields a 2-tuple (startIndex, endIndex) for each match
+        that's accepted by the wordMode (checked the same way as findText does it).
+    """
+    shadowTextLength = len( shadowText )
+    for match in compiledShadowRegex.finditer( shadowText ):
+        startIndex, endIndex = match.span( 1 )
+        if wordMode in ( 'Whole', 'Begins', ) and startIndex>0 and shadowText[startIndex-1].isalpha(): continue
+        if wordMode in ( 'Whole', 'EndsWord', ) and endIndex<shadowTextLength and shadowText[endIndex].isalpha(): continue
+        yield startIndex, endIndex
+# end of _iterateShadowFindMatches
+
+
+def findBookTextInShadowText( BBB, internalBibleBook, optionsDict ):
+    """
+    Does the same search of one loaded book as findText
+        (only call this if canFindInShadowText( optionsDict ) is True)
+        but searches the shadow text of the book (see getBookShadowText)
+        rather than case-folding, etc. every line of the book again.
+
+    Like findText, it adds the findText to the 'findHistoryList' in optionsDict.
+
+    Returns the same 3-tuple as findText: optionsDict, resultSummaryDict, resultList
+        where resultList contains findText's 5-tuples for a caseless search (else its 4-tuples).
+    """
+    if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+        print( exp("findBookTextInShadowText( {}, {!r} )").format( BBB, optionsDict['findText'] ) )
+        assert canFindInShadowText( optionsDict )
+
+    findText = optionsDict['findText']
+    if 'findHistoryList' not in optionsDict: optionsDict['findHistoryList'] = [] # Oldest first
+    try: optionsDict['findHistoryList'].remove( findText )
+    except ValueError: pass
+    optionsDict['findHistoryList'].append( findText ) # Make sure it goes on the end
+    optionsDict['regexFlag'] = False
+    caselessFlag, ignoreDiacriticsFlag = bool( optionsDict.get( 'caselessFlag', True ) ), bool( optionsDict.get( 'ignoreDiacriticsFlag' ) )
+    wordMode, contextLength = optionsDict.get( 'wordMode', 'Any' ), optionsDict.get( 'contextLength', 30 )
+    includeIntroFlag, chapterList = optionsDict.get( 'includeIntroFlag', True ), optionsDict.get( 'chapterList' )
+
+    # Use a lookahead so that overlapping matches are found (like findText does)
+    pattern = re.escape( makeShadowText( findText, caselessFlag, ignoreDiacriticsFlag )[0] )
+    compiledShadowRegex = compileFindRegex( '(?=({})$)'.format( pattern ) if wordMode == 'EndsLine' else '(?=({}))'.format( pattern ),
+                                            re.MULTILINE )
+
+    foundList = [] # Contains 7-tuples (sortKey, C, V, originalMarker, text, startIndex, endIndex) -- indexes are into the original text
+    bookShadowText = getBookShadowText( internalBibleBook, caselessFlag, ignoreDiacriticsFlag )
+    for shadowStartIndex,shadowEndIndex in _iterateShadowFindMatches( compiledShadowRegex, bookShadowText.shadowText, wordMode ):
+        originalStartIndex, originalEndIndex = getOriginalSpan( bookShadowText.offsetMap, shadowStartIndex, shadowEndIndex )
+        entryIndex = bisect_right( bookShadowText.entryStartIndexes, originalStartIndex ) - 1
+        if bookShadowText.findTextRefs[entryIndex] is None: continue # findText doesn't search this line
+        entryStartIndex = bookShadowText.entryStartIndexes[entryIndex]
+        foundList.append( ((entryIndex,1,originalStartIndex),) + bookShadowText.findTextRefs[entryIndex]
+                        + (bookShadowText.getEntryText( entryIndex ), originalStartIndex-entryStartIndex, originalEndIndex-entryStartIndex) )
+    for numEntriesBefore,C,V,originalMarker,cleanText in bookShadowText.chapterVerseLines: # These aren't in the shadow text
+        shadowText, offsetMap = makeShadowText( cleanText, caselessFlag, ignoreDiacriticsFlag )
+        for shadowStartIndex,shadowEndIndex in _iterateShadowFindMatches( compiledShadowRegex, shadowText, wordMode ):
+            originalStartIndex, originalEndIndex = getOriginalSpan( offsetMap, shadowStartIndex, shadowEndIndex )
+            foundList.append( ((numEntriesBefore,0,originalStartIndex), C, V, originalMarker, cleanText, originalStartIndex, originalEndIndex) )
+    foundList.sort( key=lambda foundEntry: foundEntry[0] ) # Back into the order of the lines in the book
+
+    resultList = [] # Contains 4-tuples or 5-tuples -- first entry is the SimpleVerseKey
+    for sortKey,C,V,originalMarker,text,ix,ixAfter in foundList:
+        if C == '-1' and not includeIntroFlag: continue
+        if chapterList is not None and C not in chapterList:
+            try:
+                if int(C) not in chapterList: continue
+            except ValueError: continue
+        if contextLength: # Find the context in the original (fully-cased) string
+            contextBefore, contextAfter = text[max(0,ix-contextLength):ix], text[ixAfter:ixAfter+contextLength]
+        else: contextBefore = contextAfter = None
+        ixHyphen = V.find( '-' )
+        if ixHyphen != -1: V = V[:ixHyphen] # Remove verse bridges
+        resultList.append( (SimpleVerseKey( BBB, C, V, ix ), originalMarker, contextBefore, text[ix:ixAfter], contextAfter, ) if caselessFlag
+                            else (SimpleVerseKey( BBB, C, V, ix ), originalMarker, contextBefore, contextAfter, ) )
+    return optionsDict, { 'searchedBookList':[BBB], 'foundBookList':[BBB] if resultList else [], }, resultList
+# end of findBookTextInShadowText
+
+
+def canFindByBooks( internalBible ):
+    """
+    Returns True if the Bible is loaded from a separate file for each book
+        so that we can search it book by book
+        (loading only the books that we need, and possibly in other processes).
+    """
+    return bool( getattr( internalBible, 'sourceFolder', None ) ) \
+        and bool( getattr( internalBible, 'possibleFilenameDict', None ) )
+# end of canFindByBooks
+
+
+def canUseFindIndex( optionsDict ):
+    """
+    Returns True if the search described by the options
+        can be narrowed down by using the find index.
+
+    Regular expression, marker and note searches need to search the whole text,
+        as does a search for something without any letters or digits in it.
+    """
+    return not optionsDict['findText'].lower().startswith( 'regex:' ) \
+        and not optionsDict.get( 'regexFlag' ) \
+        and not optionsDict['markerList'] \
+        and not optionsDict['includeMarkerTextFlag'] \
+        and not optionsDict['includeExtrasFlag'] \
+        and optionsDict['wordMode'] != 'EndsLine' \
+        and bool( getFindTokens( optionsDict['findText'] ) ) \
+        and canFindByBooks( optionsDict['givenBible'] )
+# end of canUseFindIndex
+
+
+def isRegexFind( optionsDict ):
+    """
+    Returns True if the findText in the options is a regular expression.
+    """
+    return optionsDict['findText'].lower().startswith( 'regex:' )
+# end of isRegexFind
+
+
+def canFindInWorkers( internalBible ):
+    """
+    Returns True if the books can be searched in the find worker processes at all.
+    """
+    return not BibleOrgSysGlobals.alreadyMultiprocessing and canFindByBooks( internalBible )
+# end of canFindInWorkers
+
+
+def canFindInParallel( internalBible, numBooks ):
+    """
+    Returns True if it's worth searching the books in the find worker processes.
+    """
+    return BibleOrgSysGlobals.maxProcesses > 1 and numBooks > 1 \
+        and canFindInWorkers( internalBible )
+# end of canFindInParallel
+
+
+def getFindBookList( internalBible, optionsDict ):
+    """
+    Returns the list of books to be searched (in canonical order).
+    """
+    bookList = optionsDict['bookList']
+    if bookList is None or bookList == 'ALL':
+        bookList = internalBible.possibleFilenameDict.keys() if getattr( internalBible, 'possibleFilenameDict', None ) \
+                    else internalBible.books.keys()
+    elif isinstance( bookList, str ): bookList = [bookList]
+    return sorted( bookList, key=BibleOrgSysGlobals.BibleBooksCodes.getReferenceNumber )
+# end of getFindBookList
+
+
+
+def _initFindWorker():
+    """
+    Called at the start of each task in a find worker process
+        (because ProcessPoolExecutor doesn't take an initializer before Python 3.7).
+    """
+    BibleOrgSysGlobals.alreadyMultiprocessing = True # So that BOS doesn't try to start any more processes
+# end of _initFindWorker
+
+
+def getFindWorkerPool():
+    """
+    Returns the pool of worker processes used to search the Bible books
+        (making it the first time).
+    """
+    global findWorkerPool
+    if findWorkerPool is None:
+        findWorkerPool = ProcessPoolExecutor( max_workers=BibleOrgSysGlobals.maxProcesses )
+    return findWorkerPool
+# end of getFindWorkerPool
+
+
+def _discardFindWorkerPool():
+    """
+    Called if the pool is broken (e.g., a worker process was killed)
+        so that a new one will be made next time.
+    """
+    global findWorkerPool
+    if findWorkerPool is not None:
+        findWorkerPool.shutdown( wait=False )
+        findWorkerPool = None
+# end of _discardFindWorkerPool
+
+
+def getRegexTaskManager():
+    """
+    Returns the multiprocessing manager that makes the started queues and stop events for the RegexWorkerPools
+        (starting it the first time).
+
+    Their proxies can be passed to the worker processes with each task
+        (whereas a plain multiprocessing queue could only be given to them by a pool initializer, which needs Python 3.7).
+    """
+    global regexTaskManager
+    if regexTaskManager is None:
+        regexTaskManager = multiprocessing.Manager()
+    return regexTaskManager
+# end of getRegexTaskManager
+
+
+def _runRegexTask( parameters ):
+    """
+    Runs in a worker process of a RegexWorkerPool.
+
+    Parameter parameters is a 4-tuple containing the pool's started queue and stop event (manager proxies),
+        the function to be run, and its parameters.
+
+    Returns whatever the function returns.
+    """
+    global regexStartedQueue, regexStopEvent
+    regexStartedQueue, regexStopEvent, function, functionParameters = parameters
+    _initFindWorker()
+    try: return function( functionParameters )
+    finally: regexStartedQueue = regexStopEvent = None
+# end of _runRegexTask
+
+
+def _startRegexEvaluation( taskKey ):
+    """
+    Called in a find worker process just before it starts evaluating a regular expression
+        (i.e., after any waiting in the queue and loading the Bible book)
+        so that a RegexWorkerPool can time just the expression (and kill this process if need be).
+
+    Returns False if the pool has already been stopped (so the expression mustn't be started).
+    """
+    if regexStartedQueue is None: return True # We're in the shared find worker pool
+    regexStartedQueue.put( (taskKey, os.getpid()) ) # Waits for the manager, and must be before we check the stop event (see RegexWorkerPool.close)
+    return not regexStopEvent.is_set()
+# end of _startRegexEvaluation
+
+
+
+class RegexWorkerPool:
+    """
+    A pool of find worker processes used for just one regular expression find or replace
+        so that a runaway expression (e.g., with catastrophic backtracking) can be stopped by killing the processes
+        without upsetting any other finds, collates, or replaces in the shared find worker pool.
+
+    The workers tell us when they actually start evaluating the expression for each task (see _startRegexEvaluation)
+        so that the time limit doesn't include waiting in the queue or loading the Bible book.
+    """
+    def __init__( self, numProcesses ):
+        """
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( exp("RegexWorkerPool.__init__( {} )").format( numProcesses ) )
+        regexTaskManager = getRegexTaskManager()
+        self.startedQueue, self.stopEvent = regexTaskManager.Queue(), regexTaskManager.Event()
+        self.executor = ProcessPoolExecutor( max_workers=numProcesses )
+        self.futures, self.startTimes, self.workerProcessIds = [], {}, set() # startTimes is indexed by task key
+    # end of RegexWorkerPool.__init__
+
+
+    def submit( self, function, parameters ):
+        """
+        Submits the function to one of our worker processes (like ProcessPoolExecutor.submit).
+
+        The function (which must be picklable) must call _startRegexEvaluation before it evaluates the expression.
+        """
+        future = self.executor.submit( _runRegexTask, (self.startedQueue, self.stopEvent, function, parameters) )
+        self.futures.append( future )
+        return future
+    # end of RegexWorkerPool.submit
+
+
+    def _getStartedMessages( self ):
+        """
+        Notes the time that we heard about each task being started (and the worker process doing it).
+        """
+        while not self.startedQueue.empty():
+            taskKey, processId = self.startedQueue.get()
+            self.startTimes[taskKey] = time.monotonic()
+            self.workerProcessIds.add( processId )
+    # end of RegexWorkerPool._getStartedMessages
+
+
+    def isOverTime( self, taskKey, timeLimit ):
+        """
+        Returns True if a worker started evaluating the expression for the task more than timeLimit seconds ago.
+        """
+        self._getStartedMessages()
+        return taskKey in self.startTimes and time.monotonic() - self.startTimes[taskKey] > timeLimit
+    # end of RegexWorkerPool.isOverTime
+
+
+    def getResult( self, taskKey, future, timeLimit ):
+        """
+        Waits for the task to finish and returns its result (like future.result).
+
+        Raises FuturesTimeoutError if the expression takes more than timeLimit seconds.
+        """
+        while not future.done():
+            if self.isOverTime( taskKey, timeLimit ): raise FuturesTimeoutError()
+            waitForFutures( (future,), timeout=REGEX_CHECK_INTERVAL )
+        return future.result()
+    # end of RegexWorkerPool.getResult
+
+
+    def close( self ):
+        """
+        Shuts down the pool.
+
+        If any of the tasks still haven't finished (e.g., because an expression took too long or the search was cancelled)
+            the workers that have started an expression are killed straight away
+            (because there's no way to stop a running future).
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( exp("RegexWorkerPool.close()") )
+        stopFlag = not all( future.done() for future in self.futures )
+        if stopFlag:
+            self.stopEvent.set() # Must be before we get the last started messages (see _startRegexEvaluation)
+            for future in self.futures: future.cancel() # Only works for the ones that haven't been sent to a worker yet
+        self.executor.shutdown( wait=False )
+        if stopFlag:
+            self._getStartedMessages()
+            for processId in self.workerProcessIds:
+                try: os.kill( processId, signal.SIGTERM )
+                except OSError: pass # It's already gone
+    # end of RegexWorkerPool.close
+# end of RegexWorkerPool class
+
+
+def findBookTextHelper( parameters ):
+    """
+    Runs in a find worker process to search one Bible book.
+
+    Parameter parameters is an 8-tuple containing the Bible class, sourceFolder, name, abbreviation, encoding,
+        BBB, filename, and the (picklable) optionsDict for findText.
+
+    The worker keeps the Bibles (and their books) that it's loaded
+        so that repeated searches don't have to load them again,
+        but reloads a book if its file has been changed (e.g., saved by an edit window).
+
+    Returns the same 3-tuple as findText (but without any of the unpicklable options),
+        or None if it's in a RegexWorkerPool that has already been stopped.
+    """
+    bibleClass, sourceFolder, bibleName, bibleAbbreviation, encoding, BBB, filename, bookOptionsDict = parameters
+    _initFindWorker()
+    if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+        print( exp("findBookTextHelper( {} {} {} )").format( bibleClass.__name__, sourceFolder, BBB ) )
+
+    workerBible = _getWorkerBibleBook( bibleClass, sourceFolder, bibleName, bibleAbbreviation, encoding, BBB, filename )
+    if not _startRegexEvaluation( BBB ): return None # The search has already been stopped
+    bookOptionsDict['givenBible'] = workerBible
+    if canFindInShadowText( bookOptionsDict ): # Caseless, etc. so search the shadow text that the worker keeps for the book
+        returnedOptionsDict, bookResultSummaryDict, bookResultList = findBookTextInShadowText( BBB, workerBible.books[BBB], bookOptionsDict )
+    else: returnedOptionsDict, bookResultSummaryDict, bookResultList = workerBible.findText( bookOptionsDict )
+    returnedOptionsDict = { key:value for key,value in returnedOptionsDict.items() if key not in UNPICKLABLE_FIND_OPTIONS }
+    return returnedOptionsDict, bookResultSummaryDict, bookResultList
+# end of findBookTextHelper
+
+
+def _getWorkerBibleBook( bibleClass, sourceFolder, bibleName, bibleAbbreviation, encoding, BBB, filename ):
+    """
+    Runs in a find worker process.
+
+    Returns the worker's copy of the Bible with the book loaded
+        (reloading the book if its file has changed since the worker last loaded it).
+    """
+    bibleKey = bibleClass.__name__, sourceFolder
+    try:
+        workerBible, bookSourceStats = workerBibles[bibleKey]
+        workerBibles.move_to_end( bibleKey )
+    except KeyError:
+        workerBible = _makeFileBible( bibleClass, sourceFolder, bibleName, bibleAbbreviation, encoding )
+        bookSourceStats = {}
+        workerBibles[bibleKey] = workerBible, bookSourceStats
+        while len(workerBibles) > MAX_FIND_WORKER_BIBLES: workerBibles.popitem( last=False )
+
+    sourceStat = os.stat( os.path.join( sourceFolder, filename ) )
+    sourceStat = sourceStat.st_mtime, sourceStat.st_size
+    if bookSourceStats.get( BBB ) != sourceStat:
+        workerBible.books.pop( BBB, None ) # Make sure that we load the saved version of the book
+        workerBible.loadBook( BBB )
+        bookSourceStats[BBB] = sourceStat
+    return workerBible
+# end of _getWorkerBibleBook
+
+
+def _findBookText( internalBible, optionsDict, BBB, chapterList ):
+    """
+    Searches one book of the Bible in this process.
+
+    Returns the same 3-tuple as findText.
+    """
+    internalBible.loadBookIfNecessary( BBB )
+    bookOptionsDict = optionsDict.copy()
+    bookOptionsDict['bookList'], bookOptionsDict['chapterList'] = [BBB], chapterList
+    if 'findHistoryList' in optionsDict: bookOptionsDict['findHistoryList'] = list( optionsDict['findHistoryList'] )
+    if canFindInShadowText( bookOptionsDict ): # Caseless, etc. so search the shadow text that we keep for the book
+        return findBookTextInShadowText( BBB, internalBible.books[BBB], bookOptionsDict )
+    return internalBible.findText( bookOptionsDict )
+# end of _findBookText
+
+
+def iterateFindTextInBooks( internalBible, optionsDict, bookChapterLists, waitFlag=True, timeLimit=REGEX_TIME_LIMIT ):
+    """
+    A generator that calls the BOS findText for each book in bookChapterLists (an OrderedDict indexed by BBB
+        containing the list of chapters to search or None for all of them).
+
+    If it's worthwhile, the books are searched in parallel by the find worker processes
+        (which load the books from their saved files).
+    Regular expression searches always use worker processes (if possible) in a RegexWorkerPool of their own
+        so that they can be stopped if the expression takes more than timeLimit seconds for any one book
+        (in which case TimeoutError is raised, as it is if a worker process dies), or if the generator is closed.
+
+    Yields a 4-tuple (BBB, returnedOptionsDict, bookResultSummaryDict, bookResultList)
+        for each book in turn (i.e., in the order of bookChapterLists)
+        as soon as the results for that book are available.
+    If waitFlag is False, it yields None (rather than waiting) if the next book isn't finished yet
+        so that the GUI can get on with other things and try again later.
+    If the generator is closed early, any searches that haven't started yet are cancelled.
+    """
+    if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+        print( exp("iterateFindTextInBooks( {}, {}, {}, {} )").format( optionsDict['findText'], bookChapterLists, waitFlag, timeLimit ) )
+
+    regexWorkerPool, bookFutures = None, {}
+    if bookChapterLists and ( canFindInParallel( internalBible, len(bookChapterLists) ) \
+    or ( isRegexFind( optionsDict ) and canFindInWorkers( internalBible ) ) ):
+        workerOptionsDict = { key:value for key,value in optionsDict.items() if key not in UNPICKLABLE_FIND_OPTIONS }
+        try:
+            if isRegexFind( optionsDict ): # Use our own pool so that we can stop it without upsetting any other searches
+                bookWorkerPool = regexWorkerPool = RegexWorkerPool( min( BibleOrgSysGlobals.maxProcesses, len(bookChapterLists) ) )
+            else: bookWorkerPool = getFindWorkerPool()
+            for BBB,chapterList in bookChapterLists.items():
+                bookOptionsDict = workerOptionsDict.copy()
+                bookOptionsDict['bookList'], bookOptionsDict['chapterList'] = [BBB], chapterList
+                bookFutures[BBB] = bookWorkerPool.submit( findBookTextHelper,
+                                        (type(internalBible), internalBible.sourceFolder,
+                                        getattr( internalBible, 'givenName', None ), getattr( internalBible, 'abbreviation', None ),
+                                        getattr( internalBible, 'encoding', None ),
+                                        BBB, internalBible.possibleFilenameDict[BBB], bookOptionsDict) )
+        except BrokenProcessPool as err:
+            logging.error( exp("iterateFindTextInBooks: Unable to use the find worker processes: {}").format( err ) )
+            if regexWorkerPool is None: _discardFindWorkerPool(); bookFutures = {}
+            # else a worker died (perhaps from the expression) while we were submitting, so it mustn't be tried here (see below)
+        except (EOFError, RuntimeError, OSError) as err: # Couldn't start the processes so nothing's been searched yet
+            logging.error( exp("iterateFindTextInBooks: Unable to use the find worker processes: {}").format( err ) )
+            if regexWorkerPool is not None: regexWorkerPool.close(); regexWorkerPool = None
+            bookFutures = {}
+
+    try:
+        for BBB,chapterList in bookChapterLists.items():
+            bookResults = None
+            if BBB in bookFutures:
+                bookFuture = bookFutures[BBB]
+                if regexWorkerPool is None: # No time limit
+                    while not waitFlag and not bookFuture.done(): yield None
+                else:
+                    while not waitFlag and not bookFuture.done() and not regexWorkerPool.isOverTime( BBB, timeLimit ): yield None
+                try:
+                    bookResults = bookFuture.result() if regexWorkerPool is None else regexWorkerPool.getResult( BBB, bookFuture, timeLimit )
+                except FuturesTimeoutError:
+                    logging.error( exp("iterateFindTextInBooks: {} search for {!r} took more than {} seconds").format( BBB, optionsDict['findText'], timeLimit ) )
+                    raise TimeoutError( _("Searching {} for {!r} took more than {} seconds").format( BBB, optionsDict['findText'], timeLimit ) )
+                except BrokenProcessPool as err:
+                    logging.error( exp("iterateFindTextInBooks: {} search for {!r} stopped its worker process: {}").format( BBB, optionsDict['findText'], err ) )
+                    if regexWorkerPool is not None: # Probably the expression itself, so it mustn't be tried here where it can't be stopped
+                        raise TimeoutError( _("Searching {} for {!r} stopped its worker process").format( BBB, optionsDict['findText'] ) )
+                    _discardFindWorkerPool()
+                except Exception as err: # Could be anything from the Bible class -- search it here instead
+                    logging.error( exp("iterateFindTextInBooks: {} search failed in worker process: {}").format( BBB, err ) )
+            elif regexWorkerPool is not None: # A worker died before we could submit this book
+                raise TimeoutError( _("Searching for {!r} stopped its worker process").format( optionsDict['findText'] ) )
+            if bookResults is None: bookResults = _findBookText( internalBible, optionsDict, BBB, chapterList )
+            yield (BBB,) + tuple( bookResults )
+    finally:
+        if regexWorkerPool is not None: regexWorkerPool.close() # Kills the workers if they're still going
+        else:
+            for bookFuture in bookFutures.values(): bookFuture.cancel() # Can't cancel it once it's started
+# end of iterateFindTextInBooks
+
+
+def getFindBookChapterLists( optionsDict ):
+    """
+    Works out which books (and chapters) need to be searched,
+        using the find index if possible.
+
+    Only call this if canFindByBooks( optionsDict['givenBible'] ) is True.
+
+    Returns a 2-tuple: the list of books to be searched,
+        and an OrderedDict (indexed by BBB) of the lists of chapters (or None) actually needing to be searched.
+    """
+    givenBible = optionsDict['givenBible']
+    searchedBookList = getFindBookList( givenBible, optionsDict )
+    if not canUseFindIndex( optionsDict ):
+        return searchedBookList, OrderedDict( (BBB,optionsDict['chapterList']) for BBB in searchedBookList )
+
+    findIndex = getBibleFindIndex( givenBible )
+    bookChapterLists = OrderedDict()
+    for BBB in searchedBookList:
+        try: candidateChapters = findIndex.findCandidateChapters( BBB, optionsDict['findText'] )
+        except (KeyError, OSError): candidateChapters = None # Can't find the source file, so just search it all
+        if candidateChapters is None: bookChapterLists[BBB] = optionsDict['chapterList']
+        else:
+            if optionsDict['chapterList']:
+                candidateChapters = [C for C in candidateChapters if C in optionsDict['chapterList']]
+            if candidateChapters: bookChapterLists[BBB] = candidateChapters
+    return searchedBookList, bookChapterLists
+# end of getFindBookChapterLists
+
+
+def iterateFindTextByBooks( optionsDict, resultSummaryDict, waitFlag=True, timeLimit=REGEX_TIME_LIMIT ):
+    """
+    A generator that does the same search as optionsDict['givenBible'].findText( optionsDict )
+        but only loads and searches the books and chapters
+        that the find index shows might contain the text (if the index can be used)
+        and searches the books in parallel (if that's worthwhile).
+
+    Only call this if canFindByBooks( optionsDict['givenBible'] ) is True
+        and after saving any changes to the Bible books.
+
+    resultSummaryDict should be an empty dictionary which is filled in as the search proceeds.
+    Any changes that findText makes to the options (e.g., the history list) are made to optionsDict.
+
+    Yields a 2-tuple (BBB, bookResultList) for each book searched (in canonical order),
+        or None (if waitFlag is False) if the book indexes or the next book aren't finished yet.
+    Raises TimeoutError if a regular expression search takes too long (see iterateFindTextInBooks).
+    """
+    if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+        print( exp("iterateFindTextByBooks( {!r}, {}, {} )").format( optionsDict['findText'], waitFlag, timeLimit ) )
+        assert canFindByBooks( optionsDict['givenBible'] )
+
+    if canUseFindIndex( optionsDict ): # Get any out-of-date book indexes built in the background first
+        givenBible = optionsDict['givenBible']
+        bookIndexFutures = getBibleFindIndex( givenBible ).startBuildingBookIndexes( getFindBookList( givenBible, optionsDict ) )
+        while not waitFlag and not all( bookIndexFuture.done() for bookIndexFuture in bookIndexFutures ):
+            yield None
+    searchedBookList, bookChapterLists = getFindBookChapterLists( optionsDict )
+    resultSummaryDict['searchedBookList'], resultSummaryDict['foundBookList'] = list( searchedBookList ), []
+    optionsUpdatedFlag = False
+    for bookResults in iterateFindTextInBooks( optionsDict['givenBible'], optionsDict, bookChapterLists, waitFlag, timeLimit ):
+        if bookResults is None: yield None; continue
+        BBB, returnedOptionsDict, bookResultSummaryDict, bookResultList = bookResults
+        if not optionsUpdatedFlag: # Keep any changes that findText made to the options (e.g., the history list)
+            for key,value in returnedOptionsDict.items():
+                if key not in ( 'bookList', 'chapterList' ) and key not in UNPICKLABLE_FIND_OPTIONS: optionsDict[key] = value
+            optionsUpdatedFlag = True
+        for key,value in bookResultSummaryDict.items():
+            if key == 'searchedBookList': continue
+            if key == 'foundBookList': resultSummaryDict[key].extend( value )
+            elif key not in resultSummaryDict: resultSummaryDict[key] = value
+            elif isinstance( value, int ) and not isinstance( value, bool ): resultSummaryDict[key] += value
+        yield BBB, bookResultList
+# end of iterateFindTextByBooks
+
+
+def findTextByBooks( optionsDict ):
+    """
+    Does the same search as optionsDict['givenBible'].findText( optionsDict )
+        but all at once (see iterateFindTextByBooks above).
+
+    Returns the same 3-tuple as findText: optionsDict, resultSummaryDict, resultList
+    """
+    resultSummaryDict, resultList = {}, []
+    for BBB,bookResultList in iterateFindTextByBooks( optionsDict, resultSummaryDict ):
+        resultList.extend( bookResultList )
+    return optionsDict, resultSummaryDict, resultList
+# end of findTextByBooks
+
+
+def compileFindRegex( pattern, flags=0 ):
+    """
+    Returns the compiled regular expression for the pattern and flags
+        (remembering the most recently used ones so that they don't keep getting compiled again).
+
+    Raises re.error if the regular expression is bad.
+    """
+    regexKey = pattern, flags
+    try:
+        compiledRegex = compiledRegexCache[regexKey]
+        compiledRegexCache.move_to_end( regexKey )
+    except KeyError:
+        compiledRegex = compiledRegexCache[regexKey] = re.compile( pattern, flags )
+        while len(compiledRegexCache) > MAX_COMPILED_REGEXES: compiledRegexCache.popitem( last=False )
+    return compiledRegex
+# end of compileFindRegex
+
+
+def checkFindRegex( findText ):
+    """
+    If findText starts with 'regex:', checks (and compiles) the rest of it as a regular expression.
+
+    Returns the error message if it's bad, else None.
+    """
+    if findText.lower().startswith( 'regex:' ):
+        try: compileFindRegex( findText[6:], re.MULTILINE )
+        except re.error as err: return str( err )
+# end of checkFindRegex
+
+
+def makeReplaceRegex( optionsDict ):
+    """
+    Returns a compiled regular expression for the findText and wordMode in the options.
+
+    If findText starts with 'regex:', the rest of it is used as a regular expression
+        (else it's searched for literally).
+
+    Raises re.error if the regular expression is bad.
+    """
+    findText = optionsDict['findText']
+    if findText.lower().startswith( 'regex:' ): pattern = '(?:{})'.format( findText[6:] )
+    else: pattern = re.escape( findText )
+    wordMode = optionsDict['wordMode']
+    if wordMode == 'Whole': pattern = r'(?<!\w){}(?!\w)'.format( pattern )
+    elif wordMode == 'Begins': pattern = r'(?<!\w){}'.format( pattern )
+    elif wordMode == 'EndsWord': pattern = r'{}(?!\w)'.format( pattern )
+    elif wordMode == 'EndsLine': pattern = r'{}(?=\r?$)'.format( pattern )
+    else: assert wordMode == 'Any'
+    flags = re.MULTILINE
+    if optionsDict.get( 'caselessFlag' ): flags |= re.IGNORECASE
+    return compileFindRegex( pattern, flags )
+# end of makeReplaceRegex
+
+
+def findBookReplacements( BBB, bookText, compiledRegex, optionsDict ):
+    """
+    Finds all the places in the (USFM) text of a book where the text can be replaced.
+
+    Returns a list of 7-tuples: (referenceString, startIndex, endIndex, contextBefore, foundText, contextAfter, replacementText)
+
+    Raises re.error if the replacement text has a bad group reference.
+    """
+    regexFlag = optionsDict['findText'].lower().startswith( 'regex:' )
+    replaceText, contextLength = optionsDict['replaceText'], optionsDict['contextLength']
+
+    # Find where the chapters and verses start so that we can give a reference for each replacement
+    referencePositions, references = [0], [(BBB,'0','0')]
+    C = '0'
+    for match in USFM_CV_RE.finditer( bookText ):
+        if match.group(1) == 'c': C, V = match.group(2), '0'
+        else: V = match.group(2)
+        referencePositions.append( match.start() )
+        references.append( (BBB,C,V) )
+
+    replacements = []
+    for match in compiledRegex.finditer( bookText ):
+        startIndex, endIndex = match.span()
+        if startIndex == endIndex: continue # Don't replace empty matches
+        replacementText = match.expand( replaceText ) if regexFlag else replaceText
+        referenceString = '{} {}:{}'.format( *references[bisect_right( referencePositions, startIndex ) - 1] )
+        replacements.append( (referenceString, startIndex, endIndex,
+                                bookText[max(0,startIndex-contextLength):startIndex], match.group(),
+                                bookText[endIndex:endIndex+contextLength], replacementText) )
+    return replacements
+# end of findBookReplacements
+
+
+def findBookReplacementsHelper( parameters ):
+    """
+    Runs in a RegexWorkerPool worker process to find the replacements in one book.
+
+    Parameter parameters is a 5-tuple containing BBB, bookText, the regex pattern and flags,
+        and the (picklable) optionsDict.
+
+    Returns the same list as findBookReplacements (or None if the pool has already been stopped).
+    """
+    BBB, bookText, pattern, flags, optionsDict = parameters
+    compiledRegex = compileFindRegex( pattern, flags )
+    if not _startRegexEvaluation( BBB ): return None
+    return findBookReplacements( BBB, bookText, compiledRegex, optionsDict )
+# end of findBookReplacementsHelper
+
+
+def findBookReplacementsInWorker( BBB, bookText, compiledRegex, optionsDict, regexWorkerPool, timeLimit=REGEX_TIME_LIMIT ):
+    """
+    Does findBookReplacements (above) in a process of the RegexWorkerPool (if there is one)
+        so that it can be stopped if the expression takes more than timeLimit seconds.
+
+    The caller must close the pool (which kills the worker if it's still going).
+
+    Raises TimeoutError if it takes too long (or if the worker process dies),
+        or re.error if the replacement text has a bad group reference.
+    """
+    if regexWorkerPool is None:
+        return findBookReplacements( BBB, bookText, compiledRegex, optionsDict )
+    workerOptionsDict = { key:value for key,value in optionsDict.items() if key not in UNPICKLABLE_FIND_OPTIONS }
+    try:
+        bookFuture = regexWorkerPool.submit( findBookReplacementsHelper,
+                                    (BBB, bookText, compiledRegex.pattern, compiledRegex.flags, workerOptionsDict) )
+        return regexWorkerPool.getResult( BBB, bookFuture, timeLimit )
+    except FuturesTimeoutError:
+        logging.error( exp("findBookReplacementsInWorker: {} search for {!r} took more than {} seconds").format( BBB, optionsDict['findText'], timeLimit ) )
+        raise TimeoutError( _("Searching {} for {!r} took more than {} seconds").format( BBB, optionsDict['findText'], timeLimit ) )
+    except BrokenProcessPool as err: # Probably the expression itself, so it mustn't be tried here where it can't be stopped
+        logging.error( exp("findBookReplacementsInWorker: {} search for {!r} stopped its worker process: {}").format( BBB, optionsDict['findText'], err ) )
+        raise TimeoutError( _("Searching {} for {!r} stopped its worker process").format( BBB, optionsDict['findText'] ) )
+    except (RuntimeError, OSError) as err: # Couldn't start the process so nothing's been searched yet
+        logging.error( exp("findBookReplacementsInWorker: Unable to use the find worker processes: {}").format( err ) )
+        return findBookReplacements( BBB, bookText, compiledRegex, optionsDict )
+# end of findBookReplacementsInWorker
+
+
+def applyBookReplacements( bookText, replacements ):
+    """
+    Returns the new text with the (non-overlapping) replacements made,
+        where replacements is a list of the 7-tuples from findBookReplacements (in order).
+    """
+    textBits, lastIndex = [], 0
+    for referenceString,startIndex,endIndex,contextBefore,foundText,contextAfter,replacementText in replacements:
+        textBits.append( bookText[lastIndex:startIndex] )
+        textBits.append( replacementText )
+        lastIndex = endIndex
+    textBits.append( bookText[lastIndex:] )
+    return ''.join( textBits )
+# end of applyBookReplacements
+
+
+def writeFileAtomically( filepath, fileBytes ):
+    """
+    Writes the bytes to a temporary file and then renames it over the file
+        so that the file is never left half-written.
+    """
+    tempFilepath = filepath + '.tmp'
+    with open( tempFilepath, 'wb' ) as tempFile:
+        tempFile.write( fileBytes )
+        tempFile.flush()
+        os.fsync( tempFile.fileno() )
+    try: shutil.copymode( filepath, tempFilepath )
+    except OSError: pass # The file might not exist (any more)
+    os.replace( tempFilepath, filepath )
+# end of writeFileAtomically
+
+
+
+class ReplaceUndoJournal:
+    """
+    Keeps copies of the original book files changed by a Bible replace session
+        so that the whole session can be rolled back.
+
+    The original file (and a journal record) is always saved before the book file is replaced
+        so that a rollback still works if we crash part way through.
+
+    The journal folder isn't made until the first book is recorded
+        (so replaces that don't change anything don't leave empty journals behind).
+    """
+    def __init__( self, journalFolderPath ):
+        """
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( exp("ReplaceUndoJournal.__init__( {} )").format( journalFolderPath ) )
+        self.journalFolderPath = journalFolderPath
+        self.journalFilepath = os.path.join( self.journalFolderPath, REPLACE_JOURNAL_FILENAME )
+        liveReplaceUndoJournals.add( self )
+    # end of ReplaceUndoJournal.__init__
+
+
+    def _appendRecord( self, record ):
+        """
+        Appends a record (dict) as a line of JSON to the journal file and makes sure that it's on disk.
+        """
+        with open( self.journalFilepath, 'at', encoding='utf-8' ) as journalFile:
+            journalFile.write( json.dumps( record, ensure_ascii=False ) + '\n' )
+            journalFile.flush()
+            os.fsync( journalFile.fileno() )
+    # end of ReplaceUndoJournal._appendRecord
+
+
+    def getRecords( self ):
+        """
+        Returns a list of the (dict) records in the journal
+            (ignoring any incomplete last line).
+        """
+        records = []
+        try:
+            with open( self.journalFilepath, 'rt', encoding='utf-8' ) as journalFile:
+                for line in journalFile:
+                    try: records.append( json.loads( line ) )
+                    except ValueError: break # Incomplete record -- we must have crashed while writing it
+        except FileNotFoundError: pass # Nothing was ever replaced
+        return records
+    # end of ReplaceUndoJournal.getRecords
+
+
+    def canRollback( self ):
+        """
+        Returns True if there's something that can be rolled back.
+        """
+        records = self.getRecords()
+        return bool( records ) and not records[-1].get( 'rolledBack' )
+    # end of ReplaceUndoJournal.canRollback
+
+
+    def recordBook( self, BBB, filepath, originalBytes, newBytes ):
+        """
+        Save the original file contents before the book file gets replaced with newBytes.
+
+        The first time, this makes the journal folder (deleting the oldest journals if there's too many).
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( exp("ReplaceUndoJournal.recordBook( {}, {} )").format( BBB, filepath ) )
+
+        if not os.path.isdir( self.journalFolderPath ):
+            _pruneReplaceUndoJournals( os.path.dirname( self.journalFolderPath ) )
+            os.makedirs( self.journalFolderPath, exist_ok=True )
+        originalFilename = '{}_{}.original'.format( BBB, len(self.getRecords()) )
+        writeFileAtomically( os.path.join( self.journalFolderPath, originalFilename ), originalBytes )
+        self._appendRecord( { 'BBB':BBB, 'filepath':filepath, 'originalFilename':originalFilename,
+                            'originalMD5':hashlib.md5( originalBytes ).hexdigest(), 'newMD5':hashlib.md5( newBytes ).hexdigest() } )
+    # end of ReplaceUndoJournal.recordBook
+
+
+    def rollback( self, internalBible=None ):
+        """
+        Puts back the original files (in the reverse order to which they were replaced).
+
+        Books that have been changed again since the replace are left alone.
+
+        Returns a 2-tuple with the lists of BBBs restored and BBBs left alone.
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( exp("ReplaceUndoJournal.rollback()") )
+
+        restoredBookList, changedBookList = [], []
+        records = self.getRecords()
+        if not records or records[-1].get( 'rolledBack' ): return restoredBookList, changedBookList
+        for record in reversed( records ):
+            try:
+                with open( record['filepath'], 'rb' ) as bookFile: currentMD5 = hashlib.md5( bookFile.read() ).hexdigest()
+            except FileNotFoundError: currentMD5 = None
+            if currentMD5 == record['originalMD5']: continue # We must have stopped before the book got replaced
+            if currentMD5 != record['newMD5']: # It's been changed (or deleted) since
+                logging.error( exp("ReplaceUndoJournal.rollback: {} has been changed since the replace so not restored").format( record['filepath'] ) )
+                changedBookList.append( record['BBB'] )
+                continue
+            with open( os.path.join( self.journalFolderPath, record['originalFilename'] ), 'rb' ) as originalFile:
+                writeFileAtomically( record['filepath'], originalFile.read() )
+            restoredBookList.append( record['BBB'] )
+            if internalBible is not None:
+                try: internalBible.bookNeedsReloading[record['BBB']] = True
+                except AttributeError: pass # Not all Bibles can be reloaded
+                invalidateBookShadowTexts( internalBible, record['BBB'] )
+        self._appendRecord( { 'rolledBack':True } )
+        return restoredBookList, changedBookList
+    # end of ReplaceUndoJournal.rollback
+# end of ReplaceUndoJournal class
+
+
+def _pruneReplaceUndoJournals( journalsFolderPath ):
+    """
+    Deletes the oldest journal folders to make room for a new one
+        (so that we keep at most MAX_REPLACE_JOURNALS of them).
+
+    Journals that are still in use (e.g., for an edit window's undo) are never deleted.
+    """
+    try: oldJournalFolderNames = sorted( os.listdir( journalsFolderPath ) )
+    except FileNotFoundError: return
+    liveJournalFolderPaths = { os.path.normcase( undoJournal.journalFolderPath ) for undoJournal in list( liveReplaceUndoJournals ) }
+    numToDelete = len(oldJournalFolderNames) - MAX_REPLACE_JOURNALS + 1
+    for oldJournalFolderName in oldJournalFolderNames: # Oldest first
+        if numToDelete <= 0: break
+        oldJournalFolderPath = os.path.join( journalsFolderPath, oldJournalFolderName )
+        if os.path.normcase( oldJournalFolderPath ) not in liveJournalFolderPaths:
+            shutil.rmtree( oldJournalFolderPath, ignore_errors=True )
+            numToDelete -= 1
+# end of _pruneReplaceUndoJournals
+
+
+def makeReplaceUndoJournal( internalBible ):
+    """
+    Makes a new (empty) undo journal for a replace session on the internal Bible
+        in our data folder.
+
+    Nothing is written to the disk until a book is actually replaced.
+    """
+    journalsFolderPath = os.path.join( BibleOrgSysGlobals.findHomeFolderPath(), DATA_FOLDER_NAME, REPLACE_JOURNALS_SUBFOLDER_NAME )
+    liveJournalFolderPaths = { os.path.normcase( undoJournal.journalFolderPath ) for undoJournal in list( liveReplaceUndoJournals ) }
+    journalFolderName = '{}_{}'.format( time.strftime( '%Y%m%d_%H%M%S' ), re.sub( r'[^\w.-]', '_', internalBible.getAName() ) )
+    suffix = 1
+    while True:
+        journalFolderPath = os.path.join( journalsFolderPath, journalFolderName + ('_{}'.format( suffix ) if suffix>1 else '') )
+        if not os.path.exists( journalFolderPath ) and os.path.normcase( journalFolderPath ) not in liveJournalFolderPaths: break
+        suffix += 1
+    return ReplaceUndoJournal( journalFolderPath )
+# end of makeReplaceUndoJournal
+
+
+def replaceTextInBooks( optionsDict, confirmFunction, undoJournal, timeLimit=REGEX_TIME_LIMIT ):
+    """
+    Finds and replaces text in the (USFM) files of optionsDict['givenBible'].
+
+    confirmFunction( referenceString, contextBefore, foundText, contextAfter, willBeText, haveUndosFlag )
+        is called for each replacement (until they answer 'A')
+        and must return 'Y' (yes), 'N' (no), 'A' (all), 'S' (stop), or 'U' (undo all).
+
+    All the confirmed replacements for a book are made together
+        and then the book file is written once (atomically, i.e., via a temporary file)
+        after saving the original in the undo journal
+        so that the whole session can be rolled back later (undoJournal.rollback).
+
+    Regular expressions are searched for in a RegexWorkerPool process of its own
+        and the replace is stopped if the expression takes more than timeLimit seconds for any book
+        (with 'hadRegexTimeout' set but any books already replaced left replaced).
+
+    Returns a 2-tuple: optionsDict, resultSummaryDict
+        where resultSummaryDict contains 'searchedBookList', 'replacedBookList', 'numFinds', 'numReplaces',
+            'hadRegexError', 'hadRegexTimeout', and 'undoneFlag'.
+    """
+    if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+        print( exp("replaceTextInBooks( {!r}, {!r} )").format( optionsDict['findText'], optionsDict['replaceText'] ) )
+
+    givenBible = optionsDict['givenBible']
+    encoding = getattr( givenBible, 'encoding', None ) or 'utf-8'
+    resultSummaryDict = { 'searchedBookList':[], 'replacedBookList':[], 'numFinds':0, 'numReplaces':0,
+                            'hadRegexError':False, 'hadRegexTimeout':False, 'undoneFlag':False, }
+    try: compiledRegex = makeReplaceRegex( optionsDict )
+    except re.error:
+        resultSummaryDict['hadRegexError'] = True
+        return optionsDict, resultSummaryDict
+
+    regexFlag = isRegexFind( optionsDict )
+    allFlag = stopFlag = False
+    # Regular expressions get a worker process of their own (so that it can be killed if need be)
+    regexWorkerPool = None
+    if regexFlag and not BibleOrgSysGlobals.alreadyMultiprocessing:
+        try: regexWorkerPool = RegexWorkerPool( 1 )
+        except (EOFError, RuntimeError, OSError) as err: # Couldn't start the manager process
+            logging.error( exp("replaceTextInBooks: Unable to use the find worker processes: {}").format( err ) )
+    try:
+        for BBB in getFindBookList( givenBible, optionsDict ):
+            try: filepath = os.path.join( givenBible.sourceFolder, givenBible.possibleFilenameDict[BBB] )
+            except KeyError: continue # We don't have that book
+            try:
+                with open( filepath, 'rb' ) as bookFile: originalBytes = bookFile.read()
+            except FileNotFoundError: continue
+            resultSummaryDict['searchedBookList'].append( BBB )
+            bookText = originalBytes.decode( encoding )
+            try:
+                if regexFlag: replacements = findBookReplacementsInWorker( BBB, bookText, compiledRegex, optionsDict, regexWorkerPool, timeLimit )
+                else: replacements = findBookReplacements( BBB, bookText, compiledRegex, optionsDict )
+            except (re.error, IndexError): # Bad group reference in the replace text
+                resultSummaryDict['hadRegexError'] = True
+                break
+            except TimeoutError:
+                resultSummaryDict['hadRegexTimeout'] = True
+                break
+            resultSummaryDict['numFinds'] += len(replacements)
+
+            confirmedReplacements = []
+            for replacement in replacements:
+                referenceString, startIndex, endIndex, contextBefore, foundText, contextAfter, replacementText = replacement
+                if allFlag: response = 'Y'
+                else:
+                    response = confirmFunction( referenceString, contextBefore, foundText, contextAfter,
+                                                contextBefore+replacementText+contextAfter,
+                                                bool( resultSummaryDict['numReplaces'] or confirmedReplacements ) )
+                if response == 'A': allFlag, response = True, 'Y'
+                if response == 'Y': confirmedReplacements.append( replacement )
+                elif response == 'S': stopFlag = True; break
+                elif response == 'U': # Undo everything that we've done in this session
+                    undoJournal.rollback( givenBible )
+                    resultSummaryDict['undoneFlag'], resultSummaryDict['numReplaces'], resultSummaryDict['replacedBookList'] = True, 0, []
+                    return optionsDict, resultSummaryDict
+                else: assert response == 'N'
+
+            if confirmedReplacements: # Write the book just once
+                newBytes = applyBookReplacements( bookText, confirmedReplacements ).encode( encoding )
+                undoJournal.recordBook( BBB, filepath, originalBytes, newBytes )
+                writeFileAtomically( filepath, newBytes )
+                try: givenBible.bookNeedsReloading[BBB] = True
+                except AttributeError: pass # Not all Bibles can be reloaded
+                invalidateBookShadowTexts( givenBible, BBB )
+                resultSummaryDict['numReplaces'] += len(confirmedReplacements)
+                resultSummaryDict['replacedBookList'].append( BBB )
+            if stopFlag: break
+    finally:
+        if regexWorkerPool is not None: regexWorkerPool.close()
+    return optionsDict, resultSummaryDict
+# end of replaceTextInBooks
+
+
+
+def iterateBookVerses( internalBibleBook ):
+    """
+    A generator which goes through the processed lines of a loaded Bible book
+        yielding a 6-tuple (intC, intV, C, V, markerTuple, verseText) for each verse in order
+        (and also for the book introduction and any headings, etc. before verse one).
+
+    intC and intV are the chapter and verse numbers (used to line up the verses of two versions)
+        with intC = -1 for the introduction.
+    markerTuple contains the format markers in the verse (e.g., paragraph and heading markers)
+        and verseText is the clean text of the verse.
+    """
+    intC, intV, C, V = -1, 0, '-1', '0'
+    markerList, textList = [], []
+    verseFlag = False # True if we have a \\v (rather than just an introduction or the start of a chapter)
+    for verseDataEntry in internalBibleBook._processedLines:
+        marker, cleanText = verseDataEntry.getMarker(), verseDataEntry.getCleanText()
+        if marker == 'c' or marker == 'v':
+            if verseFlag or markerList or textList:
+                yield intC, intV, C, V, tuple( markerList ), ' '.join( textList )
+            match = LEADING_NUMBER_RE.match( cleanText )
+            if marker == 'c':
+                C, V = cleanText.strip(), '0'
+                if match is not None: intC = int( match.group() )
+                intV, verseFlag = 0, False
+            else:
+                V = cleanText.strip()
+                if match is not None: intV = int( match.group() ) # else it'll line up with the previous verse number
+                verseFlag = True
+            markerList, textList = [], []
+            continue
+        if marker in COLLATE_SKIPPED_MARKERS or marker.startswith( '¬' ): continue # End markers don't have any text
+        if marker not in ( 'v~', 'p~', ): markerList.append( marker ) # Text pseudo-markers don't count as format markers
+        if cleanText: textList.append( cleanText )
+    if verseFlag or markerList or textList:
+        yield intC, intV, C, V, tuple( markerList ), ' '.join( textList )
+# end of iterateBookVerses
+
+
+def findBookShadowVerses( internalBibleBook, shadowRegexTuple ):
+    """
+    Searches the shadow text of the loaded book
+        with the 3-tuple from makeShadowRegex.
+
+    Returns the set of (C,V) 2-tuples for the verses where it's found.
+    """
+    compiledShadowRegex, caselessFlag, ignoreDiacriticsFlag = shadowRegexTuple
+    bookShadowText = getBookShadowText( internalBibleBook, caselessFlag, ignoreDiacriticsFlag )
+    entryList = bookShadowText.entryList
+    return { entryList[entryIndex][:2] for entryIndex,startIndex,endIndex in bookShadowText.iterateMatches( compiledShadowRegex )
+                                        if entryList[entryIndex][2] not in COLLATE_SKIPPED_MARKERS }
+# end of findBookShadowVerses
+
+
+def collateBookVerses( BBB, verses1, verses2, foundVerseSet1, foundVerseSet2, markersMatchFlag=False ):
+    """
+    Walks through the verses of two versions of a book together
+        (a merge join on the chapter and verse numbers)
+        checking that where the first text is found in a verse of the first version,
+        the second text is found in the same verse of the second version (and vice versa).
+
+    verses1 and verses2 are iterables of the 6-tuples from iterateBookVerses (in order)
+        and foundVerseSet1 and foundVerseSet2 are the sets from findBookShadowVerses.
+
+    Returns a list of 8-tuples (BBB, C, V, found1Flag, found2Flag, verseText1, verseText2, markersDifferFlag)
+        for each verse that doesn't match
+        where verseText1 or verseText2 is None if that version doesn't have the verse.
+    If markersMatchFlag is set, the format markers must also be the same in both versions.
+    """
+    differences = []
+    verses1, verses2 = iter( verses1 ), iter( verses2 )
+    verse1, verse2 = next( verses1, None ), next( verses2, None )
+    while verse1 is not None or verse2 is not None:
+        if verse2 is None or ( verse1 is not None and verse1[:2] < verse2[:2] ): # Only in the first version
+            thisVerse1, thisVerse2 = verse1, None
+            verse1 = next( verses1, None )
+        elif verse1 is None or verse2[:2] < verse1[:2]: # Only in the second version
+            thisVerse1, thisVerse2 = None, verse2
+            verse2 = next( verses2, None )
+        else: # In both
+            thisVerse1, thisVerse2 = verse1, verse2
+            verse1, verse2 = next( verses1, None ), next( verses2, None )
+        found1Flag = thisVerse1 is not None and thisVerse1[2:4] in foundVerseSet1
+        found2Flag = thisVerse2 is not None and thisVerse2[2:4] in foundVerseSet2
+        markersDifferFlag = markersMatchFlag and ( thisVerse1 is None or thisVerse2 is None or thisVerse1[4] != thisVerse2[4] )
+        if found1Flag != found2Flag or markersDifferFlag:
+            C, V = (thisVerse1 or thisVerse2)[2:4]
+            differences.append( (BBB, C, V, found1Flag, found2Flag,
+                                None if thisVerse1 is None else thisVerse1[5], None if thisVerse2 is None else thisVerse2[5],
+                                markersDifferFlag) )
+    return differences
+# end of collateBookVerses
+
+
+def collateBookHelper( parameters ):
+    """
+    Runs in a find worker process to load and collate one book of two Bibles.
+
+    Parameter parameters is a 6-tuple containing the two 6-tuples (Bible class, sourceFolder, name, abbreviation, encoding, filename)
+        for the two Bibles, BBB, and the two (picklable) optionsDicts and the markersMatchFlag.
+
+    Returns the same list as collateBookVerses.
+    """
+    bibleParameters1, bibleParameters2, BBB, optionsDict1, optionsDict2, markersMatchFlag = parameters
+    _initFindWorker()
+    if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+        print( exp("collateBookHelper( {} {} {} )").format( bibleParameters1[1], bibleParameters2[1], BBB ) )
+
+    workerBible1 = _getWorkerBibleBook( *(bibleParameters1[:5]+(BBB,)+bibleParameters1[5:]) )
+    workerBible2 = _getWorkerBibleBook( *(bibleParameters2[:5]+(BBB,)+bibleParameters2[5:]) )
+    return collateBookVerses( BBB, iterateBookVerses( workerBible1[BBB] ), iterateBookVerses( workerBible2[BBB] ),
+                            findBookShadowVerses( workerBible1[BBB], makeShadowRegex( optionsDict1 ) ),
+                            findBookShadowVerses( workerBible2[BBB], makeShadowRegex( optionsDict2 ) ), markersMatchFlag )
+# end of collateBookHelper
+
+
+def _loadCollateBooks( internalBible, bookList ):
+    """
+    Runs in a thread to load the Bible (or just the books that we need).
+
+    Holds the Bible's lock while loading
+        because the same (shared) Bible might be being loaded by the other thread or by a window.
+    """
+    with getInternalBibleLock( internalBible ):
+        if bookList is None or bookList == 'ALL': internalBible.load()
+        else:
+            for BBB in ( [bookList] if isinstance( bookList, str ) else bookList ):
+                internalBible.loadBookIfNecessary( BBB )
+# end of _loadCollateBooks
+
+
+def iterateCollatedBooks( optionsDict1, optionsDict2, markersMatchFlag=False, waitFlag=True ):
+    """
+    A generator that collates the books (in optionsDict1['bookList']) that are in both Bibles
+        (optionsDict1['givenBible'] and optionsDict2['givenBible']) -- see collateBookVerses above.
+
+    If possible, the books of both Bibles are loaded and collated in parallel by the find worker processes
+        (from their saved files). Otherwise the two Bibles are loaded at the same time (in two threads)
+        and then the books are collated here.
+
+    Yields a 2-tuple (BBB, differenceList) for each book in turn (in canonical order).
+    If waitFlag is False, it yields None (rather than waiting) if the next book isn't finished yet
+        so that the GUI can get on with other things and try again later.
+
+    Raises re.error (at the first next) if either findText is a bad regular expression.
+    """
+    if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+        print( exp("iterateCollatedBooks( {!r}, {!r}, {}, {} )").format( optionsDict1['findText'], optionsDict2['findText'], markersMatchFlag, waitFlag ) )
+
+    internalBible1, internalBible2 = optionsDict1['givenBible'], optionsDict2['givenBible']
+    shadowRegexTuple1, shadowRegexTuple2 = makeShadowRegex( optionsDict1 ), makeShadowRegex( optionsDict2 )
+
+    bookFutures = {}
+    if canFindInParallel( internalBible1, 2 ) and canFindInParallel( internalBible2, 2 ):
+        bookList2 = getFindBookList( internalBible2, optionsDict1 )
+        bookList = [BBB for BBB in getFindBookList( internalBible1, optionsDict1 ) if BBB in bookList2]
+        workerOptionsDict1, workerOptionsDict2 = [ { key:value for key,value in optionsDict.items() if key not in UNPICKLABLE_FIND_OPTIONS }
+                                                    for optionsDict in (optionsDict1, optionsDict2) ]
+        bibleParameters1, bibleParameters2 = [ (type(internalBible), internalBible.sourceFolder,
+                                    getattr( internalBible, 'givenName', None ), getattr( internalBible, 'abbreviation', None ),
+                                    getattr( internalBible, 'encoding', None ) ) for internalBible in (internalBible1, internalBible2) ]
+        try:
+            findWorkerPool = getFindWorkerPool()
+            for BBB in bookList:
+                bookFutures[BBB] = findWorkerPool.submit( collateBookHelper,
+                                        (bibleParameters1+(internalBible1.possibleFilenameDict[BBB],),
+                                        bibleParameters2+(internalBible2.possibleFilenameDict[BBB],),
+                                        BBB, workerOptionsDict1, workerOptionsDict2, markersMatchFlag) )
+        except (BrokenProcessPool, RuntimeError) as err:
+            logging.error( exp("iterateCollatedBooks: Unable to use the find worker processes: {}").format( err ) )
+            _discardFindWorkerPool()
+    if not bookFutures: # Load both Bibles at the same time
+        loadExecutor = ThreadPoolExecutor( max_workers=2 )
+        loadFutures = [ loadExecutor.submit( _loadCollateBooks, internalBible, optionsDict1['bookList'] )
+                                            for internalBible in (internalBible1, internalBible2) ]
+        loadExecutor.shutdown( wait=False ) # The loads carry on even if we're closed early
+        while not waitFlag and not all( loadFuture.done() for loadFuture in loadFutures ): yield None
+        for loadFuture in loadFutures: loadFuture.result() # Raise any loading exception here
+        bookList2 = getFindBookList( internalBible2, optionsDict1 )
+        bookList = [BBB for BBB in getFindBookList( internalBible1, optionsDict1 ) if BBB in bookList2]
+
+    try:
+        for BBB in bookList:
+            differenceList = None
+            if BBB in bookFutures:
+                while not waitFlag and not bookFutures[BBB].done(): yield None
+                try: differenceList = bookFutures[BBB].result()
+                except Exception as err: # Could be anything from the Bible class -- collate it here instead
+                    logging.error( exp("iterateCollatedBooks: {} collation failed in worker process: {}").format( BBB, err ) )
+                    if isinstance( err, BrokenProcessPool ): _discardFindWorkerPool()
+            if differenceList is None:
+                _loadCollateBooks( internalBible1, [BBB] )
+                _loadCollateBooks( internalBible2, [BBB] )
+                try: differenceList = collateBookVerses( BBB, iterateBookVerses( internalBible1[BBB] ), iterateBookVerses( internalBible2[BBB] ),
+                                                    findBookShadowVerses( internalBible1[BBB], shadowRegexTuple1 ),
+                                                    findBookShadowVerses( internalBible2[BBB], shadowRegexTuple2 ), markersMatchFlag )
+                except KeyError: differenceList = [] # The book couldn't be loaded
+            yield BBB, differenceList
+    finally:
+        for bookFuture in bookFutures.values(): bookFuture.cancel() # Does nothing for the finished ones
+# end of iterateCollatedBooks
+
+
+def collateBooks( optionsDict1, optionsDict2, markersMatchFlag=False ):
+    """
+    Does the same as iterateCollatedBooks (above) but all at once.
+
+    Returns a list of 8-tuples as described in collateBookVerses.
+    """
+    differenceList = []
+    for BBB,bookDifferenceList in iterateCollatedBooks( optionsDict1, optionsDict2, markersMatchFlag ):
+        differenceList.extend( bookDifferenceList )
+    return differenceList
+# end of collateBooks
+
+
+
+def demoReplace():
+    """
+    Checks the replace engine (including the undo journal) on some temporary USFM files.
+    """
+    import tempfile
+
+    class DemoBible:
+        def __init__( self, sourceFolder, filenameDict ):
+            self.sourceFolder, self.possibleFilenameDict, self.encoding = sourceFolder, filenameDict, 'utf-8'
+            self.bookNeedsReloading = {}
+        def getAName( self ): return 'Demo Bible'
+
+    originalBookBytes = {
+        'RUT': '﻿\\id RUT Demo\r\n\\c 1\r\n\\p\r\n\\v 1 The Lord bless you. Lordship.\r\n\\v 2 May the Lord deal kindly.\r\n\\c 2\r\n\\v 1 Lord\r\n'.encode( 'utf-8' ),
+        'JON': '\\id JON Demo\n\\c 1\n\\v 1 The word of the Lord came to Jonah.\n\\v 2 Ĺord is not Lord!\n'.encode( 'utf-8' ),
+        'MAL': '\\id MAL Demo\n\\c 1\n\\v 1 Nothing to change here.\n'.encode( 'utf-8' ),
+        }
+    with tempfile.TemporaryDirectory() as testFolderPath:
+        def writeOriginals():
+            for BBB,bookBytes in originalBookBytes.items():
+                with open( os.path.join( testFolderPath, BBB+'.SFM' ), 'wb' ) as bookFile: bookFile.write( bookBytes )
+        def readBook( BBB ):
+            with open( os.path.join( testFolderPath, BBB+'.SFM' ), 'rb' ) as bookFile: return bookFile.read()
+        def checkOriginals():
+            for BBB,bookBytes in originalBookBytes.items(): assert readBook( BBB ) == bookBytes, BBB
+        demoBible = DemoBible( testFolderPath, { BBB:BBB+'.SFM' for BBB in originalBookBytes } )
+        optionsDict = { 'givenBible':demoBible, 'findText':'Lord', 'replaceText':'LORD', 'wordMode':'Whole',
+                        'bookList':'ALL', 'contextLength':10, }
+        confirmResponses = []
+        def confirmFunction( referenceString, contextBefore, foundText, contextAfter, willBeText, haveUndosFlag ):
+            assert foundText == 'Lord' and willBeText == contextBefore+'LORD'+contextAfter
+            return confirmResponses.pop( 0 )
+
+        # Replace all -- check the final file bytes and then roll it back
+        writeOriginals()
+        confirmResponses[:] = [ 'A' ]
+        undoJournal = ReplaceUndoJournal( os.path.join( testFolderPath, 'Journal1' ) )
+        resultSummaryDict = replaceTextInBooks( optionsDict, confirmFunction, undoJournal )[1]
+        assert resultSummaryDict['numFinds'] == resultSummaryDict['numReplaces'] == 5, resultSummaryDict
+        assert resultSummaryDict['replacedBookList'] == ['RUT','JON'] and demoBible.bookNeedsReloading == {'RUT':True,'JON':True}
+        assert readBook( 'RUT' ) == originalBookBytes['RUT'].replace( b'Lord ', b'LORD ' ).replace( b'Lord\r', b'LORD\r' )
+        assert readBook( 'JON' ) == originalBookBytes['JON'].replace( b' Lord', b' LORD' )
+        assert readBook( 'MAL' ) == originalBookBytes['MAL']
+        assert undoJournal.canRollback()
+        assert undoJournal.rollback( demoBible ) == (['JON','RUT'], [])
+        checkOriginals()
+        assert not undoJournal.canRollback() and undoJournal.rollback() == ([], [])
+        print( "  Replace all then rollback ok" )
+
+        # Yes, No, then Stop -- only the first one is replaced
+        confirmResponses[:] = [ 'Y', 'N', 'S' ]
+        undoJournal = ReplaceUndoJournal( os.path.join( testFolderPath, 'Journal2' ) )
+        resultSummaryDict = replaceTextInBooks( optionsDict, confirmFunction, undoJournal )[1]
+        assert resultSummaryDict['numReplaces'] == 1 and resultSummaryDict['replacedBookList'] == ['RUT']
+        assert readBook( 'RUT' ) == originalBookBytes['RUT'].replace( b'Lord', b'LORD', 1 ) and readBook( 'JON' ) == originalBookBytes['JON']
+        undoJournal.rollback()
+        checkOriginals()
+        print( "  Yes/No/Stop then rollback ok" )
+
+        # Undo all part way through (after the first book has been written)
+        confirmResponses[:] = [ 'Y', 'Y', 'Y', 'Y', 'U' ]
+        undoJournal = ReplaceUndoJournal( os.path.join( testFolderPath, 'Journal3' ) )
+        resultSummaryDict = replaceTextInBooks( optionsDict, confirmFunction, undoJournal )[1]
+        assert resultSummaryDict['undoneFlag'] and resultSummaryDict['numReplaces'] == 0
+        checkOriginals()
+        print( "  Undo all during the replace ok" )
+
+        # Regex replace with a group -- then change a book before rolling back
+        confirmResponses[:] = [ 'A' ]
+        undoJournal = ReplaceUndoJournal( os.path.join( testFolderPath, 'Journal4' ) )
+        regexOptionsDict = dict( optionsDict, findText='regex:(L)ord', replaceText=r'\1ORD', wordMode='Any', bookList=['JON','RUT'] )
+        resultSummaryDict = replaceTextInBooks( regexOptionsDict, confirmFunction, undoJournal )[1]
+        assert resultSummaryDict['numReplaces'] == 6 and resultSummaryDict['replacedBookList'] == ['RUT','JON'] # Canonical order
+        with open( os.path.join( testFolderPath, 'JON.SFM' ), 'ab' ) as bookFile: bookFile.write( b'\\v 3 Edited later.\n' )
+        changedJONBytes = readBook( 'JON' )
+        assert undoJournal.rollback() == (['RUT'], ['JON'])
+        assert readBook( 'RUT' ) == originalBookBytes['RUT'] and readBook( 'JON' ) == changedJONBytes
+        print( "  Regex replace then rollback (not touching a later edit) ok" )
+
+        # Crash after the journal record was written but before the book was replaced
+        writeOriginals()
+        undoJournal = ReplaceUndoJournal( os.path.join( testFolderPath, 'Journal5' ) )
+        undoJournal.recordBook( 'RUT', os.path.join( testFolderPath, 'RUT.SFM' ), originalBookBytes['RUT'], b'never written' )
+        with open( undoJournal.journalFilepath, 'ab' ) as journalFile: journalFile.write( b'{"BBB": "JON", "filep' ) # torn record
+        assert ReplaceUndoJournal( undoJournal.journalFolderPath ).rollback() == ([], [])
+        checkOriginals()
+        print( "  Rollback after a crash ok" )
+
+        # Bad regex
+        resultSummaryDict = replaceTextInBooks( dict( optionsDict, findText='regex:(Lord' ), confirmFunction, undoJournal )[1]
+        assert resultSummaryDict['hadRegexError']
+        checkOriginals()
+
+        # Replaces that don't change anything don't make journal folders (or delete any)
+        journalsFolderPath = os.path.join( testFolderPath, 'Journals' )
+        heldJournal = ReplaceUndoJournal( os.path.join( journalsFolderPath, '00000000_000000_HELD' ) ) # Like an edit window's last replace
+        heldJournal.recordBook( 'RUT', os.path.join( testFolderPath, 'RUT.SFM' ), originalBookBytes['RUT'], originalBookBytes['RUT'] )
+        for attempt in range( MAX_REPLACE_JOURNALS + 2 ):
+            undoJournal = ReplaceUndoJournal( os.path.join( journalsFolderPath, '{:08}_000000_EMPTY'.format( attempt+1 ) ) )
+            assert not replaceTextInBooks( dict( optionsDict, findText='nowhere' ), confirmFunction, undoJournal )[1]['replacedBookList']
+        assert os.listdir( journalsFolderPath ) == ['00000000_000000_HELD']
+        for attempt in range( MAX_REPLACE_JOURNALS + 2 ): # Now with real journals which get pruned
+            undoJournal = ReplaceUndoJournal( os.path.join( journalsFolderPath, '{:08}_000000_REAL'.format( attempt+1 ) ) )
+            undoJournal.recordBook( 'RUT', os.path.join( testFolderPath, 'RUT.SFM' ), originalBookBytes['RUT'], originalBookBytes['RUT'] )
+        assert len( os.listdir( journalsFolderPath ) ) == MAX_REPLACE_JOURNALS and heldJournal.canRollback()
+        print( "  Journal folders only made for real replaces, and held journals kept ok" )
+    print( "Replace engine and undo journal tests passed" )
+# end of BibleFindFunctions.demoReplace
+
+
+def demoCollate():
+    """
+    Checks the verse-aligned collation against two separate findText passes on two generated USFM Bibles
+        and times them both.
+    """
+    import tempfile
+    from USFMBible import USFMBible
+
+    testBooks, numChapters, numVerses = ( 'GEN', 'EXO', 'LEV', 'NUM', 'DEU', 'MAT', 'MRK', 'LUK', ), 40, 30
+    def makeBookText( BBB, version ):
+        bookLines = [ '\\id {} Test version {}'.format( BBB, version ), '\\h {}'.format( BBB ), '\\mt1 {}'.format( BBB ) ]
+        for C in range( 1, numChapters+1 ):
+            bookLines.extend( [ '\\c {}'.format( C ), '\\q1' if version==2 and BBB=='MRK' and C==5 else '\\p' ] )
+            for V in range( 1, numVerses+1 ):
+                if version==2 and BBB=='MAT' and C==1 and V==11: continue # A missing verse
+                if (C*V) % 11 == 0: # Has the divine name (which should be consistently translated)
+                    name = 'Lord' if version==1 else 'God' if V%7==0 else 'Yahweh'
+                    bookLines.append( '\\v {} In verse {} of chapter {} the {} spoke.'.format( V, V, C, name ) )
+                elif version==2 and BBB=='GEN' and C==2 and V==5: bookLines.append( '\\v 5 And Yahweh was there.' ) # An extra one
+                else: bookLines.append( '\\v {} And it was so in verse {}.'.format( V, V ) )
+        return '\n'.join( bookLines ) + '\n'
+    # end of makeBookText
+
+    expectedDifferences = { ('GEN','2','5',False,True), ('MAT','1','11',True,False) }
+    expectedDifferences.update( (BBB,str(C),str(V),True,False) for BBB in testBooks
+                                for C in range( 1, numChapters+1 ) for V in range( 1, numVerses+1 ) if (C*V)%11==0 and V%7==0 )
+    optionsDict1 = { 'workName':'TV1', 'findText':'Lord', 'findHistoryList':[], 'wordMode':'Whole', 'caselessFlag':False,
+                    'ignoreDiacriticsFlag':False, 'includeIntroFlag':True, 'includeMainTextFlag':True,
+                    'includeMarkerTextFlag':False, 'includeExtrasFlag':False, 'contextLength':30,
+                    'bookList':'ALL', 'chapterList':None, 'markerList':None, 'regexFlag':False, }
+    optionsDict2 = optionsDict1.copy()
+    optionsDict2['workName'], optionsDict2['findText'], optionsDict2['findHistoryList'] = 'TV2', 'Yahweh', []
+    savedMaxProcesses = BibleOrgSysGlobals.maxProcesses
+    with tempfile.TemporaryDirectory() as testFolderPath:
+        folderPaths = [ os.path.join( testFolderPath, 'Version{}'.format( version ) ) for version in (1,2) ]
+        for version,folderPath in enumerate( folderPaths, start=1 ):
+            os.mkdir( folderPath )
+            for BBB in testBooks:
+                with open( os.path.join( folderPath, '{}.SFM'.format( BBB ) ), 'wt', encoding='utf-8' ) as bookFile:
+                    bookFile.write( makeBookText( BBB, version ) )
+        def makeTestBibles():
+            testBibles = [ USFMBible( folderPath, givenAbbreviation='TV{}'.format( version ), encoding='utf-8' )
+                                        for version,folderPath in enumerate( folderPaths, start=1 ) ]
+            for testBible in testBibles: testBible.preload()
+            optionsDict1['givenBible'], optionsDict2['givenBible'] = testBibles
+        # end of makeTestBibles
+
+        # The old way: load one Bible then the other, then do a find in each
+        makeTestBibles()
+        startTime = time.perf_counter()
+        foundVerseSets = []
+        for optionsDict in (optionsDict1, optionsDict2):
+            optionsDict['givenBible'].load()
+            foundVerseSets.append( { resultEntry[0].getBCV() for resultEntry in optionsDict['givenBible'].findText( optionsDict.copy() )[2] } )
+        oldTime = time.perf_counter() - startTime
+        assert foundVerseSets[0] ^ foundVerseSets[1] == { difference[:3] for difference in expectedDifferences }
+
+        for maxProcesses in ( 1, 4 ):
+            BibleOrgSysGlobals.maxProcesses = maxProcesses
+            makeTestBibles()
+            startTime, firstDifferenceTime, differenceList = time.perf_counter(), None, []
+            for bookDifferences in iterateCollatedBooks( optionsDict1, optionsDict2, waitFlag=False ):
+                if bookDifferences is None: time.sleep( 0.001 ); continue # Would be doing GUI stuff here
+                if firstDifferenceTime is None and bookDifferences[1]: firstDifferenceTime = time.perf_counter() - startTime
+                differenceList.extend( bookDifferences[1] )
+            newTime = time.perf_counter() - startTime
+            assert { difference[:5] for difference in differenceList } == expectedDifferences, (maxProcesses, differenceList)
+            assert len(differenceList) == len(expectedDifferences) and not any( difference[7] for difference in differenceList )
+            assert [difference[6] for difference in differenceList if difference[:3]==('MAT','1','11')] == [None]
+            print( "  Collated {} books: load and find each {:.3f}s, collate with {} process(es) {:.3f}s (first difference after {:.3f}s)" \
+                    .format( len(testBooks), oldTime, maxProcesses, newTime, firstDifferenceTime ) )
+
+        markerDifferenceList = collateBooks( optionsDict1, optionsDict2, markersMatchFlag=True )
+        assert { difference[:3] for difference in markerDifferenceList if difference[7] } \
+            == { ('MRK','5','0'), ('MAT','1','11') }, [difference for difference in markerDifferenceList if difference[7]]
+    BibleOrgSysGlobals.maxProcesses = savedMaxProcesses
+    print( "Collation gave the expected {} differences".format( len(expectedDifferences) ) )
+# end of demoCollate
+
+
+def demoShadowText():
+    """
+    Checks the shadow texts (and their offset maps) and times repeated caseless searches
+        with them against normalizing every verse for each search.
+    """
+    import tempfile
+    from USFMBible import USFMBible
+
+    # The offset maps must take us back to exactly what was found
+    for text in ( 'plain ascii Text', 'Élohim said', 'Straße and STRASSE', 'café naïve', 'İstanbul', 'Ἐν ἀρχῇ ἦν ὁ ΛΌΓΟΣ', '', ):
+        for caselessFlag in (False,True):
+            for ignoreDiacriticsFlag in (False,True):
+                shadowText, offsetMap = makeShadowText( text, caselessFlag, ignoreDiacriticsFlag )
+                if caselessFlag and ignoreDiacriticsFlag: assert shadowText == normalizeFindText( text ), (text, shadowText)
+                assert offsetMap is None or len(offsetMap) == len(shadowText)+1
+                for startIndex in range( len(shadowText) ):
+                    for endIndex in range( startIndex+1, len(shadowText)+1 ):
+                        originalStartIndex, originalEndIndex = getOriginalSpan( offsetMap, startIndex, endIndex )
+                        assert shadowText[startIndex:endIndex] in makeShadowText( text[originalStartIndex:originalEndIndex], caselessFlag, ignoreDiacriticsFlag )[0], \
+                                (text, caselessFlag, ignoreDiacriticsFlag, startIndex, endIndex)
+    print( "  Shadow text offset maps ok" )
+
+    testBooks, numChapters, numVerses = ( 'GEN', 'EXO', 'LEV', 'NUM', 'DEU', 'MAT', 'MRK', 'LUK', ), 40, 30
+    verseTexts = ( 'Ἐν ἀρχῇ ἦν ὁ λόγος, καὶ ὁ λόγος ἦν πρὸς τὸν θεόν.', 'Élohim said to the naïve man at the café: “Straße!”',
+                    'ΚΑῚ ΘΕῸΣ ἮΝ Ὁ ΛΌΓΟΣ in verse {}.', 'And it was so in verse {}.', 'elohim and ELOHIM and Elohim.', )
+    testSearches = ( # findText, wordMode, caselessFlag, ignoreDiacriticsFlag
+        ('λογος','Whole',True,True), ('ΘΕΟΣ','Any',True,True), ('elohim','Whole',True,True), ('Elohim','Whole',True,False),
+        ('naive','Begins',True,True), ('strasse','Any',True,False), ('VERSE 7','EndsWord',True,False), ('ἦν','Any',False,True),
+        ('regex:ver?se [0-9]+\\.','Any',True,True), ('regex:Λ\\w+','Any',True,False), ('nowhere','Any',True,True), ('cafe','Whole',True,True),
+        )
+    def normalizeVerseText( text, caselessFlag, ignoreDiacriticsFlag ): # The old way
+        if ignoreDiacriticsFlag: text = ''.join( char for char in unicodedata.normalize( 'NFD', text ) if not unicodedata.combining( char ) )
+        return text.casefold() if caselessFlag else text
+    with tempfile.TemporaryDirectory() as testFolderPath:
+        for BBB in testBooks:
+            with open( os.path.join( testFolderPath, '{}.SFM'.format( BBB ) ), 'wt', encoding='utf-8' ) as bookFile:
+                bookFile.write( '\\id {} Shadow test\n\\mt1 {}\n'.format( BBB, BBB ) + ''.join( '\\c {}\n\\p\n'.format( C )
+                                + ''.join( '\\v {} {}\n'.format( V, verseTexts[(C+V)%len(verseTexts)].format( V ) ) for V in range( 1, numVerses+1 ) )
+                                for C in range( 1, numChapters+1 ) ) )
+        testBible = USFMBible( testFolderPath, givenAbbreviation='SHD', encoding='utf-8' )
+        testBible.preload()
+        testBible.load()
+
+        oldTime = newTime = 0
+        for repeat in range( 3 ): # Repeated searches are where the shadow text pays off
+            for findText,wordMode,caselessFlag,ignoreDiacriticsFlag in testSearches:
+                optionsDict = { 'findText':findText, 'wordMode':wordMode, 'caselessFlag':caselessFlag, 'ignoreDiacriticsFlag':ignoreDiacriticsFlag, }
+                startTime = time.perf_counter()
+                if findText.lower().startswith( 'regex:' ):
+                    compiledRegex = makeReplaceRegex( dict( optionsDict, findText=normalizeVerseText( findText, False, ignoreDiacriticsFlag ) ) )
+                    oldNormalizeFlags = False, ignoreDiacriticsFlag
+                else:
+                    compiledRegex = makeReplaceRegex( dict( optionsDict, findText=normalizeVerseText( findText, caselessFlag, ignoreDiacriticsFlag ), caselessFlag=False ) )
+                    oldNormalizeFlags = caselessFlag, ignoreDiacriticsFlag
+                oldFoundSet = set()
+                for BBB in testBooks:
+                    C, V = '-1', '0'
+                    for verseDataEntry in testBible[BBB]._processedLines:
+                        marker, cleanText = verseDataEntry.getMarker(), verseDataEntry.getCleanText()
+                        if marker == 'c': C, V = cleanText.strip(), '0'
+                        elif marker == 'v': V = cleanText.strip()
+                        elif cleanText and marker not in COLLATE_SKIPPED_MARKERS and not marker.startswith( '¬' ) \
+                        and compiledRegex.search( normalizeVerseText( cleanText, *oldNormalizeFlags ) ):
+                            oldFoundSet.add( (BBB, C, V) )
+                oldTime += time.perf_counter() - startTime
+
+                startTime = time.perf_counter()
+                shadowRegexTuple = makeShadowRegex( optionsDict )
+                newFoundSet = { (BBB,)+CV for BBB in testBooks for CV in findBookShadowVerses( testBible[BBB], shadowRegexTuple ) }
+                newTime += time.perf_counter() - startTime
+                assert newFoundSet == oldFoundSet, (findText, len(newFoundSet), len(oldFoundSet))
+                if repeat == 0:
+                    for C,V,marker,cleanText,foundText in findInBookShadowText( testBible['GEN'], *shadowRegexTuple ):
+                        assert foundText in cleanText and shadowRegexTuple[0].search( makeShadowText( foundText, *shadowRegexTuple[1:] )[0] ), (findText, foundText)
+                    print( "  {!r} found in {} verses".format( findText, len(newFoundSet) ) )
+        print( "  {} searches of {} books: normalizing every verse {:.3f}s, with shadow texts {:.3f}s" \
+                .format( 3*len(testSearches), len(testBooks), oldTime, newTime ) )
+
+        # Bible finds through the shadow text must give exactly the same results as findText
+        #   (BOS only removes Latin accents so don't compare the Greek ones)
+        for findText,wordMode,caselessFlag,ignoreDiacriticsFlag in ( ('elohim','Whole',True,True), ('naive','Begins',True,True),
+                        ('VERSE 7','EndsWord',True,False), ('1','Any',True,False), ('in verse 3.','EndsLine',True,False), ('Cafe','Any',False,True), ):
+            optionsDict = { 'findText':findText, 'wordMode':wordMode, 'caselessFlag':caselessFlag, 'ignoreDiacriticsFlag':ignoreDiacriticsFlag,
+                            'includeIntroFlag':True, 'includeMainTextFlag':True, 'includeMarkerTextFlag':False, 'includeExtrasFlag':False,
+                            'contextLength':30, 'bookList':['GEN'], 'chapterList':None, 'markerList':None, }
+            assert canFindInShadowText( optionsDict )
+            findTextResultList = testBible.findText( optionsDict.copy() )[2]
+            shadowResultList = findBookTextInShadowText( 'GEN', testBible['GEN'], optionsDict.copy() )[2]
+            assert [(resultEntry[0].getBCVS(),)+resultEntry[1:] for resultEntry in shadowResultList] \
+                == [(resultEntry[0].getBCVS(),)+resultEntry[1:] for resultEntry in findTextResultList], (findText, len(shadowResultList), len(findTextResultList))
+        print( "  Bible finds through the shadow text gave the same results as findText" )
+
+        # Shadow texts are shared until the book is saved (or reloaded)
+        bookShadowText = getBookShadowText( testBible['GEN'] )
+        assert getBookShadowText( testBible['GEN'] ) is bookShadowText
+        invalidateBookShadowTexts( testBible, 'GEN' )
+        assert getBookShadowText( testBible['GEN'] ) is not bookShadowText
+        testBible.loadBook( 'EXO' ) # Gives a new book object
+        assert len( [book for book in bookShadowTexts if book is testBible['EXO']] ) == 0
+    print( "Shadow text searches gave the same results for {} searches".format( len(testSearches) ) )
+# end of demoShadowText
+
+
+def demoRegexTimeLimit():
+    """
+    Checks the compiled regex cache and that runaway (catastrophic backtracking) regular expressions
+        are stopped by the find and replace engines rather than hanging
+        (without upsetting the shared find worker pool).
+    """
+    import tempfile
+    from USFMBible import USFMBible
+
+    # The cache
+    compiledRegex = compileFindRegex( 'Lord', re.MULTILINE )
+    assert compileFindRegex( 'Lord', re.MULTILINE ) is compiledRegex
+    assert compileFindRegex( 'Lord', re.MULTILINE|re.IGNORECASE ) is not compiledRegex
+    for j in range( MAX_COMPILED_REGEXES+10 ): compileFindRegex( 'word{}'.format( j ) )
+    assert len(compiledRegexCache) == MAX_COMPILED_REGEXES and ('Lord',re.MULTILINE) not in compiledRegexCache
+    assert checkFindRegex( 'regex:(Lord' ) and checkFindRegex( 'regex:Lord+' ) is None and checkFindRegex( 'Lord(' ) is None
+    print( "  Compiled regex cache ok" )
+
+    class DemoBible:
+        def __init__( self, sourceFolder, filenameDict ):
+            self.sourceFolder, self.possibleFilenameDict, self.encoding = sourceFolder, filenameDict, 'utf-8'
+            self.bookNeedsReloading = {}
+        def getAName( self ): return 'Demo Bible'
+
+    timeLimit = 2
+    pathologicalPatterns = ( 'regex:(a+)+$', 'regex:(a|a)+$', 'regex:(a*)*b', r'regex:(\w+\s?)+$', ) # All take (practically) forever on the test verse
+    bookBytes = ( '\\id RUT Test\n\\c 1\n\\p\n\\v 1 Just a normal verse.\n\\v 2 {}!\n'.format( 'a'*32 ) ).encode( 'utf-8' )
+    sharedWorkerPool = getFindWorkerPool()
+    sharedWorkerPool.submit( os.getpid ).result() # Get its processes started
+    getRegexTaskManager() # Its process is kept going too
+    sharedProcesses = set( multiprocessing.active_children() )
+    with tempfile.TemporaryDirectory() as testFolderPath:
+        with open( os.path.join( testFolderPath, 'RUT.SFM' ), 'wb' ) as bookFile: bookFile.write( bookBytes )
+        demoBible = DemoBible( testFolderPath, { 'RUT':'RUT.SFM' } )
+        optionsDict = { 'givenBible':demoBible, 'replaceText':'X', 'wordMode':'Any', 'bookList':'ALL', 'contextLength':10, }
+        def confirmFunction( *args ): return 'A'
+
+        # Replace
+        for findText in pathologicalPatterns:
+            startTime = time.perf_counter()
+            resultSummaryDict = replaceTextInBooks( dict( optionsDict, findText=findText ), confirmFunction,
+                                    ReplaceUndoJournal( os.path.join( testFolderPath, 'Journal' ) ), timeLimit=timeLimit )[1]
+            elapsedTime = time.perf_counter() - startTime
+            assert resultSummaryDict['hadRegexTimeout'] and not resultSummaryDict['replacedBookList'] and elapsedTime < timeLimit+5, (findText, elapsedTime)
+            with open( os.path.join( testFolderPath, 'RUT.SFM' ), 'rb' ) as bookFile: assert bookFile.read() == bookBytes
+            print( "  Replace of {!r} stopped after {:.2f}s".format( findText, elapsedTime ) )
+        resultSummaryDict = replaceTextInBooks( dict( optionsDict, findText='regex:(norm)al' ), confirmFunction,
+                                ReplaceUndoJournal( os.path.join( testFolderPath, 'Journal' ) ), timeLimit=timeLimit )[1]
+        assert resultSummaryDict['numReplaces'] == 1 and not resultSummaryDict['hadRegexTimeout'], resultSummaryDict # A new worker was started
+        with open( os.path.join( testFolderPath, 'RUT.SFM' ), 'wb' ) as bookFile: bookFile.write( bookBytes )
+
+        # Find
+        testBible = USFMBible( testFolderPath, givenAbbreviation='TST', encoding='utf-8' )
+        testBible.preload()
+        findOptionsDict = { 'givenBible':testBible, 'workName':'TST', 'findText':pathologicalPatterns[0], 'findHistoryList':[],
+                        'wordMode':'Any', 'caselessFlag':False, 'ignoreDiacriticsFlag':False,
+                        'includeIntroFlag':True, 'includeMainTextFlag':True, 'includeMarkerTextFlag':False, 'includeExtrasFlag':False,
+                        'contextLength':10, 'bookList':'ALL', 'chapterList':None, 'markerList':None, 'regexFlag':False, }
+        startTime = time.perf_counter()
+        try:
+            for bookResults in iterateFindTextByBooks( findOptionsDict.copy(), {}, waitFlag=False, timeLimit=timeLimit ):
+                if bookResults is None: time.sleep( 0.01 ); continue # Would be doing GUI stuff here
+            raise AssertionError( "Find of {!r} wasn't stopped".format( findOptionsDict['findText'] ) )
+        except TimeoutError as err: print( "  Find stopped after {:.2f}s: {}".format( time.perf_counter()-startTime, err ) )
+        # Cancelled (by closing the iterator) while the worker is still going
+        resultIterator = iterateFindTextByBooks( findOptionsDict.copy(), {}, waitFlag=False, timeLimit=timeLimit )
+        assert next( resultIterator ) is None
+        time.sleep( 0.5 )
+        resultIterator.close()
+        time.sleep( 0.5 )
+        assert set( multiprocessing.active_children() ) == sharedProcesses # The regex worker was killed
+        resultList = findTextByBooks( dict( findOptionsDict, findText='regex:norm?al' ) )[2]
+        assert len(resultList) == 1, resultList
+        print( "  Cancelled find stopped the worker ok" )
+
+        # Only the time evaluating the expression counts (not waiting for a worker)
+        regexWorkerPool = RegexWorkerPool( 1 )
+        workerOptionsDict = { key:value for key,value in optionsDict.items() if key not in UNPICKLABLE_FIND_OPTIONS }
+        workerOptionsDict['findText'] = pathologicalPatterns[0]
+        bookFutures = [regexWorkerPool.submit( findBookReplacementsHelper, (BBB, bookBytes.decode( 'utf-8' ), '(a+)+$', re.MULTILINE, workerOptionsDict) )
+                        for BBB in ( 'RUT', 'JON', )]
+        while not regexWorkerPool.isOverTime( 'RUT', timeLimit ): time.sleep( 0.01 )
+        assert not bookFutures[1].done() and not regexWorkerPool.isOverTime( 'JON', timeLimit ) # Still waiting for the worker
+        regexWorkerPool.close()
+        time.sleep( 0.5 )
+        assert set( multiprocessing.active_children() ) == sharedProcesses
+        print( "  Waiting for a regex worker isn't timed ok" )
+    assert findWorkerPool is sharedWorkerPool and sharedWorkerPool.submit( os.getpid ).result() # Still going
+    _discardFindWorkerPool()
+    print( "Runaway regular expressions were stopped ({} second limit)".format( timeLimit ) )
+# end of demoRegexTimeLimit
+
+
+def demo():
+    """
+    Demo program to check the indexed and parallel finds against the normal BOS findText
+        on a small generated USFM Bible.
+    """
+    import tempfile
+    from USFMBible import USFMBible
+
+    if BibleOrgSysGlobals.verbosityLevel > 0: print( ProgNameVersion )
+
+    demoReplace()
+    demoCollate()
+    demoShadowText()
+    demoRegexTimeLimit()
+
+    testBookTexts = {
+        'GEN': '\\id GEN Test\n\\h Genesis\n\\mt1 Genesis\n\\ip In the beginning is an introduction.\n'
+                + ''.join( '\\c {}\n\\p\n'.format( C ) + ''.join( '\\v {} In the beginning God created verse {} of chapter {}. Élohim spoke.\n'.format( V, V, C ) \
+                    if (C+V)%7==0 else '\\v {} And it was so in verse {}, chapter {}.\n'.format( V, V, C ) for V in range( 1, 21 ) ) for C in range( 1, 11 ) ),
+        'RUT': '\\id RUT Test\n\\h Ruth\n\\mt1 Ruth\n'
+                + ''.join( '\\c {}\n\\p\n'.format( C ) + ''.join( '\\v {} Ruth said, “Where you go I will go” in verse {}.\\f + \\fr {}:{} \\ft Or: come\\f*\n'.format( V, V, C, V ) for V in range( 1, 15 ) ) for C in range( 1, 5 ) ),
+        'MAT': '\\id MAT Test\n\\h Matthew\n\\mt1 Matthew\n'
+                + ''.join( '\\c {}\n\\s1 Heading {}\n\\p\n'.format( C, C ) + ''.join( '\\v {} Jesus said the \\nd kingdom\\nd*{} is near in verse {}.\n'.format( V, 's' if V%5==0 else '', V ) for V in range( 1, 26 ) ) for C in range( 1, 29 ) ),
+        }
+    testSearches = ( # findText, wordMode, caselessFlag, ignoreDiacriticsFlag, includeMarkerTextFlag, includeExtrasFlag, markerList, contextLength
+        ('beginning','Any',True,False,False,False,None,30), ('Beginning','Whole',False,False,False,False,None,30),
+        ('kingdom','Whole',True,False,False,False,None,30), ('kingdoms','Any',True,False,False,False,None,10),
+        ('elohim','Any',True,True,False,False,None,30), ('ingdo','Any',True,False,False,False,None,30),
+        ('the kingdom','Begins',True,False,False,False,None,30), ('God created','EndsWord',True,False,False,False,None,30),
+        ('nowhere','Any',True,False,False,False,None,30), ('introduction','Any',True,False,False,False,None,30),
+        ('go” in','Any',True,False,False,False,None,30), ('come','Whole',True,False,False,True,None,30),
+        ('regex:ver?se [0-9]+','Any',False,False,False,False,None,20), ('nd','Any',True,False,True,False,None,30),
+        ('Heading','Any',False,False,False,False,['s1'],30), ('.','EndsLine',True,False,False,False,None,5),
+        )
+    savedMaxProcesses = BibleOrgSysGlobals.maxProcesses
+    with tempfile.TemporaryDirectory() as testFolderPath:
+        for BBB,bookText in testBookTexts.items():
+            with open( os.path.join( testFolderPath, '{}.SFM'.format( BBB ) ), 'wt', encoding='utf-8' ) as bookFile:
+                bookFile.write( bookText )
+        testBible = USFMBible( testFolderPath, givenAbbreviation='TST', encoding='utf-8' )
+        testBible.preload()
+        bibleFindIndexes[testBible] = BibleFindIndex( testBible, os.path.join( testFolderPath, 'Index' ) )
+        for findText,wordMode,caselessFlag,ignoreDiacriticsFlag,includeMarkerTextFlag,includeExtrasFlag,markerList,contextLength in testSearches:
+            for bookList,chapterList in ( ('ALL',None), (['GEN','MAT'],None), ('MAT',['3']), (['RUT','MAT'],['2','4']) ):
+                optionsDict = { 'givenBible':testBible, 'workName':'TST', 'findText':findText, 'findHistoryList':[],
+                                'wordMode':wordMode, 'caselessFlag':caselessFlag, 'ignoreDiacriticsFlag':ignoreDiacriticsFlag,
+                                'includeIntroFlag':True, 'includeMainTextFlag':True,
+                                'includeMarkerTextFlag':includeMarkerTextFlag, 'includeExtrasFlag':includeExtrasFlag,
+                                'contextLength':contextLength, 'bookList':bookList, 'chapterList':chapterList,
+                                'markerList':markerList, 'regexFlag':False, }
+                testBible.load()
+                startTime = time.perf_counter()
+                resultList = testBible.findText( optionsDict.copy() )[2]
+                timings = [time.perf_counter() - startTime]
+                for maxProcesses in ( 1, 4 ):
+                    BibleOrgSysGlobals.maxProcesses = maxProcesses
+                    startTime = time.perf_counter()
+                    byBooksResultList = findTextByBooks( optionsDict.copy() )[2]
+                    timings.append( time.perf_counter() - startTime )
+                    assert [(result[0].getBCV(),)+tuple(result[1:]) for result in byBooksResultList] \
+                        == [(result[0].getBCV(),)+tuple(result[1:]) for result in resultList], (findText, bookList, maxProcesses, byBooksResultList, resultList)
+                startTime, firstResultTime, streamedResultList = time.perf_counter(), None, []
+                for bookResults in iterateFindTextByBooks( optionsDict.copy(), {}, waitFlag=False ):
+                    if bookResults is None: time.sleep( 0.001 ); continue # Would be doing GUI stuff here
+                    if firstResultTime is None and bookResults[1]: firstResultTime = time.perf_counter() - startTime
+                    streamedResultList.extend( bookResults[1] )
+                assert [(result[0].getBCV(),)+tuple(result[1:]) for result in streamedResultList] \
+                    == [(result[0].getBCV(),)+tuple(result[1:]) for result in resultList], (findText, bookList, streamedResultList, resultList)
+                print( "  {!r} in {} {}: {} results, findText {:.4f}s, by books {:.4f}s, parallel {:.4f}s, first streamed result {}" \
+                        .format( findText, bookList, chapterList, len(resultList), *timings,
+                                'none' if firstResultTime is None else '{:.4f}s'.format( firstResultTime ) ) )
+        # The index is built from the saved file (not the loaded book) and stamped from before it was read
+        with open( os.path.join( testFolderPath, 'RUT.SFM' ), 'at', encoding='utf-8' ) as bookFile:
+            bookFile.write( '\\c 5\n\\p\n\\v 1 Naomi was happy.\n' )
+        assert bibleFindIndexes[testBible].findCandidateChapters( 'RUT', 'Naomi' ) == ['5']
+        assert bibleFindIndexes[testBible].startBuildingBookIndexes( ['RUT'] ) == [] # Already up to date
+    BibleOrgSysGlobals.maxProcesses = savedMaxProcesses
+    _discardFindWorkerPool()
+    print( "Finding by books gave the same results as findText for {} searches".format( len(testSearches) ) )
+# end of BibleFindFunctions.demo
+
+
+if __name__ == '__main__':
+    from multiprocessing import freeze_support
+    freeze_support() # Multiprocessing support for frozen Windows executables
+
+    # Configure basic set-up
+    parser = BibleOrgSysGlobals.setup( ProgName, ProgVersion )
+    BibleOrgSysGlobals.addStandardOptionsAndProcess( parser )
+
+    demo()
+
+    BibleOrgSysGlobals.closedown( ProgName, ProgVersion )
+# end of BibleFindFunctions.py
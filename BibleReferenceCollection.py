@@ -50,14 +50,14 @@ import tkinter as tk
 from tkinter.ttk import Frame, Button, Scrollbar
 
 # Biblelator imports
-from BiblelatorGlobals import DEFAULT, tkBREAK, \
+from BiblelatorGlobals import DEFAULT, tkSTART, tkBREAK, \
         BIBLE_GROUP_CODES, BIBLE_CONTEXT_VIEW_MODES, BIBLE_FORMAT_VIEW_MODES, MAX_PSEUDOVERSES, \
         INITIAL_REFERENCE_COLLECTION_SIZE, MINIMUM_REFERENCE_COLLECTION_SIZE, MAXIMUM_REFERENCE_COLLECTION_SIZE, \
         parseWindowSize
-from BiblelatorHelpers import mapReferencesVerseKey, handleInternalBibles
+from BiblelatorHelpers import mapReferencesVerseKey, handleInternalBibles, packVerseKey, getInternalBibleLock
 from ChildWindows import ChildWindow
 from BibleResourceWindows import BibleResourceWindowAddon
-from TextBoxes import BibleBoxAddon
+from TextBoxes import BText, ChildBoxAddon, BibleBoxAddon
 
 # BibleOrgSys imports
 #if __name__ == '__main__': import sys; sys.path.append( '../BibleOrgSys/' )
@@ -67,6 +67,7 @@ from BibleOrganizationalSystems import BibleOrganizationalSystem
 
 
 MAX_CACHED_VERSES = 30 # Per Bible resource window
+MAX_SPARE_REFERENCE_BOXES = 50 # Hidden boxes kept for reuse by each reference collection window
 
 
 
@@ -86,7 +87,7 @@ def exp( messageString ):
 
 
 
-class BibleReferenceBox( Frame, BibleBoxAddon ):
+class BibleReferenceBox( Frame, ChildBoxAddon, BibleBoxAddon ):
     """
     """
     def __init__( self, parentWindow, parentFrame, parentApp, internalBible, referenceObject ):
@@ -97,7 +98,7 @@ class BibleReferenceBox( Frame, BibleBoxAddon ):
         self.internalBible = handleInternalBibles( self.parentApp, internalBible, self )
 
         Frame.__init__( self, parentFrame )
-        BibleBoxAddon.__init__( self, parentWindow, 'BibleReferenceBox' )
+        ChildBoxAddon.__init__( self, parentWindow )
 
         # Set some dummy values required soon
         #self._contextViewRadioVar, self._formatViewRadioVar, self._groupRadioVar = tk.IntVar(), tk.IntVar(), tk.StringVar()
@@ -141,14 +142,7 @@ class BibleReferenceBox( Frame, BibleBoxAddon ):
         self.createStandardBoxKeyboardBindings()
         self.textBox.bind( '<Button-1>', self.setFocus ) # So disabled text box can still do select and copy functions
 
-        # Set-up our standard Bible styles
-        for USFMKey, styleDict in self.parentApp.stylesheet.getTKStyles().items():
-            self.textBox.tag_configure( USFMKey, **styleDict ) # Create the style
-        # Add our extra specialised styles
-        self.textBox.tag_configure( 'contextHeader', background='pink', font='helvetica 6 bold' )
-        self.textBox.tag_configure( 'context', background='pink', font='helvetica 6' )
-        self.textBox.tag_configure( 'markersHeader', background='yellow3', font='helvetica 6 bold' )
-        self.textBox.tag_configure( 'markers', background='yellow3', font='helvetica 6' )
+        BibleBoxAddon.__init__( self, parentWindow, 'BibleReferenceBox' ) # Also sets up our Bible styles
 
         self.pack( expand=tk.YES, fill=tk.BOTH ) # Pack the frame
 
@@ -207,7 +201,9 @@ class BibleReferenceBox( Frame, BibleBoxAddon ):
             print( exp("BibleReferenceBox.getContextVerseData( {} )").format( verseKey ) )
 
         if self.internalBible is not None:
-            try: return self.internalBible.getContextVerseData( verseKey )
+            try:
+                with getInternalBibleLock( self.internalBible ): # A collection box might be loading a book on a worker thread
+                    return self.internalBible.getContextVerseData( verseKey )
             except KeyError: # Could be after a verse-bridge ???
                 if verseKey.getChapterNumber() != '0':
                     logging.error( exp("BibleReferenceBox.getContextVerseData for {} {} got a KeyError") \
@@ -231,14 +227,14 @@ class BibleReferenceBox( Frame, BibleBoxAddon ):
         When it gets too large, it drops the first entry.
         """
         #if BibleOrgSysGlobals.debugFlag and debuggingThisModule: print( exp("getCachedVerseData( {} )").format( verseKey ) )
-        verseKeyHash = verseKey.makeHash()
-        if verseKeyHash in self.verseCache:
+        packedVerseKey = packVerseKey( verseKey )
+        if packedVerseKey in self.verseCache:
             #if BibleOrgSysGlobals.debugFlag and debuggingThisModule: print( "  " + exp("Retrieved from BibleReferenceBox cache") )
-            self.verseCache.move_to_end( verseKeyHash )
+            self.verseCache.move_to_end( packedVerseKey )
             #print( "   returning", self.verseCache[verseKeyHash][0] )
-            return self.verseCache[verseKeyHash]
+            return self.verseCache[packedVerseKey]
         verseContextData = self.getContextVerseData( verseKey )
-        self.verseCache[verseKeyHash] = verseContextData
+        self.verseCache[packedVerseKey] = verseContextData
         if len(self.verseCache) > MAX_CACHED_VERSES:
             #print( "Removing oldest cached entry", len(self.verseCache) )
             self.verseCache.popitem( last=False )
@@ -261,6 +257,8 @@ class BibleReferenceBox( Frame, BibleBoxAddon ):
             print( "BibleReferenceBox.updateShownReferences( {} ) for {}".format( newReferenceObject, self.internalBible.getAName() ) )
             assert isinstance( newReferenceObject, SimpleVerseKey ) or isinstance( newReferenceObject, SimpleVersesKey ) or isinstance( newReferenceObject, VerseRangeKey )
 
+        self.textBox.configure( state=tk.NORMAL )
+        self.textBox.delete( tkSTART, tk.END ) # In case we're being reused for a different reference
         for j, referenceVerse in enumerate( newReferenceObject ):
             #print( "  refVerse", j, referenceVerse )
             assert isinstance( referenceVerse, SimpleVerseKey )
@@ -277,6 +275,20 @@ class BibleReferenceBox( Frame, BibleBoxAddon ):
     # end of BibleReferenceBox.updateShownReferences
 
 
+    def rebindReference( self, newReferenceObject ):
+        """
+        Reuses this box (from the window's pool) to show a different reference
+            rather than destroying it and making a new one.
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( exp("BibleReferenceBox.rebindReference( {} ) was {}").format( newReferenceObject, self.referenceObject ) )
+
+        self.referenceObject = newReferenceObject
+        self.titleLabel.configure( text=self.referenceObject.getShortText() )
+        self.updateShownReferences( self.referenceObject )
+    # end of BibleReferenceBox.rebindReference
+
+
     def doClose( self, event=None ):
         """
         Called from the GUI.
@@ -291,6 +303,7 @@ class BibleReferenceBox( Frame, BibleBoxAddon ):
         Called to finally and irreversibly remove this box from our list and close it.
         """
         if BibleOrgSysGlobals.debugFlag and debuggingThisModule: print( exp("BibleReferenceBox.closeReferenceBox()") )
+        self.parentApp.internalBibles.releaseWindow( self ) # Let go of our internal Bible
         if self in self.parentWindow.referenceBoxes:
             self.parentWindow.referenceBoxes.remove( self )
             self.destroy()
@@ -357,6 +370,7 @@ class BibleReferenceCollectionWindow( ChildWindow, BibleResourceWindowAddon ):
         #self.BCVUpdateType = 'ReferencesMode' # Leave as default
         self.folderPath = self.filename = self.filepath = None
         self.referenceBoxes = BibleReferenceBoxes( self )
+        self.spareReferenceBoxes = [] # Hidden (unpacked) boxes that we can reuse
 
         if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
             print( exp("BibleReferenceCollectionWindow.__init__ finished.") )
@@ -588,6 +602,18 @@ class BibleReferenceCollectionWindow( ChildWindow, BibleResourceWindowAddon ):
     # end of BibleReferenceCollectionWindow.updateShownBCV
 
 
+    def prefetchVerseData( self, newReferenceVerseKey ):
+        """
+        Called at idle time (from ChildWindows) with a guess of where the user might go next.
+
+        We don't have a verse cache of our own
+            (the reference boxes are only created once we know the references)
+            so there's nothing to do here.
+        """
+        pass
+    # end of BibleReferenceCollectionWindow.prefetchVerseData
+
+
     def updateShownReferences( self, newReferencesVerseKeys ):
         """
         Updates self.textBox in various ways depending on the contextViewMode held by the enclosing window.
@@ -601,12 +627,8 @@ class BibleReferenceCollectionWindow( ChildWindow, BibleResourceWindowAddon ):
             #print( "contextViewMode", self._contextViewMode )
             assert isinstance( newReferencesVerseKeys, list ) or newReferencesVerseKeys is None
 
-        # Remove any previous resource boxes
-        for referenceBox in self.referenceBoxes:
-            referenceBox.destroy()
-        self.referenceBoxes = BibleReferenceBoxes( self )
-
-        if newReferencesVerseKeys is not None: # open new resource boxes
+        verseKeyObjects = []
+        if newReferencesVerseKeys is not None:
             assert isinstance( newReferencesVerseKeys, list )
             for newReferencesVerseKey in newReferencesVerseKeys:
                 #print( "BibleReferenceCollectionWindow.updateShownReferences.newReferencesVerseKey", newReferencesVerseKey )
@@ -614,16 +636,53 @@ class BibleReferenceCollectionWindow( ChildWindow, BibleResourceWindowAddon ):
                     print( "BibleReferenceCollectionWindow.updateShownReferences.newReferencesVerseKey: Why do we have NONE here?" ) #, newReferencesVerseKeys )
                 else:
                     assert isinstance( newReferencesVerseKey, FlexibleVersesKey )
-                    for verseKeyObject in newReferencesVerseKey:
-                        #print( "  BRCWupdateShownReferences: {}".format( verseKeyObject ) )
-                        referenceBox = BibleReferenceBox( self, self.canvasFrame, self.parentApp, self.internalBible, verseKeyObject )
-                        self.referenceBoxes.append( referenceBox )
+                    verseKeyObjects.extend( newReferencesVerseKey )
+
+        # Reuse the boxes that we're already showing (in order),
+        #   then any hidden spare ones, and only make new boxes if we run out
+        for j, verseKeyObject in enumerate( verseKeyObjects ):
+            #print( "  BRCWupdateShownReferences: {}".format( verseKeyObject ) )
+            if j < len(self.referenceBoxes):
+                self.referenceBoxes[j].rebindReference( verseKeyObject )
+            elif self.spareReferenceBoxes:
+                referenceBox = self.spareReferenceBoxes.pop()
+                referenceBox.rebindReference( verseKeyObject )
+                referenceBox.pack( expand=tk.YES, fill=tk.BOTH ) # Goes after the ones already showing
+                self.referenceBoxes.append( referenceBox )
+            else:
+                referenceBox = BibleReferenceBox( self, self.canvasFrame, self.parentApp, self.internalBible, verseKeyObject )
+                self.referenceBoxes.append( referenceBox )
+
+        # Hide any boxes that we don't need this time
+        while len(self.referenceBoxes) > len(verseKeyObjects):
+            referenceBox = self.referenceBoxes.pop()
+            referenceBox.pack_forget()
+            if len(self.spareReferenceBoxes) < MAX_SPARE_REFERENCE_BOXES:
+                self.spareReferenceBoxes.append( referenceBox )
+            else:
+                self.parentApp.internalBibles.releaseWindow( referenceBox ) # Let go of its internal Bible
+                referenceBox.destroy()
 
         self.currentVerseKeys = newReferencesVerseKeys # The FlexibleVersesKey object
         self.refreshTitle()
     # end of BibleReferenceCollectionWindow.updateShownReferences
 
 
+    def doClose( self, event=None ):
+        """
+        Called to finally and irreversibly remove this window from our list and close it.
+
+        Our boxes (including the hidden spare ones) need to let go of their internal Bible as well as us.
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( exp("BibleReferenceCollectionWindow.doClose( {} )").format( event ) )
+
+        for referenceBox in self.referenceBoxes + self.spareReferenceBoxes:
+            self.parentApp.internalBibles.releaseWindow( referenceBox )
+        ChildWindow.doClose( self, event )
+    # end of BibleReferenceCollectionWindow.doClose
+
+
     def doHelp( self, event=None ):
         """
         Display a help box.
@@ -673,6 +732,52 @@ def demo():
     tkRootWindow = Tk()
     tkRootWindow.title( ProgNameVersion )
 
+    # Measure the navigation latency for making new reference boxes each time (as we used to)
+    #   compared with rebinding pooled boxes (using real BibleReferenceBoxes showing a real USFM Bible)
+    import os, time, tempfile
+    from types import SimpleNamespace
+    from USFMBible import USFMBible
+    from BibleStylesheets import BibleStylesheet
+    from BiblelatorGlobals import DEFAULT_KEY_BINDING_DICT
+    from BiblelatorHelpers import InternalBibleRegistry
+    with tempfile.TemporaryDirectory() as testFolderPath:
+        for BBB in ( 'GEN', 'MAT', ):
+            with open( os.path.join( testFolderPath, '{}.SFM'.format( BBB ) ), 'wt', encoding='utf-8' ) as bookFile:
+                bookFile.write( '\\id {} Reference box test\n\\mt1 {}\n'.format( BBB, BBB ) + ''.join( '\\c {}\n\\p\n'.format( C )
+                                + ''.join( '\\v {} Some verse text for {} {}:{} which is \\nd long\\nd* enough to wrap.\n'.format( V, BBB, C, V )
+                                            for V in range( 1, 31 ) ) for C in range( 1, 21 ) ) )
+        testBible = USFMBible( testFolderPath, givenAbbreviation='REF', encoding='utf-8' )
+        testBible.preload()
+        testBible.load()
+        # Just enough of the application and collection window for the boxes
+        testApp = SimpleNamespace( stylesheet=BibleStylesheet().loadDefault(), keyBindingDict=DEFAULT_KEY_BINDING_DICT,
+                                    internalBibles=InternalBibleRegistry(), setDebugText=lambda newMessage=None: None )
+        testWindow = SimpleNamespace( parentApp=testApp, referenceBoxes=BibleReferenceBoxes( None ),
+                                    _contextViewMode='ByVerse', _formatViewMode='Formatted',
+                                    viewVersesBefore=0, viewVersesAfter=0 )
+        testFrame = Frame( tkRootWindow )
+        testFrame.pack( expand=tk.YES, fill=tk.BOTH )
+        def getTestReference( move, n ):
+            return SimpleVerseKey( ( 'GEN', 'MAT', )[n%2], str( 1 + (move+n)%20 ), str( 1 + (move*7+n)%30 ) )
+        for numReferences in ( 5, 20, 50 ):
+            numMoves = 10
+            startTime = time.perf_counter()
+            for move in range( numMoves ): # Close and recreate every time
+                for referenceBox in list( testWindow.referenceBoxes ): referenceBox.closeReferenceBox()
+                for n in range( numReferences ):
+                    testWindow.referenceBoxes.append( BibleReferenceBox( testWindow, testFrame, testApp, testBible, getTestReference( move, n ) ) )
+                tkRootWindow.update_idletasks()
+            recreateTime = ( time.perf_counter() - startTime ) / numMoves
+            startTime = time.perf_counter()
+            for move in range( numMoves ): # Rebind the existing boxes
+                for n, referenceBox in enumerate( testWindow.referenceBoxes ):
+                    referenceBox.rebindReference( getTestReference( move, n ) )
+                tkRootWindow.update_idletasks()
+            rebindTime = ( time.perf_counter() - startTime ) / numMoves
+            for referenceBox in list( testWindow.referenceBoxes ): referenceBox.closeReferenceBox()
+            print( "  {} references: recreate {:.1f}ms, rebind pooled {:.1f}ms per move".format( numReferences, recreateTime*1000, rebindTime*1000 ) )
+        testFrame.destroy()
+
     #settings = ApplicationSettings( 'BiblelatorData/', 'BiblelatorSettings/', ProgName )
     #settings.load()
 
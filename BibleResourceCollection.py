@@ -29,6 +29,8 @@ Boxes, Frames, and Windows to allow display and manipulation of
 A Bible resource collection is a collection of different Bible resources
     all displaying the same reference.
 
+    getBoxFetchExecutor()
+
     class BibleResourceBoxesList( list )
         __init__( self, resourceBoxesParent )
 
@@ -38,9 +40,14 @@ A Bible resource collection is a collection of different Bible resources
         gotoBCV( self, BBB, C, V )
         getSwordVerseKey( self, verseKey )
         getCachedVerseData( self, verseKey )
+        forgetMissingVerseData( self, BBB, C )
+        prefetchVerseData( self, newReferenceVerseKey )
         #BibleResourceBoxXXXdisplayAppendVerse( self, firstFlag, verseKey, verseContextData, currentVerseFlag=False )
         #getBeforeAndAfterBibleData( self, newVerseKey )
         setCurrentVerseKey( self, newVerseKey )
+        prepareShownBCV( self, newReferenceVerseKey )
+        fetchShownVerseData( self, newVerseKey, contextViewMode )
+        displayShownVerseData( self, newVerseKey, shownVerseData )
         updateShownBCV( self, newReferenceVerseKey, originator=None )
         doClose( self, event=None )
         closeResourceBox( self )
@@ -52,10 +59,14 @@ A Bible resource collection is a collection of different Bible resources
     class DBPBibleResourceBox( BibleResourceBox )
         __init__( self, parentWindow, moduleAbbreviation )
         getContextVerseData( self, verseKey )
+        onDBPChapterArrived( self, BBB, C, successFlag )
 
     class InternalBibleResourceBox( BibleResourceBox )
         __init__( self, parentWindow, modulePath )
         getContextVerseData( self, verseKey )
+        getCachedVerseData( self, verseKey )
+        prefetchVerseData( self, newReferenceVerseKey )
+        fetchShownVerseData( self, newVerseKey, contextViewMode )
 
     class BibleResourceCollectionWindow( BibleResourceWindow )
         __init__( self, parentApp, collectionName )
@@ -70,6 +81,9 @@ A Bible resource collection is a collection of different Bible resources
         openInternalBibleResourceBox( self, modulePath, windowGeometry=None )
         openBox( self, boxType, boxSource )
         updateShownBCV( self, newReferenceVerseKey, originator=None )
+        _displayFetchedBoxData( self )
+        prefetchVerseData( self, newReferenceVerseKey )
+        doClose( self, event=None )
         doHelp( self, event=None )
         doAbout( self, event=None )
 """
@@ -87,7 +101,9 @@ debuggingThisModule = True
 
 
 import os, logging
+import threading, queue
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 import tkinter as tk
 from tkinter.filedialog import Directory #, SaveAs
@@ -103,7 +119,9 @@ from BiblelatorDialogs import SelectResourceBoxDialog, RenameResourceCollectionD
 from ChildWindows import ChildWindow
 from BibleResourceWindows import BibleResourceWindowAddon
 from TextBoxes import BText, ChildBoxAddon, BibleBoxAddon, HebrewInterlinearBibleBoxAddon
-from BiblelatorHelpers import handleInternalBibles
+from BiblelatorHelpers import handleInternalBibles, packVerseKey, unpackBCV, getSwordContextVerseData, SwordChapterCache, \
+                                getInternalBibleLock, makeLockedInternalBibleFunction
+from DBPResources import getDBPResourceClient
 
 # BibleOrgSys imports
 #if __name__ == '__main__': import sys; sys.path.append( '../BibleOrgSys/' )
@@ -118,6 +136,9 @@ from BibleOrganizationalSystems import BibleOrganizationalSystem
 
 
 MAX_CACHED_VERSES = 30 # Per Bible resource window
+MAX_FETCH_THREADS = 4 # For fetching the verse data for the resource boxes
+FETCH_POLL_INTERVAL = 20 # milliseconds between checks for fetched resource box data
+boxFetchExecutor = None # Shared by all of the collection windows (made when first needed)
 
 
 
@@ -137,6 +158,18 @@ def exp( messageString ):
 
 
 
+def getBoxFetchExecutor():
+    """
+    Returns the pool of worker threads used to fetch the verse data for the resource boxes
+        (making it the first time).
+    """
+    global boxFetchExecutor
+    if boxFetchExecutor is None: boxFetchExecutor = ThreadPoolExecutor( max_workers=MAX_FETCH_THREADS )
+    return boxFetchExecutor
+# end of getBoxFetchExecutor
+
+
+
 class BibleResourceBoxesList( list ):
     """
     Keeps a list of the resource (Text) boxes.
@@ -293,6 +326,8 @@ class BibleResourceBox( Frame, ChildBoxAddon, BibleBoxAddon ):
         self.maxChaptersThisBook, self.maxVersesThisChapter = 150, 150 # temp
 
         self.verseCache = OrderedDict()
+        self.fetchLock = threading.RLock() # Only one thread at a time can be using our caches
+        self.fetchInBackground = True # Subclasses whose fetches don't block can set this to False
     # end of BibleResourceBox.__init__
 
 
@@ -341,20 +376,47 @@ class BibleResourceBox( Frame, ChildBoxAddon, BibleBoxAddon ):
         When it gets too large, it drops the first entry.
         """
         #if BibleOrgSysGlobals.debugFlag and debuggingThisModule: print( exp("getCachedVerseData( {} )").format( verseKey ) )
-        verseKeyHash = verseKey.makeHash()
-        if verseKeyHash in self.verseCache:
-            #if BibleOrgSysGlobals.debugFlag and debuggingThisModule: print( "  " + exp("Retrieved from BibleResourceBox cache") )
-            self.verseCache.move_to_end( verseKeyHash )
-            return self.verseCache[verseKeyHash]
-        verseContextData = self.getContextVerseData( verseKey )
-        self.verseCache[verseKeyHash] = verseContextData
-        if len(self.verseCache) > MAX_CACHED_VERSES:
-            #print( "Removing oldest cached entry", len(self.verseCache) )
-            self.verseCache.popitem( last=False )
+        packedVerseKey = packVerseKey( verseKey )
+        with self.fetchLock: # We can be called from the tkinter thread or from a worker thread
+            if packedVerseKey in self.verseCache:
+                #if BibleOrgSysGlobals.debugFlag and debuggingThisModule: print( "  " + exp("Retrieved from BibleResourceBox cache") )
+                self.verseCache.move_to_end( packedVerseKey )
+                return self.verseCache[packedVerseKey]
+            verseContextData = self.getContextVerseData( verseKey )
+            self.verseCache[packedVerseKey] = verseContextData
+            if len(self.verseCache) > MAX_CACHED_VERSES:
+                #print( "Removing oldest cached entry", len(self.verseCache) )
+                self.verseCache.popitem( last=False )
         return verseContextData
     # end of BibleResourceBox.getCachedVerseData
 
 
+    def forgetMissingVerseData( self, BBB, C ):
+        """
+        Removes the empty entries that we cached for verses in the given chapter
+            while it was still being fetched in the background (so that they'll be asked for again).
+        """
+        with self.fetchLock:
+            for packedVerseKey in [packedVerseKey for packedVerseKey,verseData in self.verseCache.items()
+                                    if verseData is None and ( not isinstance( packedVerseKey, int ) # can't tell so forget it anyway
+                                                            or unpackBCV( packedVerseKey )[:2] == (BBB,C) )]:
+                del self.verseCache[packedVerseKey]
+    # end of BibleResourceBox.forgetMissingVerseData
+
+
+    def prefetchVerseData( self, newReferenceVerseKey ):
+        """
+        Called at idle time (from our parent window) with a guess of where the user might go next.
+
+        The new verse key is in the reference versification system.
+        """
+        refBBB, refC, refV, refS = newReferenceVerseKey.getBCVS()
+        BBB, C, V, S = self.BibleOrganisationalSystem.convertFromReferenceVersification( refBBB, refC, refV, refS )
+        with self.fetchLock:
+            self.getCachedVerseData( SimpleVerseKey( BBB, C, V, S ) )
+    # end of BibleResourceBox.prefetchVerseData
+
+
     def setCurrentVerseKey( self, newVerseKey ):
         """
         Called to set the current verse key.
@@ -374,17 +436,17 @@ class BibleResourceBox( Frame, ChildBoxAddon, BibleBoxAddon ):
     # end of BibleResourceBox.setCurrentVerseKey
 
 
-    def updateShownBCV( self, newReferenceVerseKey, originator=None ):
+    def prepareShownBCV( self, newReferenceVerseKey ):
         """
-        Updates self in various ways depending on the contextViewMode held by the enclosing window.
+        Does the (tkinter) set-up for showing a new reference:
+            converts it to our versification system and makes it our current verse key.
 
         The new verse key is in the reference versification system.
 
-        Leaves the textbox in the disabled state.
+        Returns the verse key in our own versification system.
         """
         if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
-            print( "BibleResourceBox.updateShownBCV( {}, {} ) for".format( newReferenceVerseKey, originator ), self.moduleID )
-            #print( "contextViewMode", self._contextViewMode )
+            print( "BibleResourceBox.prepareShownBCV( {} ) for".format( newReferenceVerseKey ), self.moduleID )
             assert isinstance( newReferenceVerseKey, SimpleVerseKey )
 
         refBBB, refC, refV, refS = newReferenceVerseKey.getBCVS()
@@ -392,38 +454,49 @@ class BibleResourceBox( Frame, ChildBoxAddon, BibleBoxAddon ):
         newVerseKey = SimpleVerseKey( BBB, C, V, S )
 
         self.setCurrentVerseKey( newVerseKey )
-        self.clearText() # Leaves the text box enabled
-        startingFlag = True
 
         # Safety-check in case they edited the settings file
         if 'DBP' in self.boxType and self.parentWindow._contextViewMode in ('ByBook','ByChapter',):
             print( exp("updateShownBCV: Safety-check converted {} contextViewMode for DBP").format( repr(self.parentWindow._contextViewMode) ) )
             self.parentWindow._contextViewRadioVar.set( 3 ) # ByVerse
             self.parentWindow.changeBibleContextView()
+        return newVerseKey
+    # end of BibleResourceBox.prepareShownBCV
+
+
+    def fetchShownVerseData( self, newVerseKey, contextViewMode ):
+        """
+        Gets the data for all the verses that we need to show newVerseKey in the given contextViewMode.
 
-        if self.parentWindow._contextViewMode == 'BeforeAndAfter':
-            bibleData = self.getBeforeAndAfterBibleData( newVerseKey )
-            if bibleData:
+        Doesn't touch any tkinter widgets, so can be called on a worker thread.
+
+        Returns a list of (verseKey, verseContextData, currentVerseFlag) 3-tuples.
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( "BibleResourceBox.fetchShownVerseData( {}, {} ) for".format( newVerseKey, contextViewMode ), self.moduleID )
+
+        BBB, C, V, S = newVerseKey.getBCVS()
+        with self.fetchLock:
+            if contextViewMode == 'BeforeAndAfter':
+                bibleData = self.getBeforeAndAfterBibleData( newVerseKey )
+                if not bibleData: return []
                 verseData, previousVerses, nextVerses = bibleData
-                for verseKey,previousVerseData in previousVerses:
-                    self.displayAppendVerse( startingFlag, verseKey, previousVerseData )
-                    startingFlag = False
-                self.displayAppendVerse( startingFlag, newVerseKey, verseData, currentVerseFlag=True )
-                for verseKey,nextVerseData in nextVerses:
-                    self.displayAppendVerse( False, verseKey, nextVerseData )
-
-        elif self.parentWindow._contextViewMode == 'ByVerse':
-            cachedVerseData = self.getCachedVerseData( newVerseKey )
-            #print( "cVD for", self.moduleID, newVerseKey, cachedVerseData )
-            if cachedVerseData is None: # We might have a missing or bridged verse
-                intV = int( V )
-                while intV > 1:
-                    intV -= 1 # Go back looking for bridged verses to display
-                    cachedVerseData = self.getCachedVerseData( SimpleVerseKey( BBB, C, intV, S ) )
-                    #print( "  cVD for", self.moduleID, intV, cachedVerseData )
-                    if cachedVerseData is not None: # it seems to have worked
-                        break # Might have been nice to check/confirm that it was actually a bridged verse???
-            self.displayAppendVerse( True, newVerseKey, cachedVerseData, currentVerseFlag=True )
+                return [(verseKey,previousVerseData,False) for verseKey,previousVerseData in previousVerses] \
+                        + [(newVerseKey,verseData,True)] \
+                        + [(verseKey,nextVerseData,False) for verseKey,nextVerseData in nextVerses]
+
+            elif contextViewMode == 'ByVerse':
+                cachedVerseData = self.getCachedVerseData( newVerseKey )
+                #print( "cVD for", self.moduleID, newVerseKey, cachedVerseData )
+                if cachedVerseData is None: # We might have a missing or bridged verse
+                    intV = int( V )
+                    while intV > 1:
+                        intV -= 1 # Go back looking for bridged verses to display
+                        cachedVerseData = self.getCachedVerseData( SimpleVerseKey( BBB, C, intV, S ) )
+                        #print( "  cVD for", self.moduleID, intV, cachedVerseData )
+                        if cachedVerseData is not None: # it seems to have worked
+                            break # Might have been nice to check/confirm that it was actually a bridged verse???
+                return [(newVerseKey,cachedVerseData,True)]
 
         #elif self.parentWindow._contextViewMode == 'BySection':
             #self.displayAppendVerse( True, newVerseKey, self.getCachedVerseData( newVerseKey ), currentVerseFlag=True )
@@ -464,9 +537,26 @@ class BibleResourceBox( Frame, ChildBoxAddon, BibleBoxAddon ):
                 #self.displayAppendVerse( startingFlag, thisVerseKey, thisVerseData, currentVerseFlag=thisV==intV )
                 #startingFlag = False
 
-        else:
-            logging.critical( exp("BibleResourceBox.updateShownBCV: Bad context view mode {}").format( self.parentWindow._contextViewMode ) )
-            if BibleOrgSysGlobals.debugFlag: halt # Unknown context view mode
+        logging.critical( exp("BibleResourceBox.fetchShownVerseData: Bad context view mode {}").format( contextViewMode ) )
+        if BibleOrgSysGlobals.debugFlag: halt # Unknown context view mode
+        return []
+    # end of BibleResourceBox.fetchShownVerseData
+
+
+    def displayShownVerseData( self, newVerseKey, shownVerseData ):
+        """
+        Displays the list of verses returned by fetchShownVerseData.
+
+        Leaves the textbox in the disabled state.
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( "BibleResourceBox.displayShownVerseData( {}, {} ) for".format( newVerseKey, len(shownVerseData) ), self.moduleID )
+
+        self.clearText() # Leaves the text box enabled
+        startingFlag = True
+        for verseKey,verseContextData,currentVerseFlag in shownVerseData:
+            self.displayAppendVerse( startingFlag, verseKey, verseContextData, currentVerseFlag=currentVerseFlag )
+            startingFlag = False
 
         self.textBox.configure( state=tk.DISABLED ) # Don't allow editing
 
@@ -475,6 +565,26 @@ class BibleResourceBox( Frame, ChildBoxAddon, BibleBoxAddon ):
         try: self.textBox.see( desiredMark )
         except tk.TclError: print( exp("USFMEditWindow.updateShownBCV couldn't find {}").format( repr( desiredMark ) ) )
         self.lastCVMark = desiredMark
+    # end of BibleResourceBox.displayShownVerseData
+
+
+    def updateShownBCV( self, newReferenceVerseKey, originator=None ):
+        """
+        Updates self in various ways depending on the contextViewMode held by the enclosing window.
+
+        The new verse key is in the reference versification system.
+
+        Note that the collection window normally does the fetch part of this on a worker thread.
+
+        Leaves the textbox in the disabled state.
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( "BibleResourceBox.updateShownBCV( {}, {} ) for".format( newReferenceVerseKey, originator ), self.moduleID )
+            #print( "contextViewMode", self._contextViewMode )
+            assert isinstance( newReferenceVerseKey, SimpleVerseKey )
+
+        newVerseKey = self.prepareShownBCV( newReferenceVerseKey )
+        self.displayShownVerseData( newVerseKey, self.fetchShownVerseData( newVerseKey, self.parentWindow._contextViewMode ) )
     # end of BibleResourceBox.updateShownBCV
 
 
@@ -515,6 +625,7 @@ class BibleResourceBox( Frame, ChildBoxAddon, BibleBoxAddon ):
         Called to finally and irreversibly remove this box from our list and close it.
         """
         if BibleOrgSysGlobals.debugFlag and debuggingThisModule: print( exp("BibleResourceBox.closeResourceBox()") )
+        self.parentApp.internalBibles.releaseWindow( self ) # Let go of any internal Bible that we were using
         if self in self.parentWindow.resourceBoxesList:
             self.parentWindow.resourceBoxesList.remove( self )
             self.destroy()
@@ -541,10 +652,12 @@ class SwordBibleResourceBox( BibleResourceBox ):
         #self.boxType = 'SwordBibleResourceBox'
 
         #self.SwordModule = None # Loaded later in self.getBeforeAndAfterBibleData()
+        self.SwordChapterCache = None # Keeps the most recently used chapters (once we have the module)
         self.SwordModule = self.parentApp.SwordInterface.getModule( self.moduleAbbreviation )
         if self.SwordModule is None:
             logging.error( exp("SwordBibleResourceBox.__init__ Unable to open Sword module: {}").format( self.moduleAbbreviation ) )
             self.SwordModule = None
+        else: self.SwordChapterCache = SwordChapterCache( self.parentApp.SwordInterface, self.SwordModule )
         if isinstance( self.SwordModule, Bible ):
             #print( "Handle internalBible for SwordModule" )
             handleInternalBibles( self.parentApp, self.SwordModule, self )
@@ -558,28 +671,21 @@ class SwordBibleResourceBox( BibleResourceBox ):
     def getContextVerseData( self, verseKey ):
         """
         Fetches and returns the internal Bible data for the given reference.
+
+        The whole chapter is fetched from SWORD the first time we need a verse from it
+            and kept (along with a few other recently used chapters).
+        This is normally called on one of the collection window's worker threads.
         """
         #if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
             #print( exp("SwordBibleResourceBox.getContextVerseData( {} )").format( verseKey ) )
         if self.SwordModule is not None:
-            if verseKey.getChapterNumber()!='0' and verseKey.getVerseNumber()!='0': # not sure how to get introductions, etc.
-                SwordKey = self.getSwordVerseKey( verseKey )
-                rawContextInternalBibleData = self.parentApp.SwordInterface.getContextVerseData( self.SwordModule, SwordKey )
-                rawInternalBibleData, context = rawContextInternalBibleData
-                # Clean up the data -- not sure that it should be done here! … XXXXXXXXXXXXXXXXXXX
-                from InternalBibleInternals import InternalBibleEntryList, InternalBibleEntry
-                import re
-                adjustedInternalBibleData = InternalBibleEntryList()
-                for existingInternalBibleEntry in rawInternalBibleData:
-                    #print( 'eIBE', existingInternalBibleEntry )
-                    cleanText = existingInternalBibleEntry.getCleanText()
-                    cleanText = cleanText.replace( '</w>', '' )
-                    cleanText = re.sub( '<w .+?>', '', cleanText )
-                    newInternalBibleEntry = InternalBibleEntry( existingInternalBibleEntry[0], existingInternalBibleEntry[1], existingInternalBibleEntry[2],
-                        cleanText, existingInternalBibleEntry[4], existingInternalBibleEntry[5] )
-                    #print( 'nIBE', newInternalBibleEntry )
-                    adjustedInternalBibleData.append( newInternalBibleEntry )
-                return adjustedInternalBibleData, context
+            BBB, C, V = verseKey.getBCV()
+            if C!='0' and V!='0': # not sure how to get introductions, etc.
+                try: numVerses = self.getNumVerses( BBB, C ) or 0
+                except KeyError: numVerses = 0 # Not in our versification system
+                try: return self.SwordChapterCache.fetchChapterData( BBB, C, numVerses )[V]
+                except KeyError: # Verse is outside our versification -- fetch it by itself
+                    return getSwordContextVerseData( self.parentApp.SwordInterface, self.SwordModule, BBB, C, V )
     # end of SwordBibleResourceBox.getContextVerseData
 # end of SwordBibleResourceBox class
 
@@ -603,6 +709,7 @@ class DBPBibleResourceBox( BibleResourceBox ):
 
         self.DBPModule = None # (for refreshTitle called from the base class)
         BibleResourceBox.__init__( self, self.parentWindow, 'DBPBibleResourceBox', self.moduleAbbreviation )
+        self.fetchInBackground = False # Our DBPResourceClient already fetches in the background
         #self.boxType = 'DBPBibleResourceBox'
 
         try: self.DBPModule = DBPBible( self.moduleAbbreviation )
@@ -612,6 +719,10 @@ class DBPBibleResourceBox( BibleResourceBox ):
         except ConnectionError:
             logging.error( exp("DBPBibleResourceBox.__init__ Unable to connect to Digital Bible Platform") )
             self.DBPModule = None
+        self.DBPClient = None # Used to fetch whole chapters in the background
+        if self.DBPModule is not None:
+            DBPKey = getattr( self.DBPModule, 'key', None )
+            if DBPKey: self.DBPClient = getDBPResourceClient( self.parentApp, self.moduleAbbreviation, DBPKey )
         #if isinstance( self.DBPModule, Bible ): # Never true
             ##print( "Handle internalBible for DBPModule" )
             #handleInternalBibles( self.parentApp, self.DBPModule, self )
@@ -630,8 +741,29 @@ class DBPBibleResourceBox( BibleResourceBox ):
 
         if self.DBPModule is not None:
             if verseKey.getChapterNumber()!='0' and verseKey.getVerseNumber()!='0': # not sure how to get introductions, etc.
-                return self.DBPModule.getContextVerseData( verseKey )
+                if self.DBPClient is None: return self.DBPModule.getContextVerseData( verseKey )
+                contextVerseData = self.DBPClient.getCachedContextVerseData( verseKey )
+                if contextVerseData is None: # We'll redisplay when the chapter arrives
+                    self.DBPClient.requestChapter( verseKey.getBBB(), verseKey.getChapterNumber(), self.onDBPChapterArrived )
+                return contextVerseData
     # end of DBPBibleResourceBox.getContextVerseData
+
+
+    def onDBPChapterArrived( self, BBB, C, successFlag ):
+        """
+        Called (on the tkinter thread) by our DBPResourceClient when a chapter that we asked for has been fetched.
+
+        Forgets the empty verses that we cached for that chapter while we were waiting
+            (even if it failed, so that it'll be asked for again) and redisplays (if it was successful).
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( exp("DBPBibleResourceBox.onDBPChapterArrived( {} {}, {} )").format( BBB, C, successFlag ) )
+
+        if not self.winfo_exists(): return # we've been closed
+        self.forgetMissingVerseData( BBB, C )
+        if successFlag and self.currentVerseKey.getBBB() == BBB:
+            self.updateShownBCV( self.parentApp.getVerseKey( self.parentWindow._groupCode ) )
+    # end of DBPBibleResourceBox.onDBPChapterArrived
 # end of DBPBibleResourceBox class
 
 
@@ -667,8 +799,8 @@ class InternalBibleResourceBox( BibleResourceBox ):
                 #print( "Handle internalBible for internalBible" )
                 self.internalBible = handleInternalBibles( self.parentApp, result, self )
         if self.internalBible is not None: # Define which functions we use by default
-            self.getNumVerses = self.internalBible.getNumVerses
-            self.getNumChapters = self.internalBible.getNumChapters
+            self.getNumVerses = makeLockedInternalBibleFunction( self.internalBible, self.internalBible.getNumVerses )
+            self.getNumChapters = makeLockedInternalBibleFunction( self.internalBible, self.internalBible.getNumChapters )
     # end of InternalBibleResourceBox.__init__
 
 
@@ -680,12 +812,46 @@ class InternalBibleResourceBox( BibleResourceBox ):
             print( exp("InternalBibleResourceBox.getContextVerseData( {} )").format( verseKey ) )
 
         if self.internalBible is not None:
-            try: return self.internalBible.getContextVerseData( verseKey )
+            try:
+                with getInternalBibleLock( self.internalBible ): # It might be loading a book for another window
+                    return self.internalBible.getContextVerseData( verseKey )
             except KeyError: # Could be after a verse-bridge ???
                 if verseKey.getChapterNumber() != '0':
                     logging.error( exp("InternalBibleResourceBox.getContextVerseData for {} {} got a KeyError") \
                                                                 .format( self.boxType, verseKey ) )
     # end of InternalBibleResourceBox.getContextVerseData
+
+
+    def getCachedVerseData( self, verseKey ):
+        """
+        Takes the lock for our (shared) internal Bible before our own fetchLock
+            (always in that order, so that we can't deadlock with a worker thread).
+        """
+        if self.internalBible is None: return BibleResourceBox.getCachedVerseData( self, verseKey )
+        with getInternalBibleLock( self.internalBible ):
+            return BibleResourceBox.getCachedVerseData( self, verseKey )
+    # end of InternalBibleResourceBox.getCachedVerseData
+
+
+    def prefetchVerseData( self, newReferenceVerseKey ):
+        """
+        Holds the lock for our (shared) internal Bible for the whole prefetch.
+        """
+        if self.internalBible is None: return
+        with getInternalBibleLock( self.internalBible ):
+            BibleResourceBox.prefetchVerseData( self, newReferenceVerseKey )
+    # end of InternalBibleResourceBox.prefetchVerseData
+
+
+    def fetchShownVerseData( self, newVerseKey, contextViewMode ):
+        """
+        Holds the lock for our (shared) internal Bible for the whole fetch
+            (as finding the surrounding verses can load books as well).
+        """
+        if self.internalBible is None: return BibleResourceBox.fetchShownVerseData( self, newVerseKey, contextViewMode )
+        with getInternalBibleLock( self.internalBible ):
+            return BibleResourceBox.fetchShownVerseData( self, newVerseKey, contextViewMode )
+    # end of InternalBibleResourceBox.fetchShownVerseData
 # end of InternalBibleResourceBox class
 
 
@@ -771,6 +937,8 @@ class BibleResourceCollectionWindow( ChildWindow, BibleResourceWindowAddon ):
         self.viewVersesBefore, self.viewVersesAfter = 1, 1
 
         self.resourceBoxesList = BibleResourceBoxesList( self )
+        self.fetchGeneration, self.fetchesOutstanding = 0, 0 # Used to discard fetched data for superseded verse keys
+        self.fetchResultQueue, self.fetchPollAfterID = queue.Queue(), None
         self.createMenuBar()
 
         if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
@@ -1167,13 +1335,81 @@ class BibleResourceCollectionWindow( ChildWindow, BibleResourceWindowAddon ):
         #newVerseKey = SimpleVerseKey( BBB, C, V, S )
         self.setCurrentVerseKey( newReferenceVerseKey )
 
+        # Fetch the data for the boxes in parallel on worker threads
+        #   and then display each one (in _displayFetchedBoxData) as soon as its data arrives
+        self.fetchGeneration += 1 # so any results still coming for older keys get discarded
+        self.fetchesOutstanding = 0
+        fetchGeneration, contextViewMode = self.fetchGeneration, self._contextViewMode
         for resourceBox in self.resourceBoxesList:
-            resourceBox.updateShownBCV( newReferenceVerseKey )
+            newVerseKey = resourceBox.prepareShownBCV( newReferenceVerseKey )
+            if resourceBox.fetchInBackground:
+                future = getBoxFetchExecutor().submit( resourceBox.fetchShownVerseData, newVerseKey, contextViewMode )
+                future.add_done_callback( lambda future, resourceBox=resourceBox, newVerseKey=newVerseKey: \
+                                self.fetchResultQueue.put( (fetchGeneration, resourceBox, newVerseKey, future) ) )
+                self.fetchesOutstanding += 1
+            else: resourceBox.displayShownVerseData( newVerseKey, resourceBox.fetchShownVerseData( newVerseKey, contextViewMode ) )
+        if self.fetchesOutstanding and self.fetchPollAfterID is None:
+            self.fetchPollAfterID = self.after( FETCH_POLL_INTERVAL, self._displayFetchedBoxData )
 
         self.refreshTitle()
     # end of BibleResourceCollectionWindow.updateShownBCV
 
 
+    def _displayFetchedBoxData( self ):
+        """
+        Called regularly with after() while the worker threads are fetching data for our boxes.
+
+        Displays each box whose data has arrived (on the tkinter thread)
+            and discards any data that was fetched for a verse key that we've since moved away from.
+        """
+        self.fetchPollAfterID = None
+        if not self.winfo_exists(): return # We've been closed
+        while True:
+            try: fetchGeneration, resourceBox, newVerseKey, future = self.fetchResultQueue.get_nowait()
+            except queue.Empty: break
+            if fetchGeneration != self.fetchGeneration: continue # It's been superseded
+            self.fetchesOutstanding -= 1
+            if resourceBox not in self.resourceBoxesList: continue # It's been closed
+            try: shownVerseData = future.result()
+            except Exception as err:
+                logging.error( exp("BibleResourceCollectionWindow._displayFetchedBoxData: Unable to fetch {} for {}: {}") \
+                                        .format( newVerseKey.getShortText(), resourceBox.moduleID, err ) )
+                shownVerseData = [(newVerseKey,None,True)]
+            resourceBox.displayShownVerseData( newVerseKey, shownVerseData )
+        if self.fetchesOutstanding > 0:
+            self.fetchPollAfterID = self.after( FETCH_POLL_INTERVAL, self._displayFetchedBoxData )
+    # end of BibleResourceCollectionWindow._displayFetchedBoxData
+
+
+    def prefetchVerseData( self, newReferenceVerseKey ):
+        """
+        Called at idle time (from ChildWindows) with a guess of where the user might go next.
+
+        Passes the guess on to each of our resource boxes (which each have their own cache)
+            using the worker threads for the ones that might block.
+        """
+        for resourceBox in self.resourceBoxesList:
+            if resourceBox.fetchInBackground:
+                getBoxFetchExecutor().submit( resourceBox.prefetchVerseData, newReferenceVerseKey )
+            else: resourceBox.prefetchVerseData( newReferenceVerseKey )
+    # end of BibleResourceCollectionWindow.prefetchVerseData
+
+
+    def doClose( self, event=None ):
+        """
+        Called to finally and irreversibly remove this window from our list and close it.
+
+        Our boxes need to let go of their internal Bibles as well as us.
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( exp("BibleResourceCollectionWindow.doClose( {} )").format( event ) )
+
+        for resourceBox in self.resourceBoxesList:
+            self.parentApp.internalBibles.releaseWindow( resourceBox )
+        ChildWindow.doClose( self, event )
+    # end of BibleResourceCollectionWindow.doClose
+
+
     def doShowInfo( self, event=None ):
         """
         Pop-up dialog
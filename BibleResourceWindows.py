@@ -49,6 +49,11 @@ Windows and frames to allow display and manipulation of
         gotoBCV( self, BBB, C, V )
         getSwordVerseKey( self, verseKey )
         getCachedVerseData( self, verseKey )
+        forgetMissingVerseData( self, BBB, C )
+        prefetchVerseData( self, newReferenceVerseKey )
+        getBookSourceStat( self, BBB )
+        isBookDataComplete( self, BBB )
+        getCurrentSection( self, verseKey )
         setCurrentVerseKey( self, newVerseKey )
         updateShownBCV( self, newReferenceVerseKey, originator=None )
         doHelp( self, event=None )
@@ -87,6 +92,9 @@ Windows and frames to allow display and manipulation of
         __init__( self, parentApp, moduleAbbreviation, defaultContextViewMode=BIBLE_CONTEXT_VIEW_MODES[0], defaultFormatViewMode=BIBLE_FORMAT_VIEW_MODES[0] )
         refreshTitle( self )
         getContextVerseData( self, verseKey )
+        fetchContextVerseData( self, verseKey )
+        onSwordChapterArrived( self, BBB, C, successFlag )
+        getCurrentSection( self, verseKey )
         doShowInfo( self, event=None )
 
     class DBPBibleResourceWindow( ChildWindow, BibleResourceWindowAddon )
@@ -94,6 +102,8 @@ Windows and frames to allow display and manipulation of
         __init__( self, parentApp, moduleAbbreviation, defaultContextViewMode=BIBLE_CONTEXT_VIEW_MODES[0], defaultFormatViewMode=BIBLE_FORMAT_VIEW_MODES[0] )
         refreshTitle( self )
         getContextVerseData( self, verseKey )
+        isBookDataComplete( self, BBB )
+        onDBPChapterArrived( self, BBB, C, successFlag )
         doShowInfo( self, event=None )
 
     class InternalBibleResourceWindowAddon( BibleResourceWindowAddon )
@@ -103,6 +113,7 @@ Windows and frames to allow display and manipulation of
         refreshTitle( self )
         createContextMenu( self )
         getContextVerseData( self, verseKey )
+        getBookSourceStat( self, BBB )
         doShowInfo( self, event=None )
         _prepareForExports( self )
         doMostExports( self )
@@ -154,6 +165,13 @@ Windows and frames to allow display and manipulation of
         #doCheckProject( self )
         #doHelp( self, event=None )
         #doAbout( self, event=None )
+        _getVerseNormalizedWords( self, verseKey )
+        _iterateVerseKeys( self, fromVerseKey=None, backwards=False )
+        _scanForUnglossedVerse( self, fromVerseKey, backwards=False )
+        _buildUnglossedVerseIndex( self )
+        getUnglossedVerseIndex( self )
+        doGotoNextUnglossedVerse( self )
+        doGotoPreviousUnglossedVerse( self )
         doClose( self, event=None )
 
     demo()
@@ -181,9 +199,14 @@ from BiblelatorGlobals import APP_NAME, DEFAULT, tkBREAK, MAX_PSEUDOVERSES, erro
                             MAXIMUM_LARGE_RESOURCE_SIZE, parseWindowSize
 from ChildWindows import ChildWindow, BibleWindowAddon, HTMLWindow # BibleWindow
 from TextBoxes import BibleBoxAddon, HebrewInterlinearBibleBoxAddon
-from BiblelatorHelpers import findCurrentSection, handleInternalBibles
+from BiblelatorHelpers import findCurrentSectionIndexed, handleInternalBibles, packVerseKey, unpackBCV, \
+                                getSwordContextVerseData, SwordChapterCache, \
+                                UnglossedVerseIndex, unglossedVerseIndexes, unglossedVerseIndexBuilds, getUnglossedVerseIndexExecutor, \
+                                getGlossJournalFilepath, GlossJournal, glossJournals, \
+                                getInternalBibleLock, makeLockedInternalBibleFunction
 from BiblelatorSimpleDialogs import showInfo, showError
 from BiblelatorDialogs import GetBibleBookRangeDialog
+from DBPResources import getDBPResourceClient
 
 # BibleOrgSys imports
 #if __name__ == '__main__': import sys; sys.path.append( '../BibleOrgSys/' )
@@ -541,7 +564,7 @@ class BibleResourceWindowAddon( BibleWindowAddon ):
             print( _("doGotoPreviousSection() from {} {}:{}").format( BBB, C, V ) )
             self.parentApp.setDebugText( "BRW doGotoPreviousSection…" )
         # First the start of the current section
-        sectionStart1, sectionEnd1 = findCurrentSection( self.currentVerseKey, self.getNumChapters, self.getNumVerses, self.getCachedVerseData )
+        sectionStart1, sectionEnd1 = self.getCurrentSection( self.currentVerseKey )
         print( "section1 Start/End", sectionStart1, sectionEnd1 )
         intC1, intV1 = sectionStart1.getChapterNumberInt(), sectionStart1.getVerseNumberInt()
         # Go back one verse from the start of the current section
@@ -554,7 +577,7 @@ class BibleResourceWindowAddon( BibleWindowAddon ):
                 intV1 = self.getNumVerses( BBB, intC1)
         else: intV1 -= 1
         # Now find the start of this previous section
-        sectionStart2, sectionEnd2 = findCurrentSection( SimpleVerseKey( BBB, intC1, intV1), self.getNumChapters, self.getNumVerses, self.getCachedVerseData )
+        sectionStart2, sectionEnd2 = self.getCurrentSection( SimpleVerseKey( BBB, intC1, intV1) )
         print( "section2 Start/End", sectionStart2, sectionEnd2 )
         BBB2, C2, V2 = sectionStart2.getBCV()
         self.gotoBCV( BBB2, C2, V2 )
@@ -572,7 +595,7 @@ class BibleResourceWindowAddon( BibleWindowAddon ):
             print( _("doGotoNextSection() from {} {}:{}").format( BBB, C, V ) )
             self.parentApp.setDebugText( "BRW doGotoNextSection…" )
         # Find the end of the current section (which is the first verse of the next section)
-        sectionStart, sectionEnd = findCurrentSection( self.currentVerseKey, self.getNumChapters, self.getNumVerses, self.getCachedVerseData )
+        sectionStart, sectionEnd = self.getCurrentSection( self.currentVerseKey )
         print( "section Start/End", sectionStart, sectionEnd )
         intC2, intV2 = sectionEnd.getChapterNumberInt(), sectionEnd.getVerseNumberInt()
         if intC2 < self.maxChaptersThisBook \
@@ -700,13 +723,13 @@ class BibleResourceWindowAddon( BibleWindowAddon ):
         #if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
             #print( _("getCachedVerseData( {} )").format( verseKey ) )
 
-        verseKeyHash = verseKey.makeHash()
-        if verseKeyHash in self.verseCache:
+        packedVerseKey = packVerseKey( verseKey )
+        if packedVerseKey in self.verseCache:
             #if BibleOrgSysGlobals.debugFlag and debuggingThisModule: print( "  " + _("Retrieved from BibleResourceWindowAddon cache") )
-            self.verseCache.move_to_end( verseKeyHash )
-            return self.verseCache[verseKeyHash]
+            self.verseCache.move_to_end( packedVerseKey )
+            return self.verseCache[packedVerseKey]
         verseData = self.getContextVerseData( verseKey )
-        self.verseCache[verseKeyHash] = verseData
+        self.verseCache[packedVerseKey] = verseData
         if len(self.verseCache) > MAX_CACHED_VERSES:
             #print( "Removing oldest cached entry", len(self.verseCache) )
             self.verseCache.popitem( last=False )
@@ -714,6 +737,78 @@ class BibleResourceWindowAddon( BibleWindowAddon ):
     # end of BibleResourceWindowAddon.getCachedVerseData
 
 
+    def forgetMissingVerseData( self, BBB, C ):
+        """
+        Removes the empty entries that we cached for verses in the given chapter
+            while it was still being fetched in the background (so that they'll be asked for again).
+        """
+        for packedVerseKey in [packedVerseKey for packedVerseKey,verseData in self.verseCache.items()
+                                if verseData is None and ( not isinstance( packedVerseKey, int ) # can't tell so forget it anyway
+                                                        or unpackBCV( packedVerseKey )[:2] == (BBB,C) )]:
+            del self.verseCache[packedVerseKey]
+    # end of BibleResourceWindowAddon.forgetMissingVerseData
+
+
+    def prefetchVerseData( self, newReferenceVerseKey ):
+        """
+        Called at idle time (from ChildWindows) with a guess of where the user might go next.
+
+        The new verse key is in the reference versification system.
+
+        Just makes sure that the verse is in our cache (without displaying anything).
+        """
+        #if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            #print( _("prefetchVerseData( {} )").format( newReferenceVerseKey ) )
+
+        refBBB, refC, refV, refS = newReferenceVerseKey.getBCVS()
+        BBB, C, V, S = self.BibleOrganisationalSystem.convertFromReferenceVersification( refBBB, refC, refV, refS )
+        self.getCachedVerseData( SimpleVerseKey( BBB, C, V, S ) )
+    # end of BibleResourceWindowAddon.prefetchVerseData
+
+
+    def getBookSourceStat( self, BBB ):
+        """
+        Returns a 2-tuple (modification time, size) for the source file of the book
+            or None if this resource isn't file-based.
+
+        File-based resources override this so that their section indexes can be saved.
+        """
+        return None
+    # end of BibleResourceWindowAddon.getBookSourceStat
+
+
+    def isBookDataComplete( self, BBB ):
+        """
+        Returns False if some of the data for the book would have to be fetched first
+            (so that the section index isn't built yet).
+
+        Resources that fetch their data in the background override this.
+        """
+        return True
+    # end of BibleResourceWindowAddon.isBookDataComplete
+
+
+    def getCurrentSection( self, verseKey ):
+        """
+        Returns the verse keys for the start of the section containing verseKey
+            and for the end of it (actually the start of the next section).
+
+        Uses a section index for the whole book (built the first time that it's needed,
+            and saved for file-based resources) rather than scanning verse by verse each time.
+        The index is built with the uncached getContextVerseData so as not to flush our verse cache
+            (but not until all the data for the book is available without fetching it).
+
+        Editable windows must override this as their text can change.
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( _("getCurrentSection( {} )").format( verseKey ) )
+
+        return findCurrentSectionIndexed( (self.windowType,self.moduleID), verseKey,
+                                        self.getNumChapters, self.getNumVerses, self.getContextVerseData,
+                                        self.getBookSourceStat, self.isBookDataComplete )
+    # end of BibleResourceWindowAddon.getCurrentSection
+
+
     def setCurrentVerseKey( self, newVerseKey ):
         """
         Called to set the current verse key.
@@ -794,7 +889,7 @@ class BibleResourceWindowAddon( BibleWindowAddon ):
 
         elif self._contextViewMode == 'BySection':
             BBB, intC, intV = newVerseKey.getBBB(), newVerseKey.getChapterNumberInt(), newVerseKey.getVerseNumberInt()
-            sectionStart, sectionEnd = findCurrentSection( newVerseKey, self.getNumChapters, self.getNumVerses, self.getCachedVerseData )
+            sectionStart, sectionEnd = self.getCurrentSection( newVerseKey )
             intC1, intV1 = sectionStart.getChapterNumberInt(), sectionStart.getVerseNumberInt()
             intC2, intV2 = sectionEnd.getChapterNumberInt(), sectionEnd.getVerseNumberInt()
             for thisC in range( intC1, intC2+1 ):
@@ -892,22 +987,9 @@ class BibleResourceWindowAddon( BibleWindowAddon ):
         if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
             print( _("BibleResourceWindowAddon.doClose( {} ) for {}").format( event, self.genericWindowType ) )
 
-        # Remove ourself from the list of internal Bibles (and their controlling windows)
-        #print( 'internalBibles initially', len(self.parentApp.internalBibles), self.parentApp.internalBibles )
-        newBibleList = []
-        for internalBible,windowList in self.parentApp.internalBibles:
-            if internalBible is self.internalBible:
-                newWindowList = []
-                for controllingWindow in windowList:
-                    if controllingWindow is not self: # leave other windows alone
-                        newWindowList.append( controllingWindow )
-                if newWindowList: newBibleList.append( (internalBible,windowList) )
-            else: # leave this one unchanged
-                newBibleList.append( (internalBible,windowList) )
-        self.parentApp.internalBibles = newBibleList
-        #print( 'internalBibles now', len(self.parentApp.internalBibles), self.parentApp.internalBibles )
-
-        BibleResourceWindow.doClose( self, event )
+        # Note: ChildWindow.doClose removes us from the list of internal Bibles (and their controlling windows)
+
+        ChildWindow.doClose( self, event )
         if BibleOrgSysGlobals.debugFlag: self.parentApp.setDebugText( "Closed BibleResourceWindowAddon" )
     # end of BibleResourceWindowAddon.doClose
 # end of BibleResourceWindowAddon class
@@ -1573,6 +1655,7 @@ class SwordBibleResourceWindow( ChildWindow, BibleResourceWindowAddon ):
         self.createContextMenu() # Enable right-click menu
 
         #self.SwordModule = None # Loaded later in self.getBeforeAndAfterBibleData()
+        self.SwordChapterCache = None # Keeps the most recently used chapters (once we have the module)
         try:
             self.SwordModule = self.parentApp.SwordInterface.getModule( self.moduleAbbreviation )
         except KeyError:
@@ -1581,7 +1664,8 @@ class SwordBibleResourceWindow( ChildWindow, BibleResourceWindowAddon ):
         if self.SwordModule is None:
             logging.error( _("SwordBibleResourceWindow.__init__ Unable to open Sword module: {}").format( self.moduleAbbreviation ) )
             self.SwordModule = None
-        elif isinstance( self.SwordModule, Bible ):
+        else: self.SwordChapterCache = SwordChapterCache( self.parentApp.SwordInterface, self.SwordModule )
+        if isinstance( self.SwordModule, Bible ):
             #print( "Handle internalBible for SwordModuleRW" )
             handleInternalBibles( self.parentApp, self.SwordModule, self )
         else: print( "SwordModule using {} is {}".format( SwordType, self.SwordModule ) )
@@ -1610,32 +1694,75 @@ class SwordBibleResourceWindow( ChildWindow, BibleResourceWindowAddon ):
 
     def getContextVerseData( self, verseKey ):
         """
-        Fetches and returns the internal Bible data for the given reference.
+        Returns the internal Bible data for the given reference
+            if we have the chapter, otherwise None (and asks for it to be fetched in the background).
+
+        The whole chapter is fetched from SWORD the first time we need a verse from it
+            and kept (along with a few other recently used chapters).
         """
         #if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
             #print( _("SwordBibleResourceWindow.getContextVerseData( {} )").format( verseKey ) )
         if self.SwordModule is not None:
-            if verseKey.getChapterNumber()!='0' and verseKey.getVerseNumber()!='0': # not sure how to get introductions, etc.
-                SwordKey = self.getSwordVerseKey( verseKey )
-                rawInternalBibleContextData = self.parentApp.SwordInterface.getContextVerseData( self.SwordModule, SwordKey )
-                if rawInternalBibleContextData is None: return '', ''
-                rawInternalBibleData, context = rawInternalBibleContextData
-                # Clean up the data -- not sure that it should be done here! … XXXXXXXXXXXXXXXXXXX
-                import re
-                adjustedInternalBibleData = InternalBibleEntryList()
-                for existingInternalBibleEntry in rawInternalBibleData:
-                    #print( 'eIBE', existingInternalBibleEntry )
-                    cleanText = existingInternalBibleEntry.getCleanText()
-                    cleanText = cleanText.replace( '</w>', '' )
-                    cleanText = re.sub( '<w .+?>', '', cleanText )
-                    newInternalBibleEntry = InternalBibleEntry( existingInternalBibleEntry[0], existingInternalBibleEntry[1], existingInternalBibleEntry[2],
-                        cleanText, existingInternalBibleEntry[4], existingInternalBibleEntry[5] )
-                    #print( 'nIBE', newInternalBibleEntry )
-                    adjustedInternalBibleData.append( newInternalBibleEntry )
-                return adjustedInternalBibleData, context
+            BBB, C, V = verseKey.getBCV()
+            if C!='0' and V!='0': # not sure how to get introductions, etc.
+                chapterData = self.SwordChapterCache.getCachedChapterData( BBB, C )
+                if chapterData is None: # We'll redisplay when the chapter arrives
+                    try: numVerses = self.getNumVerses( BBB, C ) or 0
+                    except KeyError: numVerses = 0 # Not in our versification system
+                    self.SwordChapterCache.requestChapterData( self, BBB, C, numVerses, self.onSwordChapterArrived )
+                    return None
+                try: return chapterData[V]
+                except KeyError: # Verse is outside our versification -- fetch it by itself
+                    return getSwordContextVerseData( self.parentApp.SwordInterface, self.SwordModule, BBB, C, V )
     # end of SwordBibleResourceWindow.getContextVerseData
 
 
+    def fetchContextVerseData( self, verseKey ):
+        """
+        Fetches and returns the internal Bible data for the given reference straight away
+            (without using or filling our chapter cache).
+        """
+        if self.SwordModule is not None:
+            BBB, C, V = verseKey.getBCV()
+            if C!='0' and V!='0': # not sure how to get introductions, etc.
+                return getSwordContextVerseData( self.parentApp.SwordInterface, self.SwordModule, BBB, C, V )
+    # end of SwordBibleResourceWindow.fetchContextVerseData
+
+
+    def onSwordChapterArrived( self, BBB, C, successFlag ):
+        """
+        Called (on the tkinter thread) by our SwordChapterCache when a chapter that we asked for has been fetched.
+
+        Forgets the empty verses that we cached for that chapter while we were waiting
+            and redisplays (if it was successful).
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( _("SwordBibleResourceWindow.onSwordChapterArrived( {} {}, {} )").format( BBB, C, successFlag ) )
+
+        if not self.winfo_exists(): return # we've been closed
+        self.forgetMissingVerseData( BBB, C )
+        if successFlag and self.currentVerseKey.getBBB() == BBB:
+            self.updateShownBCV( self.parentApp.getVerseKey( self._groupCode ) )
+    # end of SwordBibleResourceWindow.onSwordChapterArrived
+
+
+    def getCurrentSection( self, verseKey ):
+        """
+        Returns the verse keys for the start and end of the section containing verseKey.
+
+        The section index is built on a worker thread by fetching the verses straight away,
+            as asking for every chapter in the book through our chapter cache would just flush it.
+        Until it's ready, we scan around the current verse (with our cached data).
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( _("SwordBibleResourceWindow.getCurrentSection( {} )").format( verseKey ) )
+
+        return findCurrentSectionIndexed( (self.windowType,self.moduleID), verseKey,
+                                        self.getNumChapters, self.getNumVerses, self.getContextVerseData,
+                                        fetchVerseData=self.fetchContextVerseData )
+    # end of SwordBibleResourceWindow.getCurrentSection
+
+
     def doShowInfo( self, event=None ):
         """
         Pop-up dialog
@@ -1680,6 +1807,10 @@ class DBPBibleResourceWindow( ChildWindow, BibleResourceWindowAddon ):
         except ConnectionError:
             logging.error( _("DBPBibleResourceWindow.__init__ Unable to connect to Digital Bible Platform") )
             self.DBPModule = None
+        self.DBPClient = None # Used to fetch whole chapters in the background
+        if self.DBPModule is not None:
+            DBPKey = getattr( self.DBPModule, 'key', None )
+            if DBPKey: self.DBPClient = getDBPResourceClient( self.parentApp, self.moduleAbbreviation, DBPKey )
 
         #if isinstance( self.DBPModule, Bible ): # Never true
             ##print( "Handle internalBible for DBPModuleRW" )
@@ -1716,10 +1847,42 @@ class DBPBibleResourceWindow( ChildWindow, BibleResourceWindowAddon ):
 
         if self.DBPModule is not None:
             if verseKey.getChapterNumber()!='0' and verseKey.getVerseNumber()!='0': # not sure how to get introductions, etc.
-                return self.DBPModule.getContextVerseData( verseKey )
+                if self.DBPClient is None: return self.DBPModule.getContextVerseData( verseKey )
+                contextVerseData = self.DBPClient.getCachedContextVerseData( verseKey )
+                if contextVerseData is None: # We'll redisplay when the chapter arrives
+                    self.DBPClient.requestChapter( verseKey.getBBB(), verseKey.getChapterNumber(), self.onDBPChapterArrived )
+                return contextVerseData
     # end of DBPBibleResourceWindow.getContextVerseData
 
 
+    def isBookDataComplete( self, BBB ):
+        """
+        Returns True only if we already have every chapter of the book in memory
+            (so that the section index can be built without asking for any chapters).
+        """
+        if self.DBPClient is None: return False # Every verse would be fetched (straight away) from the server
+        numChapters = self.getNumChapters( BBB )
+        return bool( numChapters ) and self.DBPClient.hasCachedChapters( BBB, numChapters )
+    # end of DBPBibleResourceWindow.isBookDataComplete
+
+
+    def onDBPChapterArrived( self, BBB, C, successFlag ):
+        """
+        Called (on the tkinter thread) by our DBPResourceClient when a chapter that we asked for has been fetched.
+
+        Forgets the empty verses that we cached for that chapter while we were waiting
+            (even if it failed, so that it'll be asked for again) and redisplays (if it was successful).
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( _("DBPBibleResourceWindow.onDBPChapterArrived( {} {}, {} )").format( BBB, C, successFlag ) )
+
+        if not self.winfo_exists(): return # we've been closed
+        self.forgetMissingVerseData( BBB, C )
+        if successFlag and self.currentVerseKey.getBBB() == BBB:
+            self.updateShownBCV( self.parentApp.getVerseKey( self._groupCode ) )
+    # end of DBPBibleResourceWindow.onDBPChapterArrived
+
+
     def doShowInfo( self, event=None ):
         """
         Pop-up dialog
@@ -1920,7 +2083,9 @@ class InternalBibleResourceWindowAddon( BibleResourceWindowAddon ):
             print( _("InternalBibleResourceWindowAddon.getContextVerseData( {} )").format( verseKey ) )
 
         if self.internalBible is not None:
-            try: return self.internalBible.getContextVerseData( verseKey )
+            try:
+                with getInternalBibleLock( self.internalBible ): # A collection box might be loading a book on a worker thread
+                    return self.internalBible.getContextVerseData( verseKey )
             except KeyError: # Could be after a verse-bridge ???
                 if verseKey.getChapterNumber() != '0':
                     logging.error( _("InternalBibleResourceWindowAddon.getContextVerseData for {} {} got a KeyError") \
@@ -1928,6 +2093,19 @@ class InternalBibleResourceWindowAddon( BibleResourceWindowAddon ):
     # end of InternalBibleResourceWindowAddon.getContextVerseData
 
 
+    def getBookSourceStat( self, BBB ):
+        """
+        Returns a 2-tuple (modification time, size) for the source file of the book.
+
+        Raises KeyError if we don't know the filename, or OSError if we can't get to it.
+        """
+        try: sourceFilepath = os.path.join( self.internalBible.sourceFolder, self.internalBible.possibleFilenameDict[BBB] )
+        except AttributeError: raise KeyError( BBB ) # Not a file-based Bible (or not loaded)
+        sourceStat = os.stat( sourceFilepath )
+        return sourceStat.st_mtime, sourceStat.st_size
+    # end of InternalBibleResourceWindowAddon.getBookSourceStat
+
+
     def doShowInfo( self, event=None ):
         """
         Pop-up dialog
@@ -2171,8 +2349,8 @@ class InternalBibleResourceWindow( ChildWindow, InternalBibleResourceWindowAddon
                     #print( "Handle internalBible for internalBibleRW" )
                     self.internalBible = handleInternalBibles( self.parentApp, result, self )
         if self.internalBible is not None: # Define which functions we use by default
-            self.getNumVerses = self.internalBible.getNumVerses
-            self.getNumChapters = self.internalBible.getNumChapters
+            self.getNumVerses = makeLockedInternalBibleFunction( self.internalBible, self.internalBible.getNumVerses )
+            self.getNumChapters = makeLockedInternalBibleFunction( self.internalBible, self.internalBible.getNumChapters )
 
         if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
             print( _("InternalBibleResourceWindow.__init__ finished.") )
@@ -2583,9 +2761,17 @@ class HebrewBibleResourceWindow( ChildWindow, InternalBibleResourceWindowAddon,
                 #print( "hereHB2", repr(HebrewWLCBible) )
                 #print( "hereIB", repr(self.internalBible) )
         if self.internalBible is not None: # Define which functions we use by default
-            self.getNumVerses = self.internalBible.getNumVerses
-            self.getNumChapters = self.internalBible.getNumChapters
-            self.internalBible.loadGlossingDict()
+            self.getNumVerses = makeLockedInternalBibleFunction( self.internalBible, self.internalBible.getNumVerses )
+            self.getNumChapters = makeLockedInternalBibleFunction( self.internalBible, self.internalBible.getNumChapters )
+            if self.internalBible not in glossJournals: # else it's already loaded (and being used by another window)
+                self.internalBible.loadGlossingDict()
+                try:
+                    glossJournal = glossJournals[self.internalBible] = GlossJournal( getGlossJournalFilepath( self.internalBible ) )
+                    numReplayed = glossJournal.replay( self.internalBible ) # Recover any glosses that weren't saved last time
+                    if numReplayed:
+                        logging.warning( _("HebrewBibleResourceWindow.__init__ recovered {} unsaved gloss changes").format( numReplayed ) )
+                except OSError as err:
+                    logging.error( _("HebrewBibleResourceWindow.__init__ Unable to open gloss journal: {}").format( err ) )
             HebrewInterlinearBibleBoxAddon.__init__( self, \
                     self, numInterlinearLines=5 if self.internalBible.glossingDict else 3) # word/Strongs/morph/genericGloss/specificGloss
 
@@ -2646,6 +2832,7 @@ class HebrewBibleResourceWindow( ChildWindow, InternalBibleResourceWindowAddon,
         #gotoMenu.add_command( label=_('Forward'), underline=0, command=self.doGoForward )
         #gotoMenu.add_command( label=_('Backward'), underline=0, command=self.doGoBackward )
         #gotoMenu.add_separator()
+        gotoMenu.add_command( label=_('Previous unglossed verse'), underline=9, command=self.doGotoPreviousUnglossedVerse )
         gotoMenu.add_command( label=_('Next unglossed verse'), underline=5, command=self.doGotoNextUnglossedVerse )
         gotoMenu.add_separator()
         gotoMenu.add_command( label=_('Previous list item'), underline=0, state=tk.DISABLED, command=self.doGotoPreviousListItem )
@@ -2692,71 +2879,140 @@ class HebrewBibleResourceWindow( ChildWindow, InternalBibleResourceWindowAddon,
     # end of HebrewBibleResourceWindow.createMenuBar
 
 
+    def _getVerseNormalizedWords( self, verseKey ):
+        """
+        Returns a list of the normalized Hebrew words in the verse
+            (which is empty if there's no data for the verse).
+
+        Can be called on a worker thread.
+        """
+        normalizedWords = []
+        with getInternalBibleLock( self.internalBible ):
+            verseData = self.getContextVerseData( verseKey ) # Uncached so we don't flush our verse cache
+            if verseData is None: return normalizedWords # Could be end of books OR INSIDE A VERSE BRIDGE
+            verseDataList, context = verseData
+            for verseDataEntry in verseDataList:
+                if verseDataEntry.getMarker() in ('v~','p~'):
+                    normalizedWords.extend( self.getNormalizedHebrewWord( verseDict['word'] ) \
+                                    for verseDict in self.internalBible.getVerseDictList( verseDataEntry, verseKey ) )
+        return normalizedWords
+    # end of HebrewBibleResourceWindow._getVerseNormalizedWords
+
+
+    def _iterateVerseKeys( self, fromVerseKey=None, backwards=False ):
+        """
+        Yields the SimpleVerseKey of every verse in our Bible in order (or in reverse order)
+            starting after (or before) fromVerseKey if it's given.
+        """
+        fromPackedVerseKey = None if fromVerseKey is None else packVerseKey( fromVerseKey )
+        chapterList = [(BBB,intC) for BBB in self.getBookList() for intC in range( 1, (self.getNumChapters( BBB ) or 0)+1 )]
+        if backwards: chapterList.reverse()
+        for BBB,intC in chapterList:
+            numVerses = self.getNumVerses( BBB, intC )
+            if fromPackedVerseKey is not None: # Skip the chapters that we don't need to look at
+                if backwards and packVerseKey( SimpleVerseKey( BBB, intC, 1 ) ) >= fromPackedVerseKey: continue
+                if not backwards and packVerseKey( SimpleVerseKey( BBB, intC, numVerses ) ) <= fromPackedVerseKey: continue
+            for intV in ( reversed( range( 1, numVerses+1 ) ) if backwards else range( 1, numVerses+1 ) ):
+                verseKey = SimpleVerseKey( BBB, intC, intV )
+                if fromPackedVerseKey is not None:
+                    packedVerseKey = packVerseKey( verseKey )
+                    if (packedVerseKey >= fromPackedVerseKey) if backwards else (packedVerseKey <= fromPackedVerseKey): continue
+                yield verseKey
+    # end of HebrewBibleResourceWindow._iterateVerseKeys
+
+
+    def _scanForUnglossedVerse( self, fromVerseKey, backwards=False ):
+        """
+        Goes verse by verse from the given one looking for a word without a generic gloss
+            (used until our index of unglossed verses is ready).
+
+        Returns the SimpleVerseKey of the verse or None if there's no more.
+        """
+        glossingDict = self.internalBible.glossingDict
+        for verseKey in self._iterateVerseKeys( fromVerseKey, backwards ):
+            for normalizedWord in self._getVerseNormalizedWords( verseKey ):
+                genericGloss = glossingDict[normalizedWord][0] if normalizedWord in glossingDict else ''
+                if not genericGloss: return verseKey # Found an empty gloss -- done
+    # end of HebrewBibleResourceWindow._scanForUnglossedVerse
+
+
+    def _buildUnglossedVerseIndex( self ):
+        """
+        Runs on a worker thread to go through all the words of the Bible
+            and make the index of verses containing unglossed words.
+
+        Returns the new index or None if it failed (which is logged here
+            so that no traceback is left in the Future keeping our Bible alive).
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( "_buildUnglossedVerseIndex() for {}".format( self.internalBible.getAName() ) )
+        try:
+            unglossedVerseIndex = UnglossedVerseIndex( self.internalBible.glossingDict )
+            for verseKey in self._iterateVerseKeys():
+                unglossedVerseIndex.addVerseWords( verseKey, self._getVerseNormalizedWords( verseKey ) )
+            unglossedVerseIndex.finishBuilding()
+            return unglossedVerseIndex
+        except Exception as err: # Could be anything from the Bible class
+            logging.error( _("HebrewBibleResourceWindow._buildUnglossedVerseIndex: Unable to find unglossed verses: {}").format( err ) )
+    # end of HebrewBibleResourceWindow._buildUnglossedVerseIndex
+
+
+    def getUnglossedVerseIndex( self ):
+        """
+        Returns the index of verses containing unglossed words for our internal Bible
+            or None if it's not ready yet.
+
+        The first call starts building it on a worker thread (as it has to go through all the words of the Bible).
+        Once it's finished, it's swapped in (with any glosses entered in the meantime)
+            and after that it's kept up-to-date as glosses are entered.
+        """
+        try: return unglossedVerseIndexes[self.internalBible]
+        except KeyError: pass # Need to build it
+
+        try: future, changedWords = unglossedVerseIndexBuilds[self.internalBible]
+        except KeyError: # Start building it
+            unglossedVerseIndexBuilds[self.internalBible] = getUnglossedVerseIndexExecutor().submit( self._buildUnglossedVerseIndex ), set()
+            return None
+        if not future.done(): return None
+        del unglossedVerseIndexBuilds[self.internalBible]
+        unglossedVerseIndex = future.result()
+        if unglossedVerseIndex is None: return None # It failed -- we'll try again next time
+        for normalizedWord in changedWords: unglossedVerseIndex.updateWord( normalizedWord )
+        unglossedVerseIndexes[self.internalBible] = unglossedVerseIndex
+        return unglossedVerseIndex
+    # end of HebrewBibleResourceWindow.getUnglossedVerseIndex
+
+
     def doGotoNextUnglossedVerse( self ):
         """
         Stays at the current BCV if no empty field is found.
         """
-        from HebrewWLCBible import ORIGINAL_MORPHEME_BREAK_CHAR, OUR_MORPHEME_BREAK_CHAR
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( "doGotoNextUnglossedVerse() from {}".format( self.currentVerseKey.getShortText() ) )
 
-        BBB, C, V = self.currentVerseKey.getBCV()
+        self.requestMissingGlosses = True # Make sure this is on / back on
+        unglossedVerseIndex = self.getUnglossedVerseIndex()
+        if unglossedVerseIndex is None: nextVerseKey = self._scanForUnglossedVerse( self.currentVerseKey )
+        else: nextVerseKey = unglossedVerseIndex.getNextVerseKey( self.currentVerseKey )
+        if nextVerseKey is None: showInfo( self, APP_NAME, _("No (more) empty glosses found") )
+        else: self.gotoBCV( *nextVerseKey.getBCV() )
+    # end of HebrewBibleResourceWindow.doGotoNextUnglossedVerse
+
+
+    def doGotoPreviousUnglossedVerse( self ):
+        """
+        Stays at the current BCV if no empty field is found.
+        """
         if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
-            print( "doGotoNextUnglossedVerse() from {} {}:{}".format( BBB, C, V ) )
+            print( "doGotoPreviousUnglossedVerse() from {}".format( self.currentVerseKey.getShortText() ) )
 
         self.requestMissingGlosses = True # Make sure this is on / back on
-        #print( "doGotoNextUnglossedVerse starting at {} {}:{}".format( BBB, C, V ) )
-        intC, intV = int( C ), int( V )
-        while True:
-            #print( "  doGotoNextUnglossedVerse looping at {} {}:{}".format( BBB, intC, intV ) )
-            if intV < self.maxVersesThisChapter: intV+=1 # Next verse
-            elif intC < self.maxChaptersThisBook:
-                intC, intV = intC+1, 0 # Next chapter
-                self.maxVersesThisChapter = self.getNumVerses( BBB, intC )
-            else: # need to go to the next book
-                BBB = self.getNextBookCode( BBB )
-                if BBB is None:
-                    #print( "    doGotoNextUnglossedVerse finished all books -- stopping" )
-                    showInfo( self, APP_NAME, _("No (more) empty glosses found") )
-                    break
-                else:
-                    #print( "    doGotoNextUnglossedVerse going to next book {}".format( BBB ) )
-                    intC, intV = 1, 1
-                    self.maxChaptersThisBook = self.getNumChapters( BBB )
-                    self.maxVersesThisChapter = self.getNumVerses( BBB, intC )
-            #print( "    doGotoNextUnglossedVerse going to {} {}:{}".format( BBB, intC, intV ) )
-            ourVerseKey = SimpleVerseKey( BBB, intC, intV )
-            cachedVerseData = self.getCachedVerseData( ourVerseKey )
-            if cachedVerseData is None: # Could be end of books OR INSIDE A VERSE BRIDGE
-                pass
-                #print( "      doGotoNextUnglossedVerse got None!" )
-                #break
-            else:
-                verseDataList, context = cachedVerseData
-                #print( "      doGotoNextUnglossedVerse got", verseDataList )
-                assert isinstance( verseDataList, InternalBibleEntryList )
-                for verseDataEntry in verseDataList:
-                    assert isinstance( verseDataEntry, InternalBibleEntry )
-                    marker = verseDataEntry.getMarker()
-                    if marker in ('v~','p~'):
-                        verseDictList = self.internalBible.getVerseDictList( verseDataEntry, ourVerseKey )
-                        #print( "verseDictList", verseDictList )
-                        for j, verseDict in enumerate( verseDictList ):
-                            #print( "verseDict", verseDict )
-                            word = verseDict['word']
-                            fullRefTuple = ( BBB, intC, intV, str(j+1))
-                            refText = '{} {}:{}.{}'.format( *fullRefTuple )
-                            normalizedWord =  self.internalBible.removeCantillationMarks( word, removeMetegOrSiluq=True ) \
-                                                .replace( ORIGINAL_MORPHEME_BREAK_CHAR, OUR_MORPHEME_BREAK_CHAR )
-                            #if normalizedWord != word:
-                                #print( '   ({}) {!r} normalized to ({}) {!r}'.format( len(word), word, len(normalizedWord), normalizedWord ) )
-                                ##print( '{!r} is '.format( normalizedWord ), end=None )
-                                ##h.printUnicodeData( normalizedWord )
-                            genericGloss,genericReferencesList,specificReferencesDict = self.internalBible.glossingDict[normalizedWord] \
-                                                            if normalizedWord in self.internalBible.glossingDict else ('',[],{})
-                            if not genericGloss:
-                                #print( "      doGotoNextUnglossedVerse found empty gloss at {} {}:{}!".format( BBB, intC, intV ) )
-                                self.gotoBCV( BBB, intC, intV )
-                                return # Found an empty gloss -- done
-    # end of Application.doGotoNextUnglossedVerse
+        unglossedVerseIndex = self.getUnglossedVerseIndex()
+        if unglossedVerseIndex is None: previousVerseKey = self._scanForUnglossedVerse( self.currentVerseKey, backwards=True )
+        else: previousVerseKey = unglossedVerseIndex.getPreviousVerseKey( self.currentVerseKey )
+        if previousVerseKey is None: showInfo( self, APP_NAME, _("No (more) empty glosses found") )
+        else: self.gotoBCV( *previousVerseKey.getBCV() )
+    # end of HebrewBibleResourceWindow.doGotoPreviousUnglossedVerse
 
 
     #def refreshTitle( self ):
@@ -3005,20 +3261,7 @@ class HebrewBibleResourceWindow( ChildWindow, InternalBibleResourceWindowAddon,
 
         HebrewInterlinearBibleBoxAddon.doClose( self )
 
-        # Remove ourself from the list of internal Bibles (and their controlling windows)
-        #print( 'internalBibles initially', len(self.parentApp.internalBibles), self.parentApp.internalBibles )
-        newBibleList = []
-        for internalBible,windowList in self.parentApp.internalBibles:
-            if internalBible is self.internalBible:
-                newWindowList = []
-                for controllingWindow in windowList:
-                    if controllingWindow is not self: # leave other windows alone
-                        newWindowList.append( controllingWindow )
-                if newWindowList: newBibleList.append( (internalBible,windowList) )
-            else: # leave this one unchanged
-                newBibleList.append( (internalBible,windowList) )
-        self.parentApp.internalBibles = newBibleList
-        #print( 'internalBibles now', len(self.parentApp.internalBibles), self.parentApp.internalBibles )
+        # Note: ChildWindow.doClose removes us from the list of internal Bibles (and their controlling windows)
 
         ChildWindow.doClose( self, event )
         if BibleOrgSysGlobals.debugFlag: self.parentApp.setDebugText( "Closed HebrewBibleResourceWindow" )
@@ -63,7 +63,8 @@ from BiblelatorDialogs import SelectResourceBoxDialog, GetNewProjectNameDialog,
                                 BookNameDialog, NumberButtonDialog, \
                                 DownloadResourcesDialog, ChooseResourcesDialog
 from BiblelatorHelpers import mapReferencesVerseKey, createEmptyUSFMBooks, \
-                                parseEnteredBooknameField, getLatestPythonModificationDate
+                                parseEnteredBooknameField, getLatestPythonModificationDate, \
+                                packVerseKey, unpackBCV, InternalBibleRegistry
 from Settings import ApplicationSettings, ProjectSettings
 from BiblelatorSettingsFunctions import parseAndApplySettings, writeSettingsFile, \
         saveNewWindowSetup, deleteExistingWindowSetup, applyGivenWindowsSettings, viewSettings, \
@@ -76,6 +77,7 @@ from BibleResourceCollection import BibleResourceCollectionWindow
 from BibleReferenceCollection import BibleReferenceCollectionWindow
 from LexiconResourceWindows import BibleLexiconResourceWindow
 from TextEditWindow import TextEditWindow
+from GrepFunctions import ParallelGrep
 from USFMEditWindow import USFMEditWindow
 #from ESFMEditWindow import ESFMEditWindow
 from BiblelatorSettingsEditor import openBiblelatorSettingsEditor
@@ -223,7 +225,7 @@ class Application( Frame ):
             self.lastInternalBibleDir = '../../../../../Data/Work/Matigsalug/Bible/'
 
         self.recentFiles = []
-        self.internalBibles = [] # Contains 2-tuples being (internalBibleObject,list of window objects displaying that Bible)
+        self.internalBibles = InternalBibleRegistry() # Iterates 2-tuples being (internalBibleObject,list of window objects displaying that Bible)
 
         #logging.critical( "Critical test" )
         #logging.error( "Error test" )
@@ -260,7 +262,7 @@ class Application( Frame ):
         self.createInfoBar()
 
         self.lastBookNumber = int( self.bookNumberVar.get() )
-        self.BCVHistory = []
+        self.BCVHistory = [] # Packed integer verse keys (see BiblelatorHelpers.packBCV) or (BBB,C,V,S) tuples for unusual references
         self.BCVHistoryIndex = None
 
         # Make sure all our Bible windows get updated initially
@@ -1960,12 +1962,14 @@ class Application( Frame ):
         self.openFileTextEditWindow( fileResult )
     # end of Application.doOpenFileTextEditWindow
 
-    def openFileTextEditWindow( self, filepath, windowGeometry=None ):
+    def openFileTextEditWindow( self, filepath, windowGeometry=None, encoding='utf-8' ):
         """
         Then open the file in a plain text edit window.
+
+        The file is read (and saved) with the given encoding.
         """
         if BibleOrgSysGlobals.debugFlag:
-            if debuggingThisModule: print( "openFileTextEditWindow( {} )".format( filepath ) )
+            if debuggingThisModule: print( "openFileTextEditWindow( {}, {} )".format( filepath, encoding ) )
         if BibleOrgSysGlobals.debugFlag: self.setDebugText( "openFileTextEditWindow…" )
 
         self.setWaitStatus( _("openFileTextEditWindow…") )
@@ -1974,11 +1978,14 @@ class Application( Frame ):
             if windowGeometry: tEW.geometry( windowGeometry )
             self.childWindows.append( tEW )
         else: # open the text file and fill the window
-            text = open( filepath, 'rt', encoding='utf-8' ).read()
+            try: text = open( filepath, 'rt', encoding=encoding ).read()
+            except (UnicodeDecodeError, LookupError): text = None
             if text == None:
                 showError( self, APP_NAME, 'Could not decode and open file ' + filepath )
+                tEW = None
             else:
                 tEW = TextEditWindow( self )
+                tEW.fileEncoding = encoding
                 tEW.setFilepath( filepath )
                 tEW.setAllText( text )
                 if windowGeometry: tEW.geometry( windowGeometry )
@@ -2484,7 +2491,7 @@ class Application( Frame ):
         assert self.BCVHistoryIndex
         self.BCVHistoryIndex -= 1
         assert self.BCVHistoryIndex >= 0
-        self.setCurrentVerseKey( self.BCVHistory[self.BCVHistoryIndex] )
+        self.setCurrentVerseKey( self.getBCVHistoryVerseKey( self.BCVHistoryIndex ) )
         self.updateBCVPreviousNextButtonsState()
         #self.acceptNewBnCV()
         self.after_idle( self.acceptNewBnCV ) # Do the acceptNewBnCV once we're idle
@@ -2505,7 +2512,7 @@ class Application( Frame ):
         assert self.BCVHistoryIndex < len(self.BCVHistory)-1
         self.BCVHistoryIndex += 1
         assert self.BCVHistoryIndex < len(self.BCVHistory)
-        self.setCurrentVerseKey( self.BCVHistory[self.BCVHistoryIndex] )
+        self.setCurrentVerseKey( self.getBCVHistoryVerseKey( self.BCVHistoryIndex ) )
         self.updateBCVPreviousNextButtonsState()
         #self.acceptNewBnCV()
         self.after_idle( self.acceptNewBnCV ) # Do the acceptNewBnCV once we're idle
@@ -2558,7 +2565,8 @@ class Application( Frame ):
         assert self.BCVHistory
         assert self.BCVHistoryIndex
         assert self.BCVHistoryIndex < len( self.BCVHistory )
-        for reference in self.BCVHistory: # These are SimpleVerseKey objects
+        for historyIndex in range( len(self.BCVHistory) ):
+            reference = self.getBCVHistoryVerseKey( historyIndex )
             #print( "Got BCVRef {} {} {} ".format( reference, reference.getVerseKeyText(), reference.getShortText() ) )
             self.BCVNavigationBox.insert( tk.END, reference.getShortText() )
         # Do a bit more set-up
@@ -2608,15 +2616,15 @@ class Application( Frame ):
         #self.setReadyStatus()
 
         found = False
-        for index, verseKey in enumerate( self.BCVHistory ):
-            if verseKey.getShortText() == selectedBCVString:
+        for index in range( len(self.BCVHistory) ):
+            if self.getBCVHistoryVerseKey( index ).getShortText() == selectedBCVString:
                 found = True; break
         if not found: halt # programming error
         #print( "  Heading to #{}={} {}".format( index, selectedBCVString, self.BCVHistory[index] ) )
         assert 0 <= index <= len( self.BCVHistory )
         self.BCVHistoryIndex = index
 
-        self.setCurrentVerseKey( self.BCVHistory[self.BCVHistoryIndex] )
+        self.setCurrentVerseKey( self.getBCVHistoryVerseKey( self.BCVHistoryIndex ) )
         self.updateBCVPreviousNextButtonsState()
         self.after_idle( self.acceptNewBnCV ) # Do the acceptNewBnCV once we're idle
     # end of Application.doAcceptBCVNavigationSelection
@@ -2760,6 +2768,16 @@ class Application( Frame ):
     # end of Application.updateBCVPreviousNextButtonsState
 
 
+    def getBCVHistoryVerseKey( self, historyIndex ):
+        """
+        Returns a SimpleVerseKey for the given entry in our BCV history
+            (which is either a packed integer or a (BBB,C,V,S) tuple).
+        """
+        historyKey = self.BCVHistory[historyIndex]
+        return SimpleVerseKey( *unpackBCV( historyKey ) if isinstance( historyKey, int ) else historyKey )
+    # end of Application.getBCVHistoryVerseKey
+
+
     def selectGroupA( self ):
         self.updateBCVGroup( 'A' )
     # end of Application.selectGroupA
@@ -3269,9 +3287,13 @@ class Application( Frame ):
             self.chapterNumberButton['text'] = C
             self.verseNumberButton['text'] = V
 
-        if self.currentVerseKey not in self.BCVHistory:
+        historyKey = packVerseKey( self.currentVerseKey )
+        if not isinstance( historyKey, int ): # An unusual reference that can't be packed
+            historyKey = self.currentVerseKey.getBCVS()
+            logging.info( "updateGUIBCVControls: Keeping unpackable reference {} in history".format( historyKey ) )
+        if historyKey not in self.BCVHistory:
             self.BCVHistoryIndex = len( self.BCVHistory )
-            self.BCVHistory.append( self.currentVerseKey )
+            self.BCVHistory.append( historyKey )
             self.updateBCVPreviousNextButtonsState()
 
         intV = int( V )
@@ -3449,7 +3471,8 @@ class Application( Frame ):
 
         search is threaded so the GUI remains active and is not
         blocked, and to allow multiple greps to overlap in time;
-        could use threadtools, but avoid loop in no active grep;
+        the files are searched by a pool of threads (see GrepFunctions)
+        and the matches are shown in batches as they're found;
 
         grep Unicode policy: text files content in the searched tree
         might be in any Unicode encoding: we don't ask about each (as
@@ -3503,146 +3526,84 @@ class Application( Frame ):
     # end of Application.onGrep
 
 
-    def onDoGrep( self, dirname, filenamepatt, grepkey, encoding):
+    def onDoGrep( self, dirname, filenamepatt, grepkey, encoding ):
         """
-        on Go in grep dialog: populate scrolled list with matches
-        tbd: should producer thread be daemon so it dies with app?
-        """
-        #from tkinter import Tk
-        #from tkinter.ttk import Label
-        import threading, queue
+        On Go in grep dialog: populate scrolled list with matches as they're found.
 
-        # make non-modal un-closeable dialog
-        mypopup = tk.Tk()
-        mypopup.title( _('PyEdit - grepping') )
-        status = Label( mypopup, text=_('Grep thread searching for: {}…').format( grepkey ) )
-        status.pack(padx=20, pady=20)
-        mypopup.protocol( 'WM_DELETE_WINDOW', lambda: None)  # ignore X close
+        The files are searched in parallel by a ParallelGrep object
+            which wakes us (with a virtual event) whenever it has a new batch of matches.
+        """
+        from tkinter.ttk import Scrollbar
+        self.logUsage( ProgName, debuggingThisModule, 'onDoGrep' )
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( "Application.onDoGrep( {!r}, {!r}, {!r}, {!r} )".format( dirname, filenamepatt, grepkey, encoding ) )
 
-        # start producer thread, consumer loop
-        myqueue = queue.Queue()
-        threadargs = (filenamepatt, dirname, grepkey, encoding, myqueue)
-        threading.Thread(target=self.grepThreadProducer, args=threadargs).start()
-        self.grepThreadConsumer(grepkey, encoding, myqueue, mypopup)
+        # new non-modal window
+        popup = tk.Toplevel( self )
+        popup.title( 'PyEdit - grep matches: %r (%s)' % (grepkey, encoding))
+        statusLabel = Label( popup, text=_('Grep threads searching for: {}…').format( grepkey ) )
+        statusLabel.pack( side=tk.TOP, fill=tk.X, padx=5, pady=5 )
+        cancelButton = Button( popup, text=_('Cancel') )
+        cancelButton.pack( side=tk.BOTTOM )
+        sbar = Scrollbar( popup )
+        matchBox = tk.Listbox( popup, relief=tk.SUNKEN, width=100 )
+        sbar.configure( command=matchBox.yview )                    # xlink sbar and list
+        matchBox.configure( yscrollcommand=sbar.set )               # move one moves other
+        sbar.pack( side=tk.RIGHT, fill=tk.Y )                      # pack first=clip last
+        matchBox.pack( side=tk.LEFT, expand=tk.YES, fill=tk.BOTH )        # list clipped first
+
+        def wakeGrepWindow(): # Called from the grep search thread
+            try: popup.event_generate( '<<GrepResults>>', when='tail' ) # Handled later by the GUI thread
+            except (tk.TclError, RuntimeError): pass # The window (or the whole app) has already gone
+        # end of wakeGrepWindow
+
+        grepSearch = ParallelGrep( dirname, filenamepatt, grepkey, encoding, wakeFunction=wakeGrepWindow )
+        matchList = [] # The (filepath,lineNumber) for each line in matchBox
+        popup.bind( '<<GrepResults>>', lambda event: self.grepResultsReady( grepSearch, matchList, popup, matchBox, statusLabel, cancelButton ) )
+        matchBox.bind( '<Double-Button-1>', lambda event: self.grepMatchSelected( matchList, matchBox, grepSearch.encoding ) )
+        cancelButton.configure( command=grepSearch.cancel )
+        popup.protocol( 'WM_DELETE_WINDOW', lambda: (grepSearch.cancel(), popup.destroy()) )
+        grepSearch.start()
     # end of Application.onDoGrep
 
 
-    def grepThreadProducer( self, filenamepatt, dirname, grepkey, encoding, myqueue):
+    def grepResultsReady( self, grepSearch, matchList, popup, matchBox, statusLabel, cancelButton ):
         """
-        in a non-GUI parallel thread: queue find.find results list;
-        could also queue matches as found, but need to keep window;
-        file content and file names may both fail to decode here;
+        In the main GUI thread: add the latest batch of matches to the list.
 
-        TBD: could pass encoded bytes to find() to avoid filename
-        decoding excs in os.walk/listdir, but which encoding to use:
-        sys.getfilesystemencoding() if not None?  see also Chapter6
-        footnote issue: 3.1 fnmatch always converts bytes per Latin-1;
+        There may be multiple active grep searches (each with their own window).
         """
-        import fnmatch
-
-        def find(pattern, startdir=os.curdir):
-            for (thisDir, subsHere, filesHere) in os.walk(startdir):
-                for name in subsHere + filesHere:
-                    if fnmatch.fnmatch(name, pattern):
-                        fullpath = os.path.join(thisDir, name)
-                        yield fullpath
-        # end of find
+        newMatches = grepSearch.getResults()
+        if newMatches:
+            matchBox.insert( tk.END, *['%s@%d  [%s]' % (filepath, lineNumber, lineString) for filepath,lineNumber,lineString in newMatches] )
+            matchList.extend( (filepath,lineNumber) for filepath,lineNumber,lineString in newMatches )
+        if not grepSearch.finishedFlag:
+            statusLabel.configure( text=_('Searched {} files: {} matches so far…').format( grepSearch.numFiles, len(matchList) ) )
+            return
 
-        matches = []
-        try:
-            for filepath in find( pattern=filenamepatt, startdir=dirname ):
-                try:
-                    textfile = open(filepath, encoding=encoding)
-                    for (linenum, linestr) in enumerate(textfile):
-                        if grepkey in linestr:
-                            msg = '%s@%d  [%s]' % (filepath, linenum + 1, linestr)
-                            matches.append(msg)
-                except UnicodeError as X:
-                    print( 'Unicode error in:', filepath, X)       # eg: decode, bom
-                except IOError as X:
-                    print( 'IO error in:', filepath, X)            # eg: permission
-        finally:
-            myqueue.put( matches )      # stop consumer loop on find excs: filenames?
-    # end of Application.grepThreadProducer
-
-
-    def grepThreadConsumer( self, grepkey, encoding, myqueue, mypopup ):
-        """
-        in the main GUI thread: watch queue for results or [];
-        there may be multiple active grep threads/loops/queues;
-        there may be other types of threads/checkers in process,
-        especially when PyEdit is attached component (PyMailGUI);
-        """
-        import queue
-        try:
-            matches = myqueue.get( block=False )
-        except queue.Empty:
-            myargs  = (grepkey, encoding, myqueue, mypopup)
-            self.after( 250, self.grepThreadConsumer, *myargs )
+        cancelButton.pack_forget()
+        if grepSearch.isCancelled():
+            statusLabel.configure( text=_('Cancelled after searching {} files: {} matches').format( grepSearch.numFiles, len(matchList) ) )
+        elif not matchList:
+            popup.destroy()
+            showInfo( self, APP_NAME, 'Grep found no matches for: %r' % grepSearch.grepkey)
         else:
-            mypopup.destroy()     # close status
-            self.update()         # erase it now
-            if not matches:
-                showInfo( self, APP_NAME, 'Grep found no matches for: %r' % grepkey)
-            else:
-                self.grepMatchesList( matches, grepkey, encoding )
-    # end of Application.grepThreadConsumer
+            statusLabel.configure( text=_('Searched {} files in {:.1f}s: {} matches').format( grepSearch.numFiles, grepSearch.elapsedTime, len(matchList) ) )
+    # end of Application.grepResultsReady
 
 
-    def grepMatchesList( self, matches, grepkey, encoding):
+    def grepMatchSelected( self, matchList, matchBox, encoding ):
         """
-        populate list after successful matches;
-        we already know Unicode encoding from the search: use
-        it here when filename clicked, so open doesn't ask user;
+        On list double-click: open the matched file (with the encoding that grep searched it with)
+            at the line of the occurrence.
         """
-        #from tkinter import Tk, tk.Listbox, tk.SUNKEN, Y
-        from tkinter.ttk import Scrollbar
-        class ScrolledList( Frame ):
-            def __init__( self, options, parent=None ):
-                Frame.__init__( self, parent )
-                self.pack( expand=tk.YES, fill=tk.BOTH )                   # make me expandable
-                self.makeWidgets(options)
-
-            def handleList(self, event):
-                index = self.tk.Listbox.curselection()                # on list double-click
-                label = self.tk.Listbox.get(index)                    # fetch selection text
-                self.runCommand(label)                             # and call action here
-                                                                   # or get(tk.ACTIVE)
-            def makeWidgets(self, options):
-                sbar = Scrollbar( self )
-                matchBox = tk.Listbox( self, relief=tk.SUNKEN )
-                sbar.configure( command=matchBox.yview )                    # xlink sbar and list
-                matchBox.configure( yscrollcommand=sbar.set )               # move one moves other
-                sbar.pack( side=tk.RIGHT, fill=tk.Y )                      # pack first=clip last
-                matchBox.pack( side=tk.LEFT, expand=tk.YES, fill=tk.BOTH )        # list clipped first
-                pos = 0
-                for label in options:                              # add to tk.Listbox
-                    matchBox.insert( pos, label )                        # or insert(tk.END,label)
-                    pos += 1                                       # or enumerate(options)
-               #list.configure(selectmode=SINGLE, setgrid=1)          # select,resize modes
-                matchBox.bind('<Double-Button-1>', self.handleList)           # set event handler
-                self.tk.Listbox = matchBox
-
-            def runCommand(self, selection):                       # redefine me lower
-                print('You selected:', selection)
-        # end of class ScrolledList
-
-        print( 'Matches for %s: %s' % (grepkey, len(matches)))
-
-        # catch list double-click
-        class ScrolledFilenames(ScrolledList):
-            def runCommand( self, selection):
-                file, line = selection.split( '  [', 1)[0].split( '@')
-                editor = TextEditorMainPopup(
-                    loadFirst=file, winTitle=' grep match', loadEncode=encoding)
-                editor.onGoto(int(line))
-                editor.text.focus_force()   # no, really
-
-        # new non-modal widnow
-        popup = tk.Tk()
-        popup.title( 'PyEdit - grep matches: %r (%s)' % (grepkey, encoding))
-        ScrolledFilenames(parent=popup, options=matches)
-    # end of Application.grepMatchesList
+        selection = matchBox.curselection()
+        if not selection: return
+        filepath, lineNumber = matchList[selection[0]]
+        textEditWindow = self.openFileTextEditWindow( filepath, encoding=encoding )
+        if textEditWindow is not None:
+            textEditWindow.doGotoWindowLine( forceline=lineNumber )
+    # end of Application.grepMatchSelected
 
 
     def doOpenSettingsEditor( self, event=None ):
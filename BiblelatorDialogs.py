@@ -130,6 +130,7 @@ from BiblelatorGlobals import APP_NAME, errorBeep
 from ModalDialog import ModalDialog
 from BiblelatorSimpleDialogs import showWarning
 from TextBoxes import BEntry, BCombobox, BText
+from BibleFindFunctions import checkFindRegex
 
 # BibleOrgSys imports
 import BibleOrgSysGlobals
@@ -1392,6 +1393,8 @@ class GetBibleFindTextDialog( ModalDialog ):
         findText = self.searchStringVar.get()
         if not findText: showWarning( self.parentWindow, APP_NAME, _("Nothing to search for!") ); return False
         if findText.lower() == 'regex:': showWarning( self.parentWindow, APP_NAME, _("No regular expression to search for!") ); return False
+        regexError = checkFindRegex( findText )
+        if regexError: showWarning( self.parentWindow, APP_NAME, _("Bad regular expression: {}").format( regexError ) ); return False
         bookResultNumber = self.booksSelectVariable.get()
         if bookResultNumber==4 and not self.optionsDict['bookList']:
             showWarning( self.parentWindow, APP_NAME, _("No books selected to search in!") ); return False
@@ -1766,6 +1769,8 @@ class GetBibleReplaceTextDialog( ModalDialog ):
         findText = self.searchStringVar.get()
         if not findText: showWarning( self.parentWindow, APP_NAME, _("Nothing to search for!") ); return False
         if findText.lower() == 'regex:': showWarning( self.parentWindow, APP_NAME, _("No regular expression to search for!") ); return False
+        regexError = checkFindRegex( findText )
+        if regexError: showWarning( self.parentWindow, APP_NAME, _("Bad regular expression: {}").format( regexError ) ); return False
         replaceText = self.replaceStringVar.get()
         if replaceText.lower().startswith( 'regex:' ): showWarning( self.parentWindow, APP_NAME, _("Don't start replace field with 'regex:'!") ); return False
         bookResultNumber = self.booksSelectVariable.get()
@@ -26,9 +26,71 @@
     createEmptyUSFMBookText( BBB, getNumChapters, getNumVerses )
     createEmptyUSFMBooks( folderPath, BBB, availableVersifications, availableVersions, requestDict )
     calculateTotalVersesForBook( BBB, getNumChapters, getNumVerses )
+    packBCV( BBB, C, V, S=None )
+    unpackBCV( packedKey )
+    packVerseKey( verseKey )
+    _compileVerseMappings()
+    _lookupMappedVerseKey( mapName, groupIndex, mainVerseKey )
     mapReferenceVerseKey( mainVerseKey )
     mapParallelVerseKey( forGroupCode, mainVerseKey )
+    getReferencesIndexFilepath()
+    getReferencesDataStamp()
+    _getReferencesVerseKeys( references )
+    buildReferencesIndex( references=None, indexFilepath=None )
+    openReferencesIndex( indexFilepath=None )
+    _lookupReferencesIndex( packedVerseKey )
+    _buildReferencesIndexInBackground( references )
+    mapReferencesVerseKey( mainVerseKey )
+    _sectionFoundIn( verseData )
     findCurrentSection( currentVerseKey, getNumChapters, getNumVerses, getVerseData )
+    buildSectionIndex( BBB, getNumChapters, getNumVerses, getVerseData )
+    getSectionIndexFilepath( resourceID, BBB )
+    loadSectionIndex( resourceID, BBB, sourceStat )
+    saveSectionIndex( resourceID, BBB, sourceStat, sectionIndex )
+    getSectionIndexExecutor()
+    _getBuiltSectionIndex( resourceID, BBB, sourceStat )
+    findCurrentSectionIndexed( resourceID, currentVerseKey, getNumChapters, getNumVerses, getVerseData, getSourceStat=None, isBookComplete=None, fetchVerseData=None )
+    predictNextVerseKeys( currentVerseKey, previousVerseKey, getNumChapters, getNumVerses, maxCount=PREFETCH_VERSE_COUNT )
+    getInternalBibleKey( internalBible )
+    getInternalBibleLock( internalBible )
+    makeLockedInternalBibleFunction( internalBible, function )
+    class InternalBibleRegistry
+        __init__( self, maxWarmBibles=MAX_WARM_INTERNAL_BIBLES )
+        __len__( self )
+        __iter__( self )
+        register( self, internalBible, controllingWindow )
+        releaseWindow( self, controllingWindow )
+    class UnglossedVerseIndex
+        __init__( self, glossingDict )
+        isGlossed( self, normalizedWord )
+        addVerseWords( self, verseKey, normalizedWords )
+        finishBuilding( self )
+        updateWord( self, normalizedWord )
+        getNextVerseKey( self, verseKey )
+        getPreviousVerseKey( self, verseKey )
+    getUnglossedVerseIndexExecutor()
+    getGlossJournalFilepath( internalBible )
+    class GlossJournal
+        __init__( self, journalFilepath )
+        replay( self, internalBible )
+        append( self, recordType, normalizedWord, gloss, fullRefTuple )
+        compact( self )
+        close( self )
+    _glossJournalTestWriter( journalFilepath, numRecords, durableCount )
+    getGlossSaveExecutor()
+    saveGlossingDict( internalBible )
+    startSavingGlossingDict( internalBible )
+    handleInternalBibles( self, internalBible, controllingWindow )
+    cleanSwordInternalBibleData( rawInternalBibleData )
+    getSwordContextVerseData( SwordInterface, SwordModule, BBB, C, V )
+    getSwordContextChapterData( SwordInterface, SwordModule, BBB, C, numVerses )
+    getSwordFetchExecutor()
+    class SwordChapterCache
+        __init__( self, SwordInterface, SwordModule, maxChapters=MAX_CACHED_SWORD_CHAPTERS )
+        getCachedChapterData( self, BBB, C )
+        fetchChapterData( self, BBB, C, numVerses )
+        requestChapterData( self, tkRootWindow, BBB, C, numVerses, callback )
+        _checkFinishedFetches( self )
     logChangedFile( userName, loggingFolder, projectName, savedBBB, bookText )
     parseEnteredBooknameField( bookNameEntry, CEntry, VEntry, BBBfunction )
     getLatestPythonModificationDate()
@@ -48,12 +110,21 @@ ProgNameVersionDate = '{} {} {}'.format( ProgNameVersion, _("last modified"), La
 debuggingThisModule = False
 
 
-import os.path
+import sys, os.path
 from datetime import datetime
 import re
+import json
+import threading
+import logging
+import struct, mmap, pickle
+import hashlib
+import weakref
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 # Biblelator imports
-from BiblelatorGlobals import APP_NAME_VERSION, BIBLE_GROUP_CODES
+from BiblelatorGlobals import APP_NAME_VERSION, DATA_FOLDER_NAME, BIBLE_GROUP_CODES
 
 # BibleOrgSys imports
 #sys.path.append( '../BibleOrgSys/' )
@@ -61,8 +132,51 @@ import BibleOrgSysGlobals
 from Bible import Bible
 from VerseReferences import SimpleVerseKey, BBB_RE #, FlexibleVersesKey
 from BibleReferencesLinks import BibleReferencesLinks
-from InternalBibleInternals import InternalBibleEntry
-
+from BibleOrganizationalSystems import BibleOrganizationalSystem
+from InternalBibleInternals import InternalBibleEntryList, InternalBibleEntry
+
+
+PREFETCH_VERSE_COUNT = 4 # How many verses ahead we guess the user might want next
+
+BBBReferenceNumbers, referenceNumberBBBs = {}, {} # Used by packBCV and unpackBCV
+
+sectionIndexes = {} # Indexed by (resourceID,BBB) -- contains (sourceStat,sectionIndex) kept for the rest of the session
+SECTION_INDEXES_SUBFOLDER_NAME = 'SectionIndexes/'
+SECTION_INDEX_VERSION = 1 # Increment this if the saved index format changes
+sectionIndexBuilds = {} # Indexed by (resourceID,BBB) -- contains (sourceStat,future) for indexes being built in the background
+sectionIndexExecutor = None # Builds section indexes in the background (made when first needed)
+
+# Tables used by mapReferenceVerseKey and mapParallelVerseKey
+#   (compiled into dictionaries keyed by packed integer verse keys the first time they're needed)
+REFERENCE_VERSE_TABLE = ( # NT references to OT
+    ( ('MAT','2','18'), ('JER','31','15') ),
+    ( ('MAT','3','3'), ('ISA','40','3') ),
+    )
+PARALLEL_VERSE_TABLE = ( # Synoptic references in the NT -- one for each of Bible groups B, C, D
+    ( ('MAT','3','13'), ( ('MRK','1','9'), ('LUK','3','21'), ('JHN','1','31') ) ),
+    )
+compiledReferenceVerseMap = compiledParallelVerseMap = None
+MAX_MAPPED_VERSE_MEMO = 500
+mappedVerseMemo = OrderedDict()
+
+SWORD_WORD_START_TAG_RE = re.compile( '<w .+?>' ) # Used by cleanSwordInternalBibleData
+SwordInterfaceLock = threading.Lock() # Resource collection boxes can fetch on worker threads
+MAX_CACHED_SWORD_CHAPTERS = 8 # Per SWORD resource window or box
+SWORD_POLL_INTERVAL = 20 # milliseconds between checks for SWORD chapters fetched in the background
+swordFetchExecutor = None # Shared by all the SWORD resource windows (made when first needed)
+
+MAX_WARM_INTERNAL_BIBLES = 3 # Bibles kept (by InternalBibleRegistry) after their last window closes
+internalBibleLocks = weakref.WeakKeyDictionary() # Indexed by internal Bible -- contains threading.RLock objects
+internalBibleLocksLock = threading.Lock() # So two threads can't make different locks for the same Bible
+unglossedVerseIndexes = weakref.WeakKeyDictionary() # Indexed by (Hebrew) internal Bible -- contains UnglossedVerseIndex objects
+unglossedVerseIndexBuilds = weakref.WeakKeyDictionary() # Indexed by (Hebrew) internal Bible -- contains (future, set of words glossed while building)
+unglossedVerseIndexExecutor = None # Builds unglossed verse indexes in the background (made when first needed)
+glossJournals = weakref.WeakKeyDictionary() # Indexed by (Hebrew) internal Bible -- contains GlossJournal objects
+GLOSS_JOURNALS_SUBFOLDER_NAME = 'GlossJournals/'
+MAX_GLOSS_JOURNAL_RECORDS = 500 # Save the whole glossing dictionary (and empty the journal) after this many changes
+GLOSS_JOURNAL_COMPACTED_RECORD = b'["C"]\n' # Everything in the journal before this has been saved in the glossing dictionary
+glossSaveExecutor = None # Saves glossing dictionaries in the background (made when first needed)
+glossSaveFutures = weakref.WeakKeyDictionary() # Indexed by (Hebrew) internal Bible -- contains the last save Future
 
 
 def exp( messageString ):
@@ -234,6 +348,109 @@ def calculateTotalVersesForBook( BBB, getNumChapters, getNumVerses ):
 
 
 
+def packBCV( BBB, C, V, S=None ):
+    """
+    Packs a book/chapter/verse(/suffix) reference into a single integer
+        which is much quicker to hash and compare than a SimpleVerseKey or its hash string.
+
+    Packed keys sort in book/chapter/verse/suffix order.
+    Chapter -1 (used for book headers) is allowed, but otherwise
+        the chapter and verse must be simple numbers (less than 999),
+        and the suffix (if any) must be a single lowercase letter.
+
+    Raises a ValueError (or a KeyError for an unknown book code) if it can't be packed.
+    """
+    try: bookNumber = BBBReferenceNumbers[BBB]
+    except KeyError:
+        bookNumber = BBBReferenceNumbers[BBB] = BibleOrgSysGlobals.BibleBooksCodes.getReferenceNumber( BBB )
+        referenceNumberBBBs[bookNumber] = BBB
+    intC, intV = int(C) + 1, int(V) # Chapter -1 becomes 0
+    if not ( 0<=intC<1000 and 0<=intV<1000 ): raise ValueError( "Can't pack {} {}:{}".format( BBB, C, V ) )
+    if S:
+        if len(S)!=1 or not 'a'<=S<='z': raise ValueError( "Can't pack {} {}:{} suffix {!r}".format( BBB, C, V, S ) )
+        suffixNumber = ord(S) - 96 # a=1
+    else: suffixNumber = 0
+    return ((bookNumber * 1000 + intC) * 1000 + intV) * 32 + suffixNumber
+# end of BiblelatorHelpers.packBCV
+
+
+def unpackBCV( packedKey ):
+    """
+    The reverse of packBCV above.
+
+    Returns BBB, C, V, S (with C and V as strings, and S as None if there's no suffix),
+        i.e., the same as SimpleVerseKey.getBCVS().
+    """
+    packedKey, suffixNumber = divmod( packedKey, 32 )
+    packedKey, intV = divmod( packedKey, 1000 )
+    bookNumber, intC = divmod( packedKey, 1000 )
+    try: BBB = referenceNumberBBBs[bookNumber]
+    except KeyError:
+        BBB = referenceNumberBBBs[bookNumber] = BibleOrgSysGlobals.BibleBooksCodes.getBBBFromReferenceNumber( bookNumber )
+        BBBReferenceNumbers[BBB] = bookNumber
+    return BBB, str(intC-1), str(intV), chr(suffixNumber+96) if suffixNumber else None
+# end of BiblelatorHelpers.unpackBCV
+
+
+def packVerseKey( verseKey ):
+    """
+    Returns the packed integer for the given SimpleVerseKey (to use as a dictionary key).
+
+    The (very rare) verse keys that can't be packed fall back to their hash string
+        (which can never be equal to any integer key).
+    """
+    try: return packBCV( *verseKey.getBCVS() )
+    except (ValueError,KeyError,TypeError): return verseKey.makeHash()
+# end of BiblelatorHelpers.packVerseKey
+
+
+def _compileVerseMappings():
+    """
+    Converts the mapping tables (at the top of this module)
+        into dictionaries keyed by packed integer verse keys.
+
+    Only needs to be done once.
+    """
+    global compiledReferenceVerseMap, compiledParallelVerseMap
+    if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+        print( exp("_compileVerseMappings()") )
+
+    compiledReferenceVerseMap = { packBCV( *fromBCV ): SimpleVerseKey( *toBCV ) \
+                                            for fromBCV,toBCV in REFERENCE_VERSE_TABLE }
+    compiledParallelVerseMap = { packBCV( *fromBCV ): tuple( SimpleVerseKey( *toBCV ) for toBCV in toBCVs ) \
+                                            for fromBCV,toBCVs in PARALLEL_VERSE_TABLE }
+# end of BiblelatorHelpers._compileVerseMappings
+
+
+def _lookupMappedVerseKey( mapName, groupIndex, mainVerseKey ):
+    """
+    Finds the mapped verse key (or None) in the compiled reference or parallel mapping.
+
+    Results (including misses, which are the usual case) are remembered in a bounded memo
+        as the same verse gets looked up by every window in every navigation.
+    """
+    memoKey = mapName, groupIndex, packVerseKey( mainVerseKey )
+    if memoKey in mappedVerseMemo:
+        mappedVerseMemo.move_to_end( memoKey )
+        return mappedVerseMemo[memoKey]
+
+    if compiledReferenceVerseMap is None: _compileVerseMappings()
+    result = None
+    try: intKey = packBCV( *mainVerseKey.getBCVS() ) # Includes any suffix so MAT 3:3a isn't taken as MAT 3:3
+    except ValueError: pass # not a simple verse, so we won't have a mapping
+    else:
+        if mapName == 'Reference': result = compiledReferenceVerseMap.get( intKey )
+        else:
+            try: result = compiledParallelVerseMap[intKey][groupIndex]
+            except (KeyError,IndexError): pass
+
+    mappedVerseMemo[memoKey] = result
+    if len(mappedVerseMemo) > MAX_MAPPED_VERSE_MEMO:
+        mappedVerseMemo.popitem( last=False )
+    return result
+# end of BiblelatorHelpers._lookupMappedVerseKey
+
+
 def mapReferenceVerseKey( mainVerseKey ):
     """
     Returns the verse key for OT references in the NT (and vv), etc.
@@ -243,16 +460,10 @@ def mapReferenceVerseKey( mainVerseKey ):
     if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
         print( exp("mapReferenceVerseKey( {} )").format( mainVerseKey.getShortText() ) )
 
-    # A (temporary) dictionary containing NT references to OT
-    REFERENCE_VERSE_KEY_DICT = {
-        SimpleVerseKey('MAT','2','18'): SimpleVerseKey('JER','31','15'),
-        SimpleVerseKey('MAT','3','3'): SimpleVerseKey('ISA','40','3'),
-        }
-
-    if mainVerseKey in REFERENCE_VERSE_KEY_DICT:
-        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
-            print( '  returning {}'.format( REFERENCE_VERSE_KEY_DICT[mainVerseKey].getShortText() ) )
-        return REFERENCE_VERSE_KEY_DICT[mainVerseKey]
+    result = _lookupMappedVerseKey( 'Reference', None, mainVerseKey )
+    if result is not None and BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+        print( '  returning {}'.format( result.getShortText() ) )
+    return result
 # end of BiblelatorHelpers.mapReferenceVerseKey
 
 
@@ -265,17 +476,188 @@ def mapParallelVerseKey( forGroupCode, mainVerseKey ):
     if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
         print( exp("mapParallelVerseKey( {}, {} )").format( forGroupCode, mainVerseKey.getShortText() ) )
     groupIndex = BIBLE_GROUP_CODES.index( forGroupCode ) - 1
-    parallelVerseKeyDict = {
-        SimpleVerseKey('MAT','3','13'): (SimpleVerseKey('MRK','1','9'), SimpleVerseKey('LUK','3','21'), SimpleVerseKey('JHN','1','31') )
-        }
-    if mainVerseKey in parallelVerseKeyDict:
-        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
-            print( '  returning {}'.format( parallelVerseKeyDict[mainVerseKey][groupIndex].getShortText() ) )
-        return parallelVerseKeyDict[mainVerseKey][groupIndex]
+
+    result = _lookupMappedVerseKey( 'Parallel', groupIndex, mainVerseKey )
+    if result is not None and BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+        print( '  returning {}'.format( result.getShortText() ) )
+    return result
 # end of BiblelatorHelpers.mapParallelVerseKey
 
 
 
+# The cross-references index file has a header, then the fixed-size records sorted by packed verse key,
+#   then the pickled getRelatedPassagesList results that the records point to
+REFERENCES_INDEX_FILENAME = 'BibleReferencesIndex.bin'
+REFERENCES_INDEX_HEADER = struct.Struct( '<8sIqq' ) # magic, number of records, BOS data mtime (ns), BOS data size
+REFERENCES_INDEX_MAGIC = b'BLRefIx2'
+REFERENCES_INDEX_RECORD = struct.Struct( '<qII' ) # packed verse key, offset, length
+referencesIndex = None # Gets set to the mmap (or False if we don't have a usable index file)
+referencesIndexCount = 0
+referencesIndexBuild = None # Gets set to the background thread while we're building the index
+
+
+def getReferencesIndexFilepath():
+    """
+    Returns the filepath for our prebuilt cross-references index.
+    """
+    return os.path.join( BibleOrgSysGlobals.findHomeFolderPath(), DATA_FOLDER_NAME, REFERENCES_INDEX_FILENAME )
+# end of BiblelatorHelpers.getReferencesIndexFilepath
+
+
+def getReferencesDataStamp():
+    """
+    Returns a (mtime,size) 2-tuple for the BibleOrgSys cross-references data files
+        so that we can tell if our index was built from an older version of them.
+    """
+    moduleFilepath = sys.modules[BibleReferencesLinks.__module__].__file__
+    dataFolderpath = os.path.join( os.path.dirname( moduleFilepath ), 'DataFiles' )
+    mtime = size = 0
+    for dataFilepath in ( os.path.join( dataFolderpath, 'BibleReferencesLinks.xml' ),
+                        os.path.join( dataFolderpath, 'DerivedFiles', 'BibleReferencesLinks_Tables.pickle' ),
+                        moduleFilepath ):
+        try: fileStat = os.stat( dataFilepath )
+        except OSError: continue
+        mtime, size = max( mtime, fileStat.st_mtime_ns ), size + fileStat.st_size
+    return mtime, size
+# end of BiblelatorHelpers.getReferencesDataStamp
+
+
+def _getReferencesVerseKeys( references ):
+    """
+    Returns a list of all the verse keys that have links in the loaded BibleReferencesLinks object.
+
+    BibleReferencesLinks doesn't let us iterate through its entries,
+        so if we can't find its data dictionary we have to try every verse in the KJV versification.
+    """
+    for attributeName in ( '_BibleReferencesLinks__DataDict', '_BibleReferencesLinks__Index', ):
+        linksData = getattr( references, attributeName, None )
+        if linksData: return list( linksData )
+
+    logging.warning( exp("_getReferencesVerseKeys: Unable to find the links data so only checking KJV verses") )
+    versificationSystem = BibleOrganizationalSystem( 'GENERIC-KJV-80-ENG' )
+    verseKeys = []
+    for BBB in versificationSystem.getBookList():
+        try: numChapters = versificationSystem.getNumChapters( BBB )
+        except KeyError: continue
+        for intC in range( 1, (numChapters or 0)+1 ):
+            try: numVerses = versificationSystem.getNumVerses( BBB, intC )
+            except KeyError: continue
+            for intV in range( 1, (numVerses or 0)+1 ):
+                verseKeys.append( SimpleVerseKey( BBB, intC, intV ) )
+    return verseKeys
+# end of BiblelatorHelpers._getReferencesVerseKeys
+
+
+def buildReferencesIndex( references=None, indexFilepath=None ):
+    """
+    Goes through every linked verse and saves the related passages from BibleReferencesLinks
+        into a sorted binary index file (that can be searched without loading it all).
+
+    Verse ranges and verses with suffixes aren't indexed
+        (mapReferencesVerseKey never looks those up in the index).
+
+    references can be an already loaded BibleReferencesLinks object.
+
+    Returns the number of verses with related passages.
+    """
+    if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+        print( exp("buildReferencesIndex( {}, {} )").format( references, indexFilepath ) )
+    if references is None:
+        references = BibleReferencesLinks()
+        references.loadData()
+    if indexFilepath is None: indexFilepath = getReferencesIndexFilepath()
+    dataMtime, dataSize = getReferencesDataStamp() # Before we read any data
+
+    entries = {}
+    for verseKey in _getReferencesVerseKeys( references ):
+        if not isinstance( verseKey, SimpleVerseKey ) or verseKey.getBCVS()[3]: continue
+        packedVerseKey = packVerseKey( verseKey )
+        if not isinstance( packedVerseKey, int ) or packedVerseKey in entries: continue
+        result = references.getRelatedPassagesList( verseKey )
+        if result is None: continue
+        pickledResult = pickle.dumps( result, pickle.HIGHEST_PROTOCOL )
+        if [(linkType,link.getShortText()) for linkType,link in pickle.loads( pickledResult )] \
+                    != [(linkType,link.getShortText()) for linkType,link in result]:
+            raise ValueError( "Related passages for {} didn't survive pickling".format( verseKey.getShortText() ) )
+        entries[packedVerseKey] = pickledResult
+    entries = sorted( entries.items() )
+
+    dataOffset = REFERENCES_INDEX_HEADER.size + len(entries) * REFERENCES_INDEX_RECORD.size
+    os.makedirs( os.path.dirname( indexFilepath ), exist_ok=True )
+    with open( indexFilepath + '.tmp', 'wb' ) as indexFile:
+        indexFile.write( REFERENCES_INDEX_HEADER.pack( REFERENCES_INDEX_MAGIC, len(entries), dataMtime, dataSize ) )
+        for packedVerseKey, pickledResult in entries:
+            indexFile.write( REFERENCES_INDEX_RECORD.pack( packedVerseKey, dataOffset, len(pickledResult) ) )
+            dataOffset += len(pickledResult)
+        for packedVerseKey, pickledResult in entries:
+            indexFile.write( pickledResult )
+    os.replace( indexFilepath + '.tmp', indexFilepath ) # So we never leave a half-written index
+    return len(entries)
+# end of BiblelatorHelpers.buildReferencesIndex
+
+
+def openReferencesIndex( indexFilepath=None ):
+    """
+    Memory-maps the cross-references index file (so nothing much is read until we search it).
+
+    Returns True if we have a usable index
+        (i.e., not one built from a different version of the BibleOrgSys data).
+    """
+    global referencesIndex, referencesIndexCount
+    if indexFilepath is None: indexFilepath = getReferencesIndexFilepath()
+    try:
+        with open( indexFilepath, 'rb' ) as indexFile:
+            indexMap = mmap.mmap( indexFile.fileno(), 0, access=mmap.ACCESS_READ )
+        magic, numRecords, dataMtime, dataSize = REFERENCES_INDEX_HEADER.unpack_from( indexMap, 0 )
+    except (OSError, ValueError, struct.error) as err: # ValueError for an empty file
+        if not isinstance( err, FileNotFoundError ):
+            logging.error( exp("openReferencesIndex: Unable to open {}: {}").format( indexFilepath, err ) )
+        referencesIndex = False
+        return False
+    if magic != REFERENCES_INDEX_MAGIC:
+        logging.warning( exp("openReferencesIndex: {} isn't a current references index").format( indexFilepath ) )
+        indexMap.close()
+        referencesIndex = False
+        return False
+    if (dataMtime,dataSize) != getReferencesDataStamp():
+        logging.info( exp("openReferencesIndex: {} was built from different BibleOrgSys data").format( indexFilepath ) )
+        indexMap.close()
+        referencesIndex = False
+        return False
+    referencesIndex, referencesIndexCount = indexMap, numRecords
+    return True
+# end of BiblelatorHelpers.openReferencesIndex
+
+
+def _lookupReferencesIndex( packedVerseKey ):
+    """
+    Does a binary search of the memory-mapped index for the packed verse key.
+
+    Returns the getRelatedPassagesList result or None.
+    """
+    low, high = 0, referencesIndexCount
+    while low < high:
+        middle = (low + high) // 2
+        recordKey, offset, length = REFERENCES_INDEX_RECORD.unpack_from( referencesIndex,
+                                    REFERENCES_INDEX_HEADER.size + middle * REFERENCES_INDEX_RECORD.size )
+        if recordKey < packedVerseKey: low = middle + 1
+        elif recordKey > packedVerseKey: high = middle
+        else: return pickle.loads( referencesIndex[offset:offset+length] )
+    return None
+# end of BiblelatorHelpers._lookupReferencesIndex
+
+
+def _buildReferencesIndexInBackground( references ):
+    """
+    Runs on a worker thread to make the index for next time
+        (the GUI thread carries on using the loaded references in the meantime).
+    """
+    try: buildReferencesIndex( references )
+    except (OSError, ValueError, pickle.PicklingError) as err:
+        logging.error( exp("_buildReferencesIndexInBackground: Unable to build references index: {}").format( err ) )
+# end of BiblelatorHelpers._buildReferencesIndexInBackground
+
+
 loadedReferences = None
 def mapReferencesVerseKey( mainVerseKey ):
     """
@@ -283,13 +665,24 @@ def mapReferencesVerseKey( mainVerseKey ):
 
     Returns None if we don't have a mapping.
     """
-    global loadedReferences
+    global loadedReferences, referencesIndexBuild
     if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
         print( exp("mapReferencesVerseKey( {} )").format( mainVerseKey.getShortText() ) )
-    if loadedReferences is None:
-        loadedReferences = BibleReferencesLinks()
-        loadedReferences.loadData()
-    result = loadedReferences.getRelatedPassagesList( mainVerseKey )
+    if referencesIndex is None: openReferencesIndex()
+    elif referencesIndexBuild is not None and not referencesIndexBuild.is_alive(): # Our background build has finished
+        referencesIndexBuild = None
+        openReferencesIndex()
+    packedVerseKey = packVerseKey( mainVerseKey )
+    if referencesIndex and isinstance( packedVerseKey, int ) and not mainVerseKey.getBCVS()[3]: # the index has no verse suffixes
+        result = _lookupReferencesIndex( packedVerseKey )
+    else: # Have to load the whole thing
+        if loadedReferences is None:
+            loadedReferences = BibleReferencesLinks()
+            loadedReferences.loadData()
+            if referencesIndex is False: # Make the index in the background so we don't have to do this next time
+                referencesIndexBuild = threading.Thread( target=_buildReferencesIndexInBackground, args=(loadedReferences,), daemon=True )
+                referencesIndexBuild.start()
+        result = loadedReferences.getRelatedPassagesList( mainVerseKey )
     # Returns a list containing 2-tuples:
     #    0: Link type ('QuotedOTReference','AlludedOTReference','PossibleOTReference')
     #    1: Link FlexibleVersesKey object
@@ -313,6 +706,56 @@ def mapReferencesVerseKey( mainVerseKey ):
 
 
 
+def _sectionFoundIn( verseData ):
+    """
+    Given some verse data (a string or an InternalBibleEntryList
+        returns True or False whether a section heading is found in it
+    """
+    if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+        print( exp("_sectionFoundIn( {!r} )").format( verseData ) )
+
+    if verseData is None: return False
+
+    elif isinstance( verseData, str ):
+        #print( "  It's a string!" )
+        if '\\s ' in verseData or '\\s1' in verseData \
+        or '\\s2' in verseData or '\\s3' in verseData:
+            return True
+
+    elif isinstance( verseData, tuple ):
+        #print( "  It's an InternalBibleEntryList!" )
+        assert len(verseData) == 2
+        verseDataList, context = verseData
+        #print( '   dataList', repr(verseDataList) )
+        #print( '    context', repr(context) )
+        for verseDataEntry in verseDataList:
+            if isinstance( verseDataEntry, InternalBibleEntry ):
+                marker, cleanText = verseDataEntry.getMarker(), verseDataEntry.getCleanText()
+            elif isinstance( verseDataEntry, tuple ):
+                marker, cleanText = verseDataEntry[0], verseDataEntry[3]
+            elif isinstance( verseDataEntry, str ):
+                if verseDataEntry=='': continue
+                verseDataEntry += '\n'
+                if verseDataEntry[0]=='\\':
+                    marker = ''
+                    for char in verseDataEntry[1:]:
+                        if char!='¬' and not char.isalnum(): break
+                        marker += char
+                    cleanText = verseDataEntry[len(marker)+1:].lstrip()
+                else:
+                    marker, cleanText = None, verseDataEntry
+            elif BibleOrgSysGlobals.debugFlag: halt
+            if marker in ( 's','s1','s2','s3','s4' ): return True
+
+    else:
+        print( 'Ooops', repr(verseData) )
+        print( verseData.__type__ )
+        halt # Programming error
+
+    return False
+# end of BiblelatorHelpers._sectionFoundIn
+
+
 def findCurrentSection( currentVerseKey, getNumChapters, getNumVerses, getVerseData ):
     """
     Given the current verseKey
@@ -328,56 +771,6 @@ def findCurrentSection( currentVerseKey, getNumChapters, getNumVerses, getVerseD
     if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
         print( exp("findCurrentSection( {}, … )").format( currentVerseKey.getShortText() ) )
 
-    def sectionFoundIn( verseData ):
-        """
-        Given some verse data (a string or an InternalBibleEntryList
-            returns True or False whether a section heading is found in it
-        """
-        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
-            print( exp("sectionFoundIn( {!r} )").format( verseData ) )
-
-        if verseData is None: return False
-
-        elif isinstance( verseData, str ):
-            #print( "  It's a string!" )
-            if '\\s ' in thisVerseData or '\\s1' in thisVerseData \
-            or '\\s2' in thisVerseData or '\\s3' in thisVerseData:
-                return True
-
-        elif isinstance( verseData, tuple ):
-            #print( "  It's an InternalBibleEntryList!" )
-            assert len(verseData) == 2
-            verseDataList, context = verseData
-            #print( '   dataList', repr(verseDataList) )
-            #print( '    context', repr(context) )
-            for verseDataEntry in verseDataList:
-                if isinstance( verseDataEntry, InternalBibleEntry ):
-                    marker, cleanText = verseDataEntry.getMarker(), verseDataEntry.getCleanText()
-                elif isinstance( verseDataEntry, tuple ):
-                    marker, cleanText = verseDataEntry[0], verseDataEntry[3]
-                elif isinstance( verseDataEntry, str ):
-                    if verseDataEntry=='': continue
-                    verseDataEntry += '\n'
-                    if verseDataEntry[0]=='\\':
-                        marker = ''
-                        for char in verseDataEntry[1:]:
-                            if char!='¬' and not char.isalnum(): break
-                            marker += char
-                        cleanText = verseDataEntry[len(marker)+1:].lstrip()
-                    else:
-                        marker, cleanText = None, verseDataEntry
-                elif BibleOrgSysGlobals.debugFlag: halt
-                if marker in ( 's','s1','s2','s3','s4' ): return True
-
-        else:
-            print( 'Ooops', repr(verseData) )
-            print( verseData.__type__ )
-            halt # Programming error
-
-        return False
-    # end of sectionFoundIn
-
-    # Start of main section of findCurrentSection
     BBB, C, V = currentVerseKey.getBCV()
     intC, intV = currentVerseKey.getChapterNumberInt(), currentVerseKey.getVerseNumberInt()
     #print( 'fCS at', BBB, C, intC, V, intV )
@@ -396,7 +789,7 @@ def findCurrentSection( currentVerseKey, getNumChapters, getNumVerses, getVerseD
             thisVerseKey = SimpleVerseKey( BBB, thisC, thisV )
             thisVerseData = getVerseData( thisVerseKey )
             if debuggingThisModule: ( ' ', thisC, thisV, repr(thisVerseData) )
-            if sectionFoundIn( thisVerseData ):
+            if _sectionFoundIn( thisVerseData ):
                 found = thisC, thisV; break
         if found: break
     if not found: found = firstC, 0
@@ -415,7 +808,7 @@ def findCurrentSection( currentVerseKey, getNumChapters, getNumVerses, getVerseD
             thisVerseKey = SimpleVerseKey( BBB, thisC, thisV )
             thisVerseData = getVerseData( thisVerseKey )
             if debuggingThisModule: ( ' ', thisC, thisV, repr(thisVerseData) )
-            if sectionFoundIn( thisVerseData ):
+            if _sectionFoundIn( thisVerseData ):
                 found = thisC, thisV; break
         if found: break
     if not found: found = lastC, numVerses
@@ -426,6 +819,839 @@ def findCurrentSection( currentVerseKey, getNumChapters, getNumVerses, getVerseD
 
 
 
+def buildSectionIndex( BBB, getNumChapters, getNumVerses, getVerseData ):
+    """
+    Given a book code
+        and functions to find the number of chapters and verses in the book
+        and a function to get verse data (preferably uncached so we don't flush the cache),
+            find every verse in the book that contains a section heading.
+
+    Returns a sorted list of packed verse keys (see packBCV).
+    """
+    if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+        print( exp("buildSectionIndex( {}, … )").format( BBB ) )
+
+    sectionIndex = []
+    numChapters = getNumChapters( BBB )
+    if numChapters is None: return sectionIndex
+    for thisC in range( 0, numChapters+1 ):
+        try: numVerses = getNumVerses( BBB, thisC )
+        except KeyError: numVerses = None
+        if numVerses is None: continue
+        for thisV in range( 0, numVerses+1 ):
+            if _sectionFoundIn( getVerseData( SimpleVerseKey( BBB, thisC, thisV ) ) ):
+                sectionIndex.append( packBCV( BBB, thisC, thisV ) )
+    return sectionIndex
+# end of BiblelatorHelpers.buildSectionIndex
+
+
+def getSectionIndexFilepath( resourceID, BBB ):
+    """
+    Returns the filepath for the saved section index of the given book of the given resource.
+    """
+    resourceName = hashlib.md5( repr(resourceID).encode( 'utf-8' ) ).hexdigest()[:12]
+    return os.path.join( BibleOrgSysGlobals.findHomeFolderPath(), DATA_FOLDER_NAME, SECTION_INDEXES_SUBFOLDER_NAME,
+                                                    '{}_{}.pickle'.format( resourceName, BBB ) )
+# end of BiblelatorHelpers.getSectionIndexFilepath
+
+
+def loadSectionIndex( resourceID, BBB, sourceStat ):
+    """
+    Returns the saved section index for the book
+        or None if there isn't one (or if it was made from a different version of the source file).
+    """
+    try:
+        with open( getSectionIndexFilepath( resourceID, BBB ), 'rb' ) as indexFile:
+            indexVersion, savedSourceStat, sectionIndex = pickle.load( indexFile )
+    except FileNotFoundError: return None
+    except (OSError, ValueError, EOFError, pickle.UnpicklingError) as err:
+        logging.error( exp("loadSectionIndex: Unable to read {} {} section index: {}").format( resourceID, BBB, err ) )
+        return None
+    if indexVersion != SECTION_INDEX_VERSION or tuple(savedSourceStat) != tuple(sourceStat): return None
+    return sectionIndex
+# end of BiblelatorHelpers.loadSectionIndex
+
+
+def saveSectionIndex( resourceID, BBB, sourceStat, sectionIndex ):
+    """
+    Saves the section index for the book along with the modification time and size of its source file
+        so that it can be used again next time (until the book is changed).
+    """
+    indexFilepath = getSectionIndexFilepath( resourceID, BBB )
+    try:
+        os.makedirs( os.path.dirname( indexFilepath ), exist_ok=True )
+        with open( indexFilepath+'.tmp', 'wb' ) as indexFile:
+            pickle.dump( (SECTION_INDEX_VERSION, sourceStat, sectionIndex), indexFile, pickle.HIGHEST_PROTOCOL )
+        os.replace( indexFilepath+'.tmp', indexFilepath )
+    except OSError as err:
+        logging.error( exp("saveSectionIndex: Unable to save {} {} section index: {}").format( resourceID, BBB, err ) )
+# end of BiblelatorHelpers.saveSectionIndex
+
+
+def getSectionIndexExecutor():
+    """
+    Returns the worker thread used to build section indexes in the background
+        (making it the first time).
+
+    It's separate from the SWORD fetch thread so that building the index for a whole book
+        doesn't hold up the chapters that the windows are waiting for.
+    """
+    global sectionIndexExecutor
+    if sectionIndexExecutor is None: sectionIndexExecutor = ThreadPoolExecutor( max_workers=1 )
+    return sectionIndexExecutor
+# end of BiblelatorHelpers.getSectionIndexExecutor
+
+
+def _getBuiltSectionIndex( resourceID, BBB, sourceStat ):
+    """
+    Checks on any background build of the section index for the book.
+
+    Returns the index if the build has finished (after saving it for next time),
+        False if it's still going (or failed, in which case we don't try again this session),
+        or None if there's no build.
+    """
+    try: buildSourceStat, future = sectionIndexBuilds[(resourceID,BBB)]
+    except KeyError: return None
+    if future is None or not future.done(): return False
+    try: sectionIndex = future.result()
+    except Exception as err: # We don't know what the resource might raise
+        logging.error( exp("findCurrentSectionIndexed: Unable to build {} {} section index: {}").format( resourceID, BBB, err ) )
+        sectionIndexBuilds[(resourceID,BBB)] = buildSourceStat, None
+        return False
+    del sectionIndexBuilds[(resourceID,BBB)]
+    if buildSourceStat != sourceStat: return None # The source changed while we were building
+    sectionIndexes[(resourceID,BBB)] = sourceStat, sectionIndex
+    if sourceStat is not None: saveSectionIndex( resourceID, BBB, sourceStat, sectionIndex )
+    return sectionIndex
+# end of BiblelatorHelpers._getBuiltSectionIndex
+
+
+def findCurrentSectionIndexed( resourceID, currentVerseKey, getNumChapters, getNumVerses, getVerseData, getSourceStat=None, isBookComplete=None, fetchVerseData=None ):
+    """
+    Does the same job as findCurrentSection above (and gives the same results)
+        but uses a section index for the book (built the first time it's needed
+        and then kept for the session) so it only needs two binary searches.
+
+    The resourceID must be unique (and hashable) for each different Bible text.
+
+    For file-based resources, getSourceStat( BBB ) should return the (modification time, size)
+        of the book's source file -- the index is then also saved to disk
+        and only rebuilt when the file changes.
+    For resources that fetch their data in the background, isBookComplete( BBB ) should return False
+        unless getVerseData can already give the data for the whole book without fetching anything.
+        Until then, we just scan around the current verse (like findCurrentSection).
+    For resources that are slow to get the data for a whole book, fetchVerseData( verseKey )
+        should get the verse data straight away and be safe to call on a worker thread.
+        The index is then built with it in the background, and we scan around the current verse
+        (with getVerseData) until it's ready.
+    """
+    if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+        print( exp("findCurrentSectionIndexed( {}, {}, … )").format( resourceID, currentVerseKey.getShortText() ) )
+
+    BBB = currentVerseKey.getBBB()
+    intC, intV = currentVerseKey.getChapterNumberInt(), currentVerseKey.getVerseNumberInt()
+    sourceStat = None
+    if getSourceStat is not None:
+        try: sourceStat = getSourceStat( BBB ) # Taken before we build so a change during the build gets noticed next time
+        except (KeyError, OSError): pass # Then we can't save it
+    try:
+        savedSourceStat, sectionIndex = sectionIndexes[(resourceID,BBB)]
+        if savedSourceStat != sourceStat: raise KeyError( "Out of date" )
+    except KeyError:
+        sectionIndex = None if sourceStat is None else loadSectionIndex( resourceID, BBB, sourceStat )
+        if sectionIndex is not None: sectionIndexes[(resourceID,BBB)] = sourceStat, sectionIndex
+        elif fetchVerseData is not None:
+            sectionIndex = _getBuiltSectionIndex( resourceID, BBB, sourceStat )
+            if sectionIndex is None: # Start building it
+                sectionIndexBuilds[(resourceID,BBB)] = sourceStat, \
+                        getSectionIndexExecutor().submit( buildSectionIndex, BBB, getNumChapters, getNumVerses, fetchVerseData )
+            if sectionIndex is None or sectionIndex is False: # Not ready yet
+                return findCurrentSection( currentVerseKey, getNumChapters, getNumVerses, getVerseData )
+        elif isBookComplete is not None and not isBookComplete( BBB ): # Building it now would just ask for every chapter
+            return findCurrentSection( currentVerseKey, getNumChapters, getNumVerses, getVerseData )
+        else:
+            sectionIndex = buildSectionIndex( BBB, getNumChapters, getNumVerses, getVerseData )
+            sectionIndexes[(resourceID,BBB)] = sourceStat, sectionIndex
+            if sourceStat is not None: saveSectionIndex( resourceID, BBB, sourceStat, sectionIndex )
+
+    # The start of the section is the last heading at or before the current verse
+    #   (but at most we go back to the beginning of the previous chapter)
+    firstC = max( intC-1, 0 )
+    numVerses = getNumVerses( BBB, intC )
+    ix = bisect_right( sectionIndex, packBCV( BBB, intC, min( intV, numVerses ) ) )
+    if ix and sectionIndex[ix-1] >= packBCV( BBB, firstC, 0 ): startC, startV = unpackBCV( sectionIndex[ix-1] )[1:3]
+    else: startC, startV = firstC, 0
+
+    # The end of the section is the next heading after the current verse
+    #   (but at most we go on to the end of the next chapter)
+    lastC = min( intC+1, getNumChapters( BBB ) )
+    ix = bisect_left( sectionIndex, packBCV( BBB, intC, min( intV+1, numVerses ) ) )
+    if ix < len(sectionIndex) and sectionIndex[ix] < packBCV( BBB, lastC+1, 0 ): endC, endV = unpackBCV( sectionIndex[ix] )[1:3]
+    else: endC, endV = lastC, getNumVerses( BBB, lastC )
+
+    return SimpleVerseKey( BBB, startC, startV ), SimpleVerseKey( BBB, endC, endV )
+# end of BiblelatorHelpers.findCurrentSectionIndexed
+
+
+
+def predictNextVerseKeys( currentVerseKey, previousVerseKey, getNumChapters, getNumVerses, maxCount=PREFETCH_VERSE_COUNT ):
+    """
+    Given the current verseKey and the one we came from (which can be None)
+        and functions to find the number of chapters and verses in the book,
+            guess where the user is likely to navigate to next.
+
+    If the last move was backwards, we guess that they'll keep going backwards.
+    If the last move was to a new chapter, we guess the start of the following chapter.
+    Otherwise we guess the next few verses, and then the start of the next chapter.
+
+    Returns a list of (up to maxCount) verseKeys with the most likely first.
+        (Note that the list doesn't cross book boundaries.)
+    """
+    if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+        print( exp("predictNextVerseKeys( {}, {}, …, {} )").format( currentVerseKey.getShortText(),
+                        None if previousVerseKey is None else previousVerseKey.getShortText(), maxCount ) )
+
+    BBB = currentVerseKey.getBBB()
+    try:
+        intC, intV = currentVerseKey.getChapterNumberInt(), currentVerseKey.getVerseNumberInt()
+        numChapters = getNumChapters( BBB )
+        numVerses = getNumVerses( BBB, intC )
+    except (KeyError, ValueError, TypeError): return [] # Presumably not a normal book
+    if not numChapters or not numVerses: return [] # e.g., a book without chapters or verses
+
+    goingBackwards = changedChapter = False
+    if previousVerseKey is not None and previousVerseKey.getBBB() == BBB:
+        try: prevC, prevV = previousVerseKey.getChapterNumberInt(), previousVerseKey.getVerseNumberInt()
+        except ValueError: prevC, prevV = intC, intV
+        goingBackwards = (prevC,prevV) > (intC,intV)
+        changedChapter = prevC != intC and abs(prevC-intC) == 1 and intV in (0,1)
+
+    resultList = []
+    if goingBackwards:
+        thisC, thisV = intC, intV
+        while len(resultList) < maxCount:
+            if thisV > 0: thisV -= 1
+            elif thisC > 1:
+                thisC -= 1
+                try: thisV = getNumVerses( BBB, thisC )
+                except KeyError: break
+            else: break
+            resultList.append( SimpleVerseKey( BBB, thisC, thisV ) )
+    else:
+        if changedChapter and intC < numChapters: # Likely paging through chapters
+            resultList.append( SimpleVerseKey( BBB, intC+1, 0 ) )
+            resultList.append( SimpleVerseKey( BBB, intC+1, 1 ) )
+        for thisV in range( intV+1, min( intV+maxCount, numVerses ) + 1 ):
+            resultList.append( SimpleVerseKey( BBB, intC, thisV ) )
+        if intC < numChapters and not changedChapter:
+            resultList.append( SimpleVerseKey( BBB, intC+1, 1 ) )
+
+    #print( "  predictNextVerseKeys returning", [vK.getShortText() for vK in resultList[:maxCount]] )
+    return resultList[:maxCount]
+# end of BiblelatorHelpers.predictNextVerseKeys
+
+
+
+def cleanSwordInternalBibleData( rawInternalBibleData ):
+    """
+    Given a list of InternalBibleEntries from the SWORD interface,
+        returns a new InternalBibleEntryList with the <w …>…</w> word markup removed from the clean text.
+    """
+    adjustedInternalBibleData = InternalBibleEntryList()
+    for existingInternalBibleEntry in rawInternalBibleData:
+        #print( 'eIBE', existingInternalBibleEntry )
+        cleanText = existingInternalBibleEntry.getCleanText().replace( '</w>', '' )
+        cleanText = SWORD_WORD_START_TAG_RE.sub( '', cleanText )
+        newInternalBibleEntry = InternalBibleEntry( existingInternalBibleEntry[0], existingInternalBibleEntry[1], existingInternalBibleEntry[2],
+            cleanText, existingInternalBibleEntry[4], existingInternalBibleEntry[5] )
+        #print( 'nIBE', newInternalBibleEntry )
+        adjustedInternalBibleData.append( newInternalBibleEntry )
+    return adjustedInternalBibleData
+# end of BiblelatorHelpers.cleanSwordInternalBibleData
+
+
+def getSwordContextVerseData( SwordInterface, SwordModule, BBB, C, V ):
+    """
+    Fetches the internal Bible data for the given reference from the SWORD module.
+
+    Returns a 2-tuple with the cleaned data and the context
+        (or two empty strings if the module has nothing for that verse).
+    """
+    with SwordInterfaceLock: # We don't know that the SWORD code is thread-safe
+        rawInternalBibleContextData = SwordInterface.getContextVerseData( SwordModule, SwordInterface.makeKey( BBB, C, V ) )
+    if rawInternalBibleContextData is None: return '', ''
+    rawInternalBibleData, context = rawInternalBibleContextData
+    return cleanSwordInternalBibleData( rawInternalBibleData ), context
+# end of BiblelatorHelpers.getSwordContextVerseData
+
+
+def getSwordContextChapterData( SwordInterface, SwordModule, BBB, C, numVerses ):
+    """
+    Fetches and cleans the internal Bible data for every verse in the chapter in one pass
+        (so that moving around within a chapter doesn't keep going back to SWORD).
+
+    The SWORD interface only gives us a verse at a time,
+        but we only need to get hold of it once for the whole chapter.
+
+    Returns a dictionary indexed by the verse number string
+        containing the 2-tuples returned by getSwordContextVerseData.
+    """
+    if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+        print( exp("getSwordContextChapterData( {}, {} {}, {} )").format( SwordModule, BBB, C, numVerses ) )
+
+    rawChapterData = []
+    with SwordInterfaceLock: # We don't know that the SWORD code is thread-safe
+        for intV in range( 1, numVerses+1 ):
+            V = str( intV )
+            rawChapterData.append( (V, SwordInterface.getContextVerseData( SwordModule, SwordInterface.makeKey( BBB, C, V ) )) )
+    chapterData = {}
+    for V,rawInternalBibleContextData in rawChapterData:
+        if rawInternalBibleContextData is None: chapterData[V] = '', ''
+        else:
+            rawInternalBibleData, context = rawInternalBibleContextData
+            chapterData[V] = cleanSwordInternalBibleData( rawInternalBibleData ), context
+    return chapterData
+# end of BiblelatorHelpers.getSwordContextChapterData
+
+
+def getSwordFetchExecutor():
+    """
+    Returns the worker thread used to fetch SWORD chapters in the background
+        (making it the first time).
+
+    One thread is enough as the SWORD calls can only be made one at a time anyway.
+    """
+    global swordFetchExecutor
+    if swordFetchExecutor is None: swordFetchExecutor = ThreadPoolExecutor( max_workers=1 )
+    return swordFetchExecutor
+# end of BiblelatorHelpers.getSwordFetchExecutor
+
+
+class SwordChapterCache:
+    """
+    A small cache of the cleaned data for whole chapters of one SWORD module
+        (keeping the most recently used ones, so that going backwards and forwards
+        over a chapter boundary doesn't keep going back to SWORD).
+
+    Chapters can either be fetched straight away (e.g., on a worker thread),
+        or fetched in the background with a callback (on the tkinter thread) when they're ready.
+    """
+    def __init__( self, SwordInterface, SwordModule, maxChapters=MAX_CACHED_SWORD_CHAPTERS ):
+        """
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( exp("SwordChapterCache.__init__( {}, {} )").format( SwordModule, maxChapters ) )
+        self.SwordInterface, self.SwordModule, self.maxChapters = SwordInterface, SwordModule, maxChapters
+        self.chapterDataCache = OrderedDict() # Indexed by (BBB,C) -- most recently used last
+        self.cacheLock = threading.Lock() # The cache can be used from worker threads
+        self.pendingFetches = {} # Indexed by (BBB,C) -- contains (future, callbackList)
+        self.tkRootWindow = self.pollAfterID = None
+    # end of SwordChapterCache.__init__
+
+
+    def getCachedChapterData( self, BBB, C ):
+        """
+        Returns the chapter data dictionary (see getSwordContextChapterData)
+            or None if we haven't got that chapter.
+        """
+        with self.cacheLock:
+            try: chapterData = self.chapterDataCache[(BBB,C)]
+            except KeyError: return None
+            self.chapterDataCache.move_to_end( (BBB,C) )
+        return chapterData
+    # end of SwordChapterCache.getCachedChapterData
+
+
+    def fetchChapterData( self, BBB, C, numVerses ):
+        """
+        Returns the chapter data dictionary, fetching it from SWORD (blocking) if we haven't got it.
+        """
+        chapterData = self.getCachedChapterData( BBB, C )
+        if chapterData is None:
+            chapterData = getSwordContextChapterData( self.SwordInterface, self.SwordModule, BBB, C, numVerses )
+            with self.cacheLock:
+                self.chapterDataCache[(BBB,C)] = chapterData
+                if len(self.chapterDataCache) > self.maxChapters:
+                    self.chapterDataCache.popitem( last=False )
+        return chapterData
+    # end of SwordChapterCache.fetchChapterData
+
+
+    def requestChapterData( self, tkRootWindow, BBB, C, numVerses, callback ):
+        """
+        Asks for the chapter to be fetched in the background (unless it's already on its way).
+
+        When it's arrived, callback( BBB, C, successFlag ) is called (from the tkinter thread).
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( exp("SwordChapterCache.requestChapterData( {} {}, {} )").format( BBB, C, numVerses ) )
+
+        if (BBB,C) in self.pendingFetches: # Already on its way
+            callbackList = self.pendingFetches[(BBB,C)][1]
+            if callback not in callbackList: callbackList.append( callback )
+            return
+        self.pendingFetches[(BBB,C)] = getSwordFetchExecutor().submit( self.fetchChapterData, BBB, C, numVerses ), [callback]
+        if self.pollAfterID is None:
+            self.tkRootWindow = tkRootWindow
+            self.pollAfterID = tkRootWindow.after( SWORD_POLL_INTERVAL, self._checkFinishedFetches )
+    # end of SwordChapterCache.requestChapterData
+
+
+    def _checkFinishedFetches( self ):
+        """
+        Called regularly with after() (on the tkinter thread) while there are fetches outstanding.
+
+        Calls the callbacks that were waiting for any chapters that have arrived.
+        """
+        self.pollAfterID = None
+        for (BBB,C),(future,callbackList) in list( self.pendingFetches.items() ):
+            if not future.done(): continue
+            del self.pendingFetches[(BBB,C)]
+            try: future.result(); successFlag = True
+            except Exception as err: # We don't know what the SWORD code might raise
+                logging.error( exp("SwordChapterCache: Unable to fetch {} {} from {}: {}").format( BBB, C, self.SwordModule, err ) )
+                successFlag = False
+            for callback in callbackList:
+                callback( BBB, C, successFlag )
+        if self.pendingFetches: # still some outstanding
+            self.pollAfterID = self.tkRootWindow.after( SWORD_POLL_INTERVAL, self._checkFinishedFetches )
+    # end of SwordChapterCache._checkFinishedFetches
+# end of SwordChapterCache class
+
+
+
+def getInternalBibleKey( internalBible ):
+    """
+    Returns a key for the registry that's the same for any copies of the same Bible,
+        i.e., the type of Bible and the normalised path that it was loaded from.
+
+    For Bibles without a source path (e.g., some SWORD modules),
+        we fall back to comparing the names and encoding.
+    """
+    sourcePath = getattr( internalBible, 'sourceFilepath', None ) # PTX Bible sets sourceFilepath but others don't!
+    if not sourcePath:
+        sourceFolder = getattr( internalBible, 'sourceFolder', None )
+        if sourceFolder: sourcePath = os.path.join( sourceFolder, getattr( internalBible, 'sourceFilename', None ) or '' )
+    if sourcePath:
+        return type(internalBible).__name__, os.path.normcase( os.path.realpath( sourcePath ) )
+    return type(internalBible).__name__, internalBible.abbreviation, internalBible.name, internalBible.sourceFilename, internalBible.encoding
+# end of BiblelatorHelpers.getInternalBibleKey
+
+
+def getInternalBibleLock( internalBible ):
+    """
+    Returns the lock that must be held while loading or looking anything up in the given internal Bible.
+
+    Internal Bibles are shared (by the InternalBibleRegistry) between windows and boxes,
+        some of which use them from worker threads,
+        and the BOS loads their books when they're first needed (which isn't thread-safe).
+
+    The lock is reentrant so that locked functions can call each other.
+    """
+    with internalBibleLocksLock:
+        try: return internalBibleLocks[internalBible]
+        except KeyError:
+            internalBibleLock = internalBibleLocks[internalBible] = threading.RLock()
+            return internalBibleLock
+# end of BiblelatorHelpers.getInternalBibleLock
+
+
+def makeLockedInternalBibleFunction( internalBible, function ):
+    """
+    Returns a function that calls the given function (usually a method of the internal Bible)
+        while holding the lock for the internal Bible.
+    """
+    internalBibleLock = getInternalBibleLock( internalBible )
+    def lockedFunction( *args, **kwargs ):
+        with internalBibleLock: return function( *args, **kwargs )
+    return lockedFunction
+# end of BiblelatorHelpers.makeLockedInternalBibleFunction
+
+
+
+class InternalBibleRegistry:
+    """
+    Keeps track of the internal Bibles that are open
+        and the windows (or boxes) that are using them.
+
+    When the last window using a Bible is closed,
+        the Bible is moved into a small warm cache (in case it's opened again soon)
+        and the oldest one there is dropped so that it can be freed.
+
+    Iterating gives (internalBible, controllingWindowList) 2-tuples
+        like the list that the main Application used to keep.
+    """
+    def __init__( self, maxWarmBibles=MAX_WARM_INTERNAL_BIBLES ):
+        """
+        """
+        self.maxWarmBibles = maxWarmBibles
+        self.openBibles = OrderedDict() # Indexed by Bible key -- contains (internalBible, controllingWindowList)
+        self.windowBibleKeys = {} # Indexed by window -- contains the set of Bible keys that it's using
+        self.warmBibles = OrderedDict() # Indexed by Bible key -- most recently closed at the end
+    # end of InternalBibleRegistry.__init__
+
+
+    def __len__( self ):
+        """
+        Returns the number of open Bibles (not counting the warm ones).
+        """
+        return len( self.openBibles )
+    # end of InternalBibleRegistry.__len__
+
+
+    def __iter__( self ):
+        """
+        Yields (internalBible, controllingWindowList) 2-tuples for the open Bibles.
+        """
+        return iter( self.openBibles.values() )
+    # end of InternalBibleRegistry.__iter__
+
+
+    def register( self, internalBible, controllingWindow ):
+        """
+        Records that the window is using the Bible.
+
+        Returns the Bible that the window should use
+            (which might be an earlier copy of the same Bible).
+        """
+        BibleKey = getInternalBibleKey( internalBible )
+        if BibleKey in self.openBibles:
+            result, controllingWindowList = self.openBibles[BibleKey]
+            if controllingWindow not in controllingWindowList: controllingWindowList.append( controllingWindow )
+        else:
+            result = self.warmBibles.pop( BibleKey, internalBible ) # Reuse the old one (with any books it had loaded)
+            self.openBibles[BibleKey] = result, [controllingWindow]
+        self.windowBibleKeys.setdefault( controllingWindow, set() ).add( BibleKey )
+        return result
+    # end of InternalBibleRegistry.register
+
+
+    def releaseWindow( self, controllingWindow ):
+        """
+        Called when a window (or box) is closed.
+
+        Any Bibles that are no longer used by any windows are moved into the warm cache.
+        """
+        for BibleKey in self.windowBibleKeys.pop( controllingWindow, () ):
+            internalBible, controllingWindowList = self.openBibles[BibleKey]
+            controllingWindowList.remove( controllingWindow )
+            if not controllingWindowList: # That was the last window using it
+                del self.openBibles[BibleKey]
+                self.warmBibles[BibleKey] = internalBible
+                if len(self.warmBibles) > self.maxWarmBibles:
+                    self.warmBibles.popitem( last=False ) # Now it can be freed
+    # end of InternalBibleRegistry.releaseWindow
+# end of InternalBibleRegistry class
+
+
+
+class UnglossedVerseIndex:
+    """
+    Keeps a sorted list of the (packed) verse keys
+        for verses that contain words without a generic gloss
+        so that the next/previous unglossed verse can be found with a binary search.
+
+    It's filled (once) by calling addVerseWords for each verse and then finishBuilding,
+        and then kept up-to-date by calling updateWord whenever a gloss is added or changed.
+    """
+    def __init__( self, glossingDict ):
+        """
+        """
+        self.glossingDict = glossingDict
+        self.wordVerseCounts = {} # Indexed by normalized word -- contains dicts of word counts indexed by packed verse key
+        self.unglossedWords = set()
+        self.verseUnglossedCounts = {} # Indexed by packed verse key -- contains the number of unglossed words in that verse
+        self.unglossedVerses = [] # Sorted packed verse keys
+    # end of UnglossedVerseIndex.__init__
+
+
+    def isGlossed( self, normalizedWord ):
+        """
+        Returns True if the word has a generic gloss.
+        """
+        try: return bool( self.glossingDict[normalizedWord][0] )
+        except KeyError: return False
+    # end of UnglossedVerseIndex.isGlossed
+
+
+    def addVerseWords( self, verseKey, normalizedWords ):
+        """
+        Adds the (normalized) words of one verse into the index.
+        """
+        packedVerseKey = packVerseKey( verseKey )
+        if not isinstance( packedVerseKey, int ): # Can't be sorted with the others
+            logging.error( exp("UnglossedVerseIndex.addVerseWords: Unable to index {}").format( verseKey ) )
+            return
+        for normalizedWord in normalizedWords:
+            try: verseCounts = self.wordVerseCounts[normalizedWord]
+            except KeyError:
+                verseCounts = self.wordVerseCounts[normalizedWord] = {}
+                if not self.isGlossed( normalizedWord ): self.unglossedWords.add( normalizedWord )
+            verseCounts[packedVerseKey] = verseCounts.get( packedVerseKey, 0 ) + 1
+            if normalizedWord in self.unglossedWords:
+                self.verseUnglossedCounts[packedVerseKey] = self.verseUnglossedCounts.get( packedVerseKey, 0 ) + 1
+    # end of UnglossedVerseIndex.addVerseWords
+
+
+    def finishBuilding( self ):
+        """
+        Called after all the verses have been added.
+        """
+        self.unglossedVerses = sorted( self.verseUnglossedCounts )
+    # end of UnglossedVerseIndex.finishBuilding
+
+
+    def updateWord( self, normalizedWord ):
+        """
+        Called after the gloss for the normalized word has been added or changed.
+
+        Adjusts the unglossed counts of the verses containing the word
+            (adding them to, or removing them from, the sorted list as necessary).
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( exp("UnglossedVerseIndex.updateWord( {!r} )").format( normalizedWord ) )
+
+        nowUnglossed = not self.isGlossed( normalizedWord )
+        if nowUnglossed == (normalizedWord in self.unglossedWords): return # No change
+        if nowUnglossed: self.unglossedWords.add( normalizedWord )
+        else: self.unglossedWords.discard( normalizedWord )
+        for packedVerseKey,wordCount in self.wordVerseCounts.get( normalizedWord, {} ).items():
+            oldCount = self.verseUnglossedCounts.get( packedVerseKey, 0 )
+            newCount = oldCount + wordCount if nowUnglossed else oldCount - wordCount
+            if newCount > 0: self.verseUnglossedCounts[packedVerseKey] = newCount
+            else: del self.verseUnglossedCounts[packedVerseKey]
+            if oldCount == 0: # Verse wasn't in our sorted list before
+                insort( self.unglossedVerses, packedVerseKey )
+            elif newCount <= 0: # Verse is no longer unglossed
+                del self.unglossedVerses[bisect_left( self.unglossedVerses, packedVerseKey )]
+    # end of UnglossedVerseIndex.updateWord
+
+
+    def getNextVerseKey( self, verseKey ):
+        """
+        Returns the SimpleVerseKey of the next verse after the given one that has unglossed words
+            or None if there's no more.
+        """
+        index = bisect_right( self.unglossedVerses, packVerseKey( verseKey ) )
+        if index < len(self.unglossedVerses):
+            return SimpleVerseKey( *unpackBCV( self.unglossedVerses[index] )[:3] )
+    # end of UnglossedVerseIndex.getNextVerseKey
+
+
+    def getPreviousVerseKey( self, verseKey ):
+        """
+        Returns the SimpleVerseKey of the last verse before the given one that has unglossed words
+            or None if there's no more.
+        """
+        index = bisect_left( self.unglossedVerses, packVerseKey( verseKey ) )
+        if index > 0:
+            return SimpleVerseKey( *unpackBCV( self.unglossedVerses[index-1] )[:3] )
+    # end of UnglossedVerseIndex.getPreviousVerseKey
+# end of UnglossedVerseIndex class
+
+
+def getUnglossedVerseIndexExecutor():
+    """
+    Returns the worker thread used to build unglossed verse indexes in the background
+        (making it the first time).
+    """
+    global unglossedVerseIndexExecutor
+    if unglossedVerseIndexExecutor is None: unglossedVerseIndexExecutor = ThreadPoolExecutor( max_workers=1 )
+    return unglossedVerseIndexExecutor
+# end of BiblelatorHelpers.getUnglossedVerseIndexExecutor
+
+
+
+def getGlossJournalFilepath( internalBible ):
+    """
+    Returns the filepath for the journal of gloss changes
+        for the glossing dictionary of the given (Hebrew) internal Bible.
+    """
+    glossingDictFilepath = getattr( internalBible, 'glossingDictFilepath', None )
+    journalName = os.path.splitext( os.path.basename( glossingDictFilepath ) )[0] if glossingDictFilepath \
+                    else internalBible.getAName()
+    journalName = re.sub( r'[^\w.-]', '_', journalName ) # Make it safe for a filename
+    return os.path.join( BibleOrgSysGlobals.findHomeFolderPath(), DATA_FOLDER_NAME, GLOSS_JOURNALS_SUBFOLDER_NAME,
+                                                    journalName + '.journal' )
+# end of BiblelatorHelpers.getGlossJournalFilepath
+
+
+
+class GlossJournal:
+    """
+    An append-only journal of the changes made to a glossing dictionary.
+
+    The BOS saves the glossing dictionary as a whole (which is slow, and only done on closing),
+        so each new or changed gloss is also written here (and flushed to disk) straight away.
+    After a crash, the changes are replayed from here into the reloaded dictionary.
+
+    Each record is one line of JSON, so a partly written last line (from a crash) is detected and dropped.
+    Once the whole dictionary has been saved, a compaction marker is written and then the journal is emptied
+        (so if we crash before it's emptied, the records before the marker aren't replayed).
+
+    The journal is shared by the GUI thread and the gloss saving thread,
+        so callers hold the internal Bible lock while using it.
+    """
+    def __init__( self, journalFilepath ):
+        """
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( exp("GlossJournal.__init__( {} )").format( journalFilepath ) )
+        self.journalFilepath = journalFilepath
+        os.makedirs( os.path.dirname( journalFilepath ), exist_ok=True )
+        self.journalFile = open( journalFilepath, 'ab', buffering=0 ) # Unbuffered so each record is a single write
+        self.numRecords = 0
+    # end of GlossJournal.__init__
+
+
+    def replay( self, internalBible ):
+        """
+        Reapplies any gloss changes that were journalled (but not saved) in an earlier session.
+
+        Skips everything up to the last compaction marker (those changes were already saved).
+        Stops at the first damaged record (and cuts it and anything after it off the journal).
+
+        Returns the number of changes reapplied.
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( exp("GlossJournal.replay( {} )").format( internalBible.getAName() ) )
+
+        goodLength, unsavedRecords = 0, []
+        with open( self.journalFilepath, 'rb' ) as journalFile:
+            for line in journalFile:
+                if line == GLOSS_JOURNAL_COMPACTED_RECORD: unsavedRecords = []
+                else:
+                    try:
+                        if not line.endswith( b'\n' ): raise ValueError( "Incomplete record" )
+                        recordType, normalizedWord, gloss, fullRefList = json.loads( line.decode( 'utf-8' ) )
+                        if recordType not in ('G','S'): raise ValueError( "Unknown record type {!r}".format( recordType ) )
+                    except (ValueError,TypeError) as err: # includes JSON and Unicode errors
+                        logging.error( exp("GlossJournal.replay: Dropping damaged journal record {!r} from {}: {}").format( line, self.journalFilepath, err ) )
+                        break
+                    unsavedRecords.append( (recordType, normalizedWord, gloss, tuple(fullRefList)) )
+                goodLength += len( line )
+        self.journalFile.truncate( goodLength ) # In case the last record was only partly written
+        for recordType, normalizedWord, gloss, fullRefTuple in unsavedRecords:
+            if recordType == 'G': internalBible.setNewGenericGloss( normalizedWord, gloss, fullRefTuple )
+            else: internalBible.setNewSpecificGloss( normalizedWord, gloss, fullRefTuple )
+        self.numRecords += len( unsavedRecords )
+        return len( unsavedRecords )
+    # end of GlossJournal.replay
+
+
+    def append( self, recordType, normalizedWord, gloss, fullRefTuple ):
+        """
+        Writes the new gloss to the end of the journal
+            and makes sure it's on the disk before returning.
+
+        recordType is 'G' for a generic gloss or 'S' for a specific gloss.
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( exp("GlossJournal.append( {}, {!r}, {!r}, {} )").format( recordType, normalizedWord, gloss, fullRefTuple ) )
+            assert recordType in 'GS'
+
+        record = json.dumps( (recordType, normalizedWord, gloss, fullRefTuple), ensure_ascii=False ) + '\n'
+        self.journalFile.write( record.encode( 'utf-8' ) )
+        os.fsync( self.journalFile.fileno() )
+        self.numRecords += 1
+    # end of GlossJournal.append
+
+
+    def compact( self ):
+        """
+        Called after the whole glossing dictionary has been saved,
+            so the journalled changes are no longer needed.
+
+        The marker is on the disk before we start truncating the journal.
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( exp("GlossJournal.compact() with {} records").format( self.numRecords ) )
+        self.journalFile.write( GLOSS_JOURNAL_COMPACTED_RECORD )
+        os.fsync( self.journalFile.fileno() )
+        self.journalFile.truncate( 0 )
+        os.fsync( self.journalFile.fileno() )
+        self.numRecords = 0
+    # end of GlossJournal.compact
+
+
+    def close( self ):
+        """
+        """
+        self.journalFile.close()
+    # end of GlossJournal.close
+# end of GlossJournal class
+
+
+def _glossJournalTestWriter( journalFilepath, numRecords, durableCount ):
+    """
+    Used by the demo to write gloss journal records (in a separate process that gets killed).
+
+    durableCount is a shared multiprocessing.Value that gets updated after each record is written.
+    """
+    glossJournal = GlossJournal( journalFilepath )
+    for n in range( numRecords ):
+        glossJournal.append( 'GS'[n%2], 'מִלָּה{}'.format( n ), 'gloss {}'.format( n ), ('GEN','1',str(n),'1') )
+        durableCount.value = n + 1
+# end of BiblelatorHelpers._glossJournalTestWriter
+
+
+def getGlossSaveExecutor():
+    """
+    Returns the worker thread used to save glossing dictionaries in the background
+        (making it the first time).
+    """
+    global glossSaveExecutor
+    if glossSaveExecutor is None: glossSaveExecutor = ThreadPoolExecutor( max_workers=1 )
+    return glossSaveExecutor
+# end of BiblelatorHelpers.getGlossSaveExecutor
+
+
+def saveGlossingDict( internalBible ):
+    """
+    Saves the whole glossing dictionary of the (Hebrew) internal Bible (if it's been changed)
+        and then compacts its gloss journal (because the changes are all saved now).
+
+    Runs on the gloss saving thread.
+    Holds the internal Bible lock so that no glosses are changed (or journalled) while it's saving.
+    """
+    if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+        print( exp("saveGlossingDict( {} )").format( internalBible.getAName() ) )
+
+    with getInternalBibleLock( internalBible ):
+        internalBible.saveAnyChangedGlosses()
+        try: glossJournals[internalBible].compact()
+        except KeyError: pass # No journal
+# end of BiblelatorHelpers.saveGlossingDict
+
+
+def startSavingGlossingDict( internalBible ):
+    """
+    Queues a save of the glossing dictionary on the gloss saving thread (so the GUI doesn't wait for it).
+
+    If there's already a save queued (but not started) for this Bible, that one will include our changes.
+
+    Returns the Future for the save.
+    """
+    if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+        print( exp("startSavingGlossingDict( {} )").format( internalBible.getAName() ) )
+
+    try: saveFuture = glossSaveFutures[internalBible]
+    except KeyError: saveFuture = None
+    if saveFuture is None or saveFuture.running() or saveFuture.done():
+        # Only keep a weak reference to the Bible, else the Future (our dict value) would keep its own key alive
+        bibleName, bibleRef = internalBible.getAName(), weakref.ref( internalBible )
+        def reportSaveError( future ):
+            if future.exception() is not None:
+                logging.error( exp("startSavingGlossingDict: Unable to save glosses for {}: {}").format( bibleName, future.exception() ) )
+            savedBible = bibleRef() # The exception's traceback refers to the Bible so forget the finished Future
+            if savedBible is not None and glossSaveFutures.get( savedBible ) is future: del glossSaveFutures[savedBible]
+        saveFuture = glossSaveFutures[internalBible] = getGlossSaveExecutor().submit( saveGlossingDict, internalBible )
+        saveFuture.add_done_callback( reportSaveError )
+    return saveFuture
+# end of BiblelatorHelpers.startSavingGlossingDict
+
+
+
 def handleInternalBibles( self, internalBible, controllingWindow ):
     """
     Try to only have one copy of internal Bibles
@@ -449,29 +1675,8 @@ def handleInternalBibles( self, internalBible, controllingWindow ):
     if debuggingThisFunction and internalBible is None:
         print( "  hIB: Got None" )
     if internalBible is not None:
-        if debuggingThisFunction: print( "  hIB: Not None" )
-        foundControllingWindowList = None
-        for iB,cWs in self.internalBibles:
-            # Some of these variables will be None but they'll still match
-            #and internalBible.sourceFilepath == iB.sourceFilepath \ # PTX Bible sets sourceFilepath but others don't!
-            if type(internalBible) is type(iB) \
-            and internalBible.abbreviation == iB.abbreviation \
-            and internalBible.name == iB.name \
-            and internalBible.sourceFilename == iB.sourceFilename \
-            and internalBible.encoding == iB.encoding: # Let's assume they're the same
-                if internalBible.sourceFolder == iB.sourceFolder:
-                    if debuggingThisFunction: print( "  Got an IB match for {}!".format( iB.name ) )
-                    result, foundControllingWindowList = iB, cWs
-                    break
-                else:
-                    if debuggingThisFunction:
-                        print( "handleInternalBibles: Got an almost IB match for {}!".format( iB.name ) )
-                        print( "    Source folders didn't match: {!r}\n           and {!r}".format( internalBible.sourceFolder, iB.sourceFolder ) )
-                    result, foundControllingWindowList = iB, cWs
-                    break
-
-        if foundControllingWindowList is None: self.internalBibles.append( (internalBible,[controllingWindow]) )
-        else: foundControllingWindowList.append( controllingWindow )
+        result = self.internalBibles.register( internalBible, controllingWindow )
+        if debuggingThisFunction and result is not internalBible: print( "  Got an IB match for {}!".format( result.name ) )
 
     if debuggingThisModule or (BibleOrgSysGlobals.debugFlag and debuggingThisModule):
         print( "Internal Bibles ({}) now:".format( len(self.internalBibles) ) )
@@ -672,6 +1877,318 @@ def demo():
 
     print( "getLatestPythonModificationDate = ", getLatestPythonModificationDate() )
 
+    # Check that the section index gives the same results as scanning the verses
+    testVerseCounts = { 0:3, 1:12, 2:9, 3:15, 4:6 }
+    testSectionVerses = ( (1,1), (1,8), (3,4), (3,5), (4,6) )
+    def testGetNumChapters( BBB ): return len(testVerseCounts) - 1
+    def testGetNumVerses( BBB, C ): return testVerseCounts[C]
+    def testGetVerseData( verseKey ):
+        C, V = verseKey.getChapterNumberInt(), verseKey.getVerseNumberInt()
+        return '{}\\v {} Some text'.format( '\\s1 A heading\n' if (C,V) in testSectionVerses else '', V )
+    numChecked = 0
+    for C,numVerses in testVerseCounts.items():
+        for V in range( 0, numVerses+1 ):
+            testVerseKey = SimpleVerseKey( 'GEN', C, V )
+            scanStart, scanEnd = findCurrentSection( testVerseKey, testGetNumChapters, testGetNumVerses, testGetVerseData )
+            indexStart, indexEnd = findCurrentSectionIndexed( 'Demo', testVerseKey, testGetNumChapters, testGetNumVerses, testGetVerseData )
+            assert indexStart.getBCV() == scanStart.getBCV() and indexEnd.getBCV() == scanEnd.getBCV(), \
+                "Section mismatch at {}: {}-{} vs {}-{}".format( testVerseKey.getShortText(),
+                    indexStart.getShortText(), indexEnd.getShortText(), scanStart.getShortText(), scanEnd.getShortText() )
+            numChecked += 1
+    print( "findCurrentSectionIndexed matched findCurrentSection for {} verses".format( numChecked ) )
+    # No index should be built while some of the data is still to come (we just scan around the current verse)
+    testVerseKey = SimpleVerseKey( 'GEN', 3, 6 )
+    requestedVerseKeys = []
+    def testGetPendingVerseData( verseKey ):
+        requestedVerseKeys.append( verseKey )
+        return testGetVerseData( verseKey ) if verseKey.getChapterNumberInt() in (2,3,4) else None
+    assert findCurrentSectionIndexed( 'DemoPending', testVerseKey, testGetNumChapters, testGetNumVerses, testGetPendingVerseData,
+                                            isBookComplete=lambda BBB: False )[0].getBCV() == ('GEN','3','5')
+    assert ('DemoPending','GEN') not in sectionIndexes
+    assert all( verseKey.getChapterNumberInt() in (2,3,4) for verseKey in requestedVerseKeys ) # Not the whole book
+    assert findCurrentSectionIndexed( 'DemoPending', testVerseKey, testGetNumChapters, testGetNumVerses, testGetVerseData,
+                                            isBookComplete=lambda BBB: True )[0].getBCV() == ('GEN','3','5')
+    assert ('DemoPending','GEN') in sectionIndexes
+    # A slow resource should get its index built in the background (and scan until it's ready)
+    backgroundBuildGate = threading.Event()
+    def testFetchVerseData( verseKey ):
+        backgroundBuildGate.wait()
+        return testGetVerseData( verseKey )
+    testVerseKey = SimpleVerseKey( 'GEN', 1, 9 )
+    assert findCurrentSectionIndexed( 'DemoBackground', testVerseKey, testGetNumChapters, testGetNumVerses, testGetVerseData,
+                                            fetchVerseData=testFetchVerseData )[0].getBCV() == ('GEN','1','8') # scanned
+    assert ('DemoBackground','GEN') not in sectionIndexes and ('DemoBackground','GEN') in sectionIndexBuilds
+    backgroundBuildGate.set()
+    sectionIndexBuilds[('DemoBackground','GEN')][1].result( timeout=10 )
+    assert findCurrentSectionIndexed( 'DemoBackground', testVerseKey, testGetNumChapters, testGetNumVerses, lambda verseKey: None,
+                                            fetchVerseData=testFetchVerseData )[0].getBCV() == ('GEN','1','8') # from the index
+    assert sectionIndexes[('DemoBackground','GEN')] == sectionIndexes[('Demo','GEN')] and not sectionIndexBuilds
+    testVerseKey = SimpleVerseKey( 'GEN', 3, 6 )
+    # A file-based index should be saved, and only used again while the source file is unchanged
+    testSourceStat = [ (1234.5, 6789) ]
+    testIndexFilepath = getSectionIndexFilepath( 'DemoSaved', 'GEN' )
+    findCurrentSectionIndexed( 'DemoSaved', testVerseKey, testGetNumChapters, testGetNumVerses, testGetVerseData, lambda BBB: testSourceStat[0] )
+    del sectionIndexes[('DemoSaved','GEN')]
+    assert loadSectionIndex( 'DemoSaved', 'GEN', testSourceStat[0] ) == sectionIndexes[('Demo','GEN')][1]
+    assert findCurrentSectionIndexed( 'DemoSaved', testVerseKey, testGetNumChapters, testGetNumVerses, lambda verseKey: None,
+                                            lambda BBB: testSourceStat[0] )[0].getBCV() == ('GEN','3','5') # from the saved index
+    testSourceStat[0] = (1235.5, 6789)
+    assert findCurrentSectionIndexed( 'DemoSaved', testVerseKey, testGetNumChapters, testGetNumVerses, lambda verseKey: None,
+                                            lambda BBB: testSourceStat[0] )[0].getBCV() == ('GEN','2','0') # rebuilt (with no headings)
+    os.remove( testIndexFilepath )
+
+    # Check the compiled verse mappings against the original functions (with their own dictionaries of verse keys)
+    #   for the mapped verses, some verses with suffixes, and some that shouldn't be there
+    def originalMapReferenceVerseKey( mainVerseKey ):
+        REFERENCE_VERSE_KEY_DICT = {
+            SimpleVerseKey('MAT','2','18'): SimpleVerseKey('JER','31','15'),
+            SimpleVerseKey('MAT','3','3'): SimpleVerseKey('ISA','40','3'),
+            }
+        if mainVerseKey in REFERENCE_VERSE_KEY_DICT: return REFERENCE_VERSE_KEY_DICT[mainVerseKey]
+    def originalMapParallelVerseKey( forGroupCode, mainVerseKey ):
+        groupIndex = BIBLE_GROUP_CODES.index( forGroupCode ) - 1
+        parallelVerseKeyDict = {
+            SimpleVerseKey('MAT','3','13'): (SimpleVerseKey('MRK','1','9'), SimpleVerseKey('LUK','3','21'), SimpleVerseKey('JHN','1','31') )
+            }
+        if mainVerseKey in parallelVerseKeyDict: return parallelVerseKeyDict[mainVerseKey][groupIndex]
+    testVerseKeys = [SimpleVerseKey('MAT','2','18'), SimpleVerseKey('MAT','3','3'), SimpleVerseKey('MAT','3','13'),
+                    SimpleVerseKey('MAT','3','3','a'), SimpleVerseKey('MAT','3','13','b'), SimpleVerseKey('MAT','2','18','a'),
+                    SimpleVerseKey('GEN','1','1'), SimpleVerseKey('MAT','3','14'), SimpleVerseKey('MAT','0','0')]
+    numMapped = 0
+    for testVerseKey in testVerseKeys:
+        for n in range( 2 ): # Second time round comes from the memo
+            expected = originalMapReferenceVerseKey( testVerseKey )
+            result = mapReferenceVerseKey( testVerseKey )
+            assert (result is None and expected is None) or (result is not None and expected is not None and result.getBCVS() == expected.getBCVS()), \
+                "Reference mismatch for {}: {} vs {}".format( testVerseKey.getShortText(), result, expected )
+            if result is not None: numMapped += 1
+            for groupCode in BIBLE_GROUP_CODES[1:4]:
+                expected = originalMapParallelVerseKey( groupCode, testVerseKey )
+                result = mapParallelVerseKey( groupCode, testVerseKey )
+                assert (result is None and expected is None) or (result is not None and expected is not None and result.getBCVS() == expected.getBCVS()), \
+                    "Parallel mismatch for {} {}: {} vs {}".format( groupCode, testVerseKey.getShortText(), result, expected )
+                if result is not None: numMapped += 1
+    assert numMapped == 2 * (2+3) # The three mapped verses only -- not the ones with suffixes
+    print( "Verse mappings matched the original functions for {} verses".format( len(testVerseKeys) ) )
+
+    # Benchmark dictionary-heavy navigation (like four windows each looking up the verses around the current one)
+    #   using hash strings and packed integers as the cache keys (made from the same prebuilt verse keys)
+    from timeit import timeit
+    navigationVerseKeys = [[SimpleVerseKey( 'MAT', C, thisV ) for thisV in range( max( V-2, 1 ), V+6 )] \
+                                for C in range( 1, 29 ) for V in range( 1, 21 )]
+    def navigateWithStringKeys():
+        verseCache = {}
+        for nearbyVerseKeys in navigationVerseKeys:
+            for window in range( 4 ):
+                for verseKey in nearbyVerseKeys:
+                    hashKey = verseKey.makeHash()
+                    if hashKey not in verseCache: verseCache[hashKey] = window
+    def navigateWithIntegerKeys():
+        verseCache = {}
+        for nearbyVerseKeys in navigationVerseKeys:
+            for window in range( 4 ):
+                for verseKey in nearbyVerseKeys:
+                    packedKey = packVerseKey( verseKey )
+                    if packedKey not in verseCache: verseCache[packedKey] = window
+    print( "Navigation benchmark: string keys {:.3f}s, integer keys {:.3f}s".format(
+            timeit( navigateWithStringKeys, number=3 ), timeit( navigateWithIntegerKeys, number=3 ) ) )
+
+    # Check that the SWORD chapter cleaning gives the same results as cleaning each verse,
+    #   and that the chapter cache keeps both chapters as we go backwards and forwards over a chapter boundary
+    #   (using a small generated stand-in module)
+    class DemoSwordInterface:
+        numCalls = 0
+        def makeKey( self, BBB, C, V ): return BBB, C, V
+        def getContextVerseData( self, SwordModule, SwordKey ):
+            DemoSwordInterface.numCalls += 1
+            return SwordModule.get( SwordKey ), []
+    demoSwordInterface = DemoSwordInterface()
+    demoSwordModule, demoChapterVerseCounts = {}, { '1':25, '2':31, '3':24 }
+    for C,numVerses in demoChapterVerseCounts.items():
+        for intV in range( 1, numVerses+1 ):
+            verseText = ' '.join( '<w lemma="strong:H{}">word{}</w>'.format( 1000+n, n ) for n in range( 12 ) )
+            demoSwordModule['GEN',C,str(intV)] = InternalBibleEntryList( [InternalBibleEntry( 'v~', 'v', verseText, verseText, None, verseText )] )
+    assert getSwordContextChapterData( demoSwordInterface, demoSwordModule, 'GEN', '1', 2 )['2'][0][0].getCleanText() \
+                == getSwordContextVerseData( demoSwordInterface, demoSwordModule, 'GEN', '1', '2' )[0][0].getCleanText() \
+                == ' '.join( 'word{}'.format( n ) for n in range( 12 ) )
+    demoChapterCache = SwordChapterCache( demoSwordInterface, demoSwordModule, maxChapters=2 )
+    DemoSwordInterface.numCalls = 0
+    for C,V in ( ('1','24'), ('1','25'), ('2','1'), ('1','25'), ('2','2'), ('1','23') ):
+        assert demoChapterCache.fetchChapterData( 'GEN', C, demoChapterVerseCounts[C] )[V][0][0].getCleanText().startswith( 'word0' )
+    assert DemoSwordInterface.numCalls == demoChapterVerseCounts['1'] + demoChapterVerseCounts['2'] # Each chapter only fetched once
+    demoChapterCache.fetchChapterData( 'GEN', '3', demoChapterVerseCounts['3'] )
+    assert demoChapterCache.getCachedChapterData( 'GEN', '2' ) is None and demoChapterCache.getCachedChapterData( 'GEN', '1' ) is not None # Least recently used went
+
+    # Benchmark stepping through some chapters (backwards and forwards over the chapter boundaries)
+    #   fetching a few verses either side one at a time (cleaning them with uncompiled regexes each time, as we used to)
+    #   against fetching them through the chapter cache,
+    #   using the small generated test module (and a real KJV SWORD module as well if there's one available)
+    def benchmarkSwordFetching( benchmarkSwordInterface, benchmarkSwordModule, benchmarkVerseCounts, moduleDescription ):
+        benchmarkPath = []
+        for C,numVerses in benchmarkVerseCounts.items():
+            benchmarkPath.extend( (C,intV) for intV in range( 1, numVerses+1 ) )
+            if C != '1': benchmarkPath.extend( [(str(int(C)-1),benchmarkVerseCounts[str(int(C)-1)]), (C,1)] ) # Back and forwards again
+        def fetchVersesSeparately():
+            for C,intV in benchmarkPath:
+                for thisV in range( max( intV-2, 1 ), min( intV+3, benchmarkVerseCounts[C]+1 ) ):
+                    rawInternalBibleData, context = benchmarkSwordInterface.getContextVerseData( benchmarkSwordModule,
+                                                        benchmarkSwordInterface.makeKey( 'GEN', C, str(thisV) ) )
+                    adjustedInternalBibleData = InternalBibleEntryList()
+                    for existingInternalBibleEntry in rawInternalBibleData or ():
+                        cleanText = existingInternalBibleEntry.getCleanText().replace( '</w>', '' )
+                        cleanText = re.sub( '<w .+?>', '', cleanText )
+                        adjustedInternalBibleData.append( InternalBibleEntry( existingInternalBibleEntry[0], existingInternalBibleEntry[1], existingInternalBibleEntry[2],
+                            cleanText, existingInternalBibleEntry[4], existingInternalBibleEntry[5] ) )
+        def fetchVersesByChapter():
+            benchmarkChapterCache = SwordChapterCache( benchmarkSwordInterface, benchmarkSwordModule )
+            for C,intV in benchmarkPath:
+                chapterData = benchmarkChapterCache.fetchChapterData( 'GEN', C, benchmarkVerseCounts[C] )
+                for thisV in range( max( intV-2, 1 ), min( intV+3, benchmarkVerseCounts[C]+1 ) ):
+                    verseData, context = chapterData[str(thisV)]
+        print( "SWORD fetch benchmark ({}): by verse {:.3f}s, by chapter {:.3f}s".format( moduleDescription,
+                timeit( fetchVersesSeparately, number=3 ), timeit( fetchVersesByChapter, number=3 ) ) )
+    benchmarkSwordFetching( demoSwordInterface, demoSwordModule, demoChapterVerseCounts, "generated test module" )
+    from SwordResources import SwordType, SwordInterface
+    if SwordType is not None:
+        benchmarkSwordInterface = SwordInterface()
+        benchmarkSwordModule = benchmarkSwordInterface.getModule( 'KJV' )
+        if benchmarkSwordModule is not None:
+            benchmarkOrganisationalSystem = BibleOrganizationalSystem( 'GENERIC-KJV-80-ENG' )
+            benchmarkSwordFetching( benchmarkSwordInterface, benchmarkSwordModule,
+                { str(C):benchmarkOrganisationalSystem.getNumVerses( 'GEN', C ) for C in range( 1, 4 ) }, "{} KJV".format( SwordType ) )
+
+    # Check that the memory-mapped cross-references index gives exactly the same results as BibleReferencesLinks
+    global referencesIndex
+    import tempfile, time
+    startTime = time.perf_counter()
+    testReferences = BibleReferencesLinks()
+    testReferences.loadData()
+    loadTime = time.perf_counter() - startTime
+    with tempfile.TemporaryDirectory() as testFolderPath:
+        testIndexFilepath = os.path.join( testFolderPath, REFERENCES_INDEX_FILENAME )
+        numIndexed = buildReferencesIndex( testReferences, testIndexFilepath )
+        startTime = time.perf_counter()
+        assert openReferencesIndex( testIndexFilepath )
+        openTime = time.perf_counter() - startTime
+        numChecked = 0
+        for BBB in ( 'GEN', 'ISA', 'MAT', 'ROM', 'REV' ):
+            for C in range( 1, 6 ):
+                for V in range( 1, 21 ):
+                    testVerseKey = SimpleVerseKey( BBB, C, V )
+                    expected = testReferences.getRelatedPassagesList( testVerseKey )
+                    result = _lookupReferencesIndex( packVerseKey( testVerseKey ) )
+                    assert (result is None and expected is None) \
+                        or [(linkType,link.getShortText()) for linkType,link in result] == [(linkType,link.getShortText()) for linkType,link in expected], \
+                            "References mismatch for {}: {} vs {}".format( testVerseKey.getShortText(), result, expected )
+                    numChecked += 1
+        for testVerseKey in _getReferencesVerseKeys( testReferences ): # Every linked verse (even outside the KJV versification)
+            if isinstance( testVerseKey, SimpleVerseKey ) and not testVerseKey.getBCVS()[3]:
+                assert _lookupReferencesIndex( packVerseKey( testVerseKey ) ) is not None, \
+                            "References index is missing {}".format( testVerseKey.getShortText() )
+        referencesIndex.close()
+        with open( testIndexFilepath, 'r+b' ) as indexFile: # Pretend that it was built from older BibleOrgSys data
+            magic, numRecords, dataMtime, dataSize = REFERENCES_INDEX_HEADER.unpack( indexFile.read( REFERENCES_INDEX_HEADER.size ) )
+            indexFile.seek( 0 )
+            indexFile.write( REFERENCES_INDEX_HEADER.pack( magic, numRecords, dataMtime-1, dataSize ) )
+        assert not openReferencesIndex( testIndexFilepath )
+        referencesIndex = None # so the real index will get opened if it's needed
+    print( "References index ({} verses) matched for {} verses: load links {:.3f}s, open index {:.6f}s".format( numIndexed, numChecked, loadTime, openTime ) )
+
+    # Check that the unglossed verse index finds the same verses as scanning through all the words
+    import random
+    testVerseWords = { SimpleVerseKey( BBB, C, V ): [random.choice( 'ABCDEFGHIJKLMNOPQRSTUVWXYZ' ) for j in range( random.randint( 0, 8 ) )] \
+                        for BBB in ( 'GEN', 'EXO', 'MAL' ) for C in range( 1, 4 ) for V in range( 1, 11 ) }
+    testGlossingDict = { word:('gloss',[],{}) for word in 'ABCDEFGHIJKLMNOPQRSTUVWXY' }
+    testUnglossedVerseIndex = UnglossedVerseIndex( testGlossingDict )
+    for testVerseKey,testWords in testVerseWords.items(): testUnglossedVerseIndex.addVerseWords( testVerseKey, testWords )
+    testUnglossedVerseIndex.finishBuilding()
+    for testStep in range( 200 ):
+        testWord = random.choice( 'ABCDEFGHIJKLMNOPQRSTUVWXYZ' )
+        testGlossingDict[testWord] = ('' if random.random() < 0.4 else 'gloss',[],{})
+        testUnglossedVerseIndex.updateWord( testWord )
+        expectedVerseKeys = [testVerseKey for testVerseKey,testWords in testVerseWords.items() if any( not testGlossingDict.get( testWord, ('',) )[0] for testWord in testWords )]
+        testVerseKey = random.choice( list( testVerseWords ) )
+        expectedNext = [verseKey for verseKey in expectedVerseKeys if packVerseKey( verseKey ) > packVerseKey( testVerseKey )]
+        expectedPrevious = [verseKey for verseKey in expectedVerseKeys if packVerseKey( verseKey ) < packVerseKey( testVerseKey )]
+        result = testUnglossedVerseIndex.getNextVerseKey( testVerseKey )
+        assert (result is None and not expectedNext) or result.getBCV() == expectedNext[0].getBCV(), (testVerseKey, result, expectedNext[:1])
+        result = testUnglossedVerseIndex.getPreviousVerseKey( testVerseKey )
+        assert (result is None and not expectedPrevious) or result.getBCV() == expectedPrevious[-1].getBCV(), (testVerseKey, result, expectedPrevious[-1:])
+    print( "Unglossed verse index matched a full scan for {} gloss changes".format( testStep+1 ) )
+
+    # Check that gloss journal records survive the writer being killed (or a record being partly written)
+    import multiprocessing, signal
+    class TestGlossingBible:
+        def __init__( self ): self.glosses = []
+        def setNewGenericGloss( self, normalizedWord, gloss, fullRefTuple ): self.glosses.append( ('G',normalizedWord,gloss,fullRefTuple) )
+        def setNewSpecificGloss( self, normalizedWord, gloss, fullRefTuple ): self.glosses.append( ('S',normalizedWord,gloss,fullRefTuple) )
+    def expectedGloss( n ): return 'GS'[n%2], 'מִלָּה{}'.format( n ), 'gloss {}'.format( n ), ('GEN','1',str(n),'1')
+    with tempfile.TemporaryDirectory() as testFolderPath:
+        testJournalFilepath = os.path.join( testFolderPath, 'Test.journal' )
+        for testRun in range( 10 ):
+            if os.path.exists( testJournalFilepath ): os.remove( testJournalFilepath )
+            durableCount = multiprocessing.Value( 'i', 0 )
+            writerProcess = multiprocessing.Process( target=_glossJournalTestWriter, args=(testJournalFilepath, 100_000, durableCount) )
+            writerProcess.start()
+            time.sleep( random.uniform( 0.05, 0.5 ) )
+            os.kill( writerProcess.pid, signal.SIGKILL ) # Kill it at some random point
+            writerProcess.join()
+            if random.random() < 0.5: # Also pretend that the last record was only partly written
+                with open( testJournalFilepath, 'ab' ) as journalFile: journalFile.write( '["G", "מִלָּ'.encode( 'utf-8' ) )
+            testBible, testGlossJournal = TestGlossingBible(), GlossJournal( testJournalFilepath )
+            numReplayed = testGlossJournal.replay( testBible )
+            assert numReplayed >= durableCount.value, (numReplayed, durableCount.value) # Nothing that was written can be lost
+            assert testBible.glosses == [expectedGloss( n ) for n in range( numReplayed )]
+            testGlossJournal.append( *expectedGloss( numReplayed ) ) # Check that it carries on properly after the damaged record
+            testBible2 = TestGlossingBible()
+            assert GlossJournal( testJournalFilepath ).replay( testBible2 ) == numReplayed + 1
+            assert testBible2.glosses == [expectedGloss( n ) for n in range( numReplayed+1 )]
+            testGlossJournal.compact()
+            assert GlossJournal( testJournalFilepath ).replay( TestGlossingBible() ) == 0
+            testGlossJournal.close()
+        with open( testJournalFilepath, 'ab' ) as journalFile: # Pretend that we crashed after the marker but before emptying it
+            for n in range( 3 ): journalFile.write( (json.dumps( expectedGloss( n ), ensure_ascii=False ) + '\n').encode( 'utf-8' ) )
+            journalFile.write( GLOSS_JOURNAL_COMPACTED_RECORD )
+            journalFile.write( (json.dumps( expectedGloss( 3 ), ensure_ascii=False ) + '\n').encode( 'utf-8' ) )
+        testBible = TestGlossingBible()
+        assert GlossJournal( testJournalFilepath ).replay( testBible ) == 1 and testBible.glosses == [expectedGloss( 3 )]
+        print( "Gloss journal recovered all records after {} killed writers (last run {:,} records)".format( testRun+1, numReplayed ) )
+
+    # Check that internal Bibles are shared and then freed as windows are opened and closed
+    import gc, weakref, tracemalloc
+    class TestInternalBible:
+        def __init__( self, sourceFolder ):
+            self.sourceFolder, self.sourceFilename = sourceFolder, None
+            self.abbreviation = self.name = self.encoding = None
+            self.books = bytearray( 4_000_000 ) # Pretend to be a loaded Bible
+    class TestWindow: pass
+    testRegistry = InternalBibleRegistry( maxWarmBibles=2 )
+    testBibleRefs = []
+    tracemalloc.start()
+    startMemory = tracemalloc.get_traced_memory()[0]
+    for windowSet in range( 2 ): # Open all the Bibles twice so the second time comes from the warm cache
+        testWindowsList = []
+        for j in range( 6 ):
+            testWindow1, testWindow2 = TestWindow(), TestWindow()
+            testInternalBible = TestInternalBible( 'TestBible{}'.format( j ) )
+            assert testRegistry.register( testInternalBible, testWindow1 ) is testRegistry.register( TestInternalBible( 'TestBible{}/'.format( j ) ), testWindow2 )
+            if windowSet == 0: testBibleRefs.append( weakref.ref( testInternalBible ) )
+            testWindowsList.extend( (testWindow1, testWindow2) )
+            del testInternalBible
+        gc.collect()
+        openMemory = tracemalloc.get_traced_memory()[0]
+        assert len(testRegistry) == 6
+        for testWindow in testWindowsList:
+            testRegistry.releaseWindow( testWindow )
+        del testWindowsList, testWindow, testWindow1, testWindow2
+        gc.collect()
+        closedMemory = tracemalloc.get_traced_memory()[0]
+        assert len(testRegistry)==0 and len(testRegistry.warmBibles)==2 and not testRegistry.windowBibleKeys
+        print( "Internal Bibles open {:,} bytes, after closing windows {:,} bytes".format( openMemory-startMemory, closedMemory-startMemory ) )
+    tracemalloc.stop()
+    assert [testBibleRef() is None for testBibleRef in testBibleRefs] == [True]*4 + [False]*2 # Only the warm ones are still alive
+    assert closedMemory - startMemory < 3 * 4_000_000
+
     #swnd = SaveWindowNameDialog( tkRootWindow, ["aaa","BBB","CcC"], "Test SWND" )
     #print( "swndResult", swnd.result )
     #dwnd = DeleteWindowNameDialog( tkRootWindow, ["aaa","BBB","CcC"], "Test DWND" )
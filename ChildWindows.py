@@ -32,12 +32,22 @@ Base windows to allow display and manipulation of
         #iconifyAllResources( self )
         deiconifyAll( self, childWindowType=None )
         saveAll( self )
+        isWindowShowing( self, appWin )
         updateThisBibleGroup( self, groupCode, newVerseKey, originator=None )
+        doDeferredWindowUpdate( self, appWin )
+        _queueGroupUpdate( self, groupCode, newVerseKey, updateList, originator )
+        cancelGroupUpdates( self, groupCode=None )
+        _doNextGroupUpdateStep( self )
+        schedulePrefetch( self, groupCode, newVerseKey )
+        cancelPrefetch( self )
+        _onUserInput( self, event )
+        _doNextPrefetch( self )
         updateLexicons( self, newLexiconWord )
 
     class ChildWindow( tk.Toplevel, ChildBoxAddon ) -- used in BibleWindow, BibleResourceWindow, TextWindow, HTMLWindow
         __init__( self, parentApp, genericWindowType )
         geometry( self, *args, **kwargs )
+        _onMapOrVisibility( self, event )
         _createStandardWindowKeyboardBinding( self, name, command )
         createStandardWindowKeyboardBindings( self, reset=False )
         notWrittenYet( self )
@@ -102,7 +112,7 @@ Base windows to allow display and manipulation of
         doClose( self, event=None )
 
     class FindResultWindow( tk.Toplevel ) -- used in BibleBoxAddon.doActualBibleFind
-        __init__( self, parentWindow, optionDict, resultSummaryDict, resultList, findFunction, refindFunction, replaceFunction, extendTo=None )
+        __init__( self, parentWindow, optionDict, resultSummaryDict, resultList, findFunction, refindFunction, replaceFunction, extendTo=None, resultIterator=None )
         notWrittenYet( self )
         createMenuBar( self )
         createContextMenu( self )
@@ -113,6 +123,20 @@ Base windows to allow display and manipulation of
         #setWaitStatus( self, newStatusText )
         setReadyStatus( self )
         makeTreeView( self )
+        _addDisplayRows( self )
+        _getResultRowValues( self, j )
+        _setRowPoolSize( self, numRows )
+        _checkRowPoolSize( self, event=None )
+        _refreshVisibleRows( self )
+        _scrollTo( self, topDisplayRow )
+        _onScrollbar( self, *args )
+        _onMouseWheel( self, event )
+        _onTreeviewClick( self, event )
+        _onTreeviewKey( self, event )
+        _fillTreeView( self )
+        _finishFind( self )
+        _abandonFind( self, err )
+        doCancelFind( self )
         itemSelected( self, event=None )
         doExtend( self, event=None )
         doActualExtend( self )
@@ -142,9 +166,15 @@ Base windows to allow display and manipulation of
         selectBible2( self, event=None )
         doNext( self, event=None )
         doPrevious( self, event=None )
+        _showCurrentDifference( self )
+        _enableNavigationButtons( self )
         disableButtons( self )
         checkEnables( self, finalFlag=False )
         doGoCollate( self, event=None )
+        _fillCollation( self )
+        _addDifferences( self, newDifferenceList )
+        _finishCollate( self )
+        _stopCollate( self )
         doShowInfo( self, event=None )
         doHelp( self, event=None )
         doAbout( self, event=None )
@@ -152,6 +182,7 @@ Base windows to allow display and manipulation of
         doRefresh( self )
         doRefind( self )
 
+    benchmarkFindResultWindow( tkRootWindow, numResults=100000 )
     demo()
 """
 
@@ -167,7 +198,7 @@ ProgNameVersionDate = '{} {} {}'.format( ProgNameVersion, _("last modified"), La
 debuggingThisModule = True
 
 
-import sys, os.path, logging, re
+import sys, os.path, logging, re, time
 
 import tkinter as tk
 from tkinter.scrolledtext import ScrolledText
@@ -175,7 +206,7 @@ from tkinter.scrolledtext import ScrolledText
 from tkinter.ttk import Style, Frame, Scrollbar, Label, Button, Treeview
 
 # Biblelator imports
-from BiblelatorGlobals import APP_NAME, DEFAULT, tkBREAK, \
+from BiblelatorGlobals import APP_NAME, DEFAULT, tkSTART, tkBREAK, \
                              BIBLE_GROUP_CODES, BIBLE_CONTEXT_VIEW_MODES, BIBLE_FORMAT_VIEW_MODES, \
                              parseWindowGeometry, parseWindowSize, assembleWindowGeometry, errorBeep, \
                              INITIAL_RESOURCE_SIZE, MINIMUM_RESOURCE_SIZE, MAXIMUM_RESOURCE_SIZE, \
@@ -183,14 +214,22 @@ from BiblelatorGlobals import APP_NAME, DEFAULT, tkBREAK, \
                              INITIAL_RESULT_WINDOW_SIZE, MINIMUM_RESULT_WINDOW_SIZE, MAXIMUM_RESULT_WINDOW_SIZE
 from BiblelatorSimpleDialogs import showError, showInfo
 from BiblelatorDialogs import SelectInternalBibleDialog
-from BiblelatorHelpers import mapReferenceVerseKey, mapParallelVerseKey #, mapReferencesVerseKey
+from BiblelatorHelpers import mapReferenceVerseKey, mapParallelVerseKey, predictNextVerseKeys #, mapReferencesVerseKey
 from TextBoxes import BText, BCombobox, HTMLTextBox, ChildBoxAddon, BibleBoxAddon
+from BibleFindFunctions import iterateCollatedBooks
 
 # BibleOrgSys imports
 #if __name__ == '__main__': import sys; sys.path.append( '../BibleOrgSys/' )
 import BibleOrgSysGlobals
 
 
+FIND_RESULT_INITIAL_ROWS = 20 # Number of Treeview rows made for find results before we know how many fit in the window
+FIND_RESULT_WHEEL_ROWS = 3 # Number of find result rows scrolled by each mouse wheel click
+FIND_RESULT_POLL_TIME = 0.05 # seconds spent getting search results before we update the display again
+FIND_RESULT_WAIT_DELAY = 30 # milliseconds before we check again if the next book isn't finished yet
+PREFETCH_START_DELAY = 400 # milliseconds after the last navigation before we start guessing
+
+
 
 class ChildWindows( list ):
     """
@@ -204,6 +243,18 @@ class ChildWindows( list ):
         self.ChildWindowsParent = ChildWindowsParent
         list.__init__( self )
 
+        # Used for the latest-wins (coalesced) updating of Bible groups
+        self.groupTargetVerseKeys = {} # Indexed by group code
+        self.groupUpdateQueues = {} # Indexed by group code -- lists of (phase,appWin,verseKey,originator)
+        self.groupUpdateAfterID = None
+        self.deferredWindowUpdates = {} # Indexed by window -- the latest (verseKey,originator) for hidden windows
+
+        # Used for the idle-time prefetching of verses
+        self.lastGroupVerseKeys = {} # Indexed by group code
+        self.prefetchQueue = []
+        self.prefetchAfterID = None
+        self.prefetchStarted = self.prefetchInputBound = False
+
 
     def iconifyAll( self, childWindowType=None ):
         if BibleOrgSysGlobals.debugFlag and debuggingThisModule: print( "ChildWindows.iconifyAll( {} )".format( childWindowType ) )
@@ -238,35 +289,244 @@ class ChildWindows( list ):
     #end of ChildWindows.saveAll
 
 
+    def isWindowShowing( self, appWin ):
+        """
+        Returns False if the window is withdrawn or iconified (or not yet mapped),
+            or if the window manager has told us that it's completely covered by other windows.
+        """
+        try: viewable = appWin.winfo_viewable()
+        except tk.TclError: return False # It's been destroyed
+        return bool( viewable ) and not getattr( appWin, 'isFullyObscured', False )
+    # end of ChildWindows.isWindowShowing
+
+
     def updateThisBibleGroup( self, groupCode, newVerseKey, originator=None ):
         """
         Called when we probably need to update some resource windows with a new Bible reference.
 
         Note that this new verse key is in the reference versification system.
+
+        Resource windows that can't currently be seen aren't updated at all --
+            they just remember the latest verse key until they're shown again.
         """
         if BibleOrgSysGlobals.debugFlag:
             print( "ChildWindows.updateThisBibleGroup( {}, {}, {} )".format( groupCode, newVerseKey, originator ) )
 
+        updateList = [] # Windows that can be updated later (in two phases)
+        def updateWindow( appWin, verseKey ):
+            """
+            Editors (and the window that initiated the move) are updated straight away,
+                but resource windows are only queued so that quick repeated moves can coalesce
+                (or deferred completely if they can't be seen).
+            """
+            if appWin is originator or 'Edit' in appWin.genericWindowType \
+            or not hasattr( appWin, 'prefetchVerseData' ):
+                appWin.updateShownBCV( verseKey, originator=originator )
+            elif not self.isWindowShowing( appWin ):
+                self.deferredWindowUpdates[appWin] = verseKey, originator
+            else:
+                if appWin in self.deferredWindowUpdates: del self.deferredWindowUpdates[appWin]
+                if ('Deferred',appWin) in self.groupUpdateQueues: self.cancelGroupUpdates( ('Deferred',appWin) )
+                updateList.append( (appWin,verseKey) )
+        # end of updateWindow
+
         for appWin in self:
             if 'Bible' in appWin.genericWindowType: # e.g., BibleResource, BibleEditor
                 if appWin.BCVUpdateType==DEFAULT and appWin._groupCode==groupCode:
-                    # The following line doesn't work coz it only updates ONE window
-                    #self.ChildWindowsParent.after_idle( lambda: appWin.updateShownBCV( newVerseKey ) )
-                    appWin.updateShownBCV( newVerseKey, originator=originator )
+                    updateWindow( appWin, newVerseKey )
                     #print( '  Normal', appWin._groupCode, newVerseKey, appWin.moduleID )
                 elif groupCode == BIBLE_GROUP_CODES[0]:
                     if appWin.BCVUpdateType=='ReferenceMode' and appWin._groupCode==BIBLE_GROUP_CODES[1]:
-                        appWin.updateShownBCV( mapReferenceVerseKey( newVerseKey ), originator=originator )
+                        updateWindow( appWin, mapReferenceVerseKey( newVerseKey ) )
                         #print( '  Reference', appWin._groupCode, mapReferenceVerseKey( newVerseKey ), appWin.moduleID )
                     elif appWin.BCVUpdateType=='ParallelMode' and appWin._groupCode!=BIBLE_GROUP_CODES[0]:
-                        appWin.updateShownBCV( mapParallelVerseKey( appWin._groupCode, newVerseKey ), originator=originator )
+                        updateWindow( appWin, mapParallelVerseKey( appWin._groupCode, newVerseKey ) )
                         #print( '  Parallel', appWin._groupCode, mapParallelVerseKey( appWin._groupCode, newVerseKey ), appWin.moduleID )
                     #elif appWin.BCVUpdateType=='ReferencesMode':
                         #appWin.updateShownReferences( mapReferencesVerseKey( newVerseKey ) )
                         ##print( '  Parallel', appWin._groupCode, mapParallelVerseKey( appWin._groupCode, newVerseKey ), appWin.moduleID )
+
+        self._queueGroupUpdate( groupCode, newVerseKey, updateList, originator )
+        for appWin in list( self.deferredWindowUpdates ): # Forget any windows that have been closed
+            if appWin not in self: del self.deferredWindowUpdates[appWin]
+        self.schedulePrefetch( groupCode, newVerseKey )
     # end of ChildWindows.updateThisBibleGroup
 
 
+    def doDeferredWindowUpdate( self, appWin ):
+        """
+        Called when a window is mapped (deiconified) or uncovered.
+
+        If the window missed any updates while it was hidden,
+            queue it to be rendered at its latest verse.
+        """
+        if appWin not in self.deferredWindowUpdates: return
+        verseKey, originator = self.deferredWindowUpdates.pop( appWin )
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( "ChildWindows.doDeferredWindowUpdate( {} ) now rendering {}".format( appWin.moduleID, verseKey ) )
+
+        if appWin in self: # It might have been closed in the meantime
+            self.groupUpdateQueues[('Deferred',appWin)] = [('Render',appWin,verseKey,originator)]
+            if self.groupUpdateAfterID is None:
+                self.groupUpdateAfterID = self.ChildWindowsParent.after_idle( self._doNextGroupUpdateStep )
+    # end of ChildWindows.doDeferredWindowUpdate
+
+
+    def _queueGroupUpdate( self, groupCode, newVerseKey, updateList, originator ):
+        """
+        Replaces any updates still waiting for this group with the new ones,
+            i.e., only the latest requested verse is ever fully displayed.
+
+        Each window is done in two phases:
+            firstly all the verse data is fetched (into the window caches),
+            then (if we still haven't moved on) all the windows are redrawn.
+        Each step is done in a separate idle callback so that further user input can get in first.
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( "ChildWindows._queueGroupUpdate( {}, {}, {} windows, {} )".format( groupCode, newVerseKey, len(updateList), originator ) )
+
+        self.groupTargetVerseKeys[groupCode] = newVerseKey
+        if groupCode in self.groupUpdateQueues and BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( "  Discarding {} stale update steps for group {}".format( len(self.groupUpdateQueues[groupCode]), groupCode ) )
+        if not updateList:
+            self.cancelGroupUpdates( groupCode )
+            return
+
+        updateQueue = []
+        if newVerseKey is not None: # there's nothing to fetch if we're just clearing the windows
+            for appWin,verseKey in updateList: updateQueue.append( ('Fetch',appWin,verseKey,originator) )
+        for appWin,verseKey in updateList: updateQueue.append( ('Render',appWin,verseKey,originator) )
+        self.groupUpdateQueues[groupCode] = updateQueue
+        if self.groupUpdateAfterID is None:
+            self.groupUpdateAfterID = self.ChildWindowsParent.after_idle( self._doNextGroupUpdateStep )
+    # end of ChildWindows._queueGroupUpdate
+
+
+    def cancelGroupUpdates( self, groupCode=None ):
+        """
+        Discards any outstanding window updates for the given group (or for all groups).
+        """
+        if groupCode is None: self.groupUpdateQueues = {}
+        elif groupCode in self.groupUpdateQueues: del self.groupUpdateQueues[groupCode]
+        if not self.groupUpdateQueues and self.groupUpdateAfterID is not None:
+            self.ChildWindowsParent.after_cancel( self.groupUpdateAfterID )
+            self.groupUpdateAfterID = None
+    # end of ChildWindows.cancelGroupUpdates
+
+
+    def _doNextGroupUpdateStep( self ):
+        """
+        Do one fetch or render step for one of the groups waiting to be updated
+            and then reschedule ourself for the next time the program is idle.
+        """
+        self.groupUpdateAfterID = None
+        if not self.groupUpdateQueues: return
+
+        groupCode = next( iter( self.groupUpdateQueues ) )
+        updateQueue = self.groupUpdateQueues[groupCode]
+        phase, appWin, verseKey, originator = updateQueue.pop( 0 )
+        if not updateQueue: del self.groupUpdateQueues[groupCode]
+        else: # Move this group to the end so that the groups take turns
+            self.groupUpdateQueues[groupCode] = self.groupUpdateQueues.pop( groupCode )
+
+        try:
+            if appWin in self: # It might have been closed in the meantime
+                if phase == 'Fetch':
+                    try: appWin.prefetchVerseData( verseKey )
+                    except Exception as err: # It'll be tried again (and reported properly) when we render
+                        logging.error( "ChildWindows._doNextGroupUpdateStep fetch failed for {} {}: {}".format( appWin.moduleID, verseKey, err ) )
+                else: appWin.updateShownBCV( verseKey, originator=originator )
+        finally: # Even if one window failed to redraw, the other windows (and groups) still need updating
+            if self.groupUpdateQueues and self.groupUpdateAfterID is None:
+                self.groupUpdateAfterID = self.ChildWindowsParent.after_idle( self._doNextGroupUpdateStep )
+    # end of ChildWindows._doNextGroupUpdateStep
+
+
+    def schedulePrefetch( self, groupCode, newVerseKey ):
+        """
+        Guess where the user might go next (from where they came from)
+            and queue up those verses to be fetched into the verse caches
+            of all the windows in this group while the program is idle.
+
+        Any previously queued prefetching is discarded.
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( "ChildWindows.schedulePrefetch( {}, {} )".format( groupCode, newVerseKey ) )
+
+        self.cancelPrefetch()
+        previousVerseKey = self.lastGroupVerseKeys.get( groupCode )
+        self.lastGroupVerseKeys[groupCode] = newVerseKey
+        if newVerseKey is None: return
+
+        app = self.ChildWindowsParent
+        predictedVerseKeys = predictNextVerseKeys( newVerseKey, previousVerseKey, app.getNumChapters, app.getNumVerses )
+        for predictedVerseKey in predictedVerseKeys: # Do the most likely verse in every window first
+            for appWin in self:
+                if 'Bible' in appWin.genericWindowType \
+                and appWin.BCVUpdateType==DEFAULT and appWin._groupCode==groupCode \
+                and hasattr( appWin, 'prefetchVerseData' ):
+                    self.prefetchQueue.append( (appWin,predictedVerseKey) )
+        if not self.prefetchQueue: return
+
+        if not self.prefetchInputBound: # Any user input stops the prefetching
+            app.bind_all( '<Key>', self._onUserInput, add='+' )
+            app.bind_all( '<Button>', self._onUserInput, add='+' )
+            self.prefetchInputBound = True
+        self.prefetchAfterID = app.after( PREFETCH_START_DELAY, self._doNextPrefetch )
+    # end of ChildWindows.schedulePrefetch
+
+
+    def cancelPrefetch( self ):
+        """
+        Discards any outstanding prefetch requests.
+        """
+        #if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            #print( "ChildWindows.cancelPrefetch() with {} queued".format( len(self.prefetchQueue) ) )
+
+        self.prefetchQueue = []
+        self.prefetchStarted = False
+        if self.prefetchAfterID is not None:
+            self.ChildWindowsParent.after_cancel( self.prefetchAfterID )
+            self.prefetchAfterID = None
+    # end of ChildWindows.cancelPrefetch
+
+
+    def _onUserInput( self, event ):
+        """
+        Called (after any other bindings) for every key press or mouse click.
+
+        If we've already started prefetching, stop now so that we don't slow down the user.
+            (If the input caused a new navigation, the prefetch has just been rescheduled
+                but hasn't started yet, so we leave it alone.)
+        """
+        if self.prefetchStarted: self.cancelPrefetch()
+    # end of ChildWindows._onUserInput
+
+
+    def _doNextPrefetch( self ):
+        """
+        Fetch one of the queued verses into its window's cache
+            and then reschedule ourself for the next time the program is idle.
+
+        Doing only one verse at a time lets any user input get handled first.
+        """
+        self.prefetchAfterID = None
+        if not self.prefetchQueue: return
+        if self.groupUpdateQueues: # Don't get in the way of displaying the current verse
+            self.prefetchAfterID = self.ChildWindowsParent.after( PREFETCH_START_DELAY, self._doNextPrefetch )
+            return
+
+        self.prefetchStarted = True
+        appWin, verseKey = self.prefetchQueue.pop( 0 )
+        if appWin in self: # It might have been closed in the meantime
+            try: appWin.prefetchVerseData( verseKey )
+            except Exception as err: # Prefetching is only a guess so never let it break anything
+                logging.error( "ChildWindows._doNextPrefetch failed for {} {}: {}".format( appWin.moduleID, verseKey, err ) )
+        if self.prefetchQueue:
+            self.prefetchAfterID = self.ChildWindowsParent.after_idle( self._doNextPrefetch )
+    # end of ChildWindows._doNextPrefetch
+
+
     def updateLexicons( self, newLexiconWord ):
         """
         Called when we probably need to update some resource windows with a new word.
@@ -309,6 +569,11 @@ class ChildWindow( tk.Toplevel, ChildBoxAddon ):
         self.minsize( *parseWindowSize( self.minimumSize ) )
         self.maxsize( *parseWindowSize( self.maximumSize ) )
 
+        # Keep track of whether we can be seen (so hidden windows don't waste time being redrawn)
+        self.isFullyObscured = False
+        self.bind( '<Map>', self._onMapOrVisibility, add='+' )
+        self.bind( '<Visibility>', self._onMapOrVisibility, add='+' )
+
         # Allow child windows to have an optional status bar
         self._showStatusBarVar = tk.BooleanVar()
         self._showStatusBarVar.set( False ) # defaults to off
@@ -369,6 +634,21 @@ class ChildWindow( tk.Toplevel, ChildBoxAddon ):
     # end of ChildWindow.geometry
 
 
+    def _onMapOrVisibility( self, event ):
+        """
+        Called when this window is mapped (e.g., deiconified)
+            or when its visibility changes (e.g., it gets covered or raised).
+
+        Note that the Toplevel bindings also get the events for all the child widgets.
+        """
+        if event.widget is not self: return
+        if event.type == tk.EventType.Visibility:
+            self.isFullyObscured = event.state == 'VisibilityFullyObscured'
+        if not self.isFullyObscured:
+            self.parentApp.childWindows.doDeferredWindowUpdate( self )
+    # end of ChildWindow._onMapOrVisibility
+
+
     def _createStandardWindowKeyboardBinding( self, name, command ):
         """
         Called from createStandardKeyboardBindings to do the actual work.
@@ -640,6 +920,9 @@ class ChildWindow( tk.Toplevel, ChildBoxAddon ):
         if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
             print( _("ChildWindow.doClose( {} ) for {}").format( event, self.genericWindowType ) )
 
+        try: internalBibles = self.parentApp.internalBibles
+        except AttributeError: internalBibles = None # Not all apps keep a list of internal Bibles
+        if internalBibles is not None: internalBibles.releaseWindow( self ) # Let go of any internal Bibles that we were using
         if self in self.parentApp.childWindows:
             self.parentApp.childWindows.remove( self )
             self.destroy()
@@ -1616,7 +1899,7 @@ class FindResultWindow( tk.Toplevel ):
     """
     Displays the find results.
     """
-    def __init__( self, parentWindow, optionDict, resultSummaryDict, resultList, findFunction, refindFunction, replaceFunction, extendTo=None ):
+    def __init__( self, parentWindow, optionDict, resultSummaryDict, resultList, findFunction, refindFunction, replaceFunction, extendTo=None, resultIterator=None ):
         """
         optionDict is the dictionary of options that were given to the find function.
         resultSummaryDict is the dictionary containing summary entries (counts) for each Bible book.
@@ -1628,16 +1911,23 @@ class FindResultWindow( tk.Toplevel ):
                 SimpleVerseKey, marker (none if v~), contextBefore, foundWordForm, contextAfter
         findFunction is the function that was called to create this window
             (which is used to refresh the window)
+        resultIterator (if given) is a generator (like BibleFindFunctions.iterateFindTextByBooks with waitFlag=False)
+            still doing the search, which yields 2-tuples (BBB, bookResultList), or None if it's still busy.
+            In this case, the window is displayed straight away (with resultList probably empty)
+                and the results are added as they come in (and resultSummaryDict gets filled in by the iterator).
         """
         if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
-            print( _("FindResultWindow.__init__( {}, {}, {}, {} )").format( parentWindow, optionDict, resultSummaryDict, len(resultList) ) )
+            print( _("FindResultWindow.__init__( {}, {}, {}, {}, {} )").format( parentWindow, optionDict, resultSummaryDict, len(resultList), resultIterator ) )
             assert parentWindow
             assert optionDict and isinstance( optionDict, dict )
-            assert resultSummaryDict and isinstance( resultSummaryDict, dict )
-            assert resultList and isinstance( resultList, list )
+            assert isinstance( resultSummaryDict, dict )
+            assert isinstance( resultList, list )
+            assert resultList or resultIterator is not None
 
         self.parentWindow, self.optionDict, self.resultSummaryDict, self.resultList, self.findFunction, self.refindFunction, self.replaceFunction, self.extendedTo = \
             parentWindow, optionDict, resultSummaryDict, resultList, findFunction, refindFunction, replaceFunction, extendTo
+        self.resultIterator, self.fillAfterID, self.numInsertedResults, self.lastInsertedBBB = resultIterator, None, 0, None
+        self.displayRows, self.topDisplayRow, self.selectedDisplayRow, self.extendCache = [], 0, None, {}
         self.parentApp = self.parentWindow.parentApp
         tk.Toplevel.__init__( self, self.parentWindow )
         self.protocol( 'WM_DELETE_WINDOW', self.doClose )
@@ -1681,9 +1971,9 @@ class FindResultWindow( tk.Toplevel ):
         #modeCb.pack( in_=top, side=tk.LEFT )
         modeCb.grid( in_=top, row=0, column=0, padx=20, pady=5, sticky=tk.W )
 
-        infoLabel = Label( self, text='( {:,} entries for {!r} )'.format( len(self.resultList), self.optionDict['findText'] ) )
+        self.infoLabel = Label( self, text='( {:,} entries for {!r} )'.format( len(self.resultList), self.optionDict['findText'] ) )
         #infoLabel.pack( in_=top, side=tk.TOP, anchor=tk0.CENTER, padx=2, pady=2 )
-        infoLabel.grid( in_=top, row=0, column=1, padx=2, pady=5 )
+        self.infoLabel.grid( in_=top, row=0, column=1, padx=2, pady=5 )
 
         if len(self.availableInternalBibles) == 1:
             extendText = _(" to {}").format( self.availableInternalBibles[0].getAName() )
@@ -1713,6 +2003,11 @@ class FindResultWindow( tk.Toplevel ):
         #closeButton.pack( in_=top, side=tk.RIGHT, padx=2, pady=2 )
         closeButton.grid( in_=top, row=1, column=3, padx=5, pady=5, sticky=tk.E )
 
+        self.cancelButton = Button( self, text=_('Cancel'), command=self.doCancelFind )
+        self.cancelButton.grid( in_=top, row=0, column=3, padx=5, pady=5, sticky=tk.E )
+        if self.resultIterator is None: self.cancelButton.configure( state=tk.DISABLED )
+        else: self.infoLabel.configure( text=_("( Searching for {!r}… )").format( self.optionDict['findText'] ) )
+
         # Create a scroll bar to fill the right-hand side of the window
         self.vScrollbar = Scrollbar( self )
         self.vScrollbar.pack( side=tk.RIGHT, fill=tk.Y )
@@ -1912,7 +2207,12 @@ class FindResultWindow( tk.Toplevel ):
 
     def makeTreeView( self ):
         """
-        Make the search result TreeView and fill it with our result list.
+        Make the search result TreeView and start filling it with our result list
+            (see _fillTreeView below).
+
+        The Treeview is virtual, i.e., it only has enough rows to fill the window
+            and they're refilled as the user scrolls (see _refreshVisibleRows),
+            so it's fast even with hundreds of thousands of results.
 
         First entry of self.result list is a dictionary containing the search parameters.
 
@@ -1925,15 +2225,17 @@ class FindResultWindow( tk.Toplevel ):
         """
         if BibleOrgSysGlobals.debugFlag:
             if debuggingThisModule: print( _("FindResultWindow.makeTreeView()") )
-            assert self.resultList
+            assert self.resultList or self.resultIterator is not None
 
         self.lineMode = not self.modeVar.get()
 
         try: self.findResultsTreeview.destroy(); del self.findResultsTreeview
         except AttributeError: pass # it may not have existed yet
-        self.findResultsTreeview = Treeview( self, yscrollcommand=self.vScrollbar.set )
+        # NOTE: The Treeview only has enough rows to fill the window (see _checkRowPoolSize)
+        #   and we change what they display as we scroll (so we do the scrollbar ourselves)
+        self.findResultsTreeview = Treeview( self, selectmode=tk.BROWSE )
         self.findResultsTreeview.pack( expand=tk.YES, fill=tk.BOTH )
-        self.vScrollbar.configure( command=self.findResultsTreeview.yview ) # link the scrollbar to the text box
+        self.vScrollbar.configure( command=self._onScrollbar )
 
         fText = self.optionDict['findText']
         lenFText = len( fText )
@@ -1966,37 +2268,280 @@ class FindResultWindow( tk.Toplevel ):
             extendName = self.extendedTo.abbreviation if self.extendedTo.abbreviation else self.extendedTo.name
             self.findResultsTreeview.heading( 'extend', text=extendName )
 
-        lastBBB = None
-        for j,resultEntry in enumerate(self.resultList):
-            if len(resultEntry) == 5:
-                ref,marker,before,fText,after = resultEntry
-            elif len(resultEntry) == 4:
-                ref,marker,before,after = resultEntry
-            else: halt # programming error
-            BBB,C,V = ref.getBCV()
+        self.findResultsTreeview.tag_bind( 'BCV', '<Double-Button-1>', self.itemSelected )
+        self.findResultsTreeview.bind( '<Configure>', self._checkRowPoolSize )
+        self.findResultsTreeview.bind( '<Button-1>', self._onTreeviewClick )
+        for eventName in ( '<MouseWheel>', '<Button-4>', '<Button-5>' ):
+            self.findResultsTreeview.bind( eventName, self._onMouseWheel )
+        for eventName in ( '<Up>', '<Down>', '<Prior>', '<Next>', '<Home>', '<End>' ):
+            self.findResultsTreeview.bind( eventName, self._onTreeviewKey )
+        self.findResultsTreeview.bind( '<Return>', self.itemSelected )
+
+        self.rowIDs = []
+        self._setRowPoolSize( FIND_RESULT_INITIAL_ROWS )
+
+        # Now (re)display the results
+        if self.fillAfterID is not None: self.after_cancel( self.fillAfterID )
+        self.fillAfterID = self.after( 1, self._fillTreeView ) # Not straight away, as our caller hasn't finished with us yet
+    # end of FindResultWindow.makeTreeView
+
+
+    def _addDisplayRows( self ):
+        """
+        Adds any new results to our list of display rows
+            (which contains BBB strings for the book headings and result indexes for the results).
+
+        This is quick even for huge numbers of results, because no Treeview rows are made here.
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( _("FindResultWindow._addDisplayRows() from {} to {}").format( self.numInsertedResults, len(self.resultList) ) )
+
+        lastBBB = self.lastInsertedBBB
+        for j in range( self.numInsertedResults, len(self.resultList) ):
+            BBB = self.resultList[j][0].getBBB()
             if BBB != lastBBB: # display a new book heading
-                self.findResultsTreeview.insert( '', 'end', BBB, text=BBB, open=True)
+                self.displayRows.append( BBB )
                 lastBBB = BBB
-            # Now insert each reference under the BBB entry
-            if self.extendedTo is None:
-                if self.lineMode:
-                    self.findResultsTreeview.insert( BBB, 'end', j, tags='BCV',
-                        values=('{} {}:{}'.format(BBB,C,V), marker if marker else '', before+fText+after) )
-                else: # column mode
-                    self.findResultsTreeview.insert( BBB, 'end', j, tags='BCV',
-                        values=('{} {}:{}'.format(BBB,C,V), marker if marker else '', before, fText, after) )
-            else: # we have extended the results to display a second version
+            self.displayRows.append( j )
+        self.numInsertedResults, self.lastInsertedBBB = len(self.resultList), lastBBB
+    # end of FindResultWindow._addDisplayRows
+
+
+    def _getResultRowValues( self, j ):
+        """
+        Returns the Treeview column values for result number j.
+
+        If we're extended, the verse text of the other version is only fetched now
+            (i.e., when the row is first scrolled into view) and then remembered.
+        """
+        resultEntry = self.resultList[j]
+        if len(resultEntry) == 5:
+            ref,marker,before,fText,after = resultEntry
+        elif len(resultEntry) == 4:
+            ref,marker,before,after = resultEntry
+            fText = self.optionDict['findText']
+        else: halt # programming error
+        BBB,C,V = ref.getBCV()
+        if self.lineMode:
+            values = ['{} {}:{}'.format(BBB,C,V), marker if marker else '', before+fText+after]
+        else: # column mode
+            values = ['{} {}:{}'.format(BBB,C,V), marker if marker else '', before, fText, after]
+        if self.extendedTo is not None: # we have extended the results to display a second version
+            try: extend = self.extendCache[j]
+            except KeyError:
                 try: extend = self.extendedTo.getVerseText( ref )
                 except KeyError: extend = '' # couldn't find that CV reference
-                if self.lineMode:
-                    self.findResultsTreeview.insert( BBB, 'end', j, tags='BCV',
-                        values=('{} {}:{}'.format(BBB,C,V), marker if marker else '', before+fText+after, extend) )
-                else: # column mode
-                    self.findResultsTreeview.insert( BBB, 'end', j, tags='BCV',
-                        values=('{} {}:{}'.format(BBB,C,V), marker if marker else '', before, fText, after, extend) )
+                self.extendCache[j] = extend
+            values.append( extend )
+        return values
+    # end of FindResultWindow._getResultRowValues
 
-        self.findResultsTreeview.tag_bind( 'BCV', '<Double-Button-1>', self.itemSelected )
-    # end of FindResultWindow.makeTreeView
+
+    def _setRowPoolSize( self, numRows ):
+        """
+        Adds or deletes Treeview rows so that there's numRows of them.
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( _("FindResultWindow._setRowPoolSize( {} ) from {}").format( numRows, len(self.rowIDs) ) )
+
+        while len(self.rowIDs) < numRows:
+            self.rowIDs.append( self.findResultsTreeview.insert( '', tk.END, text='' ) )
+        while len(self.rowIDs) > numRows:
+            self.findResultsTreeview.delete( self.rowIDs.pop() )
+        self._refreshVisibleRows()
+    # end of FindResultWindow._setRowPoolSize
+
+
+    def _checkRowPoolSize( self, event=None ):
+        """
+        Called when the Treeview changes size
+            to make sure that we have just enough rows to fill it.
+        """
+        if not self.winfo_exists(): return # We've been closed
+        rowBox = self.findResultsTreeview.bbox( self.rowIDs[0] ) if self.rowIDs else None
+        if not rowBox: # the rows aren't drawn yet
+            if self.findResultsTreeview.winfo_ismapped(): self.after( 100, self._checkRowPoolSize )
+            return
+        headingHeight, rowHeight = rowBox[1], rowBox[3]
+        numRows = max( 1, (self.findResultsTreeview.winfo_height() - headingHeight) // rowHeight )
+        if numRows != len(self.rowIDs): self._setRowPoolSize( numRows )
+    # end of FindResultWindow._checkRowPoolSize
+
+
+    def _refreshVisibleRows( self ):
+        """
+        Makes the Treeview rows display the part of the result list that we're scrolled to
+            and updates the scrollbar to match.
+        """
+        numDisplayRows, numRows = len(self.displayRows), len(self.rowIDs)
+        self.topDisplayRow = max( 0, min( self.topDisplayRow, numDisplayRows - numRows ) )
+        selectedRowID = None
+        for k,rowID in enumerate( self.rowIDs ):
+            n = self.topDisplayRow + k
+            if n >= numDisplayRows: self.findResultsTreeview.item( rowID, text='', values=(), tags=() )
+            elif isinstance( self.displayRows[n], str ): # it's a book heading
+                self.findResultsTreeview.item( rowID, text=self.displayRows[n], values=(), tags=('BBB',) )
+            else: self.findResultsTreeview.item( rowID, text='', values=self._getResultRowValues( self.displayRows[n] ), tags=('BCV',) )
+            if n == self.selectedDisplayRow: selectedRowID = rowID
+        if selectedRowID is None: self.findResultsTreeview.selection_set( () )
+        else:
+            self.findResultsTreeview.selection_set( selectedRowID )
+            self.findResultsTreeview.focus( selectedRowID )
+        if numDisplayRows: self.vScrollbar.set( self.topDisplayRow / numDisplayRows, min( 1.0, (self.topDisplayRow+numRows) / numDisplayRows ) )
+        else: self.vScrollbar.set( 0.0, 1.0 )
+    # end of FindResultWindow._refreshVisibleRows
+
+
+    def _scrollTo( self, topDisplayRow ):
+        """
+        Scroll so that the given display row is at the top of the Treeview.
+        """
+        if topDisplayRow != self.topDisplayRow:
+            self.topDisplayRow = topDisplayRow
+            self._refreshVisibleRows()
+    # end of FindResultWindow._scrollTo
+
+
+    def _onScrollbar( self, *args ):
+        """
+        Called by the scrollbar with ( 'moveto', fraction ) or ( 'scroll', number, 'units' or 'pages' ).
+        """
+        if args[0] == 'moveto':
+            self._scrollTo( max( 0, int( float(args[1]) * len(self.displayRows) ) ) )
+        elif args[0] == 'scroll':
+            amount = int( args[1] ) * ( max( 1, len(self.rowIDs)-1 ) if args[2] == 'pages' else 1 )
+            self._scrollTo( max( 0, self.topDisplayRow + amount ) )
+    # end of FindResultWindow._onScrollbar
+
+
+    def _onMouseWheel( self, event ):
+        """
+        Scroll the Treeview rows (Linux gives Button-4/5 events, Windows and Mac give MouseWheel events).
+        """
+        if event.num == 4 or event.delta > 0: amount = -FIND_RESULT_WHEEL_ROWS
+        else: amount = FIND_RESULT_WHEEL_ROWS
+        self._scrollTo( max( 0, self.topDisplayRow + amount ) )
+        return tkBREAK
+    # end of FindResultWindow._onMouseWheel
+
+
+    def _onTreeviewClick( self, event ):
+        """
+        Remember which display row they clicked on
+            (since the Treeview row will display something else if they scroll).
+        """
+        rowID = self.findResultsTreeview.identify_row( event.y )
+        if rowID in self.rowIDs:
+            n = self.topDisplayRow + self.rowIDs.index( rowID )
+            self.selectedDisplayRow = n if n < len(self.displayRows) else None
+    # end of FindResultWindow._onTreeviewClick
+
+
+    def _onTreeviewKey( self, event ):
+        """
+        Move the selection up or down (scrolling the Treeview rows as necessary).
+        """
+        numDisplayRows, numRows = len(self.displayRows), len(self.rowIDs)
+        if not numDisplayRows: return tkBREAK
+        n = self.topDisplayRow if self.selectedDisplayRow is None else self.selectedDisplayRow
+        if event.keysym == 'Up': n -= 1
+        elif event.keysym == 'Down': n += 1
+        elif event.keysym == 'Prior': n -= max( 1, numRows-1 )
+        elif event.keysym == 'Next': n += max( 1, numRows-1 )
+        elif event.keysym == 'Home': n = 0
+        elif event.keysym == 'End': n = numDisplayRows - 1
+        self.selectedDisplayRow = n = max( 0, min( n, numDisplayRows-1 ) )
+        if n < self.topDisplayRow: self.topDisplayRow = n
+        elif n >= self.topDisplayRow + numRows: self.topDisplayRow = n - numRows + 1
+        self._refreshVisibleRows()
+        return tkBREAK
+    # end of FindResultWindow._onTreeviewKey
+
+
+    def _fillTreeView( self ):
+        """
+        Gets any more results from the search (if it's still going)
+            and updates the display.
+
+        Keeps rescheduling itself (using the Tk after function)
+            until the search is finished.
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( _("FindResultWindow._fillTreeView() {}/{}").format( self.numInsertedResults, len(self.resultList) ) )
+        self.fillAfterID = None
+
+        if self.resultIterator is not None: # the search is still going
+            startTime = time.monotonic()
+            while time.monotonic() - startTime < FIND_RESULT_POLL_TIME:
+                try: bookResults = next( self.resultIterator )
+                except StopIteration: self._finishFind(); break
+                except TimeoutError as err: self._abandonFind( err ); break # e.g., a runaway regular expression
+                except Exception as err: # Could be anything from the Bible class while loading the books
+                    logging.error( _("FindResultWindow._fillTreeView: Unable to search the Bible: {}").format( err ) )
+                    self._abandonFind( err ); break
+                if bookResults is None: break # the next book isn't finished yet
+                self.resultList.extend( bookResults[1] )
+            if not self.winfo_exists(): return # We were closed (because nothing was found)
+
+        if self.numInsertedResults < len(self.resultList): self._addDisplayRows()
+        self._refreshVisibleRows()
+        if self.resultIterator is not None:
+            self.infoLabel.configure( text=_("( {:,} entries so far for {!r}… )").format( len(self.resultList), self.optionDict['findText'] ) )
+            self.fillAfterID = self.after( FIND_RESULT_WAIT_DELAY, self._fillTreeView )
+    # end of FindResultWindow._fillTreeView
+
+
+    def _finishFind( self ):
+        """
+        Called when the search iterator has finished.
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( _("FindResultWindow._finishFind() with {} results").format( len(self.resultList) ) )
+
+        self.resultIterator = None
+        self.cancelButton.configure( state=tk.DISABLED )
+        self.infoLabel.configure( text='( {:,} entries for {!r} )'.format( len(self.resultList), self.optionDict['findText'] ) )
+        if not self.resultList: # nothing found
+            self.doClose()
+            errorBeep()
+            key = self.optionDict['findText']
+            showError( self.parentWindow, APP_NAME, _("String {!r} not found").format( key if len(key)<20 else (key[:18]+'…') ) )
+    # end of FindResultWindow._finishFind
+
+
+    def _abandonFind( self, err ):
+        """
+        Called when the search iterator gave up (because a regular expression search took too long or killed its worker process)
+            or failed (e.g., while loading the books).
+
+        Leaves any results so far displayed.
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( _("FindResultWindow._abandonFind( {} ) with {} results").format( err, len(self.resultList) ) )
+
+        self.resultIterator = None
+        self.cancelButton.configure( state=tk.DISABLED )
+        self.infoLabel.configure( text=_("( {:,} entries for {!r} -- search stopped )").format( len(self.resultList), self.optionDict['findText'] ) )
+        errorBeep()
+        if isinstance( err, TimeoutError ):
+            showError( self, APP_NAME, _("{}\nso the search was stopped.\n\nPlease try a simpler regular expression.").format( err ) )
+        else: showError( self, APP_NAME, _("Unable to search the Bible: {}\n\nThe search was stopped.").format( err ) )
+    # end of FindResultWindow._abandonFind
+
+
+    def doCancelFind( self ):
+        """
+        Stop the search (if it's still going) but leave the results so far displayed.
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( _("FindResultWindow.doCancelFind()") )
+
+        if self.resultIterator is not None:
+            self.resultIterator.close() # Cancels any book searches that haven't started yet
+            self.resultIterator = None
+            self.cancelButton.configure( state=tk.DISABLED )
+            self.infoLabel.configure( text=_("( {:,} entries for {!r} -- search cancelled )").format( len(self.resultList), self.optionDict['findText'] ) )
+    # end of FindResultWindow.doCancelFind
 
 
     def itemSelected( self, event=None ):
@@ -2009,10 +2554,10 @@ class FindResultWindow( tk.Toplevel ):
             #print( dir(event) )
             #print( self.findResultsTreeview.focus() )
 
-        j = self.findResultsTreeview.focus()
-        #print( "j", repr(j) )
-        if j == 'I001': j=0 # Not sure why this is happening for the first entry???
-        ref = self.resultList[int(j)][0] # Add one to skip past the optionDict which is the first results item
+        if self.selectedDisplayRow is None: return # The Button-1 binding sets this (before the double-click)
+        j = self.displayRows[self.selectedDisplayRow]
+        if isinstance( j, str ): return # it's a book heading
+        ref = self.resultList[j][0]
         BBB,C,V = ref.getBCV()
         #print( 'itemSelected', j, ref, BBB, C, V )
         self.parentApp.gotoBCV( BBB, C, V )
@@ -2052,7 +2597,8 @@ class FindResultWindow( tk.Toplevel ):
         #print( "doExtend", self.geometry(), INITIAL_RESULT_WINDOW_SIZE )
         width, height, xOffset, yOffset = parseWindowGeometry( self.geometry() )
         self.geometry( assembleWindowGeometry( int(width*1.3), height, xOffset, yOffset ) ) # Make window widen
-        self.makeTreeView() # Redisplay everything
+        self.extendCache = {}
+        self.makeTreeView() # Redisplay everything (which only gets the extended verse texts as they're displayed)
         self.parentApp.setReadyStatus()
     # end of FindResultWindow.doActualExtend
 
@@ -2139,6 +2685,12 @@ class FindResultWindow( tk.Toplevel ):
         if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
             print( _("FindResultWindow.doClose( {} )").format( event ) )
 
+        if self.resultIterator is not None:
+            self.resultIterator.close() # Stop the search
+            self.resultIterator = None
+        if self.fillAfterID is not None:
+            self.after_cancel( self.fillAfterID )
+            self.fillAfterID = None
         try: cWs = self.parentWindow.parentApp.childWindows
         except AttributeError: cWs = self.parentApp.childWindows
         if self in cWs:
@@ -2484,6 +3036,16 @@ class CollateProjectsWindow( tk.Toplevel ):
         #self.textBox2.grid( row=2, column=0, columnspan=2, padx=2, pady=2, sticky=tk.W )
         self.vScrollbar2.configure( command=self.textBox2.yview ) # link the scrollbar to the text box
 
+        for textBox in ( self.textBox1, self.textBox2 ):
+            textBox.tag_configure( 'reference', font='helvetica 8 bold' )
+            textBox.tag_configure( 'notFound', background='pink' )
+            textBox.tag_configure( 'markersDiffer', background='yellow3' )
+            textBox.tag_configure( 'currentDifference', background='lightblue' )
+            textBox.tag_raise( tk.SEL )
+
+        self.collateIterator = self.fillAfterID = None
+        self.differenceList, self.currentDifferenceIndex = [], None # Each difference is one line in each text box
+
         self.createStandardWindowKeyboardBindings()
     # end of CollateProjectsWindow.__init__
 
@@ -2770,6 +3332,10 @@ class CollateProjectsWindow( tk.Toplevel ):
         if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
             print( _("CollateProjectsWindow.doNext( {} )").format( event ) )
 
+        if self.currentDifferenceIndex is None: self.currentDifferenceIndex = 0
+        elif self.currentDifferenceIndex < len(self.differenceList) - 1: self.currentDifferenceIndex += 1
+        else: errorBeep(); return
+        self._showCurrentDifference()
     # end of CollateProjectsWindow.doNext
 
     def doPrevious( self, event=None ):
@@ -2779,9 +3345,42 @@ class CollateProjectsWindow( tk.Toplevel ):
         if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
             print( _("CollateProjectsWindow.doPrevious( {} )").format( event ) )
 
+        if self.currentDifferenceIndex: self.currentDifferenceIndex -= 1
+        else: errorBeep(); return
+        self._showCurrentDifference()
     # end of CollateProjectsWindow.doPrevious
 
 
+    def _showCurrentDifference( self ):
+        """
+        Highlights the current difference in both text boxes
+            and goes to that verse (if Auto Goto is set).
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( _("CollateProjectsWindow._showCurrentDifference() {}").format( self.currentDifferenceIndex ) )
+
+        lineIndex = '{}.0'.format( self.currentDifferenceIndex + 1 )
+        for textBox in ( self.textBox1, self.textBox2 ):
+            textBox.tag_remove( 'currentDifference', tkSTART, tk.END )
+            textBox.tag_add( 'currentDifference', lineIndex, lineIndex+' lineend' )
+            textBox.see( lineIndex )
+        self._enableNavigationButtons()
+        if self.autoGotoVar.get():
+            BBB, C, V = self.differenceList[self.currentDifferenceIndex][:3]
+            self.parentApp.gotoBCV( BBB, C, V )
+    # end of CollateProjectsWindow._showCurrentDifference
+
+
+    def _enableNavigationButtons( self ):
+        """
+        Enables the Previous and Next buttons if there's somewhere to go.
+        """
+        self.previousButton.configure( state=tk.NORMAL if self.currentDifferenceIndex else tk.DISABLED )
+        self.nextButton.configure( state=tk.NORMAL if self.differenceList
+                        and ( self.currentDifferenceIndex is None or self.currentDifferenceIndex < len(self.differenceList) - 1 ) else tk.DISABLED )
+    # end of CollateProjectsWindow._enableNavigationButtons
+
+
     def disableButtons( self ):
         """
         Disable all buttons.
@@ -2843,50 +3442,120 @@ class CollateProjectsWindow( tk.Toplevel ):
     def doGoCollate( self, event=None ):
         """
         Process Go button.
+
+        The books of the two Bibles are loaded at the same time (see BibleFindFunctions.iterateCollatedBooks)
+            and the verses where the two search strings don't both match are added to the text boxes
+            as each book is collated.
         """
         if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
             print( _("CollateProjectsWindow.doGoCollate( {} )").format( event ) )
 
+        self._stopCollate() # In case we're already going
+        self.disableButtons()
+
         # Prepare the final parameters
         self.optionsDict1['bookList'] = self.BBB if self.thisBookOnlyVar.get() else 'ALL'
         self.optionsDict2['bookList'] = self.optionsDict1['bookList']
 
-        # Prepare the appropriate internal Bibles
-        self.parentApp.setWaitStatus( _("Preparing internal Bible1…") )
-        if self.optionsDict1['bookList'] == 'ALL':
-            self.parentApp.setWaitStatus( _("Loading/Preparing internal Bible1…") )
-            self.internalBible1.load()
-        else:
-            self.parentApp.setWaitStatus( _("Loading/Preparing internal Bible1 book…") )
-            self.internalBible1.loadBook( self.optionsDict1['bookList'] )
-        self.parentApp.setWaitStatus( _("Preparing internal Bible2…") )
-        if self.optionsDict2['bookList'] == 'ALL':
-            self.parentApp.setWaitStatus( _("Loading/Preparing internal Bible2…") )
-            self.internalBible2.load()
-        else:
-            self.parentApp.setWaitStatus( _("Loading/Preparing internal Bible2 book…") )
-            self.internalBible2.loadBook( self.optionsDict2['bookList'] )
-
-        # Do the finds
-        self.optionsDict1, resultSummaryDict1, findResultList1 = self.optionsDict1['givenBible'].findText( self.optionsDict1 )
-        print( "Got findResultList1", findResultList1 )
-        if len(findResultList1) == 0: # nothing found
-            errorBeep()
-            key = self.optionsDict1['findText']
-            showError( self, APP_NAME, _("String {!r} not found").format( key if len(key)<20 else (key[:18]+'…') ) )
-            self.disableButtons()
-            return
-        self.optionsDict2, resultSummaryDict2, findResultList2 = self.optionsDict2['givenBible'].findText( self.optionsDict2 )
-        print( "Got findResultList2", findResultList2 )
-        if len(findResultList2) == 0: # nothing found
-            errorBeep()
-            key = self.optionsDict2['findText']
-            showError( self, APP_NAME, _("String {!r} not found").format( key if len(key)<20 else (key[:28]+'…') ) )
-            self.disableButtons()
-            return
+        self.differenceList, self.currentDifferenceIndex = [], None
+        for textBox in ( self.textBox1, self.textBox2 ):
+            textBox.configure( state=tk.NORMAL )
+            textBox.delete( tkSTART, tk.END )
+            textBox.configure( state=tk.DISABLED )
+        self.setStatus( _("Loading and collating…") )
+        self.collateIterator = iterateCollatedBooks( self.optionsDict1, self.optionsDict2, self.markersMatchVar.get(), waitFlag=False )
+        self.fillAfterID = self.after( 1, self._fillCollation )
     # end of CollateProjectsWindow.doGoCollate
 
 
+    def _fillCollation( self ):
+        """
+        Gets the differences for any more books that have been collated
+            and adds them to the text boxes.
+
+        Keeps rescheduling itself (using the Tk after function)
+            until the collation is finished.
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( _("CollateProjectsWindow._fillCollation() {}").format( len(self.differenceList) ) )
+        self.fillAfterID = None
+
+        startTime = time.monotonic()
+        while time.monotonic() - startTime < FIND_RESULT_POLL_TIME:
+            try: bookDifferences = next( self.collateIterator )
+            except StopIteration: self._finishCollate(); return
+            except re.error as err:
+                self.collateIterator = None
+                self.setStatus( '' )
+                errorBeep()
+                showError( self, APP_NAME, _("Bad regular expression: {}").format( err ) )
+                self.checkEnables()
+                return
+            except Exception as err: # Could be anything from the Bible class while loading the books
+                logging.error( _("CollateProjectsWindow._fillCollation: Unable to load and collate the Bibles: {}").format( err ) )
+                self.collateIterator = None
+                self.setStatus( '' )
+                errorBeep()
+                showError( self, APP_NAME, _("Unable to load and collate the Bibles: {}").format( err ) )
+                self.checkEnables()
+                return
+            if bookDifferences is None: break # the next book isn't finished yet
+            if bookDifferences[1]: self._addDifferences( bookDifferences[1] )
+        self.setStatus( _("Collating… {:,} differences so far").format( len(self.differenceList) ) )
+        self.fillAfterID = self.after( FIND_RESULT_WAIT_DELAY, self._fillCollation )
+    # end of CollateProjectsWindow._fillCollation
+
+
+    def _addDifferences( self, newDifferenceList ):
+        """
+        Adds a line to each text box for each new difference.
+
+        Each difference is an 8-tuple: BBB, C, V, found1Flag, found2Flag, verseText1, verseText2, markersDifferFlag
+        """
+        for textBox,foundFlagIndex,verseTextIndex in ( (self.textBox1,3,5), (self.textBox2,4,6) ):
+            textBox.configure( state=tk.NORMAL )
+            for difference in newDifferenceList:
+                BBB, C, V = difference[:3]
+                if textBox.index( tk.END+'-1c' ) != tkSTART: textBox.insert( tk.END, '\n' )
+                textBox.insert( tk.END, '{} {}:{} '.format( BBB, C, V ), ('reference','markersDiffer') if difference[7] else 'reference' )
+                verseText = difference[verseTextIndex]
+                if verseText is None: textBox.insert( tk.END, _("(missing)"), 'notFound' )
+                else: textBox.insert( tk.END, verseText.replace( '\n', ' ' ), () if difference[foundFlagIndex] else 'notFound' )
+            textBox.configure( state=tk.DISABLED )
+        self.differenceList.extend( newDifferenceList )
+        self._enableNavigationButtons()
+    # end of CollateProjectsWindow._addDifferences
+
+
+    def _finishCollate( self ):
+        """
+        Called when the collation iterator has finished.
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( _("CollateProjectsWindow._finishCollate() with {} differences").format( len(self.differenceList) ) )
+
+        self.collateIterator = None
+        self.checkEnables() # Enables the Go button again
+        self._enableNavigationButtons()
+        if self.differenceList:
+            self.setStatus( _("{:,} differences").format( len(self.differenceList) ) )
+        else: self.setStatus( _("No differences found") )
+    # end of CollateProjectsWindow._finishCollate
+
+
+    def _stopCollate( self ):
+        """
+        Stop the collation if it's still going.
+        """
+        if self.fillAfterID is not None:
+            self.after_cancel( self.fillAfterID )
+            self.fillAfterID = None
+        if self.collateIterator is not None:
+            self.collateIterator.close() # Cancels any books that haven't started yet
+            self.collateIterator = None
+    # end of CollateProjectsWindow._stopCollate
+
+
     def doShowInfo( self, event=None ):
         """
         Pop-up dialog giving find info
@@ -2969,6 +3638,7 @@ class CollateProjectsWindow( tk.Toplevel ):
         if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
             print( _("CollateProjectsWindow.doClose( {} )").format( event ) )
 
+        self._stopCollate()
         try: cWs = self.parentWindow.parentApp.childWindows
         except AttributeError: cWs = self.parentApp.childWindows
         if self in cWs:
@@ -3011,6 +3681,70 @@ class CollateProjectsWindow( tk.Toplevel ):
 
 
 
+def benchmarkFindResultWindow( tkRootWindow, numResults=100000 ):
+    """
+    Time how long the find result window takes to display (and scroll through) numResults synthetic results,
+        and compare it with just inserting a Treeview row for every result.
+
+    Also counts how many verse texts the (extended) window actually fetches.
+    """
+    from collections import defaultdict
+    from VerseReferences import SimpleVerseKey
+
+    BBBs = ( 'GEN', 'EXO', 'LEV', 'NUM', 'DEU', 'JOS', 'JDG', 'RUT', 'SA1', 'SA2', )
+    resultList = []
+    for j in range( numResults ):
+        BBB, n = BBBs[j*len(BBBs)//numResults], j % 10000
+        resultList.append( (SimpleVerseKey( BBB, str(n//200+1), str(n%200+1) ), None, 'context before ', 'and after it') )
+
+    class DemoApp():
+        keyBindingDict, internalBibles, childWindows = defaultdict( lambda: ('',) ), [], []
+        def setWaitStatus( self, text ): pass
+        def setReadyStatus( self ): pass
+        def logUsage( self, *args ): pass
+        def gotoBCV( self, BBB, C, V ): pass
+    class DemoParentWindow():
+        parentApp, internalBible = DemoApp(), None
+    class DemoExtendBible():
+        abbreviation, numVerseTextCalls = 'XTD', 0
+        def getVerseText( self, verseKey ):
+            self.numVerseTextCalls += 1
+            return 'Extended text for {}'.format( verseKey.getShortText() )
+    optionDict = { 'workName':'Demo', 'findText':'found', 'contextLength':30, }
+
+    startTime = time.perf_counter()
+    demoTreeview = Treeview( tkRootWindow, columns=('ref','marker','fText') )
+    demoTreeview.pack()
+    lastBBB = None
+    for j,(ref,marker,before,after) in enumerate( resultList ): # The way it used to be done
+        BBB,C,V = ref.getBCV()
+        if BBB != lastBBB: demoTreeview.insert( '', 'end', BBB, text=BBB, open=True ); lastBBB = BBB
+        demoTreeview.insert( BBB, 'end', j, tags='BCV', values=('{} {}:{}'.format(BBB,C,V), '', before+'found'+after) )
+    tkRootWindow.update()
+    allRowsTime = time.perf_counter() - startTime
+    demoTreeview.destroy()
+
+    extendBible = DemoExtendBible()
+    startTime = time.perf_counter()
+    findResultWindow = FindResultWindow( DemoParentWindow(), optionDict, {'searchedBookList':list(BBBs), 'foundBookList':list(BBBs)}, resultList,
+                                        findFunction=None, refindFunction=None, replaceFunction=None, extendTo=extendBible )
+    while findResultWindow.numInsertedResults < numResults: tkRootWindow.update()
+    displayTime = time.perf_counter() - startTime
+    startTime = time.perf_counter()
+    numScrolls = 200
+    for k in range( numScrolls ):
+        findResultWindow._onScrollbar( 'moveto', k / numScrolls )
+        tkRootWindow.update()
+    scrollTime = time.perf_counter() - startTime
+    print( "{:,} find results: inserting every Treeview row took {:.2f}s, virtual window displayed in {:.3f}s with {} rows" \
+            .format( numResults, allRowsTime, displayTime, len(findResultWindow.rowIDs) ) )
+    print( "  {} scrolls took {:.3f}s ({:.1f}ms each) and fetched {:,} extended verse texts (not {:,})" \
+            .format( numScrolls, scrollTime, scrollTime*1000/numScrolls, extendBible.numVerseTextCalls, numResults ) )
+    findResultWindow.doClose()
+# end of benchmarkFindResultWindow
+
+
+
 def demo():
     """
     Demo program to handle command line parameters and then run what they want.
@@ -3024,6 +3758,41 @@ def demo():
 
     tkRootWindow = Tk()
     tkRootWindow.title( ProgNameVersion )
+
+    # Count how many times windows get redrawn as we navigate (with most of them hidden)
+    from VerseReferences import SimpleVerseKey
+    tkRootWindow.getNumChapters, tkRootWindow.getNumVerses = lambda BBB: 28, lambda BBB, C: 40
+    class DemoWindow():
+        def __init__( self, n ):
+            self.moduleID, self.genericWindowType, self.BCVUpdateType, self._groupCode = 'Demo{}'.format( n ), 'BibleResource', DEFAULT, 'A'
+            self.viewable, self.redrawCount = True, 0
+        def winfo_viewable( self ): return self.viewable
+        def prefetchVerseData( self, verseKey ): pass
+        def updateShownBCV( self, verseKey, originator=None ): self.redrawCount += 1
+    def navigate( demoChildWindows, waitEachTime=True ):
+        for V in range( 1, 41 ):
+            demoChildWindows.updateThisBibleGroup( 'A', SimpleVerseKey( 'MAT', 1, V ) )
+            if waitEachTime: tkRootWindow.update()
+        tkRootWindow.update()
+        demoChildWindows.cancelPrefetch()
+        return sum( appWin.redrawCount for appWin in demoChildWindows )
+    for numHidden in (0, 8):
+        demoChildWindows = ChildWindows( tkRootWindow )
+        for n in range( 10 ): demoChildWindows.append( DemoWindow( n ) )
+        for appWin in demoChildWindows[:numHidden]: appWin.viewable = False
+        redrawCount = navigate( demoChildWindows )
+        for appWin in demoChildWindows[:numHidden]: # Now show them again
+            appWin.viewable = True
+            demoChildWindows.doDeferredWindowUpdate( appWin )
+        tkRootWindow.update()
+        print( "10 windows with {} hidden: {} redraws for 40 moves (then {} after showing them)" \
+                .format( numHidden, redrawCount, sum( appWin.redrawCount for appWin in demoChildWindows ) ) )
+    demoChildWindows = ChildWindows( tkRootWindow )
+    for n in range( 10 ): demoChildWindows.append( DemoWindow( n ) )
+    print( "10 windows without waiting between 40 moves: {} redraws".format( navigate( demoChildWindows, waitEachTime=False ) ) )
+
+    benchmarkFindResultWindow( tkRootWindow )
+
     #settings = ApplicationSettings( 'BiblelatorData/', 'BiblelatorSettings/', ProgName )
     #settings.load()
 
@@ -0,0 +1,553 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# DBPResources.py
+#
+# Access layer for online Digital Bible Platform resources in Biblelator
+#
+# Copyright (C) 2018 Robert Hunt
+# Author: Robert Hunt <Freely.Given.org@gmail.com>
+# License: See gpl-3.0.txt
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Non-GUI access to the online Digital Bible Platform for the DBP resource windows and boxes.
+
+Verse text is fetched a chapter at a time over one kept-alive HTTP connection
+    on a background thread, and saved in an on-disk cache (which expires after a while).
+Finished fetches are reported back on the tkinter thread by polling with after().
+
+    class DBPConnection
+        __init__( self, host, port=None, timeout=DBP_HTTP_TIMEOUT )
+        getJSON( self, fieldREST, parameters )
+        close( self )
+
+    class DBPChapterCache
+        __init__( self, cacheFolderPath, expiryDays=DBP_CACHE_EXPIRY_DAYS )
+        getChapterFilepath( self, damRoot, BBB, C )
+        getChapter( self, damRoot, BBB, C, allowExpired=False )
+        putChapter( self, damRoot, BBB, C, chapterJSON )
+
+    class DBPResourceClient
+        __init__( self, tkRootWindow, damRoot, key, cacheFolderPath, host=DBP_URL_HOST, port=None )
+        getCachedContextVerseData( self, verseKey )
+        fetchChapter( self, BBB, C )
+        getChapterJSON( self, BBB, C )
+        requestChapter( self, BBB, C, callback )
+        hasCachedChapters( self, BBB, numChapters )
+        _fetchLoop( self )
+        _checkFinishedFetches( self )
+        close( self )
+
+    convertDBPChapterJSON( chapterJSON )
+    getDBPResourceClient( parentApp, damRoot, key )
+    demo()
+"""
+
+from gettext import gettext as _
+
+LastModifiedDate = '2018-02-12' # by RJH
+ShortProgName = "DBPResources"
+ProgName = "Biblelator DBP resources"
+ProgVersion = '0.43'
+ProgNameVersion = '{} v{}'.format( ProgName, ProgVersion )
+ProgNameVersionDate = '{} {} {}'.format( ProgNameVersion, _("last modified"), LastModifiedDate )
+
+debuggingThisModule = False
+
+
+import os
+import logging
+import json
+import time
+import threading
+import queue
+import http.client
+from urllib.parse import urlencode
+
+# Biblelator imports
+from BiblelatorGlobals import DATA_FOLDER_NAME
+
+# BibleOrgSys imports
+#if __name__ == '__main__': import sys; sys.path.append( '../BibleOrgSys/' )
+import BibleOrgSysGlobals
+from InternalBibleInternals import InternalBibleEntryList, InternalBibleEntry
+
+
+DBP_URL_HOST = 'dbt.io'
+DBP_VERSION = '2'
+DBP_HTTP_TIMEOUT = 10 # seconds
+DBP_CACHE_SUBFOLDER_NAME = 'DBPCache/'
+DBP_CACHE_EXPIRY_DAYS = 30
+DBP_FAILED_RETRY_SECONDS = 60 # Don't keep asking for a chapter that we just failed to get
+DBP_POLL_INTERVAL = 100 # milliseconds between checks for finished background fetches
+
+DBPResourceClients = {} # Indexed by damRoot -- shared by all the DBP windows and boxes
+
+
+
+def exp( messageString ):
+    """
+    Expands the message string in debug mode.
+    Prepends the module name to a error or warning message string
+        if we are in debug mode.
+    Returns the new string.
+    """
+    try: nameBit, errorBit = messageString.split( ': ', 1 )
+    except ValueError: nameBit, errorBit = '', messageString
+    if BibleOrgSysGlobals.debugFlag or debuggingThisModule:
+        nameBit = '{}{}{}'.format( ShortProgName, '.' if nameBit else '', nameBit )
+    return '{}{}'.format( nameBit, errorBit )
+# end of exp
+
+
+
+class DBPConnection:
+    """
+    A persistent (keep-alive) HTTP connection to the DBP server.
+
+    The connection is (re)opened when needed,
+        so a dropped connection only costs us one retry.
+    """
+    def __init__( self, host, port=None, timeout=DBP_HTTP_TIMEOUT ):
+        """
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( exp("DBPConnection.__init__( {}, {}, {} )").format( host, port, timeout ) )
+        self.host, self.port, self.timeout = host, port, timeout
+        self.HTTPConnection = None
+        self.numConnectionsOpened = self.numRequests = 0
+    # end of DBPConnection.__init__
+
+
+    def getJSON( self, fieldREST, parameters ):
+        """
+        Sends a GET request for the given REST field with the given parameters dict
+            and returns the decoded JSON.
+
+        Raises ConnectionError if the server can't be reached or doesn't return the data.
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( exp("DBPConnection.getJSON( {}, {} )").format( fieldREST, parameters ) )
+
+        requestString = '/{}?{}'.format( fieldREST, urlencode( parameters ) )
+        for attempt in range( 2 ): # The server might have closed our kept-alive connection
+            if self.HTTPConnection is None:
+                self.HTTPConnection = http.client.HTTPConnection( self.host, self.port, timeout=self.timeout )
+                self.numConnectionsOpened += 1
+            try:
+                self.HTTPConnection.request( 'GET', requestString, headers={ 'Connection':'keep-alive' } )
+                response = self.HTTPConnection.getresponse()
+                responseBytes = response.read() # Must read it all before we can reuse the connection
+            except (http.client.HTTPException, OSError) as err:
+                self.close()
+                if attempt: raise ConnectionError( "DBP request failed: {}".format( err ) )
+                continue
+            self.numRequests += 1
+            if response.will_close: self.close()
+            if response.status != 200:
+                raise ConnectionError( "DBP server returned {} {} for {}".format( response.status, response.reason, fieldREST ) )
+            try: return json.loads( responseBytes.decode( 'utf-8' ) )
+            except ValueError as err: raise ConnectionError( "DBP server returned bad JSON: {}".format( err ) )
+    # end of DBPConnection.getJSON
+
+
+    def close( self ):
+        """
+        Close the HTTP connection (if it's open).
+        """
+        if self.HTTPConnection is not None:
+            self.HTTPConnection.close()
+            self.HTTPConnection = None
+    # end of DBPConnection.close
+# end of DBPConnection class
+
+
+
+class DBPChapterCache:
+    """
+    An on-disk cache of DBP chapter data (as the JSON returned by the server)
+        with one file per chapter.
+
+    Chapters older than expiryDays are fetched again (if we can).
+    """
+    def __init__( self, cacheFolderPath, expiryDays=DBP_CACHE_EXPIRY_DAYS ):
+        """
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( exp("DBPChapterCache.__init__( {}, {} )").format( cacheFolderPath, expiryDays ) )
+        self.cacheFolderPath, self.expiryDays = cacheFolderPath, expiryDays
+    # end of DBPChapterCache.__init__
+
+
+    def getChapterFilepath( self, damRoot, BBB, C ):
+        """
+        """
+        return os.path.join( self.cacheFolderPath, damRoot, '{}_{}.json'.format( BBB, C ) )
+    # end of DBPChapterCache.getChapterFilepath
+
+
+    def getChapter( self, damRoot, BBB, C, allowExpired=False ):
+        """
+        Returns the cached chapter JSON or None if it's not there (or has expired).
+        """
+        try:
+            with open( self.getChapterFilepath( damRoot, BBB, C ), 'rt', encoding='utf-8' ) as cacheFile:
+                cacheEntry = json.load( cacheFile )
+        except FileNotFoundError: return None
+        except (OSError, ValueError) as err:
+            logging.error( exp("DBPChapterCache.getChapter: Unable to read cached {} {} {}: {}").format( damRoot, BBB, C, err ) )
+            return None
+        if not allowExpired and time.time() - cacheEntry['fetched'] > self.expiryDays * 24 * 60 * 60:
+            return None
+        return cacheEntry['chapter']
+    # end of DBPChapterCache.getChapter
+
+
+    def putChapter( self, damRoot, BBB, C, chapterJSON ):
+        """
+        Saves the chapter JSON in the cache.
+
+        We write to a temporary file first so that a crash can't leave a half-written chapter.
+        """
+        filepath = self.getChapterFilepath( damRoot, BBB, C )
+        try:
+            os.makedirs( os.path.dirname( filepath ), exist_ok=True )
+            with open( filepath + '.tmp', 'wt', encoding='utf-8' ) as cacheFile:
+                json.dump( { 'fetched':time.time(), 'chapter':chapterJSON }, cacheFile )
+            os.replace( filepath + '.tmp', filepath )
+        except OSError as err:
+            logging.error( exp("DBPChapterCache.putChapter: Unable to save {} {} {}: {}").format( damRoot, BBB, C, err ) )
+    # end of DBPChapterCache.putChapter
+# end of DBPChapterCache class
+
+
+
+def convertDBPChapterJSON( chapterJSON ):
+    """
+    Converts the list of verse dictionaries returned by DBP text/verse
+        into a dictionary (indexed by verse number string)
+        containing the (verseData, context) 2-tuples expected by getContextVerseData.
+    """
+    chapterData = {}
+    lastParagraphNumber = None
+    for verseDict in chapterJSON:
+        V = str( verseDict['verse_id'] )
+        verseText = verseDict['verse_text'].strip()
+        verseData = InternalBibleEntryList()
+        paragraphNumber = verseDict.get( 'paragraph_number' )
+        if paragraphNumber != lastParagraphNumber:
+            if lastParagraphNumber is not None: # Don't start a new paragraph at the beginning of the chapter
+                verseData.append( InternalBibleEntry( 'p', 'p', '', '', None, '' ) )
+            lastParagraphNumber = paragraphNumber
+        verseData.append( InternalBibleEntry( 'v', 'v', V, V, None, V ) )
+        verseData.append( InternalBibleEntry( 'v~', 'v~', verseText, verseText, None, verseText ) )
+        chapterData[V] = verseData, None # No context available
+    return chapterData
+# end of convertDBPChapterJSON
+
+
+
+class DBPResourceClient:
+    """
+    Gets the text of one DBP Bible a chapter at a time,
+        either from our disk cache, or else from the server on a background thread.
+
+    Note that the tkinter callbacks are only ever called on the tkinter thread.
+    """
+    def __init__( self, tkRootWindow, damRoot, key, cacheFolderPath, host=DBP_URL_HOST, port=None ):
+        """
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( exp("DBPResourceClient.__init__( {}, {}, …, {}, {}, {} )").format( tkRootWindow, damRoot, cacheFolderPath, host, port ) )
+        self.tkRootWindow, self.damRoot, self.key = tkRootWindow, damRoot, key
+        self.connection = DBPConnection( host, port )
+        self.diskCache = DBPChapterCache( cacheFolderPath )
+        self.chapterDataCache = {} # Indexed by (BBB,C) -- converted verse data dictionaries
+        self.failedChapters = {} # Indexed by (BBB,C) -- time when we can try again
+        self.chapterCallbacks = {} # Indexed by (BBB,C) -- lists of callbacks waiting for that chapter
+        self.requestQueue, self.resultQueue = queue.Queue(), queue.Queue()
+        self.fetchThread = None
+        self.pollAfterID = None
+    # end of DBPResourceClient.__init__
+
+
+    def getCachedContextVerseData( self, verseKey ):
+        """
+        Returns the (verseData, context) for the verse if we already have the chapter in memory,
+            otherwise None.
+
+        Doesn't look in the disk cache (as this is called on the tkinter thread)
+            -- requestChapter gets chapters from there in the background.
+        """
+        BBB, C, V = verseKey.getBCV()
+        try: chapterData = self.chapterDataCache[(BBB,C)]
+        except KeyError: return None
+        return chapterData.get( V, ('',None) )
+    # end of DBPResourceClient.getCachedContextVerseData
+
+
+    def fetchChapter( self, BBB, C ):
+        """
+        Fetches the chapter from the server (blocking) and saves it in the disk cache.
+
+        If the server can't give it to us, falls back to an expired cache entry if we have one.
+
+        Returns the chapter JSON or None.
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( exp("DBPResourceClient.fetchChapter( {} {} ) for {}").format( BBB, C, self.damRoot ) )
+
+        damID = '{}{}2ET'.format( self.damRoot, 'N' if BibleOrgSysGlobals.BibleBooksCodes.isNewTestament_NR( BBB ) else 'O' )
+        parameters = { 'v':DBP_VERSION, 'key':self.key, 'dam_id':damID,
+                    'book_id':BibleOrgSysGlobals.BibleBooksCodes.getOSISAbbreviation( BBB ), 'chapter_id':C }
+        try: chapterJSON = self.connection.getJSON( 'text/verse', parameters )
+        except ConnectionError as err:
+            logging.error( exp("DBPResourceClient.fetchChapter: Unable to get {} {} {}: {}").format( self.damRoot, BBB, C, err ) )
+            return self.diskCache.getChapter( self.damRoot, BBB, C, allowExpired=True )
+        if not isinstance( chapterJSON, list ):
+            logging.error( exp("DBPResourceClient.fetchChapter: Unexpected data for {} {} {}: {!r}").format( self.damRoot, BBB, C, chapterJSON ) )
+            return None
+        self.diskCache.putChapter( self.damRoot, BBB, C, chapterJSON )
+        return chapterJSON
+    # end of DBPResourceClient.fetchChapter
+
+
+    def getChapterJSON( self, BBB, C ):
+        """
+        Returns the chapter JSON from the disk cache if it's there (and hasn't expired),
+            otherwise fetches it from the server (blocking).
+
+        Returns None if we can't get it.
+        """
+        chapterJSON = self.diskCache.getChapter( self.damRoot, BBB, C )
+        if chapterJSON is None: chapterJSON = self.fetchChapter( BBB, C )
+        return chapterJSON
+    # end of DBPResourceClient.getChapterJSON
+
+
+    def requestChapter( self, BBB, C, callback ):
+        """
+        Asks for the chapter to be fetched in the background (unless it's already on its way).
+
+        When it's arrived, callback( BBB, C, successFlag ) is called (from the tkinter thread).
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( exp("DBPResourceClient.requestChapter( {} {}, {} ) for {}").format( BBB, C, callback, self.damRoot ) )
+
+        if time.time() < self.failedChapters.get( (BBB,C), 0 ): return # We tried that recently
+        if (BBB,C) in self.chapterCallbacks: # Already on its way
+            if callback not in self.chapterCallbacks[(BBB,C)]: self.chapterCallbacks[(BBB,C)].append( callback )
+            return
+        self.chapterCallbacks[(BBB,C)] = [callback]
+        if self.fetchThread is None:
+            self.fetchThread = threading.Thread( target=self._fetchLoop, name='DBP-{}'.format( self.damRoot ), daemon=True )
+            self.fetchThread.start()
+        self.requestQueue.put( (BBB,C) )
+        if self.pollAfterID is None:
+            self.pollAfterID = self.tkRootWindow.after( DBP_POLL_INTERVAL, self._checkFinishedFetches )
+    # end of DBPResourceClient.requestChapter
+
+
+    def hasCachedChapters( self, BBB, numChapters ):
+        """
+        Returns True if we already have all of the chapters of the book in memory
+            (so that getCachedContextVerseData won't return None for any of them).
+        """
+        return all( (BBB,str(C)) in self.chapterDataCache for C in range( 1, numChapters+1 ) )
+    # end of DBPResourceClient.hasCachedChapters
+
+
+    def _fetchLoop( self ):
+        """
+        Runs on the background thread getting requested chapters (one at a time)
+            from the disk cache or the server, and converting them, until we get a None request.
+
+        Doesn't touch tkinter or the memory caches.
+        """
+        while True:
+            request = self.requestQueue.get()
+            if request is None: break
+            BBB, C = request
+            chapterJSON = self.getChapterJSON( BBB, C )
+            self.resultQueue.put( (BBB, C, None if chapterJSON is None else convertDBPChapterJSON( chapterJSON )) )
+        self.connection.close()
+    # end of DBPResourceClient._fetchLoop
+
+
+    def _checkFinishedFetches( self ):
+        """
+        Called regularly with after() (on the tkinter thread) while there are fetches outstanding.
+
+        Saves any arrived chapters and calls the callbacks that were waiting for them.
+        """
+        self.pollAfterID = None
+        while True:
+            try: BBB, C, chapterData = self.resultQueue.get_nowait()
+            except queue.Empty: break
+            if chapterData is None:
+                self.failedChapters[(BBB,C)] = time.time() + DBP_FAILED_RETRY_SECONDS
+            else:
+                self.failedChapters.pop( (BBB,C), None )
+                self.chapterDataCache[(BBB,C)] = chapterData
+            for callback in self.chapterCallbacks.pop( (BBB,C), () ):
+                callback( BBB, C, chapterData is not None )
+        if self.chapterCallbacks: # still some outstanding
+            self.pollAfterID = self.tkRootWindow.after( DBP_POLL_INTERVAL, self._checkFinishedFetches )
+    # end of DBPResourceClient._checkFinishedFetches
+
+
+    def close( self ):
+        """
+        Stops the background thread (after any fetch in progress) and forgets any waiting callbacks.
+        """
+        if self.pollAfterID is not None:
+            self.tkRootWindow.after_cancel( self.pollAfterID )
+            self.pollAfterID = None
+        self.chapterCallbacks = {}
+        if self.fetchThread is not None:
+            self.requestQueue.put( None )
+            self.fetchThread = None
+        else: self.connection.close()
+    # end of DBPResourceClient.close
+# end of DBPResourceClient class
+
+
+
+def getDBPResourceClient( parentApp, damRoot, key ):
+    """
+    Returns the DBPResourceClient for the given DBP Bible,
+        making it the first time (so that all the windows and boxes showing it share one).
+    """
+    if damRoot not in DBPResourceClients:
+        cacheFolderPath = os.path.join( parentApp.homeFolderPath, DATA_FOLDER_NAME, DBP_CACHE_SUBFOLDER_NAME )
+        DBPResourceClients[damRoot] = DBPResourceClient( parentApp.rootWindow, damRoot, key, cacheFolderPath )
+    return DBPResourceClients[damRoot]
+# end of getDBPResourceClient
+
+
+
+def demo():
+    """
+    Test the DBP access layer against a local stand-in server serving canned JSON
+        (with configurable latency and failures).
+    """
+    from tkinter import Tk
+    import tempfile
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+    from urllib.parse import urlparse, parse_qs
+    from VerseReferences import SimpleVerseKey
+
+    if BibleOrgSysGlobals.verbosityLevel > 0: print( ProgNameVersion )
+
+    class StandInServerSettings:
+        latency, failNext, numRequests = 0, 0, 0
+    class StandInRequestHandler( BaseHTTPRequestHandler ):
+        protocol_version = 'HTTP/1.1' # So that the connection is kept alive
+        def do_GET( self ):
+            StandInServerSettings.numRequests += 1
+            time.sleep( StandInServerSettings.latency )
+            if StandInServerSettings.failNext:
+                StandInServerSettings.failNext -= 1
+                self.send_response( 500 )
+                self.send_header( 'Content-Length', '0' )
+                self.end_headers()
+                return
+            query = parse_qs( urlparse( self.path ).query )
+            C = int( query['chapter_id'][0] )
+            responseBytes = json.dumps( [ { 'book_id':query['book_id'][0], 'chapter_id':str(C), 'verse_id':str(V),
+                                        'verse_text':'Canned {} {}:{} '.format( query['dam_id'][0], C, V ),
+                                        'paragraph_number':str( 1 + V//4 ) } for V in range( 1, 11 ) ] ).encode( 'utf-8' )
+            self.send_response( 200 )
+            self.send_header( 'Content-Type', 'application/json' )
+            self.send_header( 'Content-Length', str(len(responseBytes)) )
+            self.end_headers()
+            self.wfile.write( responseBytes )
+        def log_message( self, *args ): pass
+    class StandInServer( ThreadingMixIn, HTTPServer ):
+        daemon_threads = True
+    server = StandInServer( ('127.0.0.1', 0), StandInRequestHandler )
+    threading.Thread( target=server.serve_forever, daemon=True ).start()
+    port = server.server_address[1]
+
+    tkRootWindow = Tk()
+    tkRootWindow.title( ProgNameVersion )
+    with tempfile.TemporaryDirectory() as cacheFolderPath:
+        # Blocking fetches should all go over the one connection and end up in the disk cache
+        client = DBPResourceClient( tkRootWindow, 'ENGESV', 'TestKey', cacheFolderPath, host='127.0.0.1', port=port )
+        for C in ('1','2','3'):
+            assert len( client.fetchChapter( 'MAT', C ) ) == 10
+        assert client.connection.numConnectionsOpened == 1 and client.connection.numRequests == 3
+        verseData, context = convertDBPChapterJSON( client.diskCache.getChapter( 'ENGESV', 'MAT', '2' ) )['5']
+        assert verseData[-1].getCleanText() == 'Canned ENGESVN2ET 2:5'
+        print( "  Fetched 3 chapters with {} connection".format( client.connection.numConnectionsOpened ) )
+
+        # A new client should get them from the disk (until they expire) but only in the background
+        StandInServerSettings.numRequests = 0
+        client2 = DBPResourceClient( tkRootWindow, 'ENGESV', 'TestKey', cacheFolderPath, host='127.0.0.1', port=port )
+        assert client2.getCachedContextVerseData( SimpleVerseKey( 'MAT', '3', '1' ) ) is None # Not in memory yet
+        assert client2.getChapterJSON( 'MAT', '3' ) is not None
+        assert StandInServerSettings.numRequests == 0
+        client2.diskCache.expiryDays = -1
+        assert client2.diskCache.getChapter( 'ENGESV', 'MAT', '3' ) is None
+        print( "  Disk cache hit and expiry OK" )
+
+        # Server failures -- a dropped connection gets retried, and an error falls back to the expired cache
+        client2.connection.close()
+        StandInServerSettings.failNext = 1
+        assert client2.fetchChapter( 'MAT', '3' ) is not None # expired, but better than nothing
+        assert client2.fetchChapter( 'MAT', '4' ) is not None
+        StandInServerSettings.failNext = 1
+        assert client2.fetchChapter( 'MAT', '5' ) is None
+        print( "  Failure handling OK" )
+
+        # Background fetches with latency get reported on the tkinter thread
+        StandInServerSettings.latency = 0.2
+        arrived = []
+        def onChapterArrived( BBB, C, successFlag ):
+            assert threading.current_thread() is threading.main_thread()
+            arrived.append( (BBB,C,successFlag) )
+        startTime = time.time()
+        for C in ('6','7'):
+            assert client2.getCachedContextVerseData( SimpleVerseKey( 'MAT', C, '1' ) ) is None
+            client2.requestChapter( 'MAT', C, onChapterArrived )
+            client2.requestChapter( 'MAT', C, onChapterArrived ) # Duplicate requests are ignored
+        print( "  Requested 2 chapters in {:.3f}s".format( time.time() - startTime ) )
+        while len(arrived) < 2 and time.time() - startTime < 10:
+            tkRootWindow.update()
+            time.sleep( 0.01 )
+        assert arrived == [('MAT','6',True), ('MAT','7',True)], arrived
+        assert client2.getCachedContextVerseData( SimpleVerseKey( 'MAT', '7', '10' ) ) is not None
+        assert not client2.hasCachedChapters( 'MAT', 7 ) # Chapters 1-5 were only fetched into the disk cache
+        print( "  Background fetches arrived after {:.3f}s".format( time.time() - startTime ) )
+        client.close(); client2.close()
+    server.shutdown()
+    print( "DBPResources tests finished." )
+# end of demo
+
+
+if __name__ == '__main__':
+    from multiprocessing import freeze_support
+    freeze_support() # Multiprocessing support for frozen Windows executables
+
+    # Configure basic set-up
+    parser = BibleOrgSysGlobals.setup( ProgName, ProgVersion )
+    BibleOrgSysGlobals.addStandardOptionsAndProcess( parser )
+
+    demo()
+
+    BibleOrgSysGlobals.closedown( ProgName, ProgVersion )
+# end of DBPResources.py
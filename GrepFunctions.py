@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# GrepFunctions.py
+#
+# Functions to support searching (grepping) the text files in a folder tree in Biblelator
+#
+# Copyright (C) 2018 Robert Hunt
+# Author: Robert Hunt <Freely.Given.org@gmail.com>
+# License: See gpl-3.0.txt
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Non-GUI helper functions for the Search files (grep) tool.
+
+The files are searched by a (bounded) pool of threads
+    with each file read in chunks rather than line by line.
+The matches are handed over in file order in batches,
+    and the caller is woken up (rather than having to keep polling)
+    whenever there's a new batch.
+
+    findGrepFilepaths( dirname, filenamepatt )
+    canGrepAsBytes( encoding )
+    grepFile( filepath, grepkey, encoding, cancelEvent=None )
+    class ParallelGrep
+        __init__( self, dirname, filenamepatt, grepkey, encoding, wakeFunction=None, maxThreads=None )
+        start( self )
+        cancel( self )
+        isCancelled( self )
+        _run( self )
+        _collectFile( self, filepath, future )
+        _handOverBatch( self )
+        getResults( self )
+        iterateResults( self )
+    demo()
+"""
+
+from gettext import gettext as _
+
+LastModifiedDate = '2018-03-14' # by RJH
+ShortProgName = "GrepFunctions"
+ProgName = "Biblelator Grep Functions"
+ProgVersion = '0.43'
+ProgNameVersion = '{} v{}'.format( ProgName, ProgVersion )
+ProgNameVersionDate = '{} {} {}'.format( ProgNameVersion, _("last modified"), LastModifiedDate )
+
+debuggingThisModule = False
+
+
+import os
+import logging
+import fnmatch
+import codecs
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# BibleOrgSys imports
+#if __name__ == '__main__': import sys; sys.path.append( '../BibleOrgSys/' )
+import BibleOrgSysGlobals
+
+
+GREP_CHUNK_SIZE = 64 * 1024 # Characters read from a file at a time
+GREP_BATCH_TIME = 0.1 # Seconds -- maximum time that matches are held before being handed over
+MAX_GREP_THREADS = min( 32, (os.cpu_count() or 1) + 4 ) # Threads (not processes) because most of the time is spent waiting for the disk
+GREP_FILES_AHEAD = 4 # Number of files per thread that are queued for searching before we wait for the first one
+
+
+
+def exp( messageString ):
+    """
+    Expands the message string in debug mode.
+    Prepends the module name to a error or warning message string
+        if we are in debug mode.
+    Returns the new string.
+    """
+    try: nameBit, errorBit = messageString.split( ': ', 1 )
+    except ValueError: nameBit, errorBit = '', messageString
+    if BibleOrgSysGlobals.debugFlag or debuggingThisModule:
+        nameBit = '{}{}{}'.format( ShortProgName, '.' if nameBit else '', nameBit )
+    return '{}{}'.format( nameBit+': ' if nameBit else '', errorBit )
+# end of exp
+
+
+
+def findGrepFilepaths( dirname, filenamepatt ):
+    """
+    Generator which yields the paths of the files in the folder tree
+        with names that match the pattern (in a repeatable order).
+    """
+    for folderPath, subfolderNames, filenames in os.walk( dirname ):
+        subfolderNames.sort() # So that os.walk goes down them in order
+        for filename in sorted( filenames ):
+            if fnmatch.fnmatch( filename, filenamepatt ):
+                yield os.path.join( folderPath, filename )
+# end of findGrepFilepaths
+
+
+def canGrepAsBytes( encoding ):
+    """
+    Returns True if files in this encoding can be searched for the encoded grepkey without decoding them,
+        i.e., if the encoding is a single-byte or ASCII-compatible one
+        where a newline is always the single byte 0x0A.
+    """
+    try: codecName = codecs.lookup( encoding ).name
+    except LookupError: return False
+    return ( codecName in ('utf-8','utf-8-sig','ascii') or codecName.startswith( ('iso8859','latin','cp','mac') ) ) \
+        and '\n'.encode( encoding ) == b'\n' # e.g., not EBCDIC (cp037)
+# end of canGrepAsBytes
+
+
+def grepFile( filepath, grepkey, encoding, cancelEvent=None ):
+    """
+    Searches the file for lines containing grepkey.
+
+    The file is read in chunks and a chunk is only split into lines
+        if the grepkey is somewhere in it.
+    If the encoding allows, the chunks are searched as bytes
+        and only the matching lines are decoded
+        (note that lines then only end with LF or CRLF -- not CR alone).
+
+    Returns a list of (lineNumber, lineString) 2-tuples (or None if the file couldn't be read).
+    """
+    encodedKey = None
+    if canGrepAsBytes( encoding ):
+        try: encodedKey = grepkey.encode( encoding )
+        except UnicodeError: return [] # Can't be in a file with this encoding
+        if encodedKey.decode( encoding ) != grepkey or b'\n' in encodedKey: encodedKey = None # Play safe
+
+    matches = []
+    lineNumber = 0
+    try:
+        if encodedKey: # Search the undecoded bytes
+            leftover = b'' # the (partial) last line of the last chunk
+            with open( filepath, 'rb' ) as binaryFile:
+                while cancelEvent is None or not cancelEvent.is_set():
+                    chunk = binaryFile.read( GREP_CHUNK_SIZE )
+                    if not chunk: break
+                    data = leftover + chunk
+                    if encodedKey in data: # Decode the complete lines and search them
+                        lastNewlineIndex = data.rfind( b'\n' )
+                        lines = data[:lastNewlineIndex+1].decode( encoding ).split( '\n' )
+                        lines.pop() # The empty string after the last newline
+                        leftover = data[lastNewlineIndex+1:]
+                        for line in lines:
+                            lineNumber += 1
+                            if grepkey in line: matches.append( (lineNumber, line.rstrip( '\r' )) )
+                    elif len(chunk) < GREP_CHUNK_SIZE: break # No match at the end of the file (so no need to count the lines)
+                    else: # No match anywhere in this chunk (so no need to look at the lines)
+                        lastNewlineIndex = data.rfind( b'\n' )
+                        lineNumber += data.count( b'\n', 0, lastNewlineIndex+1 )
+                        leftover = data[lastNewlineIndex+1:]
+            if leftover and encodedKey in leftover: leftover = leftover.decode( encoding ).rstrip( '\r' )
+            else: leftover = ''
+        else: # Search the decoded text
+            leftover = ''
+            with open( filepath, 'rt', encoding=encoding ) as textFile:
+                while cancelEvent is None or not cancelEvent.is_set():
+                    chunk = textFile.read( GREP_CHUNK_SIZE )
+                    if not chunk: break
+                    text = leftover + chunk
+                    if grepkey in text:
+                        lines = text.split( '\n' )
+                        leftover = lines.pop()
+                        for line in lines:
+                            lineNumber += 1
+                            if grepkey in line: matches.append( (lineNumber, line) )
+                    elif len(chunk) < GREP_CHUNK_SIZE: break # No match at the end of the file (so no need to count the lines)
+                    else: # No match anywhere in this chunk (so no need to look at the lines)
+                        lastNewlineIndex = text.rfind( '\n' )
+                        lineNumber += text.count( '\n', 0, lastNewlineIndex+1 )
+                        leftover = text[lastNewlineIndex+1:]
+    except UnicodeError as err: # e.g., decode, bom
+        logging.warning( exp("grepFile: Unicode error in {}: {}").format( filepath, err ) )
+        return None
+    except OSError as err: # e.g., permission
+        logging.warning( exp("grepFile: IO error in {}: {}").format( filepath, err ) )
+        return None
+    if cancelEvent is not None and cancelEvent.is_set(): return matches
+    if leftover and grepkey in leftover: matches.append( (lineNumber+1, leftover) )
+    return matches
+# end of grepFile
+
+
+
+class ParallelGrep:
+    """
+    Searches the files in a folder tree for a string using a pool of threads.
+
+    The matches are handed over in batches (in file order)
+        and wakeFunction (if given) is called from the search thread whenever there's a new batch waiting
+        -- the caller must then call getResults() to get them.
+    """
+    def __init__( self, dirname, filenamepatt, grepkey, encoding, wakeFunction=None, maxThreads=None ):
+        """
+        Doesn't start searching until start() is called.
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( "ParallelGrep.__init__( {!r}, {!r}, {!r}, {!r}, {}, {} )".format( dirname, filenamepatt, grepkey, encoding, wakeFunction, maxThreads ) )
+        self.dirname, self.filenamepatt, self.grepkey, self.encoding = dirname, filenamepatt, grepkey, encoding
+        self.wakeFunction, self.maxThreads = wakeFunction, maxThreads or MAX_GREP_THREADS
+
+        self.resultQueue = queue.Queue() # Contains lists of (filepath, lineNumber, lineString) 3-tuples, then None when finished
+        self.cancelEvent = threading.Event()
+        self.wakePendingFlag = False # So that we don't keep waking the caller for every batch
+        self.finishedFlag = False
+        self.numFiles = self.numSkippedFiles = self.numMatches = 0
+        self.batch, self.lastBatchTime = [], None
+        self.startTime = self.elapsedTime = None
+        self.searchThread = None
+    # end of ParallelGrep.__init__
+
+
+    def start( self ):
+        """
+        Starts the search thread (which starts the pool of threads that search the files).
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( "ParallelGrep.start()" )
+        self.startTime = self.lastBatchTime = time.monotonic()
+        self.searchThread = threading.Thread( target=self._run, name='ParallelGrep', daemon=True ) # so it dies with the app
+        self.searchThread.start()
+    # end of ParallelGrep.start
+
+
+    def cancel( self ):
+        """
+        Stops the search as soon as possible
+            (the batch that's already been handed over is still available).
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( "ParallelGrep.cancel()" )
+        self.cancelEvent.set()
+    # end of ParallelGrep.cancel
+
+    def isCancelled( self ):
+        return self.cancelEvent.is_set()
+    # end of ParallelGrep.isCancelled
+
+
+    def _run( self ):
+        """
+        Runs in the search thread.
+
+        Walks the folder tree submitting the files to the thread pool
+            but only keeps a limited number of files ahead of the oldest one that hasn't been collected yet.
+        """
+        pendingFiles = deque()
+        try:
+            with ThreadPoolExecutor( max_workers=self.maxThreads ) as executor:
+                try:
+                    for filepath in findGrepFilepaths( self.dirname, self.filenamepatt ):
+                        if self.cancelEvent.is_set(): break
+                        pendingFiles.append( (filepath, executor.submit( grepFile, filepath, self.grepkey, self.encoding, self.cancelEvent )) )
+                        if len(pendingFiles) >= self.maxThreads * GREP_FILES_AHEAD:
+                            self._collectFile( *pendingFiles.popleft() )
+                    while pendingFiles and not self.cancelEvent.is_set():
+                        self._collectFile( *pendingFiles.popleft() )
+                finally:
+                    for filepath,future in pendingFiles: future.cancel() # Those already running will notice the cancelEvent
+        except Exception as err: # Don't let the caller wait for ever
+            logging.error( exp("ParallelGrep._run: Search of {} failed: {}").format( self.dirname, err ) )
+        finally:
+            self.elapsedTime = time.monotonic() - self.startTime
+            self.batch.append( None ) # Our finished marker
+            self._handOverBatch()
+    # end of ParallelGrep._run
+
+
+    def _collectFile( self, filepath, future ):
+        """
+        Runs in the search thread.
+
+        Waits for the file to be searched and adds its matches to the batch,
+            handing the batch over if it's been held for long enough.
+        """
+        fileMatches = future.result()
+        self.numFiles += 1
+        if fileMatches is None: self.numSkippedFiles += 1
+        elif fileMatches:
+            self.numMatches += len(fileMatches)
+            self.batch.extend( (filepath, lineNumber, lineString) for lineNumber,lineString in fileMatches )
+        if self.batch and time.monotonic() - self.lastBatchTime >= GREP_BATCH_TIME:
+            self._handOverBatch()
+    # end of ParallelGrep._collectFile
+
+
+    def _handOverBatch( self ):
+        """
+        Runs in the search thread.
+
+        Queues the batch and wakes the caller (unless it hasn't yet responded to an earlier wake).
+        """
+        self.resultQueue.put( self.batch )
+        self.batch, self.lastBatchTime = [], time.monotonic()
+        if not self.wakePendingFlag and self.wakeFunction is not None: # Must be checked AFTER the put
+            self.wakePendingFlag = True
+            self.wakeFunction()
+    # end of ParallelGrep._handOverBatch
+
+
+    def getResults( self ):
+        """
+        Called (by the caller's thread) after a wake to get all the matches waiting so far.
+
+        Returns a list of (filepath, lineNumber, lineString) 3-tuples.
+            self.finishedFlag is set once the last batch has been returned.
+        """
+        self.wakePendingFlag = False # Must be cleared BEFORE emptying the queue
+        results = []
+        while True:
+            try: batch = self.resultQueue.get_nowait()
+            except queue.Empty: break
+            if batch and batch[-1] is None:
+                self.finishedFlag = True
+                batch.pop()
+            results.extend( batch )
+        return results
+    # end of ParallelGrep.getResults
+
+
+    def iterateResults( self ):
+        """
+        Generator for non-GUI callers that yields each batch of matches (waiting as necessary).
+        """
+        if self.searchThread is None: self.start()
+        while not self.finishedFlag:
+            batch = self.resultQueue.get()
+            if batch and batch[-1] is None:
+                self.finishedFlag = True
+                batch.pop()
+            if batch: yield batch
+    # end of ParallelGrep.iterateResults
+# end of class ParallelGrep
+
+
+
+def demo():
+    """
+    Demo program to check the parallel grep against a simple line-by-line search
+        and to time both on a generated folder tree of a few thousand files.
+    """
+    import tempfile, random
+
+    if BibleOrgSysGlobals.verbosityLevel > 0: print( ProgNameVersion )
+
+    def serialGrep( dirname, filenamepatt, grepkey, encoding ):
+        """ The way that the Search files tool used to do it. """
+        matches = []
+        for filepath in findGrepFilepaths( dirname, filenamepatt ):
+            try:
+                with open( filepath, encoding=encoding ) as textFile:
+                    for lineIndex,line in enumerate( textFile ):
+                        if grepkey in line: matches.append( (filepath, lineIndex+1, line.rstrip( '\n' )) )
+            except (UnicodeError, OSError): pass
+        return matches
+    # end of serialGrep
+
+    random.seed( 42 )
+    words = [ 'the', 'word', 'of', 'the', 'Lord', 'came', 'to', 'Jonah', 'in', 'beginning', 'and', 'it', 'was', 'so', 'Élohim', ]
+    numFolders, numFilesPerFolder = 40, 75
+    with tempfile.TemporaryDirectory() as testFolderPath:
+        for folderNumber in range( numFolders ):
+            folderPath = os.path.join( testFolderPath, 'Project{:02}'.format( folderNumber ), 'Books' if folderNumber%2 else '' )
+            os.makedirs( folderPath, exist_ok=True )
+            for fileNumber in range( numFilesPerFolder ):
+                lines = [ '\\v {} {}'.format( lineNumber+1, ' '.join( random.choice( words ) for w in range( random.randint( 3, 25 ) ) ) )
+                                                for lineNumber in range( random.randint( 10, 400 ) ) ]
+                if fileNumber % 17 == 0: lines.append( 'a very long last line without a final newline and with needle ' * 2000 )
+                if fileNumber % 5 == 0: lines.insert( random.randint( 0, len(lines) ), 'the needle is here' )
+                with open( os.path.join( folderPath, 'File{:03}.SFM'.format( fileNumber ) ), 'wt', encoding='utf-8', newline='' ) as textFile:
+                    textFile.write( ('\r\n' if fileNumber%4==1 else '\n').join( lines ) + ('' if fileNumber%3 else '\n') )
+        with open( os.path.join( testFolderPath, 'Project00', 'Bad.SFM' ), 'wb' ) as badFile:
+            badFile.write( b'needle \xff\xfe not UTF-8\n' )
+        numFiles = numFolders * numFilesPerFolder + 1
+        print( "  Made {} test files in {} folders".format( numFiles, numFolders ) )
+
+        for grepkey in ( 'needle', 'Jonah in', 'Élohim', 'nowhere', ):
+            serialStartTime = time.perf_counter()
+            serialMatches = serialGrep( testFolderPath, '*.SFM', grepkey, 'utf-8' )
+            serialTime = time.perf_counter() - serialStartTime
+            for maxThreads in ( 1, MAX_GREP_THREADS ):
+                grepSearch = ParallelGrep( testFolderPath, '*.SFM', grepkey, 'utf-8', maxThreads=maxThreads )
+                parallelStartTime = time.perf_counter()
+                batches = list( grepSearch.iterateResults() )
+                parallelTime = time.perf_counter() - parallelStartTime
+                parallelMatches = [match for batch in batches for match in batch]
+                assert parallelMatches == serialMatches, (grepkey, maxThreads, len(parallelMatches), len(serialMatches))
+                assert grepSearch.numFiles == numFiles and grepSearch.numSkippedFiles == (1 if grepkey=='needle' else 0) # Bad.SFM is only decoded if it might match
+                print( "  {!r} with {} threads: {} matches, serial {:.3f}s ({:.0f} files/s), parallel {:.3f}s ({:.0f} files/s) in {} batches" \
+                        .format( grepkey, maxThreads, len(parallelMatches), serialTime, numFiles/serialTime,
+                                parallelTime, numFiles/parallelTime, len(batches) ) )
+
+        # Check the wake/getResults handshake and cancelling
+        serialMatches = serialGrep( testFolderPath, '*.SFM', 'needle', 'utf-8' )
+        wakeEvent = threading.Event()
+        grepSearch = ParallelGrep( testFolderPath, '*.SFM', 'needle', 'utf-8', wakeFunction=wakeEvent.set )
+        grepSearch.start()
+        firstMatches = []
+        while not firstMatches:
+            wakeEvent.wait(); wakeEvent.clear()
+            firstMatches = grepSearch.getResults()
+        grepSearch.cancel()
+        grepSearch.searchThread.join( 5 )
+        assert not grepSearch.searchThread.is_alive()
+        remainingMatches = grepSearch.getResults()
+        assert grepSearch.finishedFlag and grepSearch.numFiles < numFiles, grepSearch.numFiles
+        assert firstMatches+remainingMatches == serialMatches[:len(firstMatches)+len(remainingMatches)]
+        print( "  Cancelled after {} of {} files ({} matches)".format( grepSearch.numFiles, numFiles, len(firstMatches)+len(remainingMatches) ) )
+        # Check the search of the decoded text (for encodings where we can't search the bytes)
+        with open( os.path.join( testFolderPath, 'Project01', 'Books', 'File001.SFM' ), 'rt', encoding='utf-8', newline='' ) as textFile: testText = textFile.read()
+        with open( os.path.join( testFolderPath, 'UTF16.txt' ), 'wt', encoding='utf-16', newline='' ) as textFile: textFile.write( testText )
+        assert not canGrepAsBytes( 'utf-16' )
+        for grepkey in ( 'needle', 'Jonah in', 'Élohim', 'nowhere', ):
+            assert grepFile( os.path.join( testFolderPath, 'UTF16.txt' ), grepkey, 'utf-16' ) \
+                == grepFile( os.path.join( testFolderPath, 'Project01', 'Books', 'File001.SFM' ), grepkey, 'utf-8' ), grepkey
+    print( "Parallel grep gave the same results as the line-by-line search" )
+# end of GrepFunctions.demo
+
+
+if __name__ == '__main__':
+    #from multiprocessing import freeze_support
+    #freeze_support() # Multiprocessing support for frozen Windows executables
+
+    # Configure basic set-up
+    parser = BibleOrgSysGlobals.setup( ProgName, ProgVersion )
+    BibleOrgSysGlobals.addStandardOptionsAndProcess( parser )
+
+    demo()
+
+    BibleOrgSysGlobals.closedown( ProgName, ProgVersion )
+# end of GrepFunctions.py
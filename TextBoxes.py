@@ -95,6 +95,14 @@ Base widgets to allow display and manipulation of
 
     class HebrewInterlinearBibleBoxAddon( BibleBoxAddon ) -- used in HebrewBibleResourceWindow
         __init__( self, parentWindow, numInterlinearLines )
+        getNormalizedHebrewWord( self, word )
+        getExpandedMorphology( self, morphology )
+        getGlossingEntry( self, normalizedWord )
+        forgetGlossingEntry( self, normalizedWord )
+        setNewGenericGloss( self, normalizedWord, genericGloss, fullRefTuple )
+        setNewSpecificGloss( self, normalizedWord, specificGloss, fullRefTuple )
+        saveGlosses( self )
+        getTextWidth( self, font, fontKey, text )
         displayAppendVerse( self, firstFlag, verseKey, verseContextData, lastFlag=True, currentVerseFlag=False, substituteTrailingSpaces=False, substituteMultipleSpaces=False )
         doClose( self, event=None )
         #getBeforeAndAfterBibleData( self, newVerseKey )
@@ -102,6 +110,7 @@ Base widgets to allow display and manipulation of
         #doActualBibleFind( self, extendTo=None )
         #_prepareInternalBible( self, bookCode=None, givenBible=None )
 
+    benchmarkHebrewInterlinearCaches( numRepeats=10 )
     demo()
 """
 
@@ -118,6 +127,9 @@ debuggingThisModule = True
 
 
 import logging
+import time
+import weakref
+from collections import OrderedDict
 
 import tkinter as tk
 import tkinter.font as tkFont
@@ -127,6 +139,9 @@ from tkinter.simpledialog import askstring, askinteger
 # Biblelator imports
 from BiblelatorGlobals import APP_NAME, tkSTART, DEFAULT, errorBeep, BIBLE_FORMAT_VIEW_MODES
 from BiblelatorSimpleDialogs import showError, showInfo
+from BiblelatorHelpers import packVerseKey, unglossedVerseIndexes, unglossedVerseIndexBuilds, glossJournals, MAX_GLOSS_JOURNAL_RECORDS, \
+                                getInternalBibleLock, startSavingGlossingDict
+from BibleFindFunctions import canFindByBooks, iterateFindTextByBooks
 
 
 # BibleOrgSys imports
@@ -151,6 +166,16 @@ TRAILING_SPACE_LINE = ' \n'
 TRAILING_SPACE_LINE_SUBSTITUTE = TRAILING_SPACE_SUBSTITUTE + '\n'
 ALL_POSSIBLE_SPACE_CHARS = ' ' + TRAILING_SPACE_SUBSTITUTE + MULTIPLE_SPACE_SUBSTITUTE
 
+MAX_CACHED_FORMATTED_VERSES = 1000 # Per Bible box or window
+MAX_CACHED_HEBREW_WORDS = 20000 # For each of the Hebrew caches below (there's around 30,000 different word forms in the Hebrew Bible)
+MAX_CACHED_TEXT_WIDTHS = 50000 # Shared by all Hebrew interlinear boxes and windows
+
+# These are shared by all Hebrew interlinear boxes and windows
+hebrewNormalizedWordCache = OrderedDict() # Indexed by the Hebrew word as in the text
+hebrewExpandedMorphologyCache = OrderedDict() # Indexed by the abbreviated morphology string
+hebrewGlossingEntryCaches = weakref.WeakKeyDictionary() # Indexed by internal Bible -- contains OrderedDicts indexed by normalized word
+textWidthCache = OrderedDict() # Indexed by 2-tuples (fontKey, text) -- contains widths in pixels
+
 
 
 class BEntry( Entry ):
@@ -1089,6 +1114,10 @@ class BibleBoxAddon():
         self.textBox.tag_configure( 'context', background='pink', font='helvetica 6' )
         self.textBox.tag_configure( 'markersHeader', background='yellow3', font='helvetica 6 bold' )
         self.textBox.tag_configure( 'markers', background='yellow3', font='helvetica 6' )
+
+        # Remembers the (text,tags) runs that we inserted for each verse
+        #   so that we don't have to work them out again when redisplaying it
+        self.formattedVerseCache = OrderedDict()
         #else:
             #self.textBox.tag_configure( 'verseNumberFormat', foreground='blue', font='helvetica 8', relief=tk.RAISED, offset='3' )
             #self.textBox.tag_configure( 'versePreSpaceFormat', background='pink', font='helvetica 8' )
@@ -1176,7 +1205,7 @@ class BibleBoxAddon():
 
         def insertAtEnd( ieText, ieTags ):
             """
-            Insert the formatted text into the end of the textbox.
+            Add the formatted text to the list of runs to be inserted into the end of the textbox.
 
             The function mostly exists so we can print the parameters if necessary for debugging.
             """
@@ -1184,7 +1213,7 @@ class BibleBoxAddon():
                 if debuggingThisModule:
                     print( "insertAtEnd( {!r}, {} )".format( ieText, ieTags ) )
                 assert isinstance( ieText, str )
-                assert isinstance( ieTags, (str,tuple) )
+                assert ieTags is None or isinstance( ieTags, (str,tuple) )
                 assert TRAILING_SPACE_SUBSTITUTE not in ieText
                 assert MULTIPLE_SPACE_SUBSTITUTE not in ieText
 
@@ -1195,7 +1224,8 @@ class BibleBoxAddon():
             if substituteTrailingSpaces:
                 ieText = ieText.replace( TRAILING_SPACE_LINE, TRAILING_SPACE_LINE_SUBSTITUTE )
 
-            self.textBox.insert( tk.END, ieText, ieTags )
+            # NOTE: Tkinter truncates the argument list at a None so we have to use an empty tag list instead
+            insertRuns.extend( (ieText, '' if ieTags is None else ieTags) )
         # end of BibleBoxAddon.displayAppendVerse.insertAtEnd
 
 
@@ -1206,6 +1236,23 @@ class BibleBoxAddon():
         if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
             print( "displayAppendVerse2( {}, {}, …, {}, {} ) for {}/{}".format( firstFlag, verseKey, lastFlag, currentVerseFlag, fVM, cVM ) )
 
+        # See if we've already formatted this exact verse data the same way before
+        formattedKey = packVerseKey( verseKey ), firstFlag, lastFlag, currentVerseFlag, substituteTrailingSpaces, substituteMultipleSpaces, cVM, fVM
+        try: cachedVerseContextData, contextRuns, verseRuns = self.formattedVerseCache[formattedKey]
+        except KeyError: cachedVerseContextData = None
+        if verseContextData is not None \
+        and ( cachedVerseContextData is verseContextData
+            or ( isinstance( verseContextData, str ) and cachedVerseContextData == verseContextData ) ):
+            # NOTE: Resource windows give us the same object from their verse caches; editors give us a new string
+            self.formattedVerseCache.move_to_end( formattedKey )
+            currentMarkName = 'C{}V{}'.format( verseKey.getChapterNumberInt(), verseKey.getVerseNumberInt() )
+            if contextRuns: self.textBox.insert( tk.END, *contextRuns )
+            self.textBox.mark_set( currentMarkName, tk.INSERT )
+            self.textBox.mark_gravity( currentMarkName, tk.LEFT )
+            if verseRuns: self.textBox.insert( tk.END, *verseRuns )
+            return
+        insertRuns = [] # Alternating text and tags ready for a single Tkinter insert call
+
         #if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
             #print( "BibleBoxAddon.displayAppendVerse( {}, {}, …, {}, {} ) for {}/{}".format( firstFlag, verseKey, lastFlag, currentVerseFlag, fVM, cVM ) )
             ##try: print( "BibleBoxAddon.displayAppendVerse( {}, {}, {}, {} )".format( firstFlag, verseKey, verseContextData, currentVerseFlag ) )
@@ -1281,6 +1328,10 @@ class BibleBoxAddon():
                     insertAtEnd( ' '+_("Displayed markers")+': ', 'markersHeader' )
                     insertAtEnd( str(markerList)[1:-1], 'markers' ) # Display list without square brackets
 
+        # Insert any context (before we set the verse mark)
+        contextRuns, insertRuns = insertRuns, []
+        if contextRuns: self.textBox.insert( tk.END, *contextRuns )
+
         #print( "  Setting mark to {}".format( currentMarkName ) )
         self.textBox.mark_set( currentMarkName, tk.INSERT )
         self.textBox.mark_gravity( currentMarkName, tk.LEFT )
@@ -1331,7 +1382,7 @@ class BibleBoxAddon():
                                 #self.textBox.mark_set( nextMarkName, tk.INSERT )
                                 #self.textBox.mark_gravity( nextMarkName, tk.LEFT )
                             #print( "  Inserting ({}): {!r}".format( marker, verseDataEntry ) )
-                            if haveTextFlag: self.textBox.insert ( tk.END, '\n' )
+                            if haveTextFlag: insertAtEnd( '\n', None )
                             if marker is None:
                                 insertAtEnd( cleanText, '###' )
                             else: insertAtEnd( '\\{} {}'.format( marker, cleanText ), marker+'#' )
@@ -1350,58 +1401,58 @@ class BibleBoxAddon():
                         #haveTextFlag = True
                     elif marker == 'id':
                         assert marker not in BibleOrgSysGlobals.USFMParagraphMarkers
-                        if haveTextFlag: self.textBox.insert ( tk.END, '\n\n' )
+                        if haveTextFlag: insertAtEnd( '\n\n', None )
                         insertAtEnd( cleanText, marker )
                         haveTextFlag = True
                     elif marker in ('ide','rem',):
                         assert marker not in BibleOrgSysGlobals.USFMParagraphMarkers
-                        if haveTextFlag: self.textBox.insert ( tk.END, '\n' )
+                        if haveTextFlag: insertAtEnd( '\n', None )
                         insertAtEnd( cleanText, marker )
                         haveTextFlag = True
                     elif marker in ('h','toc1','toc2','toc3','cl¤',):
                         assert marker not in BibleOrgSysGlobals.USFMParagraphMarkers
-                        if haveTextFlag: self.textBox.insert ( tk.END, '\n' )
+                        if haveTextFlag: insertAtEnd( '\n', None )
                         insertAtEnd( cleanText, marker )
                         haveTextFlag = True
                     elif marker in ('intro','chapters','list',):
                         assert marker not in BibleOrgSysGlobals.USFMParagraphMarkers
-                        if haveTextFlag: self.textBox.insert ( tk.END, '\n' )
+                        if haveTextFlag: insertAtEnd( '\n', None )
                         insertAtEnd( cleanText, marker )
                         haveTextFlag = True
                     elif marker in ('mt1','mt2','mt3','mt4', 'imt1','imt2','imt3','imt4', 'iot','io1','io2','io3','io4',):
                         assert marker not in BibleOrgSysGlobals.USFMParagraphMarkers
-                        if haveTextFlag: self.textBox.insert ( tk.END, '\n' )
+                        if haveTextFlag: insertAtEnd( '\n', None )
                         insertAtEnd( cleanText, marker )
                         haveTextFlag = True
                     elif marker in ('ip','ipi','im','imi','ipq','imq','ipr', 'iq1','iq2','iq3','iq4',):
                         assert marker not in BibleOrgSysGlobals.USFMParagraphMarkers
-                        if haveTextFlag: self.textBox.insert ( tk.END, '\n' )
+                        if haveTextFlag: insertAtEnd( '\n', None )
                         insertAtEnd( cleanText, marker )
                         haveTextFlag = True
                     elif marker in ('s1','s2','s3','s4', 'is1','is2','is3','is4', 'ms1','ms2','ms3','ms4', 'cl',):
                         assert marker not in BibleOrgSysGlobals.USFMParagraphMarkers
-                        if haveTextFlag: self.textBox.insert ( tk.END, '\n' )
+                        if haveTextFlag: insertAtEnd( '\n', None )
                         insertAtEnd( cleanText, marker )
                         haveTextFlag = True
                     elif marker in ('d','sp',):
                         assert marker not in BibleOrgSysGlobals.USFMParagraphMarkers
-                        if haveTextFlag: self.textBox.insert ( tk.END, '\n' )
+                        if haveTextFlag: insertAtEnd( '\n', None )
                         insertAtEnd( cleanText, marker )
                         haveTextFlag = True
                     elif marker in ('r','mr','sr',):
                         assert marker not in BibleOrgSysGlobals.USFMParagraphMarkers
-                        if haveTextFlag: self.textBox.insert ( tk.END, '\n' )
+                        if haveTextFlag: insertAtEnd( '\n', None )
                         insertAtEnd( cleanText, marker )
                         haveTextFlag = True
                     elif marker in BibleOrgSysGlobals.USFMParagraphMarkers:
                         assert not cleanText # No text expected with these markers
-                        if haveTextFlag: self.textBox.insert ( tk.END, '\n' )
+                        if haveTextFlag: insertAtEnd( '\n', None )
                         lastParagraphMarker = marker
                         haveTextFlag = True
                     elif marker in ('b','ib'):
                         assert marker not in BibleOrgSysGlobals.USFMParagraphMarkers
                         assert not cleanText # No text expected with this marker
-                        if haveTextFlag: self.textBox.insert ( tk.END, '\n' )
+                        if haveTextFlag: insertAtEnd( '\n', None )
                     #elif marker in ('m','im'):
                         #self.textBox.insert ( tk.END, '\n' if haveTextFlag else '  ', marker )
                         #if cleanText:
@@ -1448,6 +1499,13 @@ class BibleBoxAddon():
                     contextString += (' ' if firstMarker else ', ') + someMarker
                     firstMarker = False
                 insertAtEnd( contextString+' ', 'context' )
+
+        # Now insert the verse itself with a single call
+        if insertRuns: self.textBox.insert( tk.END, *insertRuns )
+        if verseContextData is not None:
+            self.formattedVerseCache[formattedKey] = verseContextData, contextRuns, insertRuns
+            while len(self.formattedVerseCache) > MAX_CACHED_FORMATTED_VERSES:
+                self.formattedVerseCache.popitem( last=False )
     # end of BibleBoxAddon.displayAppendVerse
 
 
@@ -1573,6 +1631,21 @@ class BibleBoxAddon():
         #self.lastfind = key
         self.parentApp.logUsage( ProgName, debuggingThisModule, ' doActualBibleFind {}'.format( self.BibleFindOptionsDict ) )
         #print( "bookList", repr(self.BibleFindOptionsDict['bookList']) )
+        try: replaceFunction = self.doBibleReplace
+        except AttributeError: replaceFunction = None # Read-only Bible boxes don't have a replace function
+        if canFindByBooks( self.BibleFindOptionsDict['givenBible'] ):
+            # Only load and search the books/chapters that might contain the text (and in parallel if possible)
+            #   and show the results as they come in
+            if self.modified(): self.doSave() # So that the index (and the loaded book) is up-to-date
+            resultSummaryDict = {}
+            resultIterator = iterateFindTextByBooks( self.BibleFindOptionsDict, resultSummaryDict, waitFlag=False )
+            findResultWindow = FindResultWindow( self, self.BibleFindOptionsDict, resultSummaryDict, [],
+                                    findFunction=self.doBibleFind, refindFunction=self.doActualBibleFind,
+                                    replaceFunction=replaceFunction, extendTo=extendTo, resultIterator=resultIterator )
+            self.parentApp.childWindows.append( findResultWindow )
+            self.parentApp.setReadyStatus()
+            return
+
         bookCode = None
         if isinstance( self.BibleFindOptionsDict['bookList'], str ) \
         and self.BibleFindOptionsDict['bookList'] != 'ALL':
@@ -1586,8 +1659,6 @@ class BibleBoxAddon():
             key = self.BibleFindOptionsDict['findText']
             showError( self, APP_NAME, _("String {!r} not found").format( key if len(key)<20 else (key[:18]+'…') ) )
         else:
-            try: replaceFunction = self.doBibleReplace
-            except AttributeError: replaceFunction = None # Read-only Bible boxes don't have a replace function
             findResultWindow = FindResultWindow( self, self.BibleFindOptionsDict, resultSummaryDict, findResultList,
                                     findFunction=self.doBibleFind, refindFunction=self.doActualBibleFind,
                                     replaceFunction=replaceFunction, extendTo=extendTo )
@@ -2191,12 +2262,15 @@ class HebrewInterlinearBibleBoxAddon( BibleBoxAddon ):
         self.entryStylesNormal = ( 'HebWord', 'HebStrong', 'HebMorph', 'HebGenericGloss', 'HebSpecificGloss' )
         self.entryStylesSelected = ( 'HebWordSelected', 'HebStrongSelected', 'HebMorphSelected', 'HebGenericGlossSelected', 'HebSpecificGlossSelected' )
         self.fontsNormal, self.fontsSelected = [], []
+        self.fontKeysNormal, self.fontKeysSelected = [], [] # Describe the fonts (so windows with the same fonts can share measurements)
         #tabWidthsNormal, tabWidthsSelected = [], []
         for entryStyleNormal,entryStyleSelected in zip( self.entryStylesNormal, self.entryStylesSelected ):
             fontNormal = tkFont.Font( **self.parentWindow.parentApp.stylesheet.getTKStyleDict( entryStyleNormal ) )
             fontSelected = tkFont.Font( **self.parentWindow.parentApp.stylesheet.getTKStyleDict( entryStyleSelected ) )
             self.fontsNormal.append( fontNormal )
             self.fontsSelected.append( fontSelected )
+            self.fontKeysNormal.append( tuple( sorted( fontNormal.actual().items() ) ) )
+            self.fontKeysSelected.append( tuple( sorted( fontSelected.actual().items() ) ) )
             #tabWidthNormal = fontNormal.measure( ' '*8 ) # Typically gives around 24 (pixels?)
             #tabWidthSelected = fontSelected.measure( ' '*8 ) # Typically gives around 32 (pixels?)
             ##print( "tabWidths", tabWidthNormal, tabWidthSelected )
@@ -2210,6 +2284,146 @@ class HebrewInterlinearBibleBoxAddon( BibleBoxAddon ):
     # end of HebrewInterlinearBibleBoxAddon.__init__
 
 
+    def getNormalizedHebrewWord( self, word ):
+        """
+        Removes the cantillation marks from the Hebrew word
+            and adjusts the morpheme breaks ready to look up the glossing dictionary.
+
+        The results are cached (shared between windows) because the same words recur constantly.
+        """
+        try:
+            normalizedWord = hebrewNormalizedWordCache[word]
+            hebrewNormalizedWordCache.move_to_end( word )
+        except KeyError:
+            normalizedWord = self.internalBible.removeCantillationMarks( word, removeMetegOrSiluq=True ) \
+                                .replace( ORIGINAL_MORPHEME_BREAK_CHAR, OUR_MORPHEME_BREAK_CHAR )
+            hebrewNormalizedWordCache[word] = normalizedWord
+            if len(hebrewNormalizedWordCache) > MAX_CACHED_HEBREW_WORDS:
+                hebrewNormalizedWordCache.popitem( last=False )
+        return normalizedWord
+    # end of HebrewInterlinearBibleBoxAddon.getNormalizedHebrewWord
+
+
+    def getExpandedMorphology( self, morphology ):
+        """
+        Returns the (cached) result of expanding the morphology abbreviations.
+        """
+        try:
+            expandedMorphology = hebrewExpandedMorphologyCache[morphology]
+            hebrewExpandedMorphologyCache.move_to_end( morphology )
+        except KeyError:
+            expandedMorphology = self.internalBible.expandMorphologyAbbreviations( morphology )
+            hebrewExpandedMorphologyCache[morphology] = expandedMorphology
+            if len(hebrewExpandedMorphologyCache) > MAX_CACHED_HEBREW_WORDS:
+                hebrewExpandedMorphologyCache.popitem( last=False )
+        return expandedMorphology
+    # end of HebrewInterlinearBibleBoxAddon.getExpandedMorphology
+
+
+    def getGlossingEntry( self, normalizedWord ):
+        """
+        Looks up the normalized word in the glossing dictionary of our internal Bible.
+
+        Returns a 3-tuple: genericGloss, genericReferencesList, specificReferencesDict
+            (with empty entries if the word hasn't been glossed yet).
+
+        The cache belongs to the internal Bible (so it's shared by all windows displaying it)
+            and so any changes to the glosses must call forgetGlossingEntry.
+        """
+        try: glossingEntryCache = hebrewGlossingEntryCaches[self.internalBible]
+        except KeyError: glossingEntryCache = hebrewGlossingEntryCaches[self.internalBible] = OrderedDict()
+        try:
+            glossingEntry = glossingEntryCache[normalizedWord]
+            glossingEntryCache.move_to_end( normalizedWord )
+        except KeyError:
+            glossingEntry = self.internalBible.glossingDict[normalizedWord] \
+                                if normalizedWord in self.internalBible.glossingDict else ('',[],{})
+            glossingEntryCache[normalizedWord] = glossingEntry
+            if len(glossingEntryCache) > MAX_CACHED_HEBREW_WORDS:
+                glossingEntryCache.popitem( last=False )
+        return glossingEntry
+    # end of HebrewInterlinearBibleBoxAddon.getGlossingEntry
+
+
+    def forgetGlossingEntry( self, normalizedWord ):
+        """
+        Called after the glosses for the normalized word have been changed.
+
+        Also updates the index of unglossed verses (if one has been built, or remembers the word if it's being built).
+        """
+        try: del hebrewGlossingEntryCaches[self.internalBible][normalizedWord]
+        except KeyError: pass # It wasn't cached
+        try: unglossedVerseIndexes[self.internalBible].updateWord( normalizedWord )
+        except KeyError: # No index built yet
+            try: unglossedVerseIndexBuilds[self.internalBible][1].add( normalizedWord ) # Caught up when the build is finished
+            except KeyError: pass # Not being built either
+    # end of HebrewInterlinearBibleBoxAddon.forgetGlossingEntry
+
+
+    def setNewGenericGloss( self, normalizedWord, genericGloss, fullRefTuple ):
+        """
+        Sets the generic gloss in the glossing dictionary of our internal Bible
+            and writes it to the gloss journal (so it won't be lost if we crash before the dictionary is saved).
+
+        Waits if the glossing dictionary is being saved in the background.
+        """
+        with getInternalBibleLock( self.internalBible ):
+            self.internalBible.setNewGenericGloss( normalizedWord, genericGloss, fullRefTuple )
+            try: glossJournal = glossJournals[self.internalBible]
+            except KeyError: return # No journal
+            glossJournal.append( 'G', normalizedWord, genericGloss, fullRefTuple )
+            numJournalRecords = glossJournal.numRecords
+        if numJournalRecords >= MAX_GLOSS_JOURNAL_RECORDS: self.saveGlosses()
+    # end of HebrewInterlinearBibleBoxAddon.setNewGenericGloss
+
+
+    def setNewSpecificGloss( self, normalizedWord, specificGloss, fullRefTuple ):
+        """
+        Sets the specific gloss in the glossing dictionary of our internal Bible
+            and writes it to the gloss journal (so it won't be lost if we crash before the dictionary is saved).
+
+        Waits if the glossing dictionary is being saved in the background.
+        """
+        with getInternalBibleLock( self.internalBible ):
+            self.internalBible.setNewSpecificGloss( normalizedWord, specificGloss, fullRefTuple )
+            try: glossJournal = glossJournals[self.internalBible]
+            except KeyError: return # No journal
+            glossJournal.append( 'S', normalizedWord, specificGloss, fullRefTuple )
+            numJournalRecords = glossJournal.numRecords
+        if numJournalRecords >= MAX_GLOSS_JOURNAL_RECORDS: self.saveGlosses()
+    # end of HebrewInterlinearBibleBoxAddon.setNewSpecificGloss
+
+
+    def saveGlosses( self ):
+        """
+        Saves the whole glossing dictionary (if it's been changed) in the background
+            and then empties the gloss journal (because the changes are all saved now).
+        """
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( "HebrewInterlinearBibleBoxAddon.saveGlosses()" )
+
+        startSavingGlossingDict( self.internalBible )
+    # end of HebrewInterlinearBibleBoxAddon.saveGlosses
+
+
+    def getTextWidth( self, font, fontKey, text ):
+        """
+        Returns the (cached) width of the text in pixels when displayed in the given font.
+
+        fontKey describes the font (so that windows with the same fonts can share the cache).
+        """
+        key = fontKey, text
+        try:
+            textWidth = textWidthCache[key]
+            textWidthCache.move_to_end( key )
+        except KeyError:
+            textWidth = textWidthCache[key] = font.measure( text )
+            if len(textWidthCache) > MAX_CACHED_TEXT_WIDTHS:
+                textWidthCache.popitem( last=False )
+        return textWidth
+    # end of HebrewInterlinearBibleBoxAddon.getTextWidth
+
+
     def displayAppendVerse( self, firstFlag, verseKey, verseContextData, lastFlag=True, currentVerseFlag=False, currentWordNumber=1, command=None, substituteTrailingSpaces=False, substituteMultipleSpaces=False ):
         """
         Add the requested verse to the end of self.textBox.
@@ -2345,20 +2559,18 @@ class HebrewInterlinearBibleBoxAddon( BibleBoxAddon ):
                     try: morphology = verseDict['morph']
                     except KeyError: morphology = ''
                     if self.numInterlinearLines == 3:
-                        bundle = word, strongsNumber, morphology, self.internalBible.expandMorphologyAbbreviations( morphology )
+                        bundle = word, strongsNumber, morphology, self.getExpandedMorphology( morphology )
                     elif self.numInterlinearLines == 4:
                         assert self.internalBible.glossingDict
-                        normalizedWord =  self.internalBible.removeCantillationMarks( word, removeMetegOrSiluq=True ) \
-                                            .replace( ORIGINAL_MORPHEME_BREAK_CHAR, OUR_MORPHEME_BREAK_CHAR )
+                        normalizedWord = self.getNormalizedHebrewWord( word )
                         #if normalizedWord != word:
                             #print( '   ({}) {!r} normalized to ({}) {!r}'.format( len(word), word, len(normalizedWord), normalizedWord ) )
                             ##print( '{!r} is '.format( normalizedWord ), end=None )
                             ##h.printUnicodeData( normalizedWord )
-                        genericGloss,genericReferencesList,specificReferencesDict = self.internalBible.glossingDict[normalizedWord] \
-                                                        if normalizedWord in self.internalBible.glossingDict else ('',[],{})
+                        genericGloss,genericReferencesList,specificReferencesDict = self.getGlossingEntry( normalizedWord )
                         if passNumber>1 and ( command in ('L','R') or (command=='E' and j==currentWordNumber) ):
                             command = None
-                            tempBundle = refText, normalizedWord, strongsNumber, morphology, self.internalBible.expandMorphologyAbbreviations( morphology )
+                            tempBundle = refText, normalizedWord, strongsNumber, morphology, self.getExpandedMorphology( morphology )
                             #self.parentWindow.setStatus( self.internalBible.expandMorphologyAbbreviations( morphology ) )
                             ghgwd = GetHebrewGlossWordDialog( self, _("Edit generic gloss"), tempBundle, genericGloss, geometry=self.glossWindowGeometry )
                             #print( "ghgwdResultA1", ghgwd.result )
@@ -2372,7 +2584,8 @@ class HebrewInterlinearBibleBoxAddon( BibleBoxAddon ):
                                 #print( "result1", ghgwd.result )
                                 assert ghgwd.result['word']
                                 genericGloss = ghgwd.result['word']
-                                self.internalBible.setNewGenericGloss( normalizedWord, genericGloss, fullRefTuple )
+                                self.setNewGenericGloss( normalizedWord, genericGloss, fullRefTuple )
+                                self.forgetGlossingEntry( normalizedWord )
                                 self.glossWindowGeometry = ghgwd.result['geometry'] # Keeps the window size/position
                                 try: command = ghgwd.result['command'] # 'L' or 'R'
                                 except KeyError: command = None
@@ -2383,7 +2596,7 @@ class HebrewInterlinearBibleBoxAddon( BibleBoxAddon ):
                             #print( "No generic gloss found for ({}) {}{}".format( len(word), word, \
                                 #' to ({}) {}'.format( len(normalizedWord), normalizedWord ) if normalizedWord!=word else '' ) )
                             if self.requestMissingGlosses and requestMissingGlossesNow and not self.parentApp.starting:
-                                tempBundle = refText, normalizedWord, strongsNumber, morphology, self.internalBible.expandMorphologyAbbreviations( morphology )
+                                tempBundle = refText, normalizedWord, strongsNumber, morphology, self.getExpandedMorphology( morphology )
                                 #self.parentWindow.setStatus( self.internalBible.expandMorphologyAbbreviations( morphology ) )
                                 ghgwd = GetHebrewGlossWordDialog( self, _("Enter new generic gloss"), tempBundle, geometry=self.glossWindowGeometry )
                                 #print( "ghgwdResultA2", ghgwd.result )
@@ -2397,7 +2610,8 @@ class HebrewInterlinearBibleBoxAddon( BibleBoxAddon ):
                                     #print( "result2", ghgwd.result )
                                     assert ghgwd.result['word']
                                     genericGloss = ghgwd.result['word']
-                                    self.internalBible.setNewGenericGloss( normalizedWord, genericGloss, fullRefTuple )
+                                    self.setNewGenericGloss( normalizedWord, genericGloss, fullRefTuple )
+                                    self.forgetGlossingEntry( normalizedWord )
                                     self.glossWindowGeometry = ghgwd.result['geometry'] # Keeps the window size/position
                                     try: command = ghgwd.result['command'] # 'L','R','LL','RR'
                                     except KeyError: command = None
@@ -2408,19 +2622,17 @@ class HebrewInterlinearBibleBoxAddon( BibleBoxAddon ):
                         bundle = word, strongsNumber, morphology, genericGloss
                     elif self.numInterlinearLines == 5:
                         assert self.internalBible.glossingDict
-                        normalizedWord =  self.internalBible.removeCantillationMarks( word, removeMetegOrSiluq=True ) \
-                                            .replace( ORIGINAL_MORPHEME_BREAK_CHAR, OUR_MORPHEME_BREAK_CHAR )
+                        normalizedWord = self.getNormalizedHebrewWord( word )
                         #if normalizedWord != word:
                             #print( '   ({}) {!r} normalized to ({}) {!r}'.format( len(word), word, len(normalizedWord), normalizedWord ) )
                             ##print( '{!r} is '.format( normalizedWord ), end=None )
                             ##h.printUnicodeData( normalizedWord )
-                        genericGloss,genericReferencesList,specificReferencesDict = self.internalBible.glossingDict[normalizedWord] \
-                                                        if normalizedWord in self.internalBible.glossingDict else ('',[],{})
+                        genericGloss,genericReferencesList,specificReferencesDict = self.getGlossingEntry( normalizedWord )
                         try: specificGloss = specificReferencesDict[fullRefTuple]
                         except KeyError: specificGloss = '' # No specific gloss for this reference
                         if passNumber>1 and ( command in ('L','R') or (command=='E' and j==currentWordNumber) ):
                             command = None
-                            tempBundle = refText, normalizedWord, strongsNumber, morphology, self.internalBible.expandMorphologyAbbreviations( morphology )
+                            tempBundle = refText, normalizedWord, strongsNumber, morphology, self.getExpandedMorphology( morphology )
                             #self.parentWindow.setStatus( self.internalBible.expandMorphologyAbbreviations( morphology ) )
                             ghgwd = GetHebrewGlossWordsDialog( self, _("Edit generic/specific glosses"), tempBundle, genericGloss, specificGloss, geometry=self.glossWindowGeometry )
                             #print( "ghgwdResultB1", ghgwd.result )
@@ -2435,9 +2647,10 @@ class HebrewInterlinearBibleBoxAddon( BibleBoxAddon ):
                                 assert ghgwd.result['word1']
                                 genericGloss = ghgwd.result['word1']
                                 specificGloss = ghgwd.result['word2'] if 'word2' in ghgwd.result else None
-                                self.internalBible.setNewGenericGloss( normalizedWord, genericGloss, fullRefTuple )
+                                self.setNewGenericGloss( normalizedWord, genericGloss, fullRefTuple )
                                 if specificGloss:
-                                    self.internalBible.setNewSpecificGloss( normalizedWord, specificGloss, fullRefTuple )
+                                    self.setNewSpecificGloss( normalizedWord, specificGloss, fullRefTuple )
+                                self.forgetGlossingEntry( normalizedWord )
                                 self.glossWindowGeometry = ghgwd.result['geometry'] # Keeps the window size/position
                                 try: command = ghgwd.result['command'] # 'L' or 'R'
                                 except KeyError: command = None
@@ -2448,7 +2661,7 @@ class HebrewInterlinearBibleBoxAddon( BibleBoxAddon ):
                             #print( "No generic gloss found for ({}) {}{}".format( len(word), word, \
                                 #' to ({}) {}'.format( len(normalizedWord), normalizedWord ) if normalizedWord!=word else '' ) )
                             if self.requestMissingGlosses and requestMissingGlossesNow and not self.parentApp.starting:
-                                tempBundle = refText, normalizedWord, strongsNumber, morphology, self.internalBible.expandMorphologyAbbreviations( morphology )
+                                tempBundle = refText, normalizedWord, strongsNumber, morphology, self.getExpandedMorphology( morphology )
                                 #self.parentWindow.setStatus( self.internalBible.expandMorphologyAbbreviations( morphology ) )
                                 ghgwd = GetHebrewGlossWordsDialog( self, _("Enter new generic/specific glosses"), tempBundle, geometry=self.glossWindowGeometry )
                                 #print( "ghgwdResultB2", ghgwd.result )
@@ -2463,9 +2676,10 @@ class HebrewInterlinearBibleBoxAddon( BibleBoxAddon ):
                                     assert ghgwd.result['word1']
                                     genericGloss = ghgwd.result['word1']
                                     specificGloss = ghgwd.result['word2'] if 'word2' in ghgwd.result else None
-                                    self.internalBible.setNewGenericGloss( normalizedWord, genericGloss, fullRefTuple )
+                                    self.setNewGenericGloss( normalizedWord, genericGloss, fullRefTuple )
                                     if specificGloss:
-                                        self.internalBible.setNewSpecificGloss( normalizedWord, specificGloss, fullRefTuple )
+                                        self.setNewSpecificGloss( normalizedWord, specificGloss, fullRefTuple )
+                                    self.forgetGlossingEntry( normalizedWord )
                                     self.glossWindowGeometry = ghgwd.result['geometry'] # Keeps the window size/position
                                     try: command = ghgwd.result['command'] # 'L' or 'R'
                                     except KeyError: command = None
@@ -2513,10 +2727,10 @@ class HebrewInterlinearBibleBoxAddon( BibleBoxAddon ):
                 assert len(textBundle) == self.numInterlinearLines
 
             if currentBundleFlag:
-                entryStyles, fonts = self.entryStylesSelected, self.fontsSelected
-                self.parentWindow.setStatus( self.internalBible.expandMorphologyAbbreviations(textBundle[2]) )
+                entryStyles, fonts, fontKeys = self.entryStylesSelected, self.fontsSelected, self.fontKeysSelected
+                self.parentWindow.setStatus( self.getExpandedMorphology( textBundle[2] ) )
             else:
-                entryStyles, fonts = self.entryStylesNormal, self.fontsNormal
+                entryStyles, fonts, fontKeys = self.entryStylesNormal, self.fontsNormal, self.fontKeysNormal
 
             # Find the width of each bundleEntry
             maxWidthPixels = 0
@@ -2525,7 +2739,7 @@ class HebrewInterlinearBibleBoxAddon( BibleBoxAddon ):
             for j,bundleEntry in enumerate( textBundle ):
                 #print( "bundleEntry", bundleEntry )
                 #(w,h) = (font.measure(text),font.metrics("linespace"))
-                bundleWidthPixels = fonts[j].measure( bundleEntry ) + 6 # for safety
+                bundleWidthPixels = self.getTextWidth( fonts[j], fontKeys[j], bundleEntry ) + 6 # for safety
                 bundleWidthsPixels.append( bundleWidthPixels )
                 tabStopsUsed.append( int( bundleWidthPixels / self.tabStopPixels ) + 1 )
                 #print( j, currentBundleFlag, bundleEntry, bundleWidthPixels )
@@ -2928,9 +3142,8 @@ class HebrewInterlinearBibleBoxAddon( BibleBoxAddon ):
         if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
             print( "HebrewInterlinearBibleBoxAddon.doClose( {} )".format( event ) )
 
-        try: self.internalBible.saveAnyChangedGlosses()
-        except AttributeError: # if self.internalBible is None
-            if debuggingThisModule: print( "Why is Hebrew internalBible None?" )
+        if self.internalBible is not None: self.saveGlosses()
+        elif debuggingThisModule: print( "Why is Hebrew internalBible None?" )
 
         self.destroy()
     # end of HebrewInterlinearBibleBoxAddon.doClose
@@ -3109,6 +3322,61 @@ class HebrewInterlinearBibleBoxAddon( BibleBoxAddon ):
 
 
 
+def benchmarkHebrewInterlinearCaches( numRepeats=10 ):
+    """
+    Times the per-word work of displaying Genesis 1 in a five-line Hebrew interlinear window
+        (normalizing the words, looking up the glosses, expanding the morphology, and measuring the bundles)
+        firstly done directly each time, and then using the caches.
+
+    Only the per-word work is timed (not the inserts into the text box).
+    """
+    from HebrewWLCBible import PickledHebrewWLCBible
+    WLCPath = '../BibleOrgSys/DownloadedResources/WLC.BOSPickledBible.zip'
+    try:
+        WLC = PickledHebrewWLCBible( WLCPath )
+        WLC.preload()
+        WLC.loadGlossingDict()
+    except FileNotFoundError:
+        print( "Unable to find {!r} for Hebrew interlinear benchmark".format( WLCPath ) ); return
+    BBB, C = 'GEN', '1'
+    verseWordsList = [] # Contains (fullRefTuple, wordDict) 2-tuples
+    for V in range( 1, WLC.getNumVerses( BBB, C )+1 ):
+        verseKey = SimpleVerseKey( BBB, C, str(V) )
+        verseDataList, context = WLC.getContextVerseData( verseKey )
+        for verseDataEntry in verseDataList:
+            if verseDataEntry.getMarker() in ('v~','p~'):
+                verseWordsList.extend( (verseKey.getBCV()+(str(j),), verseDict) for j,verseDict in enumerate( WLC.getVerseDictList( verseDataEntry, verseKey ), start=1 ) )
+    fonts = [tkFont.Font( family=DEFAULT_FONTNAME, size=DEFAULT_FONTSIZE ) for j in range( 5 )]
+    fontKeys = [tuple( sorted( font.actual().items() ) ) for font in fonts]
+
+    class BenchmarkBox: pass # Just enough to call the HebrewInterlinearBibleBoxAddon caching methods
+    benchmarkBox = BenchmarkBox()
+    benchmarkBox.internalBible = WLC
+    for useCaches in ( False, True ):
+        startTime = time.perf_counter()
+        for repeat in range( numRepeats ):
+            for fullRefTuple,verseDict in verseWordsList:
+                word, strongsNumber, morphology = verseDict['word'], verseDict.get( 'strong', '' ), verseDict.get( 'morph', '' )
+                if useCaches:
+                    normalizedWord = HebrewInterlinearBibleBoxAddon.getNormalizedHebrewWord( benchmarkBox, word )
+                    genericGloss,genericReferencesList,specificReferencesDict = HebrewInterlinearBibleBoxAddon.getGlossingEntry( benchmarkBox, normalizedWord )
+                    HebrewInterlinearBibleBoxAddon.getExpandedMorphology( benchmarkBox, morphology )
+                else:
+                    normalizedWord =  WLC.removeCantillationMarks( word, removeMetegOrSiluq=True ) \
+                                        .replace( ORIGINAL_MORPHEME_BREAK_CHAR, OUR_MORPHEME_BREAK_CHAR )
+                    genericGloss,genericReferencesList,specificReferencesDict = WLC.glossingDict[normalizedWord] \
+                                                    if normalizedWord in WLC.glossingDict else ('',[],{})
+                    WLC.expandMorphologyAbbreviations( morphology )
+                specificGloss = specificReferencesDict.get( fullRefTuple, '' )
+                for font,fontKey,bundleEntry in zip( fonts, fontKeys, (word,strongsNumber,morphology,genericGloss,specificGloss) ):
+                    if useCaches: HebrewInterlinearBibleBoxAddon.getTextWidth( benchmarkBox, font, fontKey, bundleEntry )
+                    else: font.measure( bundleEntry )
+        print( "Displaying {} Genesis 1 words {} times {} caches took {:.3f}s" \
+                .format( len(verseWordsList), numRepeats, 'with' if useCaches else 'without', time.perf_counter()-startTime ) )
+# end of TextBoxes.benchmarkHebrewInterlinearCaches
+
+
+
 def demo():
     """
     Demo program to handle command line parameters and then run what they want.
@@ -3123,6 +3391,8 @@ def demo():
     tkRootWindow = Tk()
     tkRootWindow.title( ProgNameVersionDate if BibleOrgSysGlobals.debugFlag else ProgNameVersion )
 
+    benchmarkHebrewInterlinearCaches()
+
     HTMLTextBoxbox = HTMLTextBox( tkRootWindow )
     HTMLTextBoxbox.pack()
 
@@ -83,6 +83,7 @@ class TextEditWindowAddon:
         self.parentApp.logUsage( ProgName, debuggingThisModule, 'TextEditWindowAddon __init__ {} {} {}'.format( windowType, folderPath, filename ) )
 
         self.filepath = os.path.join( folderPath, filename ) if folderPath and filename else None
+        self.fileEncoding = 'utf-8' # Can be changed (e.g., by grep) before the file is loaded
         self.moduleID = None
         self.protocol( 'WM_DELETE_WINDOW', self.doClose ) # Catch when window is closed
 
@@ -1059,7 +1060,7 @@ class TextEditWindowAddon:
             print( "TextEditWindowAddon.loadText()" )
 
         self.loading = True
-        text = open( self.filepath, 'rt', encoding='utf-8' ).read()
+        text = open( self.filepath, 'rt', encoding=self.fileEncoding ).read()
         if text == None:
             showError( self, APP_NAME, 'Could not decode and open file ' + self.filepath )
             return False
@@ -1136,7 +1137,7 @@ class TextEditWindowAddon:
             if self.folderPath and self.filename:
                 filepath = os.path.join( self.folderPath, self.filename )
                 allText = self.getEntireText() # from the displayed edit window
-                with open( filepath, mode='wt', encoding='utf-8' ) as theFile:
+                with open( filepath, mode='wt', encoding=self.fileEncoding ) as theFile:
                     theFile.write( allText )
                 self.rememberFileTimeAndSize()
                 self.textBox.edit_modified( tk.FALSE ) # clear Tkinter modified flag
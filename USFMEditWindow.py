@@ -51,18 +51,18 @@ from BiblelatorSimpleDialogs import showError, showWarning, showInfo
 from BiblelatorDialogs import OkCancelDialog, YesNoDialog, GetBibleReplaceTextDialog, ReplaceConfirmDialog
 from BiblelatorHelpers import createEmptyUSFMBookText, calculateTotalVersesForBook, \
                                 mapReferenceVerseKey, mapParallelVerseKey, findCurrentSection, \
-                                handleInternalBibles, getChangeLogFilepath, logChangedFile
+                                handleInternalBibles, getChangeLogFilepath, logChangedFile, packVerseKey
 from BibleResourceWindows import InternalBibleResourceWindowAddon
 from BibleReferenceCollection import BibleReferenceCollectionWindow
 from ChildWindows import ChildWindow
 from TextEditWindow import TextEditWindow, TextEditWindowAddon #, NO_TYPE_TIME
 from AutocompleteFunctions import loadBibleAutocompleteWords, loadBibleBookAutocompleteWords, \
                                     loadHunspellAutocompleteWords, loadILEXAutocompleteWords
+from BibleFindFunctions import REGEX_TIME_LIMIT, makeReplaceUndoJournal, replaceTextInBooks, invalidateBookShadowTexts
 
 # BibleOrgSys imports
 import BibleOrgSysGlobals
 from VerseReferences import SimpleVerseKey
-from USFMBible import findReplaceText
 
 
 
@@ -261,6 +261,7 @@ class USFMEditWindow( TextEditWindowAddon, InternalBibleResourceWindowAddon, Chi
         self.exportFolderPathname = None
 
         self.saveChangesAutomatically = True # different from AutoSave (which is in different files in different folders)
+        self.lastReplaceUndoJournal = None # So that the last Bible replace can be undone
 
         if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
             print( "USFMEditWindow.__init__ finished." )
@@ -379,6 +380,7 @@ class USFMEditWindow( TextEditWindowAddon, InternalBibleResourceWindowAddon, Chi
         searchMenu.add_command( label=_('Bible Find…'), underline=6, command=self.doBibleFind, accelerator=self.parentApp.keyBindingDict[_('Find')][0] )
         #subsearchMenuBible.add_command( label=_('Find again'), underline=5, command=self.notWrittenYet )
         searchMenu.add_command( label=_('Replace…'), underline=0, command=self.doBibleReplace, accelerator=self.parentApp.keyBindingDict[_('Replace')][0] )
+        searchMenu.add_command( label=_('Undo last Bible replace…'), underline=0, command=self.doUndoBibleReplace )
         #searchMenu.add_cascade( label=_('Bible'), underline=0, menu=subsearchMenuBible )
         searchMenu.add_separator()
         subSearchMenuWindow = tk.Menu( searchMenu, tearoff=False )
@@ -908,16 +910,16 @@ class USFMEditWindow( TextEditWindowAddon, InternalBibleResourceWindowAddon, Chi
             """
             #if debuggingThisModule: print( "addCacheEntry", BBB, C, V, data )
             assert BBB and C and V and data
-            verseKeyHash = SimpleVerseKey( BBB, C, V ).makeHash()
-            if verseKeyHash in self.verseCache: # Oh, how come we already have this key???
-                if data == self.verseCache[verseKeyHash]:
+            packedVerseKey = packVerseKey( SimpleVerseKey( BBB, C, V ) )
+            if packedVerseKey in self.verseCache: # Oh, how come we already have this key???
+                if data == self.verseCache[packedVerseKey]:
                     logging.critical( "cacheBook: We have an identical duplicate {} {}: {!r}" \
-                            .format( self.projectAbbreviation, verseKeyHash, data ) )
+                            .format( self.projectAbbreviation, '{} {}:{}'.format( BBB, C, V ), data ) )
                 else:
                     logging.critical( "cacheBook: We have a duplicate {} {} -- already had {!r} and now appending {!r}" \
-                            .format( self.projectAbbreviation, verseKeyHash, self.verseCache[verseKeyHash], data ) )
-                    data = self.verseCache[verseKeyHash] + '\n' + data
-            self.verseCache[verseKeyHash] = data.replace( '\n\n', '\n' ) # Weed out blank lines
+                            .format( self.projectAbbreviation, '{} {}:{}'.format( BBB, C, V ), self.verseCache[packedVerseKey], data ) )
+                    data = self.verseCache[packedVerseKey] + '\n' + data
+            self.verseCache[packedVerseKey] = data.replace( '\n\n', '\n' ) # Weed out blank lines
         # end of USFMEditWindow.cacheBook.addCacheEntry
 
         def getMarkerText( blIndex ):
@@ -1029,11 +1031,21 @@ class USFMEditWindow( TextEditWindowAddon, InternalBibleResourceWindowAddon, Chi
             otherwise returns None.
         """
         #if BibleOrgSysGlobals.debugFlag and debuggingThisModule: print( "getCachedVerseData( {} )".format( verseKey ) )
-        try: return self.verseCache[verseKey.makeHash()]
+        try: return self.verseCache[packVerseKey( verseKey )]
         except KeyError: return None
     # end of USFMEditWindow.getCachedVerseData
 
 
+    def getCurrentSection( self, verseKey ):
+        """
+        Overrides the indexed version in BibleResourceWindowAddon
+            because the text that we're editing can change at any time,
+            so we have to scan our own verse cache.
+        """
+        return findCurrentSection( verseKey, self.getNumChapters, self.getNumVerses, self.getCachedVerseData )
+    # end of USFMEditWindow.getCurrentSection
+
+
     def emptyVerseMatch( self, stringToSearch ):
         """
         Goes through all chapters, verses, and books
@@ -1346,7 +1358,7 @@ class USFMEditWindow( TextEditWindowAddon, InternalBibleResourceWindowAddon, Chi
             elif self._contextViewMode == 'BySection':
                 if BibleOrgSysGlobals.debugFlag and debuggingThisModule: print( 'USFMEditWindow.updateShownBCV', 'BySection2' )
                 BBB, intC, intV = newVerseKey.getBBB(), newVerseKey.getChapterNumberInt(), newVerseKey.getVerseNumberInt()
-                sectionStart, sectionEnd = findCurrentSection( newVerseKey, self.getNumChapters, self.getNumVerses, self.getCachedVerseData )
+                sectionStart, sectionEnd = self.getCurrentSection( newVerseKey )
                 intC1, intV1 = sectionStart.getChapterNumberInt(), sectionStart.getVerseNumberInt()
                 intC2, intV2 = sectionEnd.getChapterNumberInt(), sectionEnd.getVerseNumberInt()
                 self.bookTextBefore = self.bookTextAfter = ''
@@ -1473,17 +1485,28 @@ class USFMEditWindow( TextEditWindowAddon, InternalBibleResourceWindowAddon, Chi
             self.parentApp.logUsage( ProgName, debuggingThisModule, ' doBibleReplace {}'.format( self.BibleReplaceOptionsDict ) )
             #self._prepareInternalBible() # Make sure that all books are loaded
             self.doSave() # Make sure that any saves are made to disk
-            # We load and search/replace the actual text files
-            self.BibleReplaceOptionsDict, resultSummaryDict = findReplaceText( self.BibleReplaceOptionsDict['givenBible'], self.BibleReplaceOptionsDict, self.findReplaceCallback )
+            # We load and search/replace the actual text files (writing each book once after all its replaces are confirmed)
+            undoJournal = makeReplaceUndoJournal( self.BibleReplaceOptionsDict['givenBible'] )
+            self.BibleReplaceOptionsDict, resultSummaryDict = replaceTextInBooks( self.BibleReplaceOptionsDict, self.findReplaceCallback, undoJournal )
             #print( "Got findReplaceResults", resultSummaryDict )
-            if 'hadRegexError' in resultSummaryDict and resultSummaryDict['hadRegexError']:
+            if resultSummaryDict['replacedBookList']: self.lastReplaceUndoJournal = undoJournal
+            if resultSummaryDict['hadRegexError']:
                 errorBeep()
                 showError( self, APP_NAME, _("Regex error with {!r} or {!r}") \
                     .format( self.BibleReplaceOptionsDict['findText'], self.BibleReplaceOptionsDict['replaceText'] ) )
+            elif resultSummaryDict['hadRegexTimeout']:
+                if resultSummaryDict['replacedBookList']: self.checkForDiskChanges( autoloadText=True )
+                errorBeep()
+                showError( self, APP_NAME, _("Searching for {!r} took more than {} seconds so the replace was stopped{}.\n\nPlease try a simpler regular expression.") \
+                    .format( self.BibleReplaceOptionsDict['findText'], REGEX_TIME_LIMIT,
+                            _(" (after {} replacements)").format( resultSummaryDict['numReplaces'] ) if resultSummaryDict['numReplaces'] else '' ) )
             elif resultSummaryDict['numFinds'] == 0:
                 errorBeep()
                 key = self.BibleReplaceOptionsDict['findText']
                 showError( self, APP_NAME, _("String {!r} not found").format( key if len(key)<20 else (key[:18]+'…') ) )
+            elif resultSummaryDict['undoneFlag']:
+                self.checkForDiskChanges( autoloadText=True )
+                showInfo( self, APP_NAME, _("All replacements undone") )
             else:
                 self.checkForDiskChanges( autoloadText=True )
                 if len(resultSummaryDict['replacedBookList']) == 1:
@@ -1496,6 +1519,31 @@ class USFMEditWindow( TextEditWindowAddon, InternalBibleResourceWindowAddon, Chi
     # end of USFMEditWindow.doBibleReplace
 
 
+    def doUndoBibleReplace( self, event=None ):
+        """
+        Puts back all the book files changed by the last Bible replace
+            (except for any that have been changed again since).
+        """
+        self.parentApp.logUsage( ProgName, debuggingThisModule, 'USFMEditWindow doUndoBibleReplace' )
+        if BibleOrgSysGlobals.debugFlag and debuggingThisModule:
+            print( "USFMEditWindow.doUndoBibleReplace( {} )".format( event ) )
+
+        if self.lastReplaceUndoJournal is None or not self.lastReplaceUndoJournal.canRollback():
+            showInfo( self, APP_NAME, _("No Bible replace to undo") )
+            return
+        ynd = YesNoDialog( self, _("Undo all the replacements made by the last Bible replace?"), title=_('Undo replace?') )
+        if ynd.result != True: return
+        self.doSave() # Make sure that any saves are made to disk
+        restoredBookList, changedBookList = self.lastReplaceUndoJournal.rollback( self.BibleReplaceOptionsDict['givenBible'] )
+        self.lastReplaceUndoJournal = None
+        self.checkForDiskChanges( autoloadText=True )
+        if changedBookList:
+            showWarning( self, APP_NAME, _("Restored {} but not {} (changed since the replace)") \
+                .format( ', '.join( restoredBookList ) if restoredBookList else _('nothing'), ', '.join( changedBookList ) ) )
+        else: showInfo( self, APP_NAME, _("Restored {}").format( ', '.join( restoredBookList ) ) )
+    # end of USFMEditWindow.doUndoBibleReplace
+
+
     def findReplaceCallback( self, ref, contextBefore, ourFindText, contextAfter, willBeText, haveUndosFlag ):
         """
         Asks the user if they want to do the replace.
@@ -1503,7 +1551,7 @@ class USFMEditWindow( TextEditWindowAddon, InternalBibleResourceWindowAddon, Chi
         Returns a single UPPERCASE character
             'N' (no), 'Y' (yes), 'A' (all), or 'S' (stop).
         """
-        rcd = ReplaceConfirmDialog( self, self.parentApp, ref, contextBefore, ourFindText, contextAfter, willBeText, haveUndosFlag, _("Replace {!r}?").format( ourFindText ) )
+        rcd = ReplaceConfirmDialog( self, ref, contextBefore, ourFindText, contextAfter, willBeText, haveUndosFlag, _("Replace {!r}?").format( ourFindText ) )
         if rcd.result is None: rcd.result = 'N' # ESC pressed
         assert rcd.result in 'YNASU'
         return rcd.result
@@ -1534,6 +1582,7 @@ class USFMEditWindow( TextEditWindowAddon, InternalBibleResourceWindowAddon, Chi
                 self.rememberFileTimeAndSize()
                 BBB = self.currentVerseKey.getBBB()
                 self.internalBible.bookNeedsReloading[BBB] = True
+                invalidateBookShadowTexts( self.internalBible, BBB ) # coz they're now out of date
                 self.textBox.edit_modified( tk.FALSE ) # clear Tkinter modified flag
                 self.bookTextModified = False
                 #self.internalBible.unloadBooks() # coz they're now out of date